@@ -0,0 +1 @@
+# Maintenance jobs module
\ No newline at end of file
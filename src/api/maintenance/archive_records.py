@@ -0,0 +1,170 @@
+"""
+Archive Records
+Scheduled job that moves cold rows out of the hot DynamoDB tables into
+compressed NDJSON partitions (see utils/archive.py).
+
+DATASETS:
+- subscriptions: canceled subscriptions whose canceled_at is past the
+  retention window (they otherwise come back on every owner_id-index query)
+- invitations: invitation items (sk INVITE#..., organisations/model.py)
+  whose expires_at is past the retention window. Archived rows keep their
+  pk/sk, so they can be written back as they were
+
+Partitions are keyed by owner (owner_id / organisation_id), so the
+find_archived_* lookups only read that owner's partitions.
+
+Run locally against a directory instead of S3:
+    ARCHIVE_DIR=./archive python -m maintenance.archive_records --dry-run
+    python -m maintenance.archive_records --reindex    # partitions from before the owner layout
+"""
+import os
+import argparse
+from datetime import datetime, timedelta
+from utils.helpers import get_table
+from utils.archive import get_archive_store, archive_rows, read_archived, reindex_partitions
+from utils.telemetry import track_request
+from organisations.model import INVITE_PREFIX
+from organisations.legacy import delete_legacy
+
+# Dataset -> (owner of a row, archive month of a row)
+DATASETS = {
+    'subscriptions': (lambda row: row.get('owner_id') or 'unknown', lambda row: row['canceled_at'][:7]),
+    'invitations': (lambda row: row['organisation_id'], lambda row: row['expires_at'][:7]),
+}
+
+SUBSCRIPTION_RETENTION_DAYS = int(os.environ.get('SUBSCRIPTION_RETENTION_DAYS', '90'))
+INVITATION_RETENTION_DAYS = int(os.environ.get('INVITATION_RETENTION_DAYS', '30'))
+
+subscriptions_table = get_table('SUBSCRIPTIONS_TABLE_NAME')
+org_table = get_table('ORGANISATION_DATA_TABLE_NAME')
+
+
+def get_cutoff(retention_days):
+    """Get the ISO timestamp before which rows are archived."""
+    return (datetime.utcnow() - timedelta(days=retention_days)).isoformat()
+
+
+def scan_rows(table, **scan_kwargs):
+    """Yield every row matching a scan, one page at a time."""
+    while True:
+        response = table.scan(**scan_kwargs)
+        
+        for item in response.get('Items', []):
+            yield item
+        
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def archive_canceled_subscriptions(store, dry_run=False):
+    """Archive canceled subscriptions past the retention window."""
+    rows = scan_rows(
+        subscriptions_table,
+        FilterExpression='#status = :canceled AND canceled_at < :cutoff',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={
+            ':canceled': 'canceled',
+            ':cutoff': get_cutoff(SUBSCRIPTION_RETENTION_DAYS),
+        }
+    )
+    
+    owner_of, month_of = DATASETS['subscriptions']
+    return archive_rows(
+        store,
+        subscriptions_table,
+        'subscriptions',
+        rows,
+        key_attributes=['subscription_id'],
+        owner_of=owner_of,
+        month_of=month_of,
+        dry_run=dry_run
+    )
+
+
+def without_legacy_rows(rows):
+    """Yield rows after deleting their legacy rows, so the migration can't copy them back."""
+    for row in rows:
+        delete_legacy([{'pk': row['pk'], 'sk': row['sk']}])
+        yield row
+
+
+def archive_expired_invitations(store, dry_run=False):
+    """Archive invitations past the retention window."""
+    rows = scan_rows(
+        org_table,
+        FilterExpression='begins_with(sk, :invite) AND expires_at < :cutoff',
+        ExpressionAttributeValues={
+            ':invite': INVITE_PREFIX,
+            ':cutoff': get_cutoff(INVITATION_RETENTION_DAYS),
+        }
+    )
+    if not dry_run:
+        rows = without_legacy_rows(rows)
+    
+    owner_of, month_of = DATASETS['invitations']
+    return archive_rows(
+        store,
+        org_table,
+        'invitations',
+        rows,
+        key_attributes=['pk', 'sk'],
+        owner_of=owner_of,
+        month_of=month_of,
+        dry_run=dry_run
+    )
+
+
+def find_archived_subscriptions(owner_id, store=None):
+    """Get archived subscriptions for a user or organisation, newest first."""
+    rows = read_archived(store or get_archive_store(), 'subscriptions', owner=owner_id)
+    return sorted(rows, key=lambda row: row.get('canceled_at', ''), reverse=True)
+
+
+def find_archived_invitations(organisation_id, store=None):
+    """Get archived invitations for an organisation, newest first."""
+    rows = read_archived(store or get_archive_store(), 'invitations', owner=organisation_id)
+    return sorted(rows, key=lambda row: row.get('created_at', ''), reverse=True)
+
+
+@track_request
+def lambda_handler(event, context):
+    """
+    Scheduled (EventBridge) - archive cold subscriptions and invitations
+    
+    Returns:
+    {
+        "subscriptions": 12,
+        "invitations": 40
+    }
+    """
+    store = get_archive_store()
+    
+    result = {
+        'subscriptions': archive_canceled_subscriptions(store),
+        'invitations': archive_expired_invitations(store),
+    }
+    
+    print(f"[Archive] Archived rows: {result}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive cold subscriptions and invitations')
+    parser.add_argument('--dry-run', action='store_true', help='Count matching rows without writing or deleting')
+    parser.add_argument('--reindex', action='store_true', help='Move partitions written before the owner layout into it')
+    args = parser.parse_args()
+    
+    store = get_archive_store()
+    if args.reindex:
+        print({dataset: reindex_partitions(store, dataset, *functions) for dataset, functions in DATASETS.items()})
+        return
+    
+    print({
+        'subscriptions': archive_canceled_subscriptions(store, dry_run=args.dry_run),
+        'invitations': archive_expired_invitations(store, dry_run=args.dry_run),
+    })
+
+
+if __name__ == '__main__':
+    main()
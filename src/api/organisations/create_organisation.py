@@ -6,13 +6,13 @@ from utils.response_builder import (
 )
 from utils.helpers import (
     get_user_id_from_event,
-    get_table,
     get_current_timestamp,
     parse_request_body
 )
+from utils.unit_of_work import get_unit_of_work
+from organisations.model import get_org_table, get_user_membership, organisation_item, member_item
 
-org_table = get_table('ORGANISATIONS_TABLE_NAME')
-members_table = get_table('ORG_MEMBERS_TABLE_NAME')
+org_table = get_org_table()
 
 
 def validate_organisation_name(name):
@@ -39,13 +39,7 @@ def lambda_handler(event, context):
     user_id = get_user_id_from_event(event)
     
     # Check if user is already in an organisation
-    existing_membership = members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    
-    if existing_membership.get('Items'):
+    if get_user_membership(user_id):
         return error_response('You are already a member of an organisation. Leave your current organisation first.', 409)
     
     # Parse and validate request
@@ -76,9 +70,11 @@ def lambda_handler(event, context):
         'joined_at': timestamp
     }
     
-    # Save both items
-    org_table.put_item(Item=organisation)
-    members_table.put_item(Item=membership)
+    # Save both items in one transaction - never an organisation without its owner
+    uow = get_unit_of_work()
+    uow.put(org_table, organisation_item(organisation))
+    uow.put(org_table, member_item(membership))
+    uow.flush(atomic=True)
     
     # Return organisation with user role
     organisation['user_role'] = 'owner'
@@ -4,25 +4,11 @@ from utils.response_builder import (
     forbidden_response,
     error_handler
 )
-from utils.helpers import (
-    get_user_id_from_event,
-    get_table
-)
-
-org_table = get_table('ORGANISATIONS_TABLE_NAME')
-members_table = get_table('ORG_MEMBERS_TABLE_NAME')
-invitations_table = get_table('ORG_INVITATIONS_TABLE_NAME')
+from utils.helpers import get_user_id_from_event, build_projection
+from organisations.model import get_org_table, get_user_membership, query_partition
+from organisations.legacy import delete_legacy
 
-
-def get_user_membership(user_id):
-    """Get user's organisation membership."""
-    response = members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    items = response.get('Items', [])
-    return items[0] if items else None
+org_table = get_org_table()
 
 
 @error_handler
@@ -45,36 +31,13 @@ def lambda_handler(event, context):
     
     org_id = membership['organisation_id']
     
-    # Get all members to delete
-    members_response = members_table.query(
-        KeyConditionExpression='organisation_id = :oid',
-        ExpressionAttributeValues={':oid': org_id}
-    )
-    
-    # Delete all members
-    for member in members_response.get('Items', []):
-        members_table.delete_item(
-            Key={
-                'organisation_id': org_id,
-                'user_id': member['user_id']
-            }
-        )
-    
-    # Delete pending invitations
-    invitations_response = invitations_table.query(
-        KeyConditionExpression='organisation_id = :oid',
-        ExpressionAttributeValues={':oid': org_id}
-    )
-    
-    for invitation in invitations_response.get('Items', []):
-        invitations_table.delete_item(
-            Key={
-                'organisation_id': org_id,
-                'invitation_id': invitation['invitation_id']
-            }
-        )
-    
-    # Delete organisation
-    org_table.delete_item(Key={'organisation_id': org_id})
+    # The organisation, its members and its invitations are one partition:
+    # read only the keys, delete in batches of 25 (BatchWriteItem)
+    keys = [{'pk': item['pk'], 'sk': item['sk']} for item in query_partition(org_id, **build_projection(['pk', 'sk']))]
+    # Legacy rows first, or the organisation could be copied back
+    delete_legacy(keys)
+    with org_table.batch_writer() as batch:
+        for key in keys:
+            batch.delete_item(Key=key)
     
     return success_response({'message': 'Organisation deleted successfully'})
@@ -1,36 +1,40 @@
 from utils.response_builder import (
     success_response,
+    error_response,
     not_found_response,
     error_handler
 )
 from utils.helpers import (
     get_user_id_from_event,
-    get_table
+    get_table,
+    get_fields_param,
+    build_projection,
+    batch_get_items
 )
+from organisations.model import get_user_membership, query_members, strip_keys
 
-members_table = get_table('ORG_MEMBERS_TABLE_NAME')
 profiles_table = get_table('TABLE_NAME')
 
-
-def get_user_membership(user_id):
-    """Get user's organisation membership."""
-    response = members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    items = response.get('Items', [])
-    return items[0] if items else None
+# Fields that can be requested with ?fields=
+MEMBER_FIELDS = ['user_id', 'role', 'joined_at', 'display_name', 'email']
+# Fields that come from the member's profile rather than the membership
+PROFILE_FIELDS = ['display_name', 'email']
 
 
 @error_handler
 def lambda_handler(event, context):
     """
     GET /organisation/members - Get all organisation members
+    GET /organisation/members?fields=user_id,role - Retrieve only the listed fields
     Authenticated endpoint - must be a member of the organisation
     """
     user_id = get_user_id_from_event(event)
     
+    fields, error_msg = get_fields_param(event, MEMBER_FIELDS)
+    if error_msg:
+        return error_response(error_msg)
+    fields = fields or MEMBER_FIELDS
+    
     # Get user's membership
     membership = get_user_membership(user_id)
     if not membership:
@@ -38,24 +42,28 @@ def lambda_handler(event, context):
     
     org_id = membership['organisation_id']
     
-    # Get all members
-    members_response = members_table.query(
-        KeyConditionExpression='organisation_id = :oid',
-        ExpressionAttributeValues={':oid': org_id}
-    )
+    # Get all members (user_id and role are always needed for lookups and sorting)
+    member_attributes = ['user_id', 'role'] + [f for f in ['joined_at'] if f in fields]
+    memberships = [strip_keys(item) for item in query_members(org_id, **build_projection(member_attributes))]
+    
+    # Profiles are only read when a profile field was requested, in one
+    # batch read rather than a get_item per member
+    profiles_by_user = {}
+    if any(field in fields for field in PROFILE_FIELDS):
+        profiles = batch_get_items(
+            profiles_table,
+            [{'user_id': member['user_id']} for member in memberships],
+            ['user_id'] + PROFILE_FIELDS
+        )
+        profiles_by_user = {profile['user_id']: profile for profile in profiles}
     
     members = []
-    for member in members_response.get('Items', []):
-        member_user_id = member['user_id']
-        
-        # Get profile info for each member
-        profile_response = profiles_table.get_item(Key={'user_id': member_user_id})
-        profile = profile_response.get('Item', {})
-        
+    for member in memberships:
+        profile = profiles_by_user.get(member['user_id'], {})
         members.append({
-            'user_id': member_user_id,
+            'user_id': member['user_id'],
             'role': member['role'],
-            'joined_at': member['joined_at'],
+            'joined_at': member.get('joined_at'),
             'display_name': profile.get('display_name', 'Unknown'),
             'email': profile.get('email', '')
         })
@@ -64,4 +72,7 @@ def lambda_handler(event, context):
     role_order = {'owner': 0, 'admin': 1, 'member': 2}
     members.sort(key=lambda x: role_order.get(x['role'], 3))
     
-    return success_response(members)
+    if fields != MEMBER_FIELDS:
+        members = [{field: member[field] for field in fields} for member in members]
+    
+    return success_response(members, event=event)
@@ -1,57 +1,74 @@
 from utils.response_builder import (
     success_response,
+    error_response,
     not_found_response,
     error_handler
 )
 from utils.helpers import (
     get_user_id_from_event,
-    get_table
+    get_fields_param,
+    build_projection
 )
+from organisations.model import (
+    get_org_table,
+    get_user_membership,
+    load_organisation,
+    organisation_key,
+    strip_keys
+)
+
+# Browser/extension cache lifetime in seconds (revalidated with ETag after)
+ORGANISATION_MAX_AGE = 30
 
-org_table = get_table('ORGANISATIONS_TABLE_NAME')
-members_table = get_table('ORG_MEMBERS_TABLE_NAME')
+# Fields that can be requested with ?fields= (user_role and member_count are computed)
+ORGANISATION_FIELDS = [
+    'organisation_id', 'name', 'owner_id', 'created_at', 'updated_at',
+    'user_role', 'member_count'
+]
+COMPUTED_FIELDS = ['user_role', 'member_count']
 
 
 @error_handler
 def lambda_handler(event, context):
     """
     GET /organisation - Retrieve user's organisation
+    GET /organisation?fields=name,user_role - Retrieve only the listed fields
     Authenticated endpoint - requires valid JWT token
     Returns organisation details with user's role
     """
     user_id = get_user_id_from_event(event)
     
+    fields, error_msg = get_fields_param(event, ORGANISATION_FIELDS)
+    if error_msg:
+        return error_response(error_msg)
+    
     # Find user's organisation membership
-    membership_response = members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    
-    memberships = membership_response.get('Items', [])
-    if not memberships:
+    membership = get_user_membership(user_id)
+    if not membership:
         return not_found_response('Not a member of any organisation')
     
-    # Get the organisation details
-    membership = memberships[0]
     org_id = membership['organisation_id']
     
-    org_response = org_table.get_item(Key={'organisation_id': org_id})
+    stored_fields = [f for f in (fields or ORGANISATION_FIELDS) if f not in COMPUTED_FIELDS and f != 'organisation_id']
     
-    if 'Item' not in org_response:
-        return not_found_response('Organisation not found')
+    if not fields or 'member_count' in fields:
+        # The organisation and its members in one Query (members sort just
+        # before the organisation item); the projection keeps member items small
+        org, members, _ = load_organisation(org_id, **build_projection(['sk', 'organisation_id'] + stored_fields))
+        if org:
+            org['member_count'] = len(members)
+    else:
+        projection = build_projection(['organisation_id'] + stored_fields)
+        org = strip_keys(get_org_table().get_item(Key=organisation_key(org_id), **projection).get('Item'))
     
-    org = org_response['Item']
+    if not org:
+        return not_found_response('Organisation not found')
     
     # Add user's role to the response
-    org['user_role'] = membership['role']
+    if not fields or 'user_role' in fields:
+        org['user_role'] = membership['role']
     
-    # Get member count
-    members_response = members_table.query(
-        KeyConditionExpression='organisation_id = :oid',
-        ExpressionAttributeValues={':oid': org_id},
-        Select='COUNT'
-    )
-    org['member_count'] = members_response.get('Count', 0)
+    if fields:
+        org = {field: org[field] for field in fields if field in org}
     
-    return success_response(org)
+    return success_response(org, event=event, max_age=ORGANISATION_MAX_AGE)
@@ -8,25 +8,22 @@ from utils.response_builder import (
 )
 from utils.helpers import (
     get_user_id_from_event,
-    get_table,
     get_current_timestamp,
     parse_request_body
 )
+from utils.rate_limit import rate_limit, limit_org
+from utils.unit_of_work import get_unit_of_work
+from organisations.model import (
+    EMAIL_INDEX,
+    get_org_table,
+    get_user_membership,
+    get_organisation,
+    get_invitation_expiry,
+    invitation_item,
+    org_pk
+)
 
-members_table = get_table('ORG_MEMBERS_TABLE_NAME')
-invitations_table = get_table('ORG_INVITATIONS_TABLE_NAME')
-org_table = get_table('ORGANISATIONS_TABLE_NAME')
-
-
-def get_user_membership(user_id):
-    """Get user's organisation membership."""
-    response = members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    items = response.get('Items', [])
-    return items[0] if items else None
+org_table = get_org_table()
 
 
 def validate_email(email):
@@ -37,10 +34,12 @@ def validate_email(email):
 
 
 @error_handler
+@rate_limit
 def lambda_handler(event, context):
     """
     POST /organisation/members/invite - Invite a new member
     Authenticated endpoint - requires admin or owner role
+    Rate limited per user and per organisation
     """
     user_id = get_user_id_from_event(event)
     
@@ -54,6 +53,7 @@ def lambda_handler(event, context):
         return forbidden_response('Only admins can invite members')
     
     org_id = membership['organisation_id']
+    limit_org(org_id)
     
     # Parse request
     body = parse_request_body(event)
@@ -74,22 +74,22 @@ def lambda_handler(event, context):
         return forbidden_response('Only the owner can invite admins')
     
     # Check if invitation already exists
-    existing_invitations = invitations_table.query(
-        IndexName='email-index',
-        KeyConditionExpression='email = :email',
-        FilterExpression='organisation_id = :oid',
+    existing_invitations = org_table.query(
+        IndexName=EMAIL_INDEX,
+        KeyConditionExpression='gsi2pk = :email AND gsi2sk = :org',
         ExpressionAttributeValues={
-            ':email': email,
-            ':oid': org_id
-        }
+            ':email': f"EMAIL#{email}",
+            ':org': org_pk(org_id)
+        },
+        Select='COUNT'
     )
     
-    if existing_invitations.get('Items'):
+    if existing_invitations.get('Count'):
         return error_response('An invitation has already been sent to this email', 409)
     
     # Get organisation name
-    org_response = org_table.get_item(Key={'organisation_id': org_id})
-    org_name = org_response.get('Item', {}).get('name', 'Organisation')
+    org = get_organisation(org_id) or {}
+    org_name = org.get('name', 'Organisation')
     
     # Create invitation
     timestamp = get_current_timestamp()
@@ -104,11 +104,12 @@ def lambda_handler(event, context):
         'token': token,
         'invited_by': user_id,
         'created_at': timestamp,
-        'expires_at': timestamp,  # TODO: Add proper expiration
+        'expires_at': get_invitation_expiry(timestamp),
         'status': 'pending'
     }
     
-    invitations_table.put_item(Item=invitation)
+    # Written once the handler succeeds
+    get_unit_of_work().put(org_table, invitation_item(invitation))
     
     # TODO: Send invitation email
     
@@ -4,23 +4,12 @@ from utils.response_builder import (
     forbidden_response,
     error_handler
 )
-from utils.helpers import (
-    get_user_id_from_event,
-    get_table
-)
-
-members_table = get_table('ORG_MEMBERS_TABLE_NAME')
-
+from utils.helpers import get_user_id_from_event
+from utils.unit_of_work import get_unit_of_work
+from organisations.model import get_org_table, get_user_membership, member_key
+from organisations.legacy import delete_legacy
 
-def get_user_membership(user_id):
-    """Get user's organisation membership."""
-    response = members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    items = response.get('Items', [])
-    return items[0] if items else None
+org_table = get_org_table()
 
 
 @error_handler
@@ -42,12 +31,8 @@ def lambda_handler(event, context):
     
     org_id = membership['organisation_id']
     
-    # Remove membership
-    members_table.delete_item(
-        Key={
-            'organisation_id': org_id,
-            'user_id': user_id
-        }
-    )
+    # Remove membership (written once the handler succeeds) - and its legacy row, or it could be copied back
+    delete_legacy([member_key(org_id, user_id)])
+    get_unit_of_work().delete(org_table, member_key(org_id, user_id))
     
     return success_response({'message': 'Successfully left the organisation'})
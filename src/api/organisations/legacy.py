@@ -0,0 +1,175 @@
+"""
+Legacy Organisation Tables
+The organisations, org-members and org-invitations tables that
+organisation_data replaces (see organisations/model.py). While terraform's
+organisation_legacy_tables_enabled is on, the functions are given their names
+(ORGANISATIONS_TABLE_NAME, ORG_MEMBERS_TABLE_NAME, ORG_INVITATIONS_TABLE_NAME)
+and read through to them, so traffic can move to organisation_data before
+tools/migrate_organisations.py has copied everything.
+
+COPY ON FIRST USE:
+get_user_membership falls back to org-members when a user has no membership
+in organisation_data, and copies the user's whole organisation (the
+organisation, its invitations and members - the user's own membership last,
+so an interrupted copy is picked up by the next request). The handlers then
+only ever read and write organisation_data.
+
+CONSISTENCY:
+- copy_item is conditional: an item organisation_data already has is only
+  replaced by a legacy row with a newer updated_at, so changes made through
+  the handlers are never undone (the migration uses it too)
+- delete_legacy removes the legacy rows of deleted items, before the
+  organisation_data delete, so a later copy can't bring them back
+- A copy that raced a delete (its legacy row is gone once the copy is
+  written) is removed again, unless the item was recreated meanwhile
+"""
+import os
+from botocore.exceptions import ClientError
+from utils.helpers import get_table
+from utils.unit_of_work import is_condition_failure
+from organisations.model import (
+    META, MEMBER_PREFIX, INVITE_PREFIX, organisation_item, member_item, invitation_item
+)
+
+# Legacy item -> organisation_data item, by entity
+BUILDERS = {
+    'organisation': organisation_item,
+    'member': member_item,
+    'invitation': invitation_item,
+}
+
+# Attribute set once when an item is created - tells a copy from a recreated item
+CREATED_ATTRIBUTES = {
+    'organisation': 'created_at',
+    'member': 'joined_at',
+    'invitation': 'created_at',
+}
+
+
+def legacy_tables_enabled():
+    """Whether the functions still read the legacy tables."""
+    return bool(os.environ.get('ORG_MEMBERS_TABLE_NAME'))
+
+
+def get_legacy_tables():
+    """The legacy tables by entity."""
+    return {
+        'organisation': get_table('ORGANISATIONS_TABLE_NAME'),
+        'member': get_table('ORG_MEMBERS_TABLE_NAME'),
+        'invitation': get_table('ORG_INVITATIONS_TABLE_NAME'),
+    }
+
+
+def legacy_key(key):
+    """(entity, legacy key) of an organisation_data key."""
+    org_id = key['pk'][len('ORG#'):]
+    if key['sk'] == META:
+        return 'organisation', {'organisation_id': org_id}
+    if key['sk'].startswith(MEMBER_PREFIX):
+        return 'member', {'organisation_id': org_id, 'user_id': key['sk'][len(MEMBER_PREFIX):]}
+    return 'invitation', {'organisation_id': org_id, 'invitation_id': key['sk'][len(INVITE_PREFIX):]}
+
+
+def _remove_copy(target, item):
+    created = CREATED_ATTRIBUTES[item['entity']]
+    if created in item:
+        condition = {
+            'ConditionExpression': '#created = :created',
+            'ExpressionAttributeValues': {':created': item[created]},
+        }
+    else:
+        condition = {'ConditionExpression': 'attribute_exists(pk) AND attribute_not_exists(#created)'}
+    try:
+        target.delete_item(Key={'pk': item['pk'], 'sk': item['sk']}, ExpressionAttributeNames={'#created': created}, **condition)
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
+
+
+def copy_item(target, source, item, key):
+    """
+    Copy one legacy row (item: built for organisation_data, key: its legacy
+    key in source) unless target has it at the same or a newer updated_at.
+    Returns the put's response, or None when nothing was copied.
+    """
+    condition = {'ConditionExpression': 'attribute_not_exists(pk)'}
+    if item.get('updated_at'):
+        condition = {
+            'ConditionExpression': 'attribute_not_exists(pk) OR attribute_not_exists(updated_at) OR updated_at < :updated_at',
+            'ExpressionAttributeValues': {':updated_at': item['updated_at']},
+        }
+    try:
+        response = target.put_item(Item=item, **condition)
+    except ClientError as e:
+        if is_condition_failure(e):
+            return None
+        raise
+    
+    # Deleted since it was read (deletes go to the legacy table first): remove the copy again
+    if source.get_item(Key=key, ConsistentRead=True).get('Item') is None:
+        _remove_copy(target, item)
+        return None
+    return response
+
+
+def copy_user_organisation(org_table, user_id):
+    """
+    Copy the organisation a user belongs to in the legacy tables into
+    organisation_data. Returns the user's membership item, or None if the
+    user has none there either.
+    """
+    tables = get_legacy_tables()
+    response = tables['member'].query(
+        IndexName='user_id-index',
+        KeyConditionExpression='user_id = :user_id',
+        ExpressionAttributeValues={':user_id': user_id}
+    )
+    if not response.get('Items'):
+        return None
+    org_id = response['Items'][0]['organisation_id']
+    
+    rows = []
+    organisation = tables['organisation'].get_item(Key={'organisation_id': org_id}).get('Item')
+    if organisation:
+        rows.append(('organisation', organisation))
+    for entity in ('invitation', 'member'):
+        query_kwargs = {
+            'KeyConditionExpression': 'organisation_id = :org_id',
+            'ExpressionAttributeValues': {':org_id': org_id},
+        }
+        while True:
+            page = tables[entity].query(**query_kwargs)
+            rows.extend((entity, row) for row in page.get('Items', []))
+            if 'LastEvaluatedKey' not in page:
+                break
+            query_kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+    
+    # The user's own membership goes last - until it is copied, the next request copies again
+    rows.sort(key=lambda row: row[0] == 'member' and row[1]['user_id'] == user_id)
+    print(f"[Organisations] Copying organisation {org_id} ({len(rows)} items) from the legacy tables")
+    membership = None
+    for entity, row in rows:
+        item = BUILDERS[entity](row)
+        key = legacy_key(item)[1]
+        if copy_item(org_table, tables[entity], item, key) is None and entity == 'member' and row['user_id'] == user_id:
+            # Copied before (or removed again because the user just left) - what is stored counts
+            item = org_table.get_item(Key={'pk': item['pk'], 'sk': item['sk']}, ConsistentRead=True).get('Item')
+        if entity == 'member' and row['user_id'] == user_id:
+            membership = item
+    return membership
+
+
+def delete_legacy(keys):
+    """Delete the legacy rows of organisation_data keys (nothing once the legacy tables are off)."""
+    if not legacy_tables_enabled():
+        return
+    
+    tables = get_legacy_tables()
+    writers = {}
+    for key in keys:
+        entity, row_key = legacy_key(key)
+        if entity not in writers:
+            writers[entity] = tables[entity].batch_writer()
+        writers[entity].delete_item(Key=row_key)
+    for writer in writers.values():
+        writer.flush()
@@ -0,0 +1,181 @@
+"""
+Organisation Data Model
+Organisations, their memberships and their invitations live in one table
+(ORGANISATION_DATA_TABLE_NAME), one partition per organisation:
+
+    pk            sk                gsi1pk / gsi1sk            gsi2pk / gsi2sk
+    ORG#<org_id>  META              -                          -
+    ORG#<org_id>  MEMBER#<user_id>  USER#<user_id> / ORG#<id>  -
+    ORG#<org_id>  INVITE#<inv_id>   -                          EMAIL#<email> / ORG#<id>
+
+ACCESS PATTERNS:
+- Organisation, members and invitations: one Query on pk. Sort keys order
+  INVITE# < MEMBER# < META, so "members and the organisation" is the range
+  MEMBER#..META and "everything" is INVITE#..META
+- A user's membership: Query gsi1 on USER#<user_id>
+- Invitations sent to an email: Query gsi2 on EMAIL#<email> (and gsi2sk =
+  ORG#<org_id> for one organisation)
+
+Items keep their plain attributes (organisation_id, user_id, role, ...)
+next to the key attributes; strip_keys() removes the key attributes before
+an item is returned to a client. The *_item() builders are used by the
+handlers and by tools/migrate_organisations.py, which copies the legacy
+organisations/org-members/org-invitations tables into this layout. Until
+that has run, a user found only in the legacy tables has their organisation
+copied on first use (organisations/legacy.py).
+"""
+import os
+from datetime import datetime, timedelta
+from utils.helpers import get_table
+from utils.unit_of_work import get_unit_of_work
+
+USER_INDEX = 'gsi1'
+EMAIL_INDEX = 'gsi2'
+
+META = 'META'
+MEMBER_PREFIX = 'MEMBER#'
+INVITE_PREFIX = 'INVITE#'
+
+# Attributes that only exist for the table layout
+KEY_ATTRIBUTES = ('pk', 'sk', 'gsi1pk', 'gsi1sk', 'gsi2pk', 'gsi2sk', 'entity')
+
+# Days an invitation stays valid (archive_records archives it after its retention window)
+INVITATION_EXPIRY_DAYS = int(os.environ.get('INVITATION_EXPIRY_DAYS', '7'))
+
+
+def get_org_table():
+    return get_table('ORGANISATION_DATA_TABLE_NAME')
+
+
+def org_pk(org_id):
+    return f"ORG#{org_id}"
+
+
+def organisation_key(org_id):
+    return {'pk': org_pk(org_id), 'sk': META}
+
+
+def member_key(org_id, user_id):
+    return {'pk': org_pk(org_id), 'sk': f"{MEMBER_PREFIX}{user_id}"}
+
+
+def invitation_key(org_id, invitation_id):
+    return {'pk': org_pk(org_id), 'sk': f"{INVITE_PREFIX}{invitation_id}"}
+
+
+def organisation_item(organisation):
+    """Table item for an organisation (organisation_id, name, owner_id, ...)."""
+    return {**organisation, **organisation_key(organisation['organisation_id']), 'entity': 'organisation'}
+
+
+def member_item(membership):
+    """Table item for a membership (organisation_id, user_id, role, joined_at)."""
+    org_id = membership['organisation_id']
+    return {
+        **membership,
+        **member_key(org_id, membership['user_id']),
+        'gsi1pk': f"USER#{membership['user_id']}",
+        'gsi1sk': org_pk(org_id),
+        'entity': 'member',
+    }
+
+
+def invitation_item(invitation):
+    """Table item for an invitation (organisation_id, invitation_id, email, ...)."""
+    org_id = invitation['organisation_id']
+    return {
+        **invitation,
+        **invitation_key(org_id, invitation['invitation_id']),
+        'gsi2pk': f"EMAIL#{invitation['email']}",
+        'gsi2sk': org_pk(org_id),
+        'entity': 'invitation',
+    }
+
+
+def get_invitation_expiry(created_at):
+    """Expiry (ISO timestamp) of an invitation created at an ISO timestamp."""
+    return (datetime.fromisoformat(created_at) + timedelta(days=INVITATION_EXPIRY_DAYS)).isoformat()
+
+
+def strip_keys(item):
+    """An item without its key attributes (None stays None)."""
+    if item is None:
+        return None
+    return {name: value for name, value in item.items() if name not in KEY_ATTRIBUTES}
+
+
+def get_user_membership(user_id):
+    """Get user's organisation membership (through the unit of work, so a later get of it is free)."""
+    response = get_unit_of_work().query(
+        get_org_table(),
+        IndexName=USER_INDEX,
+        KeyConditionExpression='gsi1pk = :user',
+        ExpressionAttributeValues={':user': f"USER#{user_id}"}
+    )
+    items = response.get('Items', [])
+    if items:
+        return strip_keys(items[0])
+    
+    # Not migrated yet? Import deferred - it is only needed while the legacy tables are read
+    from organisations.legacy import legacy_tables_enabled, copy_user_organisation
+    if legacy_tables_enabled():
+        return strip_keys(copy_user_organisation(get_org_table(), user_id))
+    return None
+
+
+def get_organisation(org_id):
+    """Get an organisation's details."""
+    return strip_keys(get_unit_of_work().get(get_org_table(), organisation_key(org_id)))
+
+
+def _query_pages(query_kwargs):
+    while True:
+        response = get_unit_of_work().query(get_org_table(), **query_kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            break
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def query_partition(org_id, first=INVITE_PREFIX, last=META, **query_kwargs):
+    """Yield every item of an organisation with first <= sk <= last, one page at a time."""
+    query_kwargs.update({
+        'KeyConditionExpression': 'pk = :pk AND sk BETWEEN :first AND :last',
+        'ExpressionAttributeValues': {':pk': org_pk(org_id), ':first': first, ':last': last},
+    })
+    return _query_pages(query_kwargs)
+
+
+def query_members(org_id, **query_kwargs):
+    """Yield an organisation's membership items, one page at a time."""
+    query_kwargs.update({
+        'KeyConditionExpression': 'pk = :pk AND begins_with(sk, :member)',
+        'ExpressionAttributeValues': {':pk': org_pk(org_id), ':member': MEMBER_PREFIX},
+    })
+    return _query_pages(query_kwargs)
+
+
+def load_organisation(org_id, invitations=False, **query_kwargs):
+    """
+    Get an organisation with its members (and invitations) in one Query.
+    Returns (organisation or None, members, invitations).
+    """
+    organisation, members, pending = None, [], []
+    for item in query_partition(org_id, INVITE_PREFIX if invitations else MEMBER_PREFIX, META, **query_kwargs):
+        if item['sk'] == META:
+            organisation = strip_keys(item)
+        elif item['sk'].startswith(MEMBER_PREFIX):
+            members.append(strip_keys(item))
+        else:
+            pending.append(strip_keys(item))
+    return organisation, members, pending
+
+
+def count_members(org_id):
+    """Count members in an organisation."""
+    response = get_org_table().query(
+        KeyConditionExpression='pk = :pk AND begins_with(sk, :member)',
+        ExpressionAttributeValues={':pk': org_pk(org_id), ':member': MEMBER_PREFIX},
+        Select='COUNT'
+    )
+    return response.get('Count', 0)
@@ -6,22 +6,13 @@ from utils.response_builder import (
 )
 from utils.helpers import (
     get_user_id_from_event,
-    get_table,
     get_path_param
 )
+from utils.unit_of_work import get_unit_of_work
+from organisations.model import get_org_table, get_user_membership, member_key
+from organisations.legacy import delete_legacy
 
-members_table = get_table('ORG_MEMBERS_TABLE_NAME')
-
-
-def get_user_membership(user_id):
-    """Get user's organisation membership."""
-    response = members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    items = response.get('Items', [])
-    return items[0] if items else None
+org_table = get_org_table()
 
 
 @error_handler
@@ -45,18 +36,12 @@ def lambda_handler(event, context):
     org_id = membership['organisation_id']
     
     # Get target member's membership
-    target_membership = members_table.get_item(
-        Key={
-            'organisation_id': org_id,
-            'user_id': target_member_id
-        }
-    )
-    
-    if 'Item' not in target_membership:
+    uow = get_unit_of_work()
+    target_key = member_key(org_id, target_member_id)
+    target = uow.get(org_table, target_key)
+    if target is None:
         return not_found_response('Member not found in this organisation')
     
-    target = target_membership['Item']
-    
     # Cannot remove owner
     if target['role'] == 'owner':
         return forbidden_response('Cannot remove the organisation owner')
@@ -69,12 +54,8 @@ def lambda_handler(event, context):
     if target_member_id == user_id:
         return forbidden_response('Use the leave endpoint to remove yourself')
     
-    # Remove member
-    members_table.delete_item(
-        Key={
-            'organisation_id': org_id,
-            'user_id': target_member_id
-        }
-    )
+    # Remove member (written once the handler succeeds) - and its legacy row, or it could be copied back
+    delete_legacy([target_key])
+    uow.delete(org_table, target_key)
     
     return success_response({'message': 'Member removed successfully'})
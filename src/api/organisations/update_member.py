@@ -1,3 +1,4 @@
+from botocore.exceptions import ClientError
 from utils.response_builder import (
     success_response,
     error_response,
@@ -7,24 +8,14 @@ from utils.response_builder import (
 )
 from utils.helpers import (
     get_user_id_from_event,
-    get_table,
     get_current_timestamp,
     parse_request_body,
     get_path_param
 )
+from utils.unit_of_work import get_unit_of_work, is_condition_failure
+from organisations.model import get_org_table, get_user_membership, member_key, strip_keys
 
-members_table = get_table('ORG_MEMBERS_TABLE_NAME')
-
-
-def get_user_membership(user_id):
-    """Get user's organisation membership."""
-    response = members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    items = response.get('Items', [])
-    return items[0] if items else None
+org_table = get_org_table()
 
 
 @error_handler
@@ -48,18 +39,12 @@ def lambda_handler(event, context):
     org_id = membership['organisation_id']
     
     # Get target member's membership
-    target_membership = members_table.get_item(
-        Key={
-            'organisation_id': org_id,
-            'user_id': target_member_id
-        }
-    )
-    
-    if 'Item' not in target_membership:
+    uow = get_unit_of_work()
+    target_key = member_key(org_id, target_member_id)
+    target = uow.get(org_table, target_key)
+    if target is None:
         return not_found_response('Member not found in this organisation')
     
-    target = target_membership['Item']
-    
     # Cannot modify owner
     if target['role'] == 'owner':
         return forbidden_response('Cannot modify the organisation owner')
@@ -76,19 +61,24 @@ def lambda_handler(event, context):
     if new_role == 'admin' and membership['role'] != 'owner':
         return forbidden_response('Only the owner can promote members to admin')
     
-    # Update member role
-    response = members_table.update_item(
-        Key={
-            'organisation_id': org_id,
-            'user_id': target_member_id
-        },
+    # Update member role - unless they left meanwhile (an update would recreate the item)
+    uow.update(
+        org_table,
+        target_key,
         UpdateExpression='SET #r = :role, updated_at = :updated_at',
+        ConditionExpression='attribute_exists(pk)',
         ExpressionAttributeNames={'#r': 'role'},
         ExpressionAttributeValues={
             ':role': new_role,
             ':updated_at': get_current_timestamp()
-        },
-        ReturnValues='ALL_NEW'
+        }
     )
+    try:
+        uow.flush()
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
+        return not_found_response('Member not found in this organisation')
     
-    return success_response(response['Attributes'])
+    # The update's new item is already in the unit of work
+    return success_response(strip_keys(uow.get(org_table, target_key)))
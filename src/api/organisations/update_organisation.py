@@ -1,3 +1,4 @@
+from botocore.exceptions import ClientError
 from utils.response_builder import (
     success_response,
     error_response,
@@ -7,13 +8,13 @@ from utils.response_builder import (
 )
 from utils.helpers import (
     get_user_id_from_event,
-    get_table,
     get_current_timestamp,
     parse_request_body
 )
+from utils.unit_of_work import get_unit_of_work, is_condition_failure
+from organisations.model import get_org_table, get_user_membership, organisation_key, strip_keys
 
-org_table = get_table('ORGANISATIONS_TABLE_NAME')
-members_table = get_table('ORG_MEMBERS_TABLE_NAME')
+org_table = get_org_table()
 
 
 def validate_organisation_name(name):
@@ -31,17 +32,6 @@ def validate_organisation_name(name):
     return (True, None)
 
 
-def get_user_membership(user_id):
-    """Get user's organisation membership."""
-    response = members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    items = response.get('Items', [])
-    return items[0] if items else None
-
-
 @error_handler
 def lambda_handler(event, context):
     """
@@ -78,16 +68,26 @@ def lambda_handler(event, context):
         update_expression += ", #n = :name"
         expression_values[':name'] = name
     
-    # Update organisation
-    response = org_table.update_item(
-        Key={'organisation_id': org_id},
-        UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_values,
-        ExpressionAttributeNames={'#n': 'name'} if name else {},
-        ReturnValues='ALL_NEW'
-    )
+    # Update organisation - unless it was deleted meanwhile (an update would recreate the item)
+    update_kwargs = {
+        'UpdateExpression': update_expression,
+        'ConditionExpression': 'attribute_exists(pk)',
+        'ExpressionAttributeValues': expression_values,
+    }
+    if name:
+        update_kwargs['ExpressionAttributeNames'] = {'#n': 'name'}
+    
+    uow = get_unit_of_work()
+    uow.update(org_table, organisation_key(org_id), **update_kwargs)
+    try:
+        uow.flush()
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
+        return not_found_response('Organisation not found')
     
-    org = response['Attributes']
+    # The update's new item is already in the unit of work
+    org = strip_keys(uow.get(org_table, organisation_key(org_id)))
     org['user_role'] = membership['role']
     
     return success_response(org)
@@ -1,3 +1,4 @@
+from botocore.exceptions import ClientError
 from utils.response_builder import (
     success_response,
     error_response,
@@ -10,6 +11,7 @@ from utils.helpers import (
     get_current_timestamp,
     parse_request_body
 )
+from utils.unit_of_work import get_unit_of_work, is_condition_failure
 
 table = get_table('TABLE_NAME')
 
@@ -59,13 +61,15 @@ def lambda_handler(event, context):
     # Remove None values
     profile = {k: v for k, v in profile.items() if v is not None}
     
-    # Check if profile already exists
-    existing = table.get_item(Key={'user_id': user_id})
-    if 'Item' in existing:
+    # Save to DynamoDB, unless the profile already exists
+    uow = get_unit_of_work()
+    uow.put(table, profile, ConditionExpression='attribute_not_exists(user_id)')
+    try:
+        uow.flush()
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
         return error_response('Profile already exists. Use PUT to update.', 409)
     
-    # Save to DynamoDB
-    table.put_item(Item=profile)
-    
     return success_response(profile, 201)
 
@@ -0,0 +1,165 @@
+"""
+Get Me
+Returns everything the profile page needs in a single request.
+
+Resolves the user's organisation membership once, then fetches the profile,
+organisation with its member list (one Query, see organisations/model.py) and
+subscription concurrently, replacing separate /profile, /organisation,
+/organisation/members and /subscription calls.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from utils.response_builder import (
+    success_response,
+    error_response,
+    error_handler
+)
+from utils.helpers import (
+    get_user_id_from_event,
+    get_table,
+    get_query_param,
+    batch_get_items
+)
+from subscriptions.get_subscription import (
+    find_subscription,
+    build_subscription_status
+)
+from organisations.model import get_user_membership, load_organisation
+from utils.unit_of_work import run_in_unit_of_work
+
+profiles_table = get_table('TABLE_NAME')
+
+SECTIONS = ['profile', 'organisation', 'members', 'subscription']
+
+# Always revalidate - the page reloads this after every change it makes
+ME_MAX_AGE = 0
+
+# Shared across invocations in a warm container
+executor = ThreadPoolExecutor(max_workers=len(SECTIONS))
+
+
+def submit(func, *args):
+    """Run a call on the executor in a copy of the request's context (its deadline and telemetry), with a unit of work of its own."""
+    return executor.submit(contextvars.copy_context().run, run_in_unit_of_work, func, *args)
+
+
+def parse_include(event):
+    """Parse ?include=profile,members into a list of sections."""
+    include = get_query_param(event, 'include')
+    if not include:
+        return list(SECTIONS), None
+    
+    sections = [section.strip() for section in include.split(',') if section.strip()]
+    invalid = [section for section in sections if section not in SECTIONS]
+    if invalid:
+        return None, f"Invalid include: {', '.join(invalid)}. Allowed: {', '.join(SECTIONS)}"
+    
+    return sections, None
+
+
+def get_profile(user_id):
+    """Get the user's profile."""
+    response = profiles_table.get_item(Key={'user_id': user_id})
+    return response.get('Item')
+
+
+def get_organisation(org_id, with_members):
+    """
+    Get organisation details and its memberships in one Query, and the
+    member list with profile info when with_members.
+    Returns (organisation, memberships, members or None).
+    """
+    organisation, memberships, _ = load_organisation(org_id)
+    return organisation, memberships, get_members(memberships) if with_members else None
+
+
+def get_members(memberships):
+    """Get organisation members with their profile info."""
+    # One batch read for every member's profile
+    profiles = batch_get_items(
+        profiles_table,
+        [{'user_id': member['user_id']} for member in memberships]
+    )
+    profiles_by_user = {profile['user_id']: profile for profile in profiles}
+    
+    members = []
+    for member in memberships:
+        profile = profiles_by_user.get(member['user_id'], {})
+        members.append({
+            'user_id': member['user_id'],
+            'role': member['role'],
+            'joined_at': member['joined_at'],
+            'display_name': profile.get('display_name', 'Unknown'),
+            'email': profile.get('email', '')
+        })
+    
+    # Sort: owner first, then admins, then members
+    role_order = {'owner': 0, 'admin': 1, 'member': 2}
+    members.sort(key=lambda x: role_order.get(x['role'], 3))
+    
+    return members
+
+
+@error_handler
+def lambda_handler(event, context):
+    """
+    GET /me - Get the current user's profile page data
+    GET /me?include=profile,subscription - Only the listed sections
+    Authenticated endpoint - requires valid JWT token
+    
+    Returns:
+    {
+        "profile": {...} | null,
+        "organisation": {... "user_role", "member_count"} | null,
+        "members": [...] | null,
+        "subscription": {same as GET /subscription}
+    }
+    """
+    user_id = get_user_id_from_event(event)
+    
+    sections, error_msg = parse_include(event)
+    if error_msg:
+        return error_response(error_msg)
+    
+    membership = get_user_membership(user_id)
+    org_id = membership['organisation_id'] if membership else None
+    
+    # Fetch independent pieces concurrently
+    futures = {}
+    if 'profile' in sections:
+        futures['profile'] = submit(get_profile, user_id)
+    if org_id and any(section in sections for section in ('organisation', 'members', 'subscription')):
+        futures['organisation'] = submit(get_organisation, org_id, 'members' in sections)
+    if 'subscription' in sections:
+        futures['subscription'] = submit(find_subscription, user_id, org_id)
+    
+    results = {name: future.result() for name, future in futures.items()}
+    
+    organisation, memberships, members = results.get('organisation', (None, [], None))
+    
+    # Member count comes from the memberships the organisation Query returned
+    member_count = len(memberships) if org_id else None
+    if organisation:
+        organisation['user_role'] = membership['role']
+        organisation['member_count'] = member_count
+    
+    body = {}
+    if 'profile' in sections:
+        body['profile'] = results.get('profile')
+    if 'organisation' in sections:
+        body['organisation'] = organisation
+    if 'members' in sections:
+        body['members'] = members
+    if 'subscription' in sections:
+        subscription, is_org_subscription = results['subscription']
+        user_count = 1
+        if is_org_subscription:
+            user_count = member_count
+        body['subscription'] = build_subscription_status(
+            subscription,
+            is_org_subscription,
+            organisation,
+            user_count
+        )
+    
+    return success_response(body, event=event, max_age=ME_MAX_AGE)
@@ -1,22 +1,35 @@
 from utils.response_builder import (
     success_response,
+    error_response,
     not_found_response,
     error_handler
 )
 from utils.helpers import (
     get_user_id_from_event,
     get_table,
-    get_query_param
+    get_query_param,
+    get_fields_param,
+    build_projection
 )
 
 table = get_table('TABLE_NAME')
 
+# Browser/extension cache lifetime in seconds (revalidated with ETag after)
+PROFILE_MAX_AGE = 60
+
+# Fields that can be requested with ?fields=
+PROFILE_FIELDS = [
+    'user_id', 'display_name', 'email', 'bio', 'phone', 'company',
+    'address', 'city', 'state', 'country', 'created_at', 'updated_at'
+]
+
 
 @error_handler
 def lambda_handler(event, context):
     """
     GET /profile - Retrieve user profile
     GET /profile?user_id={id} - Retrieve specific user's profile
+    GET /profile?fields=display_name,email - Retrieve only the listed fields
     Authenticated endpoint - requires valid JWT token
     """
     # Extract authenticated user_id from Cognito authorizer claims
@@ -25,11 +38,22 @@ def lambda_handler(event, context):
     # Check if requesting another user's profile via query parameter
     target_user_id = get_query_param(event, 'user_id', auth_user_id)
     
-    # Get profile from DynamoDB
-    response = table.get_item(Key={'user_id': target_user_id})
+    fields, error_msg = get_fields_param(event, PROFILE_FIELDS)
+    if error_msg:
+        return error_response(error_msg)
+    
+    # Get profile from DynamoDB (only the requested attributes, plus the key)
+    get_kwargs = {'Key': {'user_id': target_user_id}}
+    if fields:
+        get_kwargs.update(build_projection(['user_id'] + [f for f in fields if f != 'user_id']))
+    
+    response = table.get_item(**get_kwargs)
     
     if 'Item' not in response:
         return not_found_response('Profile not found')
     
-    return success_response(response['Item'])
-
+    profile = response['Item']
+    if fields:
+        profile = {field: profile[field] for field in fields if field in profile}
+    
+    return success_response(profile, event=event, max_age=PROFILE_MAX_AGE)
@@ -1,3 +1,4 @@
+from botocore.exceptions import ClientError
 from utils.response_builder import (
     success_response,
     error_response,
@@ -11,6 +12,7 @@ from utils.helpers import (
     get_current_timestamp,
     parse_request_body
 )
+from utils.unit_of_work import get_unit_of_work, is_condition_failure
 
 table = get_table('TABLE_NAME')
 
@@ -41,11 +43,6 @@ def lambda_handler(event, context):
     if not is_valid:
         return error_response(error_msg)
     
-    # Check if profile exists
-    existing = table.get_item(Key={'user_id': user_id})
-    if 'Item' not in existing:
-        return not_found_response('Profile not found. Use POST to create.')
-    
     # Build update expression dynamically
     update_expression = "SET updated_at = :updated_at"
     expression_values = {':updated_at': get_current_timestamp()}
@@ -67,13 +64,22 @@ def lambda_handler(event, context):
             update_expression += f", {field_name} = :{field_name}"
             expression_values[f':{field_name}'] = value if value else None
     
-    # Update profile
-    response = table.update_item(
-        Key={'user_id': user_id},
+    # Update profile, if it exists
+    uow = get_unit_of_work()
+    uow.update(
+        table,
+        {'user_id': user_id},
         UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_values,
-        ReturnValues='ALL_NEW'
+        ConditionExpression='attribute_exists(user_id)',
+        ExpressionAttributeValues=expression_values
     )
+    try:
+        uow.flush()
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
+        return not_found_response('Profile not found. Use POST to create.')
     
-    return success_response(response['Attributes'])
+    # The update's new item is already in the unit of work
+    return success_response(uow.get(table, {'user_id': user_id}))
 
@@ -0,0 +1,83 @@
+"""
+API Router
+Single Lambda entry point for every API Gateway route.
+
+With one function behind the whole API, all routes share warm containers,
+the DynamoDB client, the Stripe price cache and so on, instead of each
+low-traffic route paying its own cold starts. Optional - enabled with
+api_router_enabled in terraform; the per-function handlers are unchanged
+and can still be deployed on their own.
+
+LOGIC:
+1. Look up (httpMethod, resource) in the route table
+2. Import the route's handler module on first use (memoised per container)
+3. Call its lambda_handler with the original event and context
+"""
+import importlib
+from utils.response_builder import error_response, not_found_response
+from utils.warmup import is_warmup_event, mark_invocation, warm_up
+
+# (httpMethod, API Gateway resource) -> handler module
+ROUTES = {
+    # Profile API
+    ('GET', '/profile'): 'profiles.get_profile',
+    ('POST', '/profile'): 'profiles.create_profile',
+    ('PUT', '/profile'): 'profiles.update_profile',
+    ('GET', '/me'): 'profiles.get_me',
+    # Organisation API
+    ('GET', '/organisation'): 'organisations.get_organisation',
+    ('POST', '/organisation'): 'organisations.create_organisation',
+    ('PUT', '/organisation'): 'organisations.update_organisation',
+    ('DELETE', '/organisation'): 'organisations.delete_organisation',
+    ('GET', '/organisation/members'): 'organisations.get_members',
+    ('POST', '/organisation/members/invite'): 'organisations.invite_member',
+    ('PUT', '/organisation/members/{member_id}'): 'organisations.update_member',
+    ('DELETE', '/organisation/members/{member_id}'): 'organisations.remove_member',
+    ('POST', '/organisation/leave'): 'organisations.leave_organisation',
+    # Subscription API
+    ('GET', '/subscription'): 'subscriptions.get_subscription',
+    ('POST', '/subscription'): 'subscriptions.create_checkout',
+    ('POST', '/subscription/webhook'): 'subscriptions.stripe_webhook',
+    ('POST', '/subscription/portal'): 'subscriptions.create_portal',
+}
+
+# Resources with at least one route (to tell 405 from 404)
+ROUTED_RESOURCES = frozenset(resource for _, resource in ROUTES)
+
+# Handler functions by module (populated on first use)
+_handlers = {}
+
+
+def get_route_handler(http_method, resource):
+    """Get the lambda_handler for a route, or None if there is no such route."""
+    module_name = ROUTES.get((http_method, resource))
+    if module_name is None:
+        return None
+    
+    handler = _handlers.get(module_name)
+    if handler is None:
+        handler = _handlers[module_name] = importlib.import_module(module_name).lambda_handler
+    return handler
+
+
+def lambda_handler(event, context):
+    """
+    Any API route - dispatched to the route's own lambda_handler
+    """
+    # Warm every route: import all handlers (registering their warmers) first
+    if is_warmup_event(event):
+        cold_start = mark_invocation()
+        for http_method, resource in ROUTES:
+            get_route_handler(http_method, resource)
+        return warm_up(context, cold_start)
+    
+    http_method = event.get('httpMethod')
+    resource = event.get('resource')
+    
+    handler = get_route_handler(http_method, resource)
+    if handler is None:
+        if resource in ROUTED_RESOURCES:
+            return error_response(f"Method {http_method} not allowed on {resource}", 405)
+        return not_found_response(f"No route for {http_method} {resource}")
+    
+    return handler(event, context)
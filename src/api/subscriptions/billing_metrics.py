@@ -0,0 +1,225 @@
+"""
+Billing Metrics
+Incremental aggregate counters maintained from Stripe webhook events, so
+dashboards read a handful of items instead of scanning the subscriptions table.
+
+ITEMS (billing metrics table, metric_key + dimension):
+- CURRENT / {plan}#{billing_period}
+    Gauges: number of subscriptions per status (active, trialing, past_due,
+    canceled, ...) and mrr (monthly recurring revenue in cents, active only)
+- DAILY#{YYYY-MM} / {YYYY-MM-DD}#{plan}#{billing_period}
+    Flow counters for the day: transitions into each status, plus
+    trial_conversions (trialing -> active)
+
+All writes are atomic ADD updates, so concurrent webhooks never lose counts.
+The webhook takes a subscription's previous state from its own update
+(ReturnValues=ALL_OLD), never from an earlier read, so concurrent or
+redelivered events each move the gauges from the state they replaced.
+
+SEEDING:
+A subscription is counted in the CURRENT gauges once it has an mrr
+attribute - every webhook write sets one. Rows written before the metrics
+existed have none: the webhook doesn't subtract their old state, and the
+billing-metrics-seed backfill (tools/migrations.py) sets mrr and adds them
+to the gauges in one transaction.
+
+CLI:
+    python -m subscriptions.billing_metrics --days 30
+"""
+import json
+import argparse
+from datetime import datetime, timedelta, timezone
+from utils.helpers import get_table
+
+
+CURRENT_KEY = 'CURRENT'
+
+# Only active subscriptions contribute to MRR
+MRR_STATUSES = ['active']
+
+
+def get_metrics_table():
+    # Resolved on use, so tools can import the helpers without the table configured
+    return get_table('BILLING_METRICS_TABLE_NAME')
+
+
+def get_subscription_mrr(stripe_sub):
+    """Get monthly recurring revenue (in cents) for a Stripe subscription."""
+    item = stripe_sub['items']['data'][0]
+    price = item['price']
+    
+    amount = (price.get('unit_amount') or 0) * (item.get('quantity') or 1)
+    recurring = price.get('recurring')
+    interval = recurring.get('interval') if recurring else 'month'
+    
+    if interval == 'year':
+        return amount // 12
+    return amount
+
+
+def build_metrics_state(status, plan, billing_period, mrr=0):
+    """Build the state snapshot used to compute metric deltas."""
+    return {
+        'status': status,
+        'plan': plan or 'single',
+        'billing_period': billing_period or 'monthly',
+        'mrr': int(mrr or 0),
+    }
+
+
+def get_previous_state(subscription):
+    """State of a stored subscription row (e.g. ALL_OLD), or None if it isn't counted in the gauges yet."""
+    if not subscription or 'mrr' not in subscription:
+        return None
+    return build_metrics_state(
+        subscription.get('status'),
+        subscription.get('plan'),
+        subscription.get('billing_period'),
+        subscription['mrr']
+    )
+
+
+def _dimension(state):
+    return f"{state['plan']}#{state['billing_period']}"
+
+
+def _add(deltas, key, attribute, amount):
+    if amount:
+        item_deltas = deltas.setdefault(key, {})
+        item_deltas[attribute] = item_deltas.get(attribute, 0) + amount
+
+
+def compute_metric_deltas(before, after, day):
+    """
+    Compute counter deltas for a subscription state change.
+    before/after are states from build_metrics_state (None if absent).
+    Returns {(metric_key, dimension): {attribute: delta}} without zero deltas.
+    """
+    deltas = {}
+    
+    # Gauges - move the subscription out of its old status and into the new one
+    if before:
+        key = (CURRENT_KEY, _dimension(before))
+        _add(deltas, key, before['status'], -1)
+        if before['status'] in MRR_STATUSES:
+            _add(deltas, key, 'mrr', -before['mrr'])
+    
+    if after:
+        key = (CURRENT_KEY, _dimension(after))
+        _add(deltas, key, after['status'], 1)
+        if after['status'] in MRR_STATUSES:
+            _add(deltas, key, 'mrr', after['mrr'])
+    
+    # Daily flow counters - only count real status transitions
+    if after and (not before or before['status'] != after['status']):
+        key = (f"DAILY#{day[:7]}", f"{day}#{_dimension(after)}")
+        _add(deltas, key, after['status'], 1)
+        if before and before['status'] == 'trialing' and after['status'] == 'active':
+            _add(deltas, key, 'trial_conversions', 1)
+    
+    # Opposite deltas on the same item cancel out (e.g. a no-op update)
+    return {
+        key: {attr: value for attr, value in item_deltas.items() if value}
+        for key, item_deltas in deltas.items()
+        if any(item_deltas.values())
+    }
+
+
+def get_seed_deltas(state):
+    """Gauge deltas that count an existing subscription for the first time (no daily flow)."""
+    return {key: deltas for key, deltas in compute_metric_deltas(None, state, '').items() if key[0] == CURRENT_KEY}
+
+
+def build_metric_update(metric_key, dimension, item_deltas):
+    """UpdateItem parameters (Key, UpdateExpression, ...) adding deltas to one metrics item."""
+    names = {}
+    values = {}
+    clauses = []
+    for index, (attribute, amount) in enumerate(sorted(item_deltas.items())):
+        names[f'#a{index}'] = attribute
+        values[f':v{index}'] = amount
+        clauses.append(f'#a{index} :v{index}')
+    
+    return {
+        'Key': {'metric_key': metric_key, 'dimension': dimension},
+        'UpdateExpression': 'ADD ' + ', '.join(clauses),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values,
+    }
+
+
+def record_subscription_change(before, after):
+    """
+    Apply the metric deltas for a subscription state change.
+    Best effort - a metrics failure must never fail the webhook.
+    """
+    day = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    
+    try:
+        for (metric_key, dimension), item_deltas in compute_metric_deltas(before, after, day).items():
+            get_metrics_table().update_item(**build_metric_update(metric_key, dimension, item_deltas))
+    except Exception as e:
+        print(f"[BillingMetrics] Error recording metrics: {str(e)}")
+
+
+def get_current_metrics():
+    """Get the current gauges per plan and billing period."""
+    response = get_metrics_table().query(
+        KeyConditionExpression='metric_key = :key',
+        ExpressionAttributeValues={':key': CURRENT_KEY}
+    )
+    
+    return {
+        item['dimension']: {k: v for k, v in item.items() if k not in ('metric_key', 'dimension')}
+        for item in response.get('Items', [])
+    }
+
+
+def get_daily_metrics(start_day, end_day):
+    """Get daily flow counters between two YYYY-MM-DD days (inclusive)."""
+    start = datetime.strptime(start_day, '%Y-%m-%d').date()
+    end = datetime.strptime(end_day, '%Y-%m-%d').date()
+    
+    # One query per month partition covered by the range
+    months = []
+    month = start.replace(day=1)
+    while month <= end:
+        months.append(month.strftime('%Y-%m'))
+        month = (month + timedelta(days=32)).replace(day=1)
+    
+    daily = {}
+    for month_key in months:
+        response = get_metrics_table().query(
+            KeyConditionExpression='metric_key = :key AND dimension BETWEEN :start AND :end',
+            ExpressionAttributeValues={
+                ':key': f'DAILY#{month_key}',
+                ':start': start_day,
+                # '~' sorts after '#', so the end day's plans are included
+                ':end': f'{end_day}~',
+            }
+        )
+        
+        for item in response.get('Items', []):
+            day, dimension = item['dimension'].split('#', 1)
+            counters = {k: v for k, v in item.items() if k not in ('metric_key', 'dimension')}
+            daily.setdefault(day, {})[dimension] = counters
+    
+    return daily
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query billing metrics aggregates')
+    parser.add_argument('--days', type=int, default=30, help='Number of days of daily counters to include')
+    args = parser.parse_args()
+    
+    today = datetime.now(timezone.utc).date()
+    start_day = (today - timedelta(days=args.days - 1)).strftime('%Y-%m-%d')
+    
+    print(json.dumps({
+        'current': get_current_metrics(),
+        'daily': get_daily_metrics(start_day, today.strftime('%Y-%m-%d')),
+    }, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
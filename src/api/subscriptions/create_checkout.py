@@ -5,32 +5,27 @@ Creates a checkout session for subscribing to a plan.
 Supports both:
 - Personal subscriptions (owner_type: 'user')
 - Organisation subscriptions (owner_type: 'organisation')
+
+Rate limited per user, and per organisation for organisation subscriptions
+(utils.rate_limit) - every request creates a Stripe checkout session.
 """
 import os
-import stripe
 from utils.response_builder import success_response, error_response, error_handler
-from utils.helpers import get_user_id_from_event, get_table, parse_request_body
+from utils.helpers import get_user_id_from_event, parse_request_body
+from utils.rate_limit import rate_limit, limit_org
 from subscriptions.plans import PLANS, get_plan_from_stripe_price, get_stripe_price_for_plan
+from subscriptions.stripe_client import get_stripe
+from organisations.model import get_user_membership
 
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
 website_url = os.environ.get('WEBSITE_URL', 'http://localhost:8000')
 
-org_members_table = get_table('ORG_MEMBERS_TABLE_NAME')
-
 
 def get_user_organisation(user_id):
     """Get the organisation the user belongs to and their role."""
-    response = org_members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    
-    items = response.get('Items', [])
-    if not items:
+    membership = get_user_membership(user_id)
+    if not membership:
         return None, None
     
-    membership = items[0]
     return membership.get('organisation_id'), membership.get('role')
 
 
@@ -57,6 +52,7 @@ def validate_checkout_request(plan, billing_period, owner_type, user_id):
 
 
 @error_handler
+@rate_limit
 def lambda_handler(event, context):
     """
     POST /subscription - Create Stripe Checkout session
@@ -84,6 +80,10 @@ def lambda_handler(event, context):
     
     owner_type = body.get('owner_type', 'user')
     
+    # Reject bad owner types before anything talks to Stripe
+    if owner_type not in ['user', 'organisation']:
+        return error_response("Owner type must be 'user' or 'organisation'", 400)
+    
     # Check if price_id is provided directly (from PricingConfig)
     price_id = body.get('price_id')
     
@@ -119,11 +119,13 @@ def lambda_handler(event, context):
         if role not in ['owner', 'admin']:
             return error_response("Only organisation owners and admins can purchase subscriptions", 403)
         
+        limit_org(org_id)
         owner_id = org_id
     else:
         owner_id = user_id
     
     # Create Stripe checkout session
+    stripe = get_stripe()
     try:
         checkout_session = stripe.checkout.Session.create(
             mode='subscription',
@@ -158,6 +160,6 @@ def lambda_handler(event, context):
             'checkout_url': checkout_session.url,
             'session_id': checkout_session.id
         })
-        
+    
     except stripe.error.StripeError as e:
         return error_response(f"Stripe error: {str(e)}", 500)
@@ -3,32 +3,25 @@ Create Stripe Customer Portal Session
 Allows users to manage their subscription via Stripe's hosted portal.
 """
 import os
-import stripe
 from utils.response_builder import success_response, error_response, error_handler
 from utils.helpers import get_user_id_from_event, get_table
+from subscriptions.stripe_client import get_stripe
+from organisations.model import get_user_membership
 
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
 website_url = os.environ.get('WEBSITE_URL', 'http://localhost:8000')
 
 subscriptions_table = get_table('SUBSCRIPTIONS_TABLE_NAME')
-org_members_table = get_table('ORG_MEMBERS_TABLE_NAME')
 
 
 def get_user_subscription(user_id):
     """Get user's subscription (personal or org)."""
     # Check org membership first
-    org_response = org_members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    
-    org_membership = org_response.get('Items', [])
+    org_membership = get_user_membership(user_id)
     
     # Try org subscription first
     if org_membership:
-        org_id = org_membership[0].get('organisation_id')
-        role = org_membership[0].get('role')
+        org_id = org_membership.get('organisation_id')
+        role = org_membership.get('role')
         
         # Only owners/admins can access portal for org subscriptions
         if role in ['owner', 'admin']:
@@ -82,6 +75,7 @@ def lambda_handler(event, context):
     if is_org and role not in ['owner', 'admin']:
         return error_response("Only organisation owners and admins can manage subscriptions", 403)
     
+    stripe = get_stripe()
     try:
         portal_session = stripe.billing_portal.Session.create(
             customer=stripe_customer_id,
@@ -91,6 +85,6 @@ def lambda_handler(event, context):
         return success_response({
             'portal_url': portal_session.url
         })
-        
+    
     except stripe.error.StripeError as e:
         return error_response(f"Stripe error: {str(e)}", 500)
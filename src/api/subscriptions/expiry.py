@@ -0,0 +1,62 @@
+"""
+Subscription Expiry Index
+Helpers for the sparse expiry_bucket-index GSI on the subscriptions table.
+
+Only subscriptions in a status that Stripe moves on by itself (trialing,
+active, past_due) carry the expiry_bucket / expires_at attributes, so the
+index only ever holds rows the expiry sweeper may need to re-verify.
+
+BUCKETS:
+- expiry_bucket: UTC day of the next expiry instant, e.g. "2026-10-19"
+- expires_at: the next expiry instant as a Unix timestamp (index sort key)
+"""
+from datetime import datetime, timedelta, timezone
+
+EXPIRY_INDEX_NAME = 'expiry_bucket-index'
+
+# Statuses that can lapse without us being told (e.g. a lost webhook)
+TRACKED_STATUSES = ['trialing', 'active', 'past_due']
+
+
+def get_next_expiry(status, current_period_end, trial_end):
+    """Get the next instant at which Stripe should change the subscription."""
+    if status == 'trialing' and trial_end:
+        return int(trial_end)
+    
+    if current_period_end:
+        return int(current_period_end)
+    
+    return None
+
+
+def get_expiry_bucket(timestamp):
+    """Get the index bucket (UTC day) for a Unix timestamp."""
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def get_expiry_attributes(status, current_period_end, trial_end):
+    """
+    Get the expiry index attributes for a subscription.
+    Returns an empty dict when the subscription should not be indexed.
+    """
+    if status not in TRACKED_STATUSES:
+        return {}
+    
+    expires_at = get_next_expiry(status, current_period_end, trial_end)
+    if expires_at is None:
+        return {}
+    
+    return {
+        'expiry_bucket': get_expiry_bucket(expires_at),
+        'expires_at': expires_at,
+    }
+
+
+def get_due_buckets(cutoff, lookback_days):
+    """Get the buckets that may hold entries expiring at or before cutoff, oldest first."""
+    cutoff_day = datetime.fromtimestamp(int(cutoff), tz=timezone.utc).date()
+    
+    return [
+        (cutoff_day - timedelta(days=offset)).strftime('%Y-%m-%d')
+        for offset in range(lookback_days, -1, -1)
+    ]
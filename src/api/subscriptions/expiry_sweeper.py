@@ -0,0 +1,158 @@
+"""
+Subscription Expiry Sweeper
+Scheduled job that re-verifies subscriptions whose trial or billing period
+has ended but which are still trialing/active/past_due in DynamoDB.
+
+Subscription status normally only changes when Stripe sends a webhook, so a
+lost event leaves a lapsed subscription with access. Rather than scanning the
+whole table, the sweeper queries the sparse expiry_bucket-index for the
+buckets that are due, so the cost scales with the number of expiring
+subscriptions and not with the table size.
+
+LOGIC:
+1. Query each due bucket for entries with expires_at <= now - grace period
+2. Retrieve the current state of each one from Stripe (bounded batch per run)
+3. Sync the record through the same code paths the webhook uses
+4. Entries the sync left due (Stripe reported the same lapsed period, or the
+   call failed) move to now + EXPIRY_RECHECK_SECONDS, and entries without a
+   Stripe subscription leave the index - otherwise the oldest entries would
+   fill every batch and newer due entries would never be reached
+"""
+import os
+import time
+from botocore.exceptions import ClientError
+from utils.helpers import get_table
+from subscriptions.expiry import EXPIRY_INDEX_NAME, get_due_buckets, get_expiry_bucket
+from subscriptions.stripe_webhook import handle_subscription_updated, handle_subscription_deleted
+from subscriptions.stripe_client import get_stripe
+from utils.telemetry import track_request
+
+# Give Stripe time to deliver renewal webhooks before we step in
+GRACE_SECONDS = int(os.environ.get('EXPIRY_GRACE_SECONDS', '3600'))
+# How many past daily buckets to look back through
+LOOKBACK_DAYS = int(os.environ.get('EXPIRY_LOOKBACK_DAYS', '7'))
+# Maximum subscriptions re-verified per run (the rest are picked up next run)
+BATCH_SIZE = int(os.environ.get('EXPIRY_BATCH_SIZE', '100'))
+# When to look again at an entry Stripe hasn't moved on yet
+RECHECK_SECONDS = int(os.environ.get('EXPIRY_RECHECK_SECONDS', '21600'))
+
+subscriptions_table = get_table('SUBSCRIPTIONS_TABLE_NAME')
+
+
+def find_due_subscriptions(cutoff):
+    """Yield index entries whose next expiry is at or before cutoff."""
+    for bucket in get_due_buckets(cutoff, LOOKBACK_DAYS):
+        query_kwargs = {
+            'IndexName': EXPIRY_INDEX_NAME,
+            'KeyConditionExpression': 'expiry_bucket = :bucket AND expires_at <= :cutoff',
+            'ExpressionAttributeValues': {
+                ':bucket': bucket,
+                ':cutoff': cutoff,
+            },
+        }
+        
+        while True:
+            response = subscriptions_table.query(**query_kwargs)
+            
+            for item in response.get('Items', []):
+                yield item
+            
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def reschedule_if_due(subscription_id, cutoff, recheck_at=None):
+    """
+    Move an entry that is still due to recheck_at (None: drop it from the
+    index). Conditional on it still being due, so a sync that moved or
+    removed it wins.
+    """
+    if recheck_at is None:
+        update = {'UpdateExpression': 'REMOVE expiry_bucket, expires_at'}
+    else:
+        update = {
+            'UpdateExpression': 'SET expiry_bucket = :bucket, expires_at = :recheck_at',
+            'ExpressionAttributeValues': {':bucket': get_expiry_bucket(recheck_at), ':recheck_at': recheck_at},
+        }
+    update.setdefault('ExpressionAttributeValues', {})[':cutoff'] = cutoff
+    
+    try:
+        subscriptions_table.update_item(
+            Key={'subscription_id': subscription_id},
+            ConditionExpression='expires_at <= :cutoff',
+            **update
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+
+def reverify_subscription(stripe_sub_id):
+    """Sync one subscription from Stripe. Returns the status Stripe reported."""
+    stripe = get_stripe()
+    try:
+        stripe_sub = stripe.Subscription.retrieve(stripe_sub_id)
+    except stripe.error.InvalidRequestError:
+        # Subscription no longer exists in Stripe - treat as canceled
+        handle_subscription_deleted({'id': stripe_sub_id})
+        return 'canceled'
+    
+    if stripe_sub['status'] == 'canceled':
+        handle_subscription_deleted(stripe_sub)
+    else:
+        handle_subscription_updated(stripe_sub)
+    
+    return stripe_sub['status']
+
+
+@track_request
+def lambda_handler(event, context):
+    """
+    Scheduled (EventBridge) - re-verify lapsed trials and billing periods
+    
+    Returns:
+    {
+        "checked": 3,
+        "statuses": {"active": 2, "canceled": 1},
+        "rescheduled": 1
+    }
+    """
+    cutoff = int(time.time()) - GRACE_SECONDS
+    
+    # Collect a bounded batch first so the query pages aren't held open
+    # while we wait on Stripe
+    due = []
+    for item in find_due_subscriptions(cutoff):
+        if item.get('stripe_subscription_id'):
+            due.append((item['subscription_id'], item['stripe_subscription_id']))
+        else:
+            # Nothing to re-verify it against
+            reschedule_if_due(item['subscription_id'], cutoff)
+        if len(due) >= BATCH_SIZE:
+            break
+    
+    stripe = get_stripe()
+    statuses = {}
+    rescheduled = 0
+    recheck_at = int(time.time()) + RECHECK_SECONDS
+    for subscription_id, stripe_sub_id in due:
+        try:
+            status = reverify_subscription(stripe_sub_id)
+        except stripe.error.StripeError as e:
+            print(f"[ExpirySweeper] Error re-verifying {stripe_sub_id}: {e}")
+            status = 'error'
+        statuses[status] = statuses.get(status, 0) + 1
+        
+        if reschedule_if_due(subscription_id, cutoff, recheck_at):
+            rescheduled += 1
+    
+    print(f"[ExpirySweeper] Re-verified {len(due)} subscriptions: {statuses}, {rescheduled} still due rescheduled")
+    
+    return {
+        'checked': len(due),
+        'statuses': statuses,
+        'rescheduled': rescheduled
+    }
@@ -7,39 +7,31 @@ LOGIC:
 2. If yes, check if org has an active subscription
 3. If no org or no org subscription, check user's personal subscription
 4. Return subscription details with user limits and usage
+
+Rate limited per user and per organisation (utils.rate_limit) - the
+extension polls this endpoint.
 """
 import os
 from utils.response_builder import success_response, error_handler
 from utils.helpers import get_user_id_from_event, get_table
+from utils.rate_limit import rate_limit, limit_org
 from subscriptions.plans import get_user_limit, PLANS
+from organisations.model import get_user_membership, get_organisation, count_members
 
 subscriptions_table = get_table('SUBSCRIPTIONS_TABLE_NAME')
-org_members_table = get_table('ORG_MEMBERS_TABLE_NAME')
-organisations_table = get_table('ORGANISATIONS_TABLE_NAME')
+
+# Short cache lifetime - the extension polls this and status changes via webhook
+SUBSCRIPTION_MAX_AGE = 15
 
 
 def get_user_organisation(user_id):
     """Get the organisation the user belongs to, if any."""
-    response = org_members_table.query(
-        IndexName='user_id-index',
-        KeyConditionExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
-    )
-    
-    items = response.get('Items', [])
-    if not items:
+    membership = get_user_membership(user_id)
+    if not membership:
         return None
     
-    # Return the first (should only be one)
-    membership = items[0]
-    org_id = membership.get('organisation_id')
-    
     # Get org details
-    org_response = organisations_table.get_item(
-        Key={'organisation_id': org_id}
-    )
-    
-    org = org_response.get('Item')
+    org = get_organisation(membership['organisation_id'])
     if org:
         org['user_role'] = membership.get('role', 'member')
     
@@ -67,49 +59,25 @@ def get_subscription_by_owner(owner_id):
     return items[0]
 
 
-def count_org_members(org_id):
-    """Count members in an organisation."""
-    response = org_members_table.query(
-        KeyConditionExpression='organisation_id = :oid',
-        ExpressionAttributeValues={':oid': org_id},
-        Select='COUNT'
-    )
-    return response.get('Count', 0)
-
-
-@error_handler
-def lambda_handler(event, context):
+def find_subscription(user_id, org_id=None):
     """
-    GET /subscription - Get user's subscription status
-    
-    Returns:
-    - subscription: The active subscription (personal or org)
-    - limits: User limits
-    - usage: Current user counts
-    - organisation: Organisation details if subscription is shared
+    Find the subscription that applies to a user.
+    Org subscription takes priority over the user's personal subscription.
+    Returns (subscription, is_org_subscription).
     """
-    user_id = get_user_id_from_event(event)
-    
-    # Check if user belongs to an organisation
-    organisation = get_user_organisation(user_id)
-    
-    subscription = None
-    is_org_subscription = False
-    
-    # Check org subscription first (org subscription takes priority)
-    if organisation:
-        org_id = organisation.get('organisation_id')
+    if org_id:
         subscription = get_subscription_by_owner(org_id)
         if subscription:
-            is_org_subscription = True
-    
-    # Fall back to personal subscription
-    if not subscription:
-        subscription = get_subscription_by_owner(user_id)
+            return subscription, True
     
+    return get_subscription_by_owner(user_id), False
+
+
+def build_subscription_status(subscription, is_org_subscription, organisation, user_count=1):
+    """Build the GET /subscription payload for a subscription lookup."""
     # No subscription found
     if not subscription:
-        return success_response({
+        return {
             'subscription': None,
             'limits': {
                 'users': 1
@@ -119,7 +87,7 @@ def lambda_handler(event, context):
             },
             'organisation': organisation,
             'has_access': False
-        })
+        }
     
     # Get plan details
     plan_key = subscription.get('plan', 'single')
@@ -128,17 +96,10 @@ def lambda_handler(event, context):
     # Calculate limits (may be custom for enterprise)
     user_limit = subscription.get('custom_user_limit') or get_user_limit(plan_key)
     
-    # Calculate usage
-    if is_org_subscription:
-        owner_id = organisation.get('organisation_id')
-        user_count = count_org_members(owner_id)
-    else:
-        user_count = 1
-    
     # Determine if user has active access
     has_access = subscription.get('status') in ['active', 'trialing']
     
-    return success_response({
+    return {
         'subscription': {
             'subscription_id': subscription.get('subscription_id'),
             'plan': plan_key,
@@ -160,4 +121,40 @@ def lambda_handler(event, context):
         },
         'organisation': organisation if is_org_subscription else None,
         'has_access': has_access
-    })
+    }
+
+
+@error_handler
+@rate_limit
+def lambda_handler(event, context):
+    """
+    GET /subscription - Get user's subscription status
+    
+    Returns:
+    - subscription: The active subscription (personal or org)
+    - limits: User limits
+    - usage: Current user counts
+    - organisation: Organisation details if subscription is shared
+    """
+    user_id = get_user_id_from_event(event)
+    
+    # Check if user belongs to an organisation
+    organisation = get_user_organisation(user_id)
+    org_id = organisation.get('organisation_id') if organisation else None
+    if org_id:
+        limit_org(org_id)
+    
+    subscription, is_org_subscription = find_subscription(user_id, org_id)
+    
+    # Calculate usage
+    if is_org_subscription:
+        user_count = count_members(org_id)
+    else:
+        user_count = 1
+    
+    return success_response(build_subscription_status(
+        subscription,
+        is_org_subscription,
+        organisation,
+        user_count
+    ), event=event, max_age=SUBSCRIPTION_MAX_AGE)
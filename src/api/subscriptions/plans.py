@@ -15,10 +15,8 @@ PRICING MODEL:
 STRIPE SETUP REQUIRED:
 Each Stripe Product must have metadata: plan_key = "single" | "team" | "business"
 """
-import os
-import stripe
-
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+from subscriptions.stripe_client import get_stripe
+from utils.warmup import register_warmer
 
 # Plan configurations with user limits
 PLANS = {
@@ -48,6 +46,9 @@ DEFAULT_USER_LIMIT = 1
 _stripe_price_cache = None
 
 
+# Memoised per container: only the first warm-up ping (or request) calls Stripe,
+# which also opens the SDK's connection for the first real request
+@register_warmer
 def _fetch_stripe_prices():
     """Fetch active prices from Stripe and build mappings based on product metadata."""
     global _stripe_price_cache
@@ -55,6 +56,7 @@ def _fetch_stripe_prices():
     if _stripe_price_cache is not None:
         return _stripe_price_cache
     
+    stripe = get_stripe()
     price_to_plan = {}
     plan_to_price = {}
     
@@ -95,7 +97,7 @@ def _fetch_stripe_prices():
         }
         
         print(f"[Plans] Loaded {len(price_to_plan)} prices from Stripe")
-        
+    
     except stripe.error.StripeError as e:
         print(f"[Plans] Error fetching Stripe prices: {e}")
         _stripe_price_cache = {
@@ -0,0 +1,84 @@
+"""
+Stripe Client
+Imports and configures the Stripe SDK on first use.
+
+The SDK is one of the slowest imports in the subscription handlers, and many
+requests (validation failures, plan lookups from the cache, reads that only
+touch DynamoDB) never call Stripe. Modules call get_stripe() inside the code
+path that needs it instead of importing stripe at module level.
+
+The SDK's HTTP client is wrapped so every Stripe API request is reported to
+utils.telemetry, and every attempt (retries included) is given what is left
+of the request's deadline (utils.deadline) as its timeout.
+"""
+import os
+import re
+import time
+from utils.deadline import call_timeout
+from utils.telemetry import record_call
+from utils.warmup import register_warmer
+
+# The configured stripe module (populated on first use)
+_stripe = None
+
+# Object IDs in request paths (sub_1Nx..., cus_P2...) - grouped as {id}
+_OBJECT_ID = re.compile(r'/[a-z]+_(?=[A-Za-z0-9]*[A-Z0-9])[A-Za-z0-9]{8,}')
+
+
+def _get_operation(method, url):
+    """Describe a Stripe request, e.g. "GET /v1/subscriptions/{id}"."""
+    path = re.sub(r'^https?://[^/]+', '', url).split('?', 1)[0]
+    return f"{method.upper()} {_OBJECT_ID.sub('/{id}', path)}"
+
+
+def instrument_http_client(http_client):
+    """Report every request made by a Stripe HTTP client to utils.telemetry."""
+    request_with_retries = http_client.request_with_retries
+    
+    def timed_request(method, url, headers, post_data=None, *args, **kwargs):
+        started = time.perf_counter()
+        content = ''
+        status_code = None
+        try:
+            content, status_code, response_headers = request_with_retries(method, url, headers, post_data, *args, **kwargs)
+            return content, status_code, response_headers
+        finally:
+            record_call(
+                'stripe',
+                _get_operation(method, url),
+                (time.perf_counter() - started) * 1000,
+                len(content or ''),
+                error=status_code is None or status_code >= 300
+            )
+    
+    http_client.request_with_retries = timed_request
+    return http_client
+
+
+def apply_deadline(http_client):
+    """Time out each request made by a Stripe HTTP client at the request deadline."""
+    request = http_client.request
+    # The SDK's own timeout (80s) stays the ceiling
+    ceiling = getattr(http_client, '_timeout', None)
+    
+    def deadline_request(method, url, *args, **kwargs):
+        http_client._timeout = call_timeout(ceiling, _get_operation(method, url))
+        return request(method, url, *args, **kwargs)
+    
+    # request_with_retries calls request once per attempt
+    http_client.request = deadline_request
+    return http_client
+
+
+@register_warmer
+def get_stripe():
+    """Get the Stripe SDK module, importing and configuring it on first use."""
+    global _stripe
+    
+    if _stripe is None:
+        import stripe
+        stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+        stripe.default_http_client = instrument_http_client(apply_deadline(stripe.new_default_http_client()))
+        _stripe = stripe
+    
+    return _stripe
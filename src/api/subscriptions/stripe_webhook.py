@@ -12,12 +12,18 @@ Events handled:
 import os
 import json
 import uuid
-import stripe
+from botocore.exceptions import ClientError
 from utils.response_builder import success_response, error_response
-from utils.helpers import get_table, get_current_timestamp
+from utils.helpers import get_table, get_current_timestamp, get_raw_body, get_header
+from utils.unit_of_work import is_condition_failure
 from subscriptions.plans import get_plan_from_stripe_price, get_user_limit
+from subscriptions.expiry import get_expiry_attributes
+from subscriptions.billing_metrics import (
+    build_metrics_state, get_previous_state, get_subscription_mrr, record_subscription_change
+)
+from subscriptions.stripe_client import get_stripe
+from utils.telemetry import track_request
 
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
 webhook_secret = os.environ.get('STRIPE_WEBHOOK_SECRET')
 
 subscriptions_table = get_table('SUBSCRIPTIONS_TABLE_NAME')
@@ -25,12 +31,14 @@ subscriptions_table = get_table('SUBSCRIPTIONS_TABLE_NAME')
 
 def verify_webhook_signature(event):
     """Verify Stripe webhook signature."""
-    payload = event.get('body', '')
-    sig_header = event.get('headers', {}).get('Stripe-Signature') or event.get('headers', {}).get('stripe-signature')
+    # Signature is computed over the exact bytes Stripe sent
+    payload = get_raw_body(event)
+    sig_header = get_header(event, 'Stripe-Signature')
     
     if not sig_header:
         return None, "Missing Stripe-Signature header"
     
+    stripe = get_stripe()
     try:
         stripe_event = stripe.Webhook.construct_event(
             payload, sig_header, webhook_secret
@@ -42,6 +50,11 @@ def verify_webhook_signature(event):
         return None, f"Invalid signature: {str(e)}"
 
 
+def get_subscription_record_id(stripe_subscription_id):
+    """Record id of a Stripe subscription - the same on every delivery of its checkout event."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"stripe:subscription:{stripe_subscription_id}"))
+
+
 def handle_checkout_completed(session):
     """Handle checkout.session.completed event - create subscription record."""
     metadata = session.get('metadata', {})
@@ -52,7 +65,7 @@ def handle_checkout_completed(session):
         return
     
     # Get subscription details from Stripe
-    stripe_sub = stripe.Subscription.retrieve(subscription_id)
+    stripe_sub = get_stripe().Subscription.retrieve(subscription_id)
     
     # Get plan from price ID
     price_id = stripe_sub['items']['data'][0]['price']['id']
@@ -64,7 +77,7 @@ def handle_checkout_completed(session):
     
     # Create subscription record
     subscription_record = {
-        'subscription_id': str(uuid.uuid4()),
+        'subscription_id': get_subscription_record_id(subscription_id),
         'stripe_subscription_id': subscription_id,
         'stripe_customer_id': customer_id,
         'owner_id': metadata.get('owner_id'),
@@ -78,11 +91,36 @@ def handle_checkout_completed(session):
         'cancel_at_period_end': stripe_sub.get('cancel_at_period_end', False),
         'trial_end': stripe_sub.get('trial_end'),
         'user_limit': get_user_limit(plan_key),
+        'mrr': get_subscription_mrr(stripe_sub),
         'created_at': get_current_timestamp(),
         'updated_at': get_current_timestamp(),
     }
     
-    subscriptions_table.put_item(Item=subscription_record)
+    # Index the next trial/period end so the expiry sweeper can find it
+    subscription_record.update(get_expiry_attributes(
+        stripe_sub['status'],
+        stripe_sub['current_period_end'],
+        stripe_sub.get('trial_end')
+    ))
+    
+    # Stripe redelivers events - a second delivery must not count the subscription again
+    try:
+        subscriptions_table.put_item(
+            Item=subscription_record,
+            ConditionExpression='attribute_not_exists(subscription_id)'
+        )
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
+        print(f"[Webhook] Subscription {subscription_id} already recorded - skipping redelivered checkout")
+        return
+    
+    record_subscription_change(None, build_metrics_state(
+        subscription_record['status'],
+        plan_key,
+        billing_period,
+        subscription_record['mrr']
+    ))
 
 
 def handle_subscription_updated(stripe_sub):
@@ -113,6 +151,7 @@ def handle_subscription_updated(stripe_sub):
         current_period_end = :period_end,
         cancel_at_period_end = :cancel_at_end,
         trial_end = :trial_end,
+        mrr = :mrr,
         updated_at = :updated_at
     """
     
@@ -122,6 +161,7 @@ def handle_subscription_updated(stripe_sub):
         ':period_end': stripe_sub['current_period_end'],
         ':cancel_at_end': stripe_sub.get('cancel_at_period_end', False),
         ':trial_end': stripe_sub.get('trial_end'),
+        ':mrr': get_subscription_mrr(stripe_sub),
         ':updated_at': get_current_timestamp(),
     }
     
@@ -132,14 +172,39 @@ def handle_subscription_updated(stripe_sub):
         expr_values[':billing'] = billing_period
         expr_values[':user_limit'] = get_user_limit(plan_key)
     
-    subscriptions_table.update_item(
+    # Keep the sparse expiry index in step with the new status
+    expiry = get_expiry_attributes(
+        stripe_sub['status'],
+        stripe_sub['current_period_end'],
+        stripe_sub.get('trial_end')
+    )
+    if expiry:
+        update_expr += ", expiry_bucket = :expiry_bucket, expires_at = :expires_at"
+        expr_values[':expiry_bucket'] = expiry['expiry_bucket']
+        expr_values[':expires_at'] = expiry['expires_at']
+    else:
+        update_expr += " REMOVE expiry_bucket, expires_at"
+    
+    # The row as this update found it - the query above may already be stale
+    previous = subscriptions_table.update_item(
         Key={'subscription_id': subscription['subscription_id']},
         UpdateExpression=update_expr,
         ExpressionAttributeNames={
             '#status': 'status',
             '#plan': 'plan'
         } if plan_key else {'#status': 'status'},
-        ExpressionAttributeValues=expr_values
+        ExpressionAttributeValues=expr_values,
+        ReturnValues='ALL_OLD'
+    ).get('Attributes') or subscription
+    
+    record_subscription_change(
+        get_previous_state(previous),
+        build_metrics_state(
+            stripe_sub['status'],
+            plan_key or previous.get('plan'),
+            billing_period if plan_key else previous.get('billing_period'),
+            expr_values[':mrr']
+        )
     )
 
 
@@ -160,16 +225,30 @@ def handle_subscription_deleted(stripe_sub):
     
     subscription = items[0]
     
-    # Update status to canceled
-    subscriptions_table.update_item(
+    # Update status to canceled and drop it from the expiry index (mrr marks the row as counted in the gauges)
+    previous = subscriptions_table.update_item(
         Key={'subscription_id': subscription['subscription_id']},
-        UpdateExpression='SET #status = :status, canceled_at = :canceled_at, updated_at = :updated_at',
+        UpdateExpression=(
+            'SET #status = :status, canceled_at = :canceled_at, updated_at = :updated_at, mrr = if_not_exists(mrr, :zero) '
+            'REMOVE expiry_bucket, expires_at'
+        ),
         ExpressionAttributeNames={'#status': 'status'},
         ExpressionAttributeValues={
             ':status': 'canceled',
             ':canceled_at': get_current_timestamp(),
             ':updated_at': get_current_timestamp(),
-        }
+            ':zero': 0,
+        },
+        ReturnValues='ALL_OLD'
+    ).get('Attributes') or subscription
+    
+    record_subscription_change(
+        get_previous_state(previous),
+        build_metrics_state(
+            'canceled',
+            previous.get('plan'),
+            previous.get('billing_period')
+        )
     )
 
 
@@ -192,18 +271,31 @@ def handle_payment_failed(invoice):
     
     subscription = items[0]
     
-    # Update status to past_due
-    subscriptions_table.update_item(
+    # Update status to past_due (mrr marks the row as counted in the gauges)
+    previous = subscriptions_table.update_item(
         Key={'subscription_id': subscription['subscription_id']},
-        UpdateExpression='SET #status = :status, updated_at = :updated_at',
+        UpdateExpression='SET #status = :status, updated_at = :updated_at, mrr = if_not_exists(mrr, :zero)',
         ExpressionAttributeNames={'#status': 'status'},
         ExpressionAttributeValues={
             ':status': 'past_due',
             ':updated_at': get_current_timestamp(),
-        }
+            ':zero': 0,
+        },
+        ReturnValues='ALL_OLD'
+    ).get('Attributes') or subscription
+    
+    record_subscription_change(
+        get_previous_state(previous),
+        build_metrics_state(
+            'past_due',
+            previous.get('plan'),
+            previous.get('billing_period'),
+            previous.get('mrr')
+        )
     )
 
 
+@track_request
 def lambda_handler(event, context):
     """
     POST /subscription/webhook - Handle Stripe webhook events
@@ -235,7 +327,7 @@ def lambda_handler(event, context):
         # Add more event handlers as needed
         
         return success_response({'received': True})
-        
+    
     except Exception as e:
         # Log error but return 200 to prevent Stripe retries
         print(f"Error processing webhook: {str(e)}")
@@ -1,2 +1,7 @@
 # Utils package for Lambda functions
 
+# Memory profiling has to start before the handler's imports to see them
+import os
+if os.environ.get('MEMORY_PROFILE'):
+    from utils import memory_profile
+    memory_profile.start()
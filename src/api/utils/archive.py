@@ -0,0 +1,207 @@
+"""
+Archive storage utilities
+Streams DynamoDB rows into gzip-compressed NDJSON partitions and reads them back.
+
+LAYOUT:
+    {dataset}/owner={owner}/month={YYYY-MM}/part-{timestamp}-{id}.ndjson.gz
+
+Partitions are keyed by the rows' owner (a user or organisation), so reading
+one owner's history lists and decompresses only that owner's partitions -
+the cost grows with the owner's archive, not with everyone's. Partitions
+from before the owner layout ({dataset}/month=...) are moved into it by
+reindex_partitions().
+
+Partitions are written to S3 when ARCHIVE_BUCKET is set, otherwise to the
+local directory in ARCHIVE_DIR (used for local runs and as a stand-in for S3).
+"""
+import os
+import io
+import gzip
+import json
+import uuid
+from decimal import Decimal
+from datetime import datetime
+from urllib.parse import quote
+
+
+# Rows per partition file (also bounds memory while streaming)
+PART_SIZE = int(os.environ.get('ARCHIVE_PART_SIZE', '1000'))
+
+
+def _json_default(obj):
+    """Serialise DynamoDB Decimals without turning integers into floats."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, set):
+        return sorted(obj)
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+def encode_partition(rows):
+    """Encode rows as gzip-compressed NDJSON."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as gz:
+        for row in rows:
+            gz.write(json.dumps(row, default=_json_default, separators=(',', ':')).encode('utf-8'))
+            gz.write(b'\n')
+    return buffer.getvalue()
+
+
+def decode_partition(data):
+    """Decode gzip-compressed NDJSON into rows."""
+    for line in gzip.decompress(data).splitlines():
+        if line.strip():
+            yield json.loads(line)
+
+
+class LocalArchiveStore:
+    """Archive store backed by a local directory."""
+    
+    def __init__(self, root):
+        self.root = root
+    
+    def put(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial partition
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    
+    def list(self, prefix):
+        # Prefixes match like S3's - they need not end at a directory
+        base = os.path.join(self.root, os.path.dirname(prefix))
+        keys = []
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                if filename.endswith('.ndjson.gz'):
+                    keys.append(os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, '/'))
+        return sorted(key for key in keys if key.startswith(prefix))
+    
+    def get(self, key):
+        with open(os.path.join(self.root, key), 'rb') as f:
+            return f.read()
+    
+    def delete(self, key):
+        os.remove(os.path.join(self.root, key))
+
+
+class S3ArchiveStore:
+    """Archive store backed by an S3 bucket."""
+    
+    def __init__(self, bucket):
+        import boto3
+        self.bucket = bucket
+        self.s3 = boto3.client('s3')
+    
+    def put(self, key, data):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType='application/x-ndjson',
+            ContentEncoding='gzip'
+        )
+    
+    def list(self, prefix):
+        keys = []
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                keys.append(obj['Key'])
+        return sorted(keys)
+    
+    def get(self, key):
+        return self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+    
+    def delete(self, key):
+        self.s3.delete_object(Bucket=self.bucket, Key=key)
+
+
+def get_archive_store():
+    """Get the configured archive store (S3 if ARCHIVE_BUCKET is set)."""
+    bucket = os.environ.get('ARCHIVE_BUCKET')
+    if bucket:
+        return S3ArchiveStore(bucket)
+    return LocalArchiveStore(os.environ.get('ARCHIVE_DIR', 'archive'))
+
+
+def owner_prefix(dataset, owner):
+    """Key prefix of an owner's partitions."""
+    return f"{dataset}/owner={quote(str(owner), safe='')}/"
+
+
+def write_partition(store, dataset, owner, month, rows):
+    """Write one partition file and return its key."""
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    key = f"{owner_prefix(dataset, owner)}month={month}/part-{stamp}-{uuid.uuid4().hex[:8]}.ndjson.gz"
+    store.put(key, encode_partition(rows))
+    return key
+
+
+def archive_rows(store, table, dataset, rows, key_attributes, owner_of, month_of, dry_run=False):
+    """
+    Stream rows into archive partitions, then delete them from the table.
+    
+    Rows are grouped by owner and month (owner_of(row), month_of(row) ->
+    'YYYY-MM'), and everything pending is flushed every PART_SIZE rows. A
+    chunk is only deleted after its partition is written, so a failure
+    part-way never loses data (at worst a row is archived twice).
+    
+    Returns the number of rows archived.
+    """
+    pending = {}
+    held = 0
+    archived = 0
+    
+    def flush(owner, month):
+        chunk = pending.pop((owner, month))
+        if dry_run:
+            return len(chunk)
+        
+        write_partition(store, dataset, owner, month, chunk)
+        with table.batch_writer() as batch:
+            for row in chunk:
+                batch.delete_item(Key={attr: row[attr] for attr in key_attributes})
+        return len(chunk)
+    
+    for row in rows:
+        pending.setdefault((owner_of(row), month_of(row)), []).append(row)
+        held += 1
+        if held >= PART_SIZE:
+            for group in list(pending):
+                archived += flush(*group)
+            held = 0
+    
+    for group in list(pending):
+        archived += flush(*group)
+    
+    return archived
+
+
+def read_archived(store, dataset, owner=None, predicate=None):
+    """Yield archived rows for a dataset (one owner's, if given), optionally filtered by predicate(row)."""
+    prefix = owner_prefix(dataset, owner) if owner is not None else f"{dataset}/"
+    for key in store.list(prefix):
+        for row in decode_partition(store.get(key)):
+            if predicate is None or predicate(row):
+                yield row
+
+
+def reindex_partitions(store, dataset, owner_of, month_of):
+    """
+    Move partitions written before the owner layout ({dataset}/month=...)
+    into it. Each old partition is deleted once its rows are rewritten.
+    Returns the number of partitions moved.
+    """
+    moved = 0
+    for key in store.list(f"{dataset}/month="):
+        groups = {}
+        for row in decode_partition(store.get(key)):
+            groups.setdefault((owner_of(row), month_of(row)), []).append(row)
+        for (owner, month), rows in groups.items():
+            write_partition(store, dataset, owner, month, rows)
+        store.delete(key)
+        moved += 1
+    return moved
@@ -0,0 +1,97 @@
+"""
+Request deadlines for Lambda functions.
+error_handler starts a deadline for every request from the Lambda context's
+get_remaining_time_in_millis(), less a reserve for building and returning
+the response. Outbound calls read it:
+
+- DynamoDB: every attempt (retries included) gets a read timeout of the
+  remaining budget, capped at the client's own read timeout (utils.dynamodb)
+- Stripe: every attempt gets the same, capped at the SDK client's timeout
+  (subscriptions.stripe_client)
+
+A call that would start with less than DEADLINE_MIN_CALL_MS left raises
+DeadlineExceeded instead, and error_handler turns that (and DynamoDB
+timeouts) into a 503 with Retry-After - a clean response rather than the
+gateway error a Lambda timeout produces. A request that arrives with its
+budget already spent gets the 503 without running the handler.
+
+SETTINGS:
+- DEADLINE_RESERVE_MS=500       kept back to build and return the response
+- DEADLINE_MIN_CALL_MS=200      shortest timeout worth starting a call with
+- DEADLINE_RETRY_AFTER=1        Retry-After (seconds) on the 503
+
+The current deadline is a context variable, so requests served concurrently
+in one process each time out on their own budget.
+"""
+import os
+import time
+import contextvars
+
+RESERVE_MS = int(os.environ.get('DEADLINE_RESERVE_MS', '500'))
+MIN_CALL_MS = int(os.environ.get('DEADLINE_MIN_CALL_MS', '200'))
+RETRY_AFTER_SECONDS = int(os.environ.get('DEADLINE_RETRY_AFTER', '1'))
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting a call the request has no time left for."""
+
+
+class Deadline:
+    """The time a request has left for its outbound calls."""
+    
+    def __init__(self, remaining_ms):
+        self.expires_at = time.monotonic() + (remaining_ms - RESERVE_MS) / 1000
+    
+    @classmethod
+    def from_context(cls, context):
+        """Build a deadline from a Lambda context (None if it has no time limit)."""
+        get_remaining = getattr(context, 'get_remaining_time_in_millis', None)
+        if get_remaining is None:
+            return None
+        return cls(get_remaining())
+    
+    def remaining_ms(self):
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000)
+    
+    def is_spent(self):
+        return self.remaining_ms() < MIN_CALL_MS
+    
+    def timeout(self, ceiling=None, operation='call'):
+        """
+        Seconds an outbound call may take: the remaining budget, capped at
+        ceiling. Raises DeadlineExceeded when too little is left to start it.
+        """
+        remaining_ms = self.remaining_ms()
+        if remaining_ms < MIN_CALL_MS:
+            raise DeadlineExceeded(f"{remaining_ms:.0f}ms left in the request, not starting {operation}")
+        if ceiling is None:
+            return remaining_ms / 1000
+        return min(ceiling, remaining_ms / 1000)
+
+
+# Deadline of the request in progress
+_current = contextvars.ContextVar('deadline', default=None)
+
+
+def start_deadline(context):
+    """Start the deadline for a request."""
+    deadline = Deadline.from_context(context)
+    _current.set(deadline)
+    return deadline
+
+
+def clear_deadline():
+    _current.set(None)
+
+
+def get_deadline():
+    """Get the current request's deadline (None outside a request)."""
+    return _current.get()
+
+
+def call_timeout(ceiling=None, operation='call'):
+    """Timeout for an outbound call: the current request's budget, or ceiling outside a request."""
+    current = _current.get()
+    if current is None:
+        return ceiling
+    return current.timeout(ceiling, operation)
@@ -0,0 +1,502 @@
+"""
+DynamoDB data access on the low-level client.
+ClientTable mirrors the subset of the boto3 resource Table API the handlers
+use (get_item, put_item, update_item, delete_item, query, scan,
+batch_writer), so handler code reads the same while skipping the resource
+layer and its TypeSerializer/TypeDeserializer.
+
+TYPES:
+- Writes: str -> S, bool -> BOOL, int/float/Decimal -> N, None -> NULL,
+  dict -> M, list/tuple -> L, bytes -> B, sets -> SS/NS/BS
+- Reads: N becomes int (or float when it has a fraction/exponent) rather than
+  Decimal, everything else maps back to the types above
+
+The boto3 client is only built (and boto3 only imported) on the first call,
+so importing a handler costs nothing until it actually touches DynamoDB.
+Every call made through it is reported to utils.telemetry, including the
+capacity it consumed (ReturnConsumedCapacity=INDEXES is added to every call
+that supports it), per table and per index.
+
+Every attempt (retries included) gets what is left of the request's
+deadline (utils.deadline) as its read timeout, capped at
+DYNAMODB_READ_TIMEOUT; an attempt with too little time left raises
+DeadlineExceeded instead of being sent. Per-attempt timeouts need a botocore
+that reads read_timeout from the request context - on older ones the
+client's own timeouts (DYNAMODB_CONNECT_TIMEOUT/DYNAMODB_READ_TIMEOUT) still
+bound every attempt.
+
+RETRIES:
+The client runs botocore's standard retry mode: throttles and transient
+errors are retried with jittered exponential backoff, up to
+DYNAMODB_MAX_ATTEMPTS. Unprocessed batch items are resent with the same kind
+of backoff (send_batch).
+
+On top of that, a client-side token bucket (RateLimiter) shared by every
+call in the container adapts to throttling: it is open until DynamoDB
+throttles, then cuts the send rate by 30% on every throttle and doubles it for
+every second without one, until it is back to the rate that was throttled. An
+attempt that would have to wait longer than DYNAMODB_MAX_RATE_WAIT_MS (or
+past the request deadline) for a token fails at once instead of sleeping, so
+a throttled container sheds requests quickly (botocore's own adaptive mode
+blocks without a limit).
+
+Throttles that outlast the retries surface as ClientErrors (is_throttle) or
+ThrottledError, which error_handler turns into 429 with Retry-After.
+"""
+import os
+import time
+import random
+import threading
+from decimal import Decimal
+from utils.deadline import MIN_CALL_MS, call_timeout, get_deadline
+from utils.telemetry import record_call, record_capacity
+
+# BatchWriteItem accepts at most 25 requests per call
+BATCH_WRITE_SIZE = 25
+
+# Request parameters that carry items/keys/values and need marshalling
+_ITEM_PARAMS = ('Key', 'Item', 'ExclusiveStartKey')
+# Response fields that carry items/keys and need unmarshalling
+_ITEM_FIELDS = ('Item', 'Attributes', 'LastEvaluatedKey')
+
+# Operations that accept ReturnConsumedCapacity
+CAPACITY_OPERATIONS = {
+    'GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan',
+    'BatchGetItem', 'BatchWriteItem', 'TransactGetItems', 'TransactWriteItems',
+}
+
+# Operations whose CapacityUnits are reads (the rest are writes)
+READ_OPERATIONS = {'GetItem', 'Query', 'Scan', 'BatchGetItem', 'TransactGetItems'}
+
+# Per-attempt timeouts (seconds), lowered further by the request deadline
+CONNECT_TIMEOUT = float(os.environ.get('DYNAMODB_CONNECT_TIMEOUT', '1'))
+READ_TIMEOUT = float(os.environ.get('DYNAMODB_READ_TIMEOUT', '5'))
+
+# Retry policy (see RETRIES above)
+MAX_ATTEMPTS = int(os.environ.get('DYNAMODB_MAX_ATTEMPTS', '3'))
+BACKOFF_BASE = 0.05
+BACKOFF_CAP = 1.0
+MAX_RATE_WAIT_MS = int(os.environ.get('DYNAMODB_MAX_RATE_WAIT_MS', '250'))
+
+# Error codes that mean "slow down" rather than "wrong request"
+THROTTLE_CODES = {
+    'ProvisionedThroughputExceededException', 'ThrottlingException',
+    'RequestLimitExceeded', 'TransactionConflictException',
+}
+# TransactionCanceledException cancellation reasons that mean the same
+THROTTLE_REASONS = {'ThrottlingError', 'ProvisionedThroughputExceeded', 'TransactionConflict'}
+
+# Shared DynamoDB client (populated on first use)
+_client = None
+
+
+def get_client():
+    """Get the shared DynamoDB client, building it on first use."""
+    global _client
+    
+    if _client is None:
+        import boto3
+        _client = boto3.client('dynamodb', config=client_config())
+        instrument_client(_client)
+    
+    return _client
+
+
+def client_config():
+    """botocore Config with the timeouts and retry policy every DynamoDB client uses."""
+    from botocore.config import Config
+    return Config(
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        retries={'mode': 'standard', 'max_attempts': MAX_ATTEMPTS},
+    )
+
+
+class ThrottledError(Exception):
+    """Raised when DynamoDB (or the client-side rate limiter) keeps throttling a request."""
+
+
+def is_throttle(error):
+    """Check whether an error is DynamoDB throttling (or a transaction conflict)."""
+    if isinstance(error, ThrottledError):
+        return True
+    response = getattr(error, 'response', None) or {}
+    code = response.get('Error', {}).get('Code')
+    if code in THROTTLE_CODES:
+        return True
+    if code == 'TransactionCanceledException':
+        # Items that didn't fail say 'None'; any other reason is a real failure
+        reasons = {reason.get('Code') for reason in response.get('CancellationReasons', [])} - {'None'}
+        return bool(reasons) and reasons <= THROTTLE_REASONS
+    return False
+
+
+def backoff_delay(attempt):
+    """Seconds to wait before retry number attempt (full jitter)."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class RateLimiter:
+    """
+    Adaptive client-side token bucket (see RETRIES above). Thread-safe - the
+    local gateway runs requests on threads sharing one client.
+    """
+    
+    # Fewest sends per second it slows down to
+    MIN_RATE = 1.0
+    # Each throttle cuts the rate to this share (as botocore's adaptive mode)...
+    BACKOFF = 0.7
+    # ...but throttles this soon after the last cut answer the same burst
+    THROTTLE_WINDOW = 0.1
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Rate that was throttled (None while unlimited) - reaching it again lifts the limit
+        self.ceiling = None
+        # Rate set by the last throttle, and when it happened
+        self.base_rate = None
+        self.throttled_at = 0.0
+        self.tokens = 0.0
+        self.refilled = 0.0
+        # Send times over the last second, to measure the rate
+        self.sent = []
+    
+    def _rate(self, now):
+        """Current sends per second (None while unlimited) - doubles every second without a throttle."""
+        if self.ceiling is None:
+            return None
+        rate = self.base_rate * 2 ** (now - self.throttled_at)
+        if rate >= self.ceiling:
+            self.ceiling = None
+            return None
+        return rate
+    
+    def acquire(self, operation):
+        """Take a token for one attempt, waiting for it if the wait is short enough."""
+        with self.lock:
+            now = time.monotonic()
+            self.sent = [sent for sent in self.sent if now - sent < 1.0]
+            self.sent.append(now)
+            rate = self._rate(now)
+            if rate is None:
+                return
+            self.tokens = min(rate, self.tokens + (now - self.refilled) * rate) - 1
+            self.refilled = now
+            wait = -self.tokens / rate if self.tokens < 0 else 0
+            if not wait:
+                return
+            deadline = get_deadline()
+            too_late = deadline is not None and deadline.remaining_ms() - wait * 1000 < MIN_CALL_MS
+            if too_late or wait * 1000 > MAX_RATE_WAIT_MS:
+                # Not sent, so the token is given back
+                self.tokens += 1
+                raise ThrottledError(f"Client-side rate limit ({rate:.1f}/s) would hold {operation} for {wait * 1000:.0f}ms")
+        time.sleep(wait)
+    
+    def on_throttle(self):
+        with self.lock:
+            now = time.monotonic()
+            rate = self._rate(now)
+            if rate is not None and now - self.throttled_at < self.THROTTLE_WINDOW:
+                return
+            if rate is None:
+                # Measured over the last second, this send included
+                rate = max(float(len([sent for sent in self.sent if now - sent < 1.0])), self.MIN_RATE)
+                self.ceiling = rate
+                self.tokens = 0.0
+                self.refilled = now
+            self.base_rate = max(rate * self.BACKOFF, self.MIN_RATE)
+            self.throttled_at = now
+
+
+_rate_limiter = RateLimiter()
+
+
+def _count_items(request_items):
+    # BatchGetItem requests hold {'Keys': [...]}, BatchWriteItem requests a list
+    return sum(len(request['Keys']) if isinstance(request, dict) else len(request) for request in request_items.values())
+
+
+def send_batch(send, request_items, unprocessed_field):
+    """
+    Send a BatchGetItem/BatchWriteItem request and resend whatever comes back
+    in unprocessed_field, backing off between sends. Yields every response.
+    Raises ThrottledError after MAX_ATTEMPTS sends in a row without progress.
+    """
+    attempt = 0
+    while request_items:
+        if attempt:
+            if attempt >= MAX_ATTEMPTS:
+                raise ThrottledError(f"{_count_items(request_items)} batch item(s) still unprocessed after {attempt} attempts")
+            time.sleep(backoff_delay(attempt))
+        sent = _count_items(request_items)
+        response = send(RequestItems=request_items)
+        yield response
+        request_items = response.get(unprocessed_field) or None
+        # Partial progress (e.g. the 16MB BatchGetItem limit) isn't throttling
+        attempt = attempt + 1 if request_items and _count_items(request_items) >= sent else 1
+
+
+def _start_call(params, model, context, **kwargs):
+    if model.name in CAPACITY_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'INDEXES')
+    context['telemetry_started'] = time.perf_counter()
+    context['telemetry_operation'] = model.name
+    context['telemetry_table'] = params.get('TableName')
+
+
+def _before_send(request, event_name='', **kwargs):
+    # Runs for every attempt, so retries are held to the deadline and the rate limit too
+    operation = f"DynamoDB {event_name.rsplit('.', 1)[-1]}"
+    _rate_limiter.acquire(operation)
+    timeout = call_timeout(READ_TIMEOUT, operation)
+    context = getattr(request, 'context', None)
+    if context is not None:
+        context['read_timeout'] = timeout
+
+
+def _check_attempt(response=None, **kwargs):
+    # needs-retry fires after every attempt; response is (http response, parsed) or None
+    if response is None:
+        return None
+    if response[1].get('Error', {}).get('Code') in THROTTLE_CODES:
+        _rate_limiter.on_throttle()
+    # Leaves the retry decision to botocore
+    return None
+
+
+def _split_units(units, is_read):
+    """Get (read, write) units from a capacity block."""
+    read = units.get('ReadCapacityUnits')
+    write = units.get('WriteCapacityUnits')
+    if read is None and write is None:
+        total = units.get('CapacityUnits', 0)
+        return (total, 0) if is_read else (0, total)
+    return read or 0, write or 0
+
+
+def report_consumed_capacity(operation, consumed):
+    """Report a response's ConsumedCapacity (dict or list) per table and index."""
+    is_read = operation in READ_OPERATIONS
+    for entry in consumed if isinstance(consumed, list) else [consumed]:
+        table = entry.get('TableName')
+        # With INDEXES the table's own share is broken out under "Table"
+        table_units = entry.get('Table', entry)
+        record_capacity(table, None, *_split_units(table_units, is_read))
+        for index_type in ('GlobalSecondaryIndexes', 'LocalSecondaryIndexes'):
+            for index, units in entry.get(index_type, {}).items():
+                record_capacity(table, index, *_split_units(units, is_read))
+
+
+def _finish_call(http_response, context, error=False):
+    started = context.get('telemetry_started')
+    if started is None:
+        return
+    
+    duration_ms = (time.perf_counter() - started) * 1000
+    bytes_returned = len(http_response.content) if http_response is not None else 0
+    record_call(
+        'dynamodb', context.get('telemetry_operation'), duration_ms, bytes_returned,
+        context.get('telemetry_table'), error
+    )
+
+
+def _after_call(http_response, parsed, model, context, **kwargs):
+    _finish_call(http_response, context, error=http_response.status_code >= 300)
+    if parsed.get('ConsumedCapacity'):
+        report_consumed_capacity(model.name, parsed['ConsumedCapacity'])
+
+
+def _after_call_error(context, **kwargs):
+    # Raised before a response arrived (connection errors, timeouts)
+    _finish_call(None, context, error=True)
+
+
+def instrument_client(client):
+    """Report every call made by a DynamoDB client to utils.telemetry and hold it to the request deadline."""
+    events = client.meta.events
+    events.register('before-parameter-build.dynamodb', _start_call)
+    # First, so the deadline is checked before a stand-in answers the call
+    events.register_first('before-send.dynamodb', _before_send)
+    events.register('needs-retry.dynamodb', _check_attempt)
+    events.register('after-call.dynamodb', _after_call)
+    events.register('after-call-error.dynamodb', _after_call_error)
+    return client
+
+
+def _unmarshal_number(text):
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+def unmarshal_value(attribute):
+    """Convert a DynamoDB attribute value ({'S': 'x'}) to a Python value."""
+    # Attribute values always hold exactly one type key
+    for type_key, value in attribute.items():
+        if type_key == 'S':
+            return value
+        if type_key == 'N':
+            return _unmarshal_number(value)
+        if type_key == 'BOOL':
+            return value
+        if type_key == 'NULL':
+            return None
+        if type_key == 'M':
+            return {name: unmarshal_value(item) for name, item in value.items()}
+        if type_key == 'L':
+            return [unmarshal_value(item) for item in value]
+        if type_key == 'SS':
+            return set(value)
+        if type_key == 'NS':
+            return {_unmarshal_number(item) for item in value}
+        if type_key == 'B':
+            return value
+        if type_key == 'BS':
+            return set(value)
+        raise TypeError(f"Unknown DynamoDB type: {type_key}")
+    raise TypeError("Empty DynamoDB attribute value")
+
+
+def unmarshal_item(item):
+    """Convert a DynamoDB item to a plain dict."""
+    return {name: unmarshal_value(attribute) for name, attribute in item.items()}
+
+
+def _marshal_number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def marshal_value(value):
+    """Convert a Python value to a DynamoDB attribute value."""
+    value_type = type(value)
+    if value_type is str:
+        return {'S': value}
+    # bool before int - bool is a subclass of int
+    if value_type is bool:
+        return {'BOOL': value}
+    if value_type is int or value_type is float or value_type is Decimal:
+        return {'N': _marshal_number(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': {name: marshal_value(item) for name, item in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [marshal_value(item) for item in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, (set, frozenset)):
+        if not value:
+            raise TypeError("DynamoDB does not support empty sets")
+        if all(isinstance(item, str) for item in value):
+            return {'SS': list(value)}
+        if all(isinstance(item, (bytes, bytearray)) for item in value):
+            return {'BS': [bytes(item) for item in value]}
+        if all(isinstance(item, (int, float, Decimal)) and not isinstance(item, bool) for item in value):
+            return {'NS': [_marshal_number(item) for item in value]}
+        raise TypeError("Set values must all be strings, numbers or bytes")
+    raise TypeError(f"Object of type {value_type} cannot be stored in DynamoDB")
+
+
+def marshal_item(item):
+    """Convert a plain dict to a DynamoDB item."""
+    return {name: marshal_value(value) for name, value in item.items()}
+
+
+def marshal_request(kwargs):
+    """Marshal the item/key/value parameters of a request (copy)."""
+    request = dict(kwargs)
+    for param in _ITEM_PARAMS:
+        if param in request:
+            request[param] = marshal_item(request[param])
+    if 'ExpressionAttributeValues' in request:
+        request['ExpressionAttributeValues'] = marshal_item(request['ExpressionAttributeValues'])
+    return request
+
+
+def unmarshal_response(response):
+    """Unmarshal the items/keys of a response in place."""
+    for field in _ITEM_FIELDS:
+        if field in response:
+            response[field] = unmarshal_item(response[field])
+    if 'Items' in response:
+        response['Items'] = [unmarshal_item(item) for item in response['Items']]
+    return response
+
+
+class ClientTable:
+    """A DynamoDB table accessed through the low-level client."""
+    
+    def __init__(self, name, client=None, key_names=None):
+        self.name = name
+        self._client = client
+        # Key attributes (hash, range), when known
+        self.key_names = key_names
+    
+    @property
+    def client(self):
+        # Resolved on first call rather than when the table is declared
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+    
+    def _call(self, operation, kwargs):
+        request = marshal_request(kwargs)
+        request['TableName'] = self.name
+        return unmarshal_response(getattr(self.client, operation)(**request))
+    
+    def get_item(self, **kwargs):
+        return self._call('get_item', kwargs)
+    
+    def put_item(self, **kwargs):
+        return self._call('put_item', kwargs)
+    
+    def update_item(self, **kwargs):
+        return self._call('update_item', kwargs)
+    
+    def delete_item(self, **kwargs):
+        return self._call('delete_item', kwargs)
+    
+    def query(self, **kwargs):
+        return self._call('query', kwargs)
+    
+    def scan(self, **kwargs):
+        return self._call('scan', kwargs)
+    
+    def batch_writer(self):
+        return BatchWriter(self.client, self.name)
+
+
+class BatchWriter:
+    """Buffers puts/deletes into BatchWriteItem calls (resource batch_writer equivalent)."""
+    
+    def __init__(self, client, table_name):
+        self.client = client
+        self.table_name = table_name
+        self.requests = []
+    
+    def put_item(self, Item):
+        self.requests.append({'PutRequest': {'Item': marshal_item(Item)}})
+        if len(self.requests) >= BATCH_WRITE_SIZE:
+            self.flush()
+    
+    def delete_item(self, Key):
+        self.requests.append({'DeleteRequest': {'Key': marshal_item(Key)}})
+        if len(self.requests) >= BATCH_WRITE_SIZE:
+            self.flush()
+    
+    def flush(self):
+        while self.requests:
+            chunk = self.requests[:BATCH_WRITE_SIZE]
+            self.requests = self.requests[BATCH_WRITE_SIZE:]
+            # Throttled requests come back unprocessed and are resent
+            for _ in send_batch(self.client.batch_write_item, {self.table_name: chunk}, 'UnprocessedItems'):
+                pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
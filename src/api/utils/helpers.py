@@ -3,12 +3,25 @@ Helper utilities for Lambda functions
 Provides common helper functions for auth, database, and timestamps
 """
 import os
-import boto3
 from datetime import datetime
+from utils.dynamodb import ClientTable, get_client, marshal_item, unmarshal_item, send_batch
 
 
-# Initialize DynamoDB resource (shared across all functions)
-dynamodb = boto3.resource('dynamodb')
+# Tables by environment variable (shared across all functions in a container)
+_tables = {}
+
+# Key attributes of each table (as in terraform), for utils.unit_of_work
+TABLE_KEYS = {
+    'TABLE_NAME': ('user_id',),
+    'ORGANISATION_DATA_TABLE_NAME': ('pk', 'sk'),
+    'SUBSCRIPTIONS_TABLE_NAME': ('subscription_id',),
+    'BILLING_METRICS_TABLE_NAME': ('metric_key', 'dimension'),
+    'RATE_LIMITS_TABLE_NAME': ('bucket_key',),
+    # Legacy organisation tables (organisations/legacy.py)
+    'ORGANISATIONS_TABLE_NAME': ('organisation_id',),
+    'ORG_MEMBERS_TABLE_NAME': ('organisation_id', 'user_id'),
+    'ORG_INVITATIONS_TABLE_NAME': ('organisation_id', 'invitation_id'),
+}
 
 
 def get_user_id_from_event(event):
@@ -16,21 +29,82 @@ def get_user_id_from_event(event):
     return event['requestContext']['authorizer']['claims']['sub']
 
 def get_table(table_name_env_var):
-    table_name = os.environ[table_name_env_var]
-    return dynamodb.Table(table_name)
+    # Memoised; the DynamoDB client itself is only built on the first call.
+    table = _tables.get(table_name_env_var)
+    if table is None:
+        table = _tables[table_name_env_var] = ClientTable(os.environ[table_name_env_var], key_names=TABLE_KEYS.get(table_name_env_var))
+    return table
 
 def get_current_timestamp():
     return datetime.utcnow().isoformat()
 
+def get_raw_body(event, default=''):
+    # Get the raw request body, decoding it if API Gateway base64-encoded it
+    # (it does for every request once binary media types are enabled).
+    body = event.get('body')
+    if body is None:
+        return default
+    if event.get('isBase64Encoded'):
+        import base64
+        return base64.b64decode(body).decode('utf-8')
+    return body
+
 def parse_request_body(event):
     import json
-    return json.loads(event.get('body', '{}'))
+    return json.loads(get_raw_body(event, '{}'))
 
 def get_query_param(event, param_name, default=None):
     query_params = event.get('queryStringParameters', {}) or {}
     return query_params.get(param_name, default)
 
+def get_fields_param(event, allowed_fields):
+    # Parse ?fields=a,b into a list validated against allowed_fields.
+    # Returns (fields, error) - fields is None when the parameter is absent.
+    fields_param = get_query_param(event, 'fields')
+    if not fields_param:
+        return (None, None)
+    
+    fields = []
+    for field in fields_param.split(','):
+        field = field.strip()
+        if field and field not in fields:
+            fields.append(field)
+    
+    invalid = [field for field in fields if field not in allowed_fields]
+    if invalid or not fields:
+        return (None, f"Invalid fields: {', '.join(invalid) or fields_param}. Allowed: {', '.join(allowed_fields)}")
+    
+    return (fields, None)
+
+def build_projection(attributes):
+    # Build ProjectionExpression kwargs using placeholder names, so reserved
+    # words such as name, role and state can be projected.
+    names = {f'#p{index}': attribute for index, attribute in enumerate(attributes)}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
+    }
+
+def get_header(event, header_name, default=None):
+    # Get a request header (case-insensitive) from API Gateway event.
+    headers = event.get('headers') or {}
+    header_name = header_name.lower()
+    for name, value in headers.items():
+        if name.lower() == header_name:
+            return value
+    return default
+
 def get_path_param(event, param_name):
     # Get path parameter from API Gateway event.
     return event['pathParameters'][param_name]
 
+def batch_get_items(table, keys, attributes=None):
+    # Fetch items by primary key in chunks of 100 (BatchGetItem limit), retrying unprocessed keys with backoff.
+    # attributes limits the returned attributes like build_projection.
+    items = []
+    projection = build_projection(attributes) if attributes else {}
+    for start in range(0, len(keys), 100):
+        request = {table.name: {'Keys': [marshal_item(key) for key in keys[start:start + 100]], **projection}}
+        for response in send_batch(get_client().batch_get_item, request, 'UnprocessedKeys'):
+            items.extend(unmarshal_item(item) for item in response.get('Responses', {}).get(table.name, []))
+    return items
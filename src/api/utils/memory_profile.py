@@ -0,0 +1,166 @@
+"""
+Memory profiling for Lambda right-sizing.
+Off unless the MEMORY_PROFILE environment variable is set; the utils package
+then starts tracemalloc before anything else is imported, and every request's
+telemetry record (utils.telemetry) gains its memory use:
+
+    Metrics:    MemoryPeakKB (allocated at the peak of the request),
+                MemoryRetainedKB (still allocated when it finishes),
+                MemoryTracedKB (all Python allocations in the container),
+                MaxRSSMB (the process's high-water mark, as Lambda's
+                "Max Memory Used")
+    Properties: memory.sites (the top allocation sites still holding memory
+                at the end of the request, file:line), memory.imports
+                (modules imported since the last request, with the memory
+                each import left allocated - on a cold start this is the
+                handler's own import cost)
+
+tracemalloc slows every allocation down, and finding the allocation sites
+means snapshotting and diffing the whole heap twice per request (seconds on
+a large heap), so this is for profiling runs (tools/size_functions.py), not
+for production traffic.
+
+SETTINGS:
+- MEMORY_PROFILE=1             enable
+- MEMORY_PROFILE_TOP=10        allocation sites reported per request (0 skips
+                               the heap snapshots)
+- MEMORY_PROFILE_FRAMES=1      traceback depth kept per allocation
+"""
+import os
+import sys
+import gc
+import builtins
+import threading
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not on Windows - MaxRSSMB is left out
+    resource = None
+
+TOP_SITES = int(os.environ.get('MEMORY_PROFILE_TOP', '10'))
+FRAMES = int(os.environ.get('MEMORY_PROFILE_FRAMES', '1'))
+
+# Allocations made by the profiler and the import machinery itself
+_IGNORED_FILES = (tracemalloc.__file__, __file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>')
+
+_enabled = False
+_original_import = None
+_import_state = threading.local()
+
+# Module -> KB its import left allocated (including what it imported), in
+# import order; imports are reported once, with the next request
+_imports = {}
+_reported_imports = 0
+
+# (traced bytes, snapshot) when the current request started
+_invocation = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def start():
+    """Start tracing allocations and import memory (idempotent)."""
+    global _enabled, _original_import
+    
+    if _enabled:
+        return
+    tracemalloc.start(FRAMES)
+    _original_import = builtins.__import__
+    builtins.__import__ = _tracked_import
+    _enabled = True
+
+
+def _tracked_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Only the outermost import of a module not loaded yet is measured, so
+    # e.g. "boto3" includes botocore
+    if level or name in sys.modules or getattr(_import_state, 'active', False):
+        return _original_import(name, globals, locals, fromlist, level)
+    
+    before = tracemalloc.get_traced_memory()[0]
+    _import_state.active = True
+    try:
+        module = _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _import_state.active = False
+    _imports[name] = round((tracemalloc.get_traced_memory()[0] - before) / 1024, 1)
+    return module
+
+
+def import_memory():
+    """KB left allocated by each measured import so far."""
+    return dict(_imports)
+
+
+def _short_path(filename):
+    """Path relative to its sys.path entry, e.g. "botocore/parsers.py"."""
+    for prefix in sorted((path for path in sys.path if path), key=len, reverse=True):
+        if filename.startswith(prefix.rstrip(os.sep) + os.sep):
+            return filename[len(prefix.rstrip(os.sep)) + 1:]
+    return filename
+
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def start_invocation():
+    """Mark the start of a request."""
+    global _invocation
+    
+    if not _enabled:
+        return
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot() if TOP_SITES else None
+    tracemalloc.reset_peak()
+    _invocation = (tracemalloc.get_traced_memory()[0], snapshot)
+
+
+def finish_invocation():
+    """
+    Measure the request started by start_invocation.
+    Returns (metrics, units, properties), or None when profiling is off.
+    """
+    global _invocation, _reported_imports
+    
+    if not _enabled or _invocation is None:
+        return None
+    baseline, before = _invocation
+    _invocation = None
+    current, peak = tracemalloc.get_traced_memory()
+    
+    sites = []
+    if before is not None:
+        # Filtering the stats is far cheaper than filtering every trace
+        stats = [
+            stat for stat in tracemalloc.take_snapshot().compare_to(before, 'lineno')
+            if stat.size_diff > 0 and stat.traceback[0].filename not in _IGNORED_FILES
+        ]
+        stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+        for stat in stats[:TOP_SITES]:
+            frame = stat.traceback[0]
+            sites.append({
+                'site': f"{_short_path(frame.filename)}:{frame.lineno}",
+                'kb': round(stat.size_diff / 1024, 1),
+                'blocks': stat.count_diff,
+            })
+    
+    imports = list(_imports.items())[_reported_imports:]
+    _reported_imports = len(_imports)
+    
+    metrics = {
+        'MemoryPeakKB': round((peak - baseline) / 1024, 1),
+        'MemoryRetainedKB': round((current - baseline) / 1024, 1),
+        'MemoryTracedKB': round(current / 1024, 1),
+    }
+    units = {'MemoryPeakKB': 'Kilobytes', 'MemoryRetainedKB': 'Kilobytes', 'MemoryTracedKB': 'Kilobytes'}
+    rss = max_rss_mb()
+    if rss is not None:
+        metrics['MaxRSSMB'] = rss
+        units['MaxRSSMB'] = 'Megabytes'
+    return metrics, units, {'sites': sites, 'imports': dict(imports)}
@@ -0,0 +1,317 @@
+"""
+Rate limiting for Lambda handlers.
+Per-user and per-organisation token buckets per route, shared by every
+container through the rate limits table (RATE_LIMITS_TABLE_NAME):
+
+    @error_handler
+    @rate_limit
+    def lambda_handler(event, context):
+        ...
+        limit_org(org_id)      # once the handler knows the organisation
+
+The user bucket is checked before the handler runs; limit_org() raises
+RateLimited when the organisation's bucket is empty, and either way the
+request gets a 429 with Retry-After. Every response carries RateLimit-Limit,
+RateLimit-Remaining and RateLimit-Reset for the tightest bucket it used.
+
+BUCKETS:
+Each bucket is one item holding a GCRA "theoretical arrival time" (tat, ms):
+taking n tokens moves tat n emission intervals (period / limit) forward, and
+is allowed while tat stays within burst intervals of now. One conditional
+UpdateItem takes the tokens, so concurrent containers can't overspend a
+bucket, and the item expires (TTL) once the bucket has refilled.
+
+FAST PATH (per container):
+- Tokens are leased from the table a few at a time (LEASE_SHARE of the
+  burst), so a client's next requests spend them without a DynamoDB write.
+  A lease lasts as long as its tokens took to accrue; what a container
+  doesn't spend in time is lost, never double-spent.
+- A bucket found empty is remembered until it has a token again, so a
+  client hammering an endpoint gets 429s without any DynamoDB calls.
+
+Limits are per route (ROUTE_LIMITS); RATE_LIMITS overrides them with JSON,
+e.g. {"GET /subscription": {"user": [120, 60], "org": [1200, 60, 200]}}
+([limit, period seconds, burst]). Rate limiting fails open: without
+RATE_LIMITS_TABLE_NAME, or when the table can't be reached, requests are let
+through.
+
+The route, limits and decisions of the request in progress are held in a
+context variable, so requests served concurrently in one process don't see
+each other's; the lease and empty-bucket caches are shared on purpose.
+"""
+import os
+import json
+import math
+import contextvars
+import time
+from functools import wraps
+from botocore.exceptions import ClientError
+from utils.dynamodb import ClientTable, unmarshal_item
+from utils.helpers import get_user_id_from_event
+from utils.telemetry import get_route
+
+# Share of a bucket's burst a container leases at once
+LEASE_SHARE = 0.1
+
+# Keep the per-container caches from growing without bound
+MAX_CACHED_BUCKETS = 1000
+
+
+class RateLimit:
+    """limit requests per period (seconds), in bursts of up to burst (default: limit)."""
+    
+    def __init__(self, limit, period, burst=None):
+        self.limit = limit
+        self.period = period
+        self.burst = burst or limit
+    
+    @property
+    def interval_ms(self):
+        """Time one token takes to accrue."""
+        return self.period * 1000 / self.limit
+    
+    @property
+    def lease(self):
+        return max(1, int(self.burst * LEASE_SHARE))
+
+
+ROUTE_LIMITS = {
+    # Polled by the extension - generous, but stops a polling loop gone wrong
+    'GET /subscription': {'user': RateLimit(60, 60), 'org': RateLimit(600, 60)},
+    # Every request creates a Stripe checkout session
+    'POST /subscription': {'user': RateLimit(10, 60), 'org': RateLimit(30, 60)},
+    # Every request can send an invitation email
+    'POST /organisation/members/invite': {
+        'user': RateLimit(30, 3600, burst=10),
+        'org': RateLimit(100, 3600, burst=20),
+    },
+}
+
+
+def _load_overrides():
+    overrides = json.loads(os.environ.get('RATE_LIMITS') or '{}')
+    for route, scopes in overrides.items():
+        ROUTE_LIMITS[route] = {scope: RateLimit(*values) for scope, values in scopes.items()}
+
+
+_load_overrides()
+
+
+class RateLimited(Exception):
+    """Raised by limit_org() when the organisation's bucket is empty."""
+    
+    def __init__(self, decision):
+        super().__init__(f"Rate limit exceeded for {decision.key}")
+        self.decision = decision
+
+
+class Decision:
+    """The outcome of taking a token from a bucket."""
+    
+    def __init__(self, key, rule, allowed, remaining, reset_seconds, retry_after=0):
+        self.key = key
+        self.rule = rule
+        self.allowed = allowed
+        self.remaining = max(0, remaining)
+        self.reset_seconds = max(0, reset_seconds)
+        self.retry_after = retry_after
+    
+    def headers(self):
+        return {
+            'RateLimit-Limit': str(self.rule.limit),
+            'RateLimit-Remaining': str(self.remaining),
+            'RateLimit-Reset': str(math.ceil(self.reset_seconds)),
+        }
+
+
+class _RequestLimits:
+    """The route, limits and decisions of one request."""
+    
+    def __init__(self, route):
+        self.route = route
+        self.limits = ROUTE_LIMITS.get(route)
+        self.decisions = []
+
+
+# Rate limits table (resolved on first use)
+_table = None
+
+# Per-container caches: key -> lease {tokens, expires_at, remaining, full_at},
+# key -> time the bucket has a token again
+_leases = {}
+_blocked = {}
+
+# Limits of the request in progress (None outside a rate limited handler)
+_current = contextvars.ContextVar('rate_limits', default=None)
+
+
+def _get_table():
+    global _table
+    
+    if _table is None:
+        table_name = os.environ.get('RATE_LIMITS_TABLE_NAME')
+        if not table_name:
+            return None
+        _table = ClientTable(table_name)
+    return _table
+
+
+def _reserve(key, rule, count, tat=None):
+    """
+    Take count tokens from the shared bucket in one conditional write.
+    Returns (taken, tat) - the bucket's tat after taking them, or the tat
+    that made it refuse. tat, if known, picks which write to try first.
+    """
+    table = _get_table()
+    increment = math.ceil(count * rule.interval_ms)
+    # Two tries: the guess from tat, then the case the refusal showed
+    for _ in range(2):
+        now = int(time.time() * 1000)
+        max_tat = now + int(rule.burst * rule.interval_ms) - increment
+        ttl = (max(tat or now, now) + increment) // 1000 + 1
+        if tat is not None and tat > now:
+            if tat > max_tat:
+                return False, tat
+            # Bucket partly spent - move tat on if it stays within the burst
+            update = {
+                'UpdateExpression': 'SET tat = tat + :increment, expires_at_ttl = :ttl',
+                'ConditionExpression': 'tat > :now AND tat <= :max_tat',
+                'ExpressionAttributeValues': {':increment': increment, ':now': now, ':max_tat': max_tat, ':ttl': ttl},
+            }
+        else:
+            # Bucket full (or new) - tat restarts from now
+            update = {
+                'UpdateExpression': 'SET tat = :tat, expires_at_ttl = :ttl',
+                'ConditionExpression': 'attribute_not_exists(tat) OR tat <= :now',
+                'ExpressionAttributeValues': {':tat': now + increment, ':now': now, ':ttl': ttl},
+            }
+        try:
+            response = table.update_item(
+                Key={'bucket_key': key},
+                ReturnValues='UPDATED_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD',
+                **update
+            )
+            return True, response['Attributes']['tat']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            item = e.response.get('Item')
+            tat = unmarshal_item(item).get('tat') if item else None
+    return False, tat
+
+
+def _prune(cache, now):
+    if len(cache) > MAX_CACHED_BUCKETS:
+        for key in [key for key, value in cache.items() if (value['expires_at'] if isinstance(value, dict) else value) <= now]:
+            del cache[key]
+
+
+def take(key, rule):
+    """Take one token from a bucket. Returns a Decision."""
+    now = time.time()
+    
+    # Fast path: known empty, or tokens left on this container's lease
+    blocked_until = _blocked.get(key)
+    if blocked_until is not None and now < blocked_until:
+        return Decision(key, rule, False, 0, blocked_until - now, math.ceil(blocked_until - now))
+    lease = _leases.get(key)
+    if lease is not None and lease['tokens'] > 0 and now < lease['expires_at']:
+        lease['tokens'] -= 1
+        return Decision(key, rule, True, lease['remaining'] + lease['tokens'], lease['full_at'] - now)
+    
+    count = rule.lease
+    # An old lease knows where the bucket was, which picks the right write first
+    taken, tat = _reserve(key, rule, count, int(lease['full_at'] * 1000) if lease else None)
+    if not taken and count > 1:
+        # Not enough for a lease - a single token may still be there
+        count = 1
+        taken, tat = _reserve(key, rule, count, tat)
+    
+    now_ms = time.time() * 1000
+    burst_ms = rule.burst * rule.interval_ms
+    if not taken:
+        wait_ms = (tat or now_ms) - (now_ms + burst_ms - rule.interval_ms)
+        _prune(_blocked, now)
+        _blocked[key] = now + wait_ms / 1000
+        return Decision(key, rule, False, 0, ((tat or now_ms) - now_ms) / 1000, math.ceil(wait_ms / 1000))
+    
+    remaining = int((now_ms + burst_ms - tat) // rule.interval_ms)
+    _blocked.pop(key, None)
+    _prune(_leases, now)
+    # Kept with no tokens left too - full_at is the next write's hint
+    _leases[key] = {
+        'tokens': count - 1,
+        'expires_at': now + count * rule.interval_ms / 1000,
+        'remaining': remaining,
+        'full_at': tat / 1000,
+    }
+    return Decision(key, rule, True, remaining + count - 1, tat / 1000 - now)
+
+
+def _check(scope, identity):
+    current = _current.get()
+    rule = (current.limits or {}).get(scope) if current else None
+    if rule is None or not identity or _get_table() is None:
+        return None
+    key = f"{current.route}#{scope}#{identity}"
+    try:
+        decision = take(key, rule)
+    except Exception as e:
+        # Fail open - a rate limit outage must not take the API down with it
+        print(f"[RateLimit] Not checked ({key}): {type(e).__name__} - {str(e)}")
+        return None
+    current.decisions.append(decision)
+    return decision
+
+
+def limit_org(org_id):
+    """Take a token from the organisation's bucket for this route. Raises RateLimited when it is empty."""
+    decision = _check('org', org_id)
+    if decision is not None and not decision.allowed:
+        raise RateLimited(decision)
+
+
+def _add_headers(response, decisions):
+    if not decisions or not isinstance(response, dict):
+        return response
+    tightest = min(decisions, key=lambda decision: (decision.allowed, decision.remaining))
+    headers = response.setdefault('headers', {})
+    headers.update(tightest.headers())
+    exposed = [header for header in headers.get('Access-Control-Expose-Headers', '').split(',') if header]
+    headers['Access-Control-Expose-Headers'] = ','.join(exposed + list(tightest.headers()))
+    return response
+
+
+def _limited_response(decision):
+    # Imported here - response_builder's error handling wraps this module's decorator
+    from utils.response_builder import too_many_requests_response
+    print(f"[RateLimit] Limited {decision.key}, retry after {decision.retry_after}s")
+    return too_many_requests_response('Rate limit exceeded, please retry later', retry_after=max(1, decision.retry_after))
+
+
+def rate_limit(func):
+    """Apply the route's per-user (and, through limit_org, per-organisation) limits to a handler."""
+    @wraps(func)
+    def wrapper(event, context):
+        current = _RequestLimits(get_route(event))
+        token = _current.set(current)
+        try:
+            try:
+                user_id = get_user_id_from_event(event)
+            except (KeyError, TypeError):
+                # Unauthenticated - the handler rejects it
+                user_id = None
+            decision = _check('user', user_id)
+            if decision is not None and not decision.allowed:
+                return _add_headers(_limited_response(decision), current.decisions)
+            try:
+                response = func(event, context)
+            except RateLimited as e:
+                response = _limited_response(e.decision)
+            return _add_headers(response, current.decisions)
+        finally:
+            _current.reset(token)
+    
+    return wrapper
+
@@ -1,36 +1,177 @@
 """
 Response builder utilities for Lambda functions.
 Provides standardized response formatting and error handling.
+
+error_handler also starts the request's deadline (utils.deadline): requests
+that arrive without time left for their calls, and calls that run out of it,
+get a 503 with Retry-After instead of running into the Lambda timeout.
+DynamoDB throttling that outlasts the client's retries (utils.dynamodb) gets
+a 429 with Retry-After.
+
+It also gives every request a unit of work (utils.unit_of_work): writes the
+handler queued are flushed once it returns a success, and dropped when it
+returns an error or raises.
 """
-import json
-from decimal import Decimal
+import os
+import gzip
+import base64
+import hashlib
+from types import MappingProxyType
 from functools import wraps
-from botocore.exceptions import ClientError
+from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutError
+from utils.deadline import RETRY_AFTER_SECONDS, DeadlineExceeded, start_deadline, clear_deadline
+from utils.dynamodb import ThrottledError, is_throttle
+from utils.helpers import get_header
+from utils.serialisation import dumps
+from utils.telemetry import start_request, finish_request, get_route
+from utils.unit_of_work import start_unit_of_work, finish_unit_of_work
+from utils.warmup import is_warmup_event, mark_invocation, warm_up
+
+# brotli is optional - without it responses fall back to gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed (not worth the CPU)
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Retry-After (seconds) on 429s for throttled requests
+THROTTLE_RETRY_AFTER = int(os.environ.get('THROTTLE_RETRY_AFTER', '1'))
+
+
+# Headers sent on every response (copied, never mutated)
+BASE_HEADERS = MappingProxyType({
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
+    'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+})
+
+
+def compute_etag(serialised_body):
+    """Compute a weak ETag from the serialised response body."""
+    digest = hashlib.sha1(serialised_body.encode('utf-8')).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick a response encoding from an Accept-Encoding header.
+    Prefers brotli over gzip at equal quality. Returns None for identity.
+    """
+    if not accept_encoding:
+        return None
+    
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    
+    best = None
+    best_quality = 0.0
+    for coding in supported:
+        quality = qualities.get(coding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best = coding
+            best_quality = quality
+    return best
 
 
-# Helper to convert Decimal to native Python types for JSON serialization
-def decimal_default(obj):
-    """Convert Decimal objects to float for JSON serialization."""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+def compress_body(serialised_body, encoding):
+    """Compress a serialised body with the given encoding."""
+    data = serialised_body.encode('utf-8')
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
 
 
-def build_response(status_code, body):
+def build_response(status_code, body, event=None, max_age=None):
+    """
+    Build an API Gateway proxy response.
+    
+    When the request event and a max_age are given, 200 responses are
+    cacheable: they carry an ETag and Cache-Control: private, and a matching
+    If-None-Match gets 304 Not Modified with no body.
+    
+    When the request event is given, bodies of at least COMPRESSION_MIN_BYTES
+    are compressed according to its Accept-Encoding (brotli or gzip) and
+    returned base64-encoded with isBase64Encoded set.
+    """
+    headers = dict(BASE_HEADERS)
+    
+    cacheable = event is not None and max_age is not None and status_code == 200
+    
+    # Sorted keys keep the ETag stable regardless of attribute order
+    serialised_body = dumps(body, sort_keys=cacheable)
+    
+    if cacheable:
+        etag = compute_etag(serialised_body)
+        headers['ETag'] = etag
+        headers['Cache-Control'] = f'private, max-age={max_age}'
+        headers['Vary'] = 'Authorization,Accept-Encoding'
+        headers['Access-Control-Expose-Headers'] = 'ETag'
+        
+        if etag_matches(get_header(event, 'If-None-Match'), etag):
+            return {
+                'statusCode': 304,
+                'headers': headers,
+                'body': ''
+            }
+    
+    if event is not None:
+        headers.setdefault('Vary', 'Accept-Encoding')
+        
+        encoding = None
+        if len(serialised_body) >= COMPRESSION_MIN_BYTES:
+            encoding = choose_encoding(get_header(event, 'Accept-Encoding'))
+        
+        if encoding:
+            headers['Content-Encoding'] = encoding
+            return {
+                'statusCode': status_code,
+                'headers': headers,
+                'body': base64.b64encode(compress_body(serialised_body, encoding)).decode('ascii'),
+                'isBase64Encoded': True
+            }
+    
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
-        },
-        'body': json.dumps(body, default=decimal_default)
+        'headers': headers,
+        'body': serialised_body
     }
 
 
-def success_response(body, status_code=200):
-    return build_response(status_code, body)
+def success_response(body, status_code=200, event=None, max_age=None):
+    return build_response(status_code, body, event=event, max_age=max_age)
 
 
 def error_response(message, status_code=400):
@@ -53,21 +194,69 @@ def server_error_response(message='Internal server error'):
     return error_response(message, 500)
 
 
+def retry_later_response(message, status_code, retry_after):
+    response = error_response(message, status_code)
+    response['headers']['Retry-After'] = str(retry_after)
+    response['headers']['Access-Control-Expose-Headers'] = 'Retry-After'
+    return response
+
+
+def unavailable_response(message='Service temporarily unavailable, please retry', retry_after=RETRY_AFTER_SECONDS):
+    return retry_later_response(message, 503, retry_after)
+
+
+def too_many_requests_response(message='Too many requests, please retry', retry_after=THROTTLE_RETRY_AFTER):
+    return retry_later_response(message, 429, retry_after)
+
+
+def _run_handler(func, event, context):
+    start_unit_of_work()
+    try:
+        response = func(event, context)
+        # Queued writes go out only once the handler has succeeded
+        finish_unit_of_work(commit=response.get('statusCode', 500) < 400)
+        return response
+    except KeyError as e:
+        print(f"KeyError: Missing required field or claim - {str(e)}")
+        return unauthorized_response('Unauthorized - Invalid token or missing required fields')
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        print(f"AWS ClientError: {error_code} - {str(e)}")
+        if is_throttle(e):
+            return too_many_requests_response()
+        return server_error_response()
+    except ThrottledError as e:
+        print(f"Throttled: {str(e)}")
+        return too_many_requests_response()
+    except (DeadlineExceeded, ConnectTimeoutError, ReadTimeoutError) as e:
+        print(f"Deadline: {type(e).__name__} - {str(e)}")
+        return unavailable_response()
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        return server_error_response()
+    finally:
+        finish_unit_of_work(commit=False)
+
+
 def error_handler(func):
     @wraps(func)
     def wrapper(event, context):
-        try:
-            return func(event, context)
-        except KeyError as e:
-            print(f"KeyError: Missing required field or claim - {str(e)}")
-            return unauthorized_response('Unauthorized - Invalid token or missing required fields')
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            print(f"AWS ClientError: {error_code} - {str(e)}")
-            return server_error_response()
-        except Exception as e:
-            print(f"Unexpected error: {str(e)}")
-            return server_error_response()
+        cold_start = mark_invocation()
+        
+        # Scheduled warm-up pings prime the container and skip the handler
+        if is_warmup_event(event):
+            return warm_up(context, cold_start)
+        
+        # One telemetry record (latency, DynamoDB/Stripe calls) per request
+        start_request(context, cold_start, get_route(event))
+        deadline = start_deadline(context)
+        if deadline is not None and deadline.is_spent():
+            print(f"Deadline: {deadline.remaining_ms():.0f}ms left, not running the handler")
+            response = unavailable_response()
+        else:
+            response = _run_handler(func, event, context)
+        clear_deadline()
+        finish_request(response.get('statusCode'))
+        return response
     
     return wrapper
-
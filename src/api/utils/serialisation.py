@@ -0,0 +1,59 @@
+"""
+JSON serialisation for API responses.
+Uses orjson when it is installed and falls back to the standard library.
+
+DynamoDB returns every number as a Decimal. Integral Decimals are encoded as
+int (epochs and counts stay integers) and the rest as float.
+
+Both encoders write compact separators and raw (unescaped) non-ASCII, and
+agree on strings, ints, bools, null and floats written in plain notation.
+They differ on floats that need an exponent (orjson "1e-5", stdlib "1e-05")
+and on NaN/Infinity (orjson null, stdlib NaN). ETags hash these bytes, so
+switching encoders may change the ETag of such a body once - clients then
+get a 200 instead of a 304. orjson rejects integers beyond 64 bits (DynamoDB
+numbers have up to 38 digits); those bodies are encoded by the stdlib.
+
+NOTE: Walking the body up front to replace Decimals was measured slower than
+letting the encoder hand them over (tools/bench_serialisation.py), because
+the walk visits every value while the encoder only defers on the values it
+can't encode itself (Decimal, set).
+"""
+import json
+from decimal import Decimal
+
+# orjson is optional - a C encoder several times faster than json.dumps
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _encode_fallback(value):
+    """Encode the values DynamoDB returns that JSON has no type for."""
+    if type(value) is Decimal:
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value)} is not JSON serializable")
+
+
+_std_encoder = json.JSONEncoder(
+    separators=(',', ':'), ensure_ascii=False, default=_encode_fallback
+)
+_std_sorted_encoder = json.JSONEncoder(
+    separators=(',', ':'), ensure_ascii=False, sort_keys=True, default=_encode_fallback
+)
+
+
+def dumps(value, sort_keys=False):
+    """Serialise a response body to a compact JSON string."""
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        try:
+            return orjson.dumps(value, default=_encode_fallback, option=option).decode('utf-8')
+        except orjson.JSONEncodeError:
+            # e.g. an integer beyond 64 bits - the stdlib encoder has no limit
+            pass
+    
+    encoder = _std_sorted_encoder if sort_keys else _std_encoder
+    return encoder.encode(value)
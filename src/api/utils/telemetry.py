@@ -0,0 +1,268 @@
+"""
+Telemetry utilities for Lambda functions.
+Emits CloudWatch metrics as Embedded Metric Format (EMF) log lines - CloudWatch
+Logs extracts them into metrics, so no PutMetricData calls (or extra latency)
+are needed.
+
+PER REQUEST:
+error_handler (or track_request for handlers without it) starts a request,
+the DynamoDB client and Stripe HTTP client report every call made while it
+runs (record_call), and one EMF line is emitted when it finishes:
+
+    Metrics:    Latency, ColdStart, DynamoDBCalls, DynamoDBLatency,
+                DynamoDBBytes, StripeCalls, StripeLatency, StripeBytes,
+                ConsumedRCU, ConsumedWCU
+    Properties: route, status_code, calls (per service:operation:resource
+                count / latency / bytes / errors), capacity (RCU/WCU per
+                table and per "table/index")
+
+With MEMORY_PROFILE set, records also carry the request's memory use (see
+utils.memory_profile).
+
+The current request is a context variable, so requests served concurrently
+in one process keep their records apart. Calls from worker threads are
+recorded against it when they run in a copy of the request's context
+(get_me's fan-out does).
+
+SINKS:
+Records go to stdout (CloudWatch Logs) by default. capture() swaps in a
+MemorySink so tests and benchmarks can inspect the same records locally.
+"""
+import json
+import time
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+from utils import memory_profile
+
+NAMESPACE = 'Printerapp/Lambda'
+
+# Metric name prefixes per instrumented service
+SERVICE_METRICS = {
+    'dynamodb': 'DynamoDB',
+    'stripe': 'Stripe',
+}
+
+
+def get_function_name(context):
+    """Get the Lambda function name from the context (None outside Lambda)."""
+    return getattr(context, 'function_name', None) or 'local'
+
+
+def _print_sink(record):
+    print(json.dumps(record, separators=(',', ':'), default=str))
+
+
+class MemorySink:
+    """Collects emitted records in memory (tests, benchmarks, local runs)."""
+    
+    def __init__(self):
+        self.records = []
+    
+    def __call__(self, record):
+        self.records.append(record)
+    
+    def requests(self):
+        """Get the per-request records (skipping other metrics, e.g. warm-up)."""
+        return [record for record in self.records if 'route' in record]
+
+
+# Where records are sent
+_sinks = [_print_sink]
+
+
+@contextmanager
+def capture(echo=False):
+    """Send records to a MemorySink for the duration of the block."""
+    global _sinks
+    
+    sink = MemorySink()
+    previous = _sinks
+    _sinks = [sink, _print_sink] if echo else [sink]
+    try:
+        yield sink
+    finally:
+        _sinks = previous
+
+
+def emit_metrics(metrics, dimensions=None, properties=None, units=None):
+    """
+    Emit one EMF record.
+    metrics: {name: value}, dimensions: {name: value}, properties: extra
+    searchable fields that are logged but not turned into metrics.
+    """
+    dimensions = dimensions or {}
+    units = units or {}
+    
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': units.get(name, 'Count')} for name in metrics],
+            }],
+        },
+    }
+    record.update(properties or {})
+    record.update(dimensions)
+    record.update(metrics)
+    
+    for sink in _sinks:
+        sink(record)
+
+
+class RequestTelemetry:
+    """Calls and timings collected for one request."""
+    
+    def __init__(self, function_name, route, cold_start):
+        self.function_name = function_name
+        self.route = route
+        self.cold_start = cold_start
+        self.started = time.perf_counter()
+        self.calls = {}
+        self.capacity = {}
+        self.lock = threading.Lock()
+    
+    def record(self, service, operation, duration_ms, bytes_returned, resource, error):
+        key = ':'.join(filter(None, [service, operation, resource]))
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = {
+                    'service': service,
+                    'count': 0,
+                    'latency_ms': 0.0,
+                    'max_latency_ms': 0.0,
+                    'bytes': 0,
+                    'errors': 0,
+                }
+            call['count'] += 1
+            call['latency_ms'] += duration_ms
+            call['max_latency_ms'] = max(call['max_latency_ms'], duration_ms)
+            call['bytes'] += bytes_returned
+            call['errors'] += 1 if error else 0
+    
+    def record_capacity(self, table, index, read_units, write_units):
+        key = f"{table}/{index}" if index else table
+        with self.lock:
+            units = self.capacity.setdefault(key, {'rcu': 0.0, 'wcu': 0.0})
+            units['rcu'] += read_units
+            units['wcu'] += write_units
+    
+    def totals(self, service):
+        calls = [call for call in self.calls.values() if call['service'] == service]
+        return {
+            'calls': sum(call['count'] for call in calls),
+            'latency_ms': sum(call['latency_ms'] for call in calls),
+            'bytes': sum(call['bytes'] for call in calls),
+        }
+
+
+# The request currently running (None between requests)
+_current = contextvars.ContextVar('request_telemetry', default=None)
+
+
+def start_request(context, cold_start, route=None):
+    """Start collecting telemetry for a request."""
+    # Before the request's clock starts - the heap snapshot is slow
+    memory_profile.start_invocation()
+    current = RequestTelemetry(get_function_name(context), route, cold_start)
+    _current.set(current)
+    return current
+
+
+def record_call(service, operation, duration_ms, bytes_returned=0, resource=None, error=False):
+    """Record one downstream call against the current request (no-op outside one)."""
+    current = _current.get()
+    if current is not None:
+        current.record(service, operation, duration_ms, bytes_returned, resource, error)
+
+
+def record_capacity(table, index, read_units, write_units):
+    """Record consumed capacity units against the current request (no-op outside one)."""
+    current = _current.get()
+    if current is not None:
+        current.record_capacity(table, index, read_units, write_units)
+
+
+def finish_request(status_code=None):
+    """Emit the request's EMF record and stop collecting. Returns the record's metrics."""
+    current = _current.get()
+    _current.set(None)
+    if current is None:
+        return None
+    
+    metrics = {
+        'Latency': round((time.perf_counter() - current.started) * 1000, 2),
+        'ColdStart': 1 if current.cold_start else 0,
+    }
+    units = {'Latency': 'Milliseconds'}
+    for service, prefix in SERVICE_METRICS.items():
+        totals = current.totals(service)
+        metrics[f'{prefix}Calls'] = totals['calls']
+        metrics[f'{prefix}Latency'] = round(totals['latency_ms'], 2)
+        metrics[f'{prefix}Bytes'] = totals['bytes']
+        units[f'{prefix}Latency'] = 'Milliseconds'
+        units[f'{prefix}Bytes'] = 'Bytes'
+    
+    # Index capacity is charged on top of the table's, so both count
+    metrics['ConsumedRCU'] = round(sum(units['rcu'] for units in current.capacity.values()), 2)
+    metrics['ConsumedWCU'] = round(sum(units['wcu'] for units in current.capacity.values()), 2)
+    
+    calls = {
+        key: dict(call, latency_ms=round(call['latency_ms'], 2), max_latency_ms=round(call['max_latency_ms'], 2))
+        for key, call in current.calls.items()
+    }
+    capacity = {
+        key: {'rcu': round(units['rcu'], 2), 'wcu': round(units['wcu'], 2)}
+        for key, units in current.capacity.items()
+    }
+    properties = {'route': current.route, 'status_code': status_code, 'calls': calls, 'capacity': capacity}
+    
+    memory = memory_profile.finish_invocation()
+    if memory is not None:
+        memory_metrics, memory_units, properties['memory'] = memory
+        metrics.update(memory_metrics)
+        units.update(memory_units)
+    
+    emit_metrics(
+        metrics,
+        dimensions={'FunctionName': current.function_name},
+        properties=properties,
+        units=units
+    )
+    return metrics
+
+
+def get_route(event):
+    """Describe the request an event represents, e.g. "GET /profile"."""
+    if isinstance(event, dict) and event.get('httpMethod'):
+        return f"{event['httpMethod']} {event.get('resource')}"
+    if isinstance(event, dict) and event.get('detail-type'):
+        return event['detail-type']
+    return 'invoke'
+
+
+def track_request(func):
+    """Per-request telemetry for handlers that don't use error_handler."""
+    @wraps(func)
+    def wrapper(event, context):
+        # Imported here - warmup imports this module
+        from utils.warmup import mark_invocation
+        
+        start_request(context, mark_invocation(), get_route(event))
+        status_code = None
+        try:
+            response = func(event, context)
+            if isinstance(response, dict):
+                status_code = response.get('statusCode')
+            return response
+        except Exception:
+            status_code = 500
+            raise
+        finally:
+            finish_request(status_code)
+    
+    return wrapper
@@ -0,0 +1,240 @@
+"""
+Request-scoped unit of work for DynamoDB.
+error_handler starts one for every request; handlers read and write through
+it instead of calling their tables directly:
+
+    uow = get_unit_of_work()
+    org = uow.get(org_table, {'organisation_id': org_id})
+    uow.put(org_table, organisation)
+    uow.put(members_table, membership)
+    uow.flush(atomic=True)      # or leave it to error_handler
+
+IDENTITY MAP:
+Every item the unit reads (get, and query results that hold whole items) is
+kept by table and key, so reading the same key again in the request costs
+nothing, and reads see the request's own queued puts and deletes. Items are
+handed out as copies - changing one doesn't change what the unit holds.
+Reading a key with a queued update (or condition) flushes the unit first.
+
+WRITES:
+put/delete/update only queue the write (a later plain put or delete of the
+same key replaces it). flush() sends everything queued in as few calls as
+possible:
+- one write: PutItem/DeleteItem/UpdateItem (an update's new item goes into
+  the identity map, so reading it back is free)
+- plain puts and deletes: BatchWriteItem, 25 at a time across tables, with
+  unprocessed items resent (utils.dynamodb.send_batch)
+- atomic=True, or any update or condition among them: one TransactWriteItems
+  (up to 100 writes, all or nothing; twice the write capacity)
+error_handler flushes whatever is still queued once the handler returns a
+success, and drops it on an error response or exception. Handlers that need
+to answer a failed condition (is_condition_failure) flush it themselves.
+
+Outside a request (scripts, tests) get_unit_of_work() starts a unit that is
+only written when flushed.
+
+The current unit is a context variable, so requests served concurrently in
+one process (tools/local_gateway.py) each see their own. A unit is not
+thread-safe: work run on other threads (get_me's sections) goes through
+run_in_unit_of_work, so each call has a unit of its own.
+"""
+import contextvars
+from utils.dynamodb import BATCH_WRITE_SIZE, get_client, marshal_item, marshal_request, send_batch
+
+# TransactWriteItems accepts at most 100 writes
+MAX_TRANSACTION_ITEMS = 100
+
+# Condition/expression parameters a queued write can carry
+_EXPRESSION_PARAMS = ('ConditionExpression', 'ExpressionAttributeNames', 'ExpressionAttributeValues')
+
+
+def is_condition_failure(error):
+    """Whether a ClientError from a flush was a failed ConditionExpression."""
+    error_info = getattr(error, 'response', {}).get('Error', {})
+    if error_info.get('Code') == 'ConditionalCheckFailedException':
+        return True
+    if error_info.get('Code') == 'TransactionCanceledException':
+        reasons = error.response.get('CancellationReasons', [])
+        return any(reason.get('Code') == 'ConditionalCheckFailed' for reason in reasons)
+    return False
+
+
+class UnitOfWork:
+    """The reads and queued writes of one request."""
+    
+    def __init__(self):
+        # (table name, key) -> item, or None when it is known not to exist
+        self._items = {}
+        # (table name, key) -> (action, table, params), in queued order
+        self._writes = {}
+    
+    @staticmethod
+    def _identity(table, item):
+        if not table.key_names:
+            raise ValueError(f"Key attributes of table {table.name} are not known (utils.helpers.TABLE_KEYS)")
+        return (table.name, tuple(item[name] for name in table.key_names))
+    
+    def _remember(self, identity, item):
+        self._items[identity] = dict(item) if item is not None else None
+    
+    def get(self, table, key):
+        """Get an item by key (None if it doesn't exist), from memory when the request already has it."""
+        identity = self._identity(table, key)
+        write = self._writes.get(identity)
+        if write is not None:
+            action, _, params = write
+            if action == 'Update' or 'ConditionExpression' in params:
+                self.flush()
+            else:
+                return dict(params['Item']) if action == 'Put' else None
+        if identity not in self._items:
+            response = table.get_item(Key=key)
+            self._remember(identity, response.get('Item'))
+        item = self._items[identity]
+        return dict(item) if item is not None else None
+    
+    def query(self, table, **kwargs):
+        """Query a table (or index), keeping the items it returns for later gets."""
+        response = table.query(**kwargs)
+        # Only whole items - every index here projects ALL
+        if table.key_names and 'ProjectionExpression' not in kwargs and 'Select' not in kwargs:
+            for item in response.get('Items', []):
+                identity = self._identity(table, item)
+                if identity not in self._writes:
+                    self._remember(identity, item)
+        return response
+    
+    def _queue(self, action, table, identity, params):
+        pending = self._writes.get(identity)
+        if pending is not None and (action == 'Update' or pending[0] == 'Update' or 'ConditionExpression' in pending[2]):
+            # Conditions and updates are relative to what is stored
+            self.flush()
+        self._writes.pop(identity, None)
+        self._writes[identity] = (action, table, params)
+    
+    def put(self, table, item, **conditions):
+        """Queue a put (ConditionExpression etc. may be passed with it)."""
+        identity = self._identity(table, item)
+        self._queue('Put', table, identity, {'Item': dict(item), **conditions})
+    
+    def delete(self, table, key, **conditions):
+        """Queue a delete (ConditionExpression etc. may be passed with it)."""
+        identity = self._identity(table, key)
+        self._queue('Delete', table, identity, {'Key': dict(key), **conditions})
+    
+    def update(self, table, key, **kwargs):
+        """Queue an update (UpdateExpression, ConditionExpression, ExpressionAttribute*)."""
+        identity = self._identity(table, key)
+        self._queue('Update', table, identity, {'Key': dict(key), **kwargs})
+    
+    def discard(self):
+        """Drop the queued writes."""
+        self._writes = {}
+    
+    def flush(self, atomic=False):
+        """Send the queued writes (see WRITES above)."""
+        writes = list(self._writes.items())
+        self._writes = {}
+        if not writes:
+            return
+        
+        if len(writes) == 1:
+            self._write_one(*writes[0])
+        elif atomic or any(action == 'Update' or any(param in params for param in _EXPRESSION_PARAMS)
+                           for _, (action, _, params) in writes):
+            self._transact(writes)
+        else:
+            self._batch(writes)
+        
+        for identity, (action, _, params) in writes:
+            if action == 'Put':
+                self._remember(identity, params['Item'])
+            elif action == 'Delete':
+                self._remember(identity, None)
+            elif identity in self._items and len(writes) > 1:
+                # Transactions don't return the updated item
+                del self._items[identity]
+    
+    def _write_one(self, identity, write):
+        action, table, params = write
+        if action == 'Put':
+            table.put_item(**params)
+        elif action == 'Delete':
+            table.delete_item(**params)
+        else:
+            response = table.update_item(**{**params, 'ReturnValues': params.get('ReturnValues', 'ALL_NEW')})
+            if params.get('ReturnValues', 'ALL_NEW') == 'ALL_NEW':
+                self._remember(identity, response.get('Attributes'))
+            else:
+                # Only part of the item (or the old one) came back
+                self._items.pop(identity, None)
+    
+    def _transact(self, writes):
+        if len(writes) > MAX_TRANSACTION_ITEMS:
+            raise ValueError(f"{len(writes)} writes don't fit in one transaction (max {MAX_TRANSACTION_ITEMS})")
+        transact_items = []
+        for _, (action, table, params) in writes:
+            request = marshal_request(params)
+            request['TableName'] = table.name
+            transact_items.append({action: request})
+        get_client().transact_write_items(TransactItems=transact_items)
+    
+    def _batch(self, writes):
+        for start in range(0, len(writes), BATCH_WRITE_SIZE):
+            request_items = {}
+            for _, (action, table, params) in writes[start:start + BATCH_WRITE_SIZE]:
+                if action == 'Put':
+                    request = {'PutRequest': {'Item': marshal_item(params['Item'])}}
+                else:
+                    request = {'DeleteRequest': {'Key': marshal_item(params['Key'])}}
+                request_items.setdefault(table.name, []).append(request)
+            # Throttled requests come back unprocessed and are resent
+            for _ in send_batch(get_client().batch_write_item, request_items, 'UnprocessedItems'):
+                pass
+
+
+# Unit of work of the request in progress
+_current = contextvars.ContextVar('unit_of_work', default=None)
+
+
+def start_unit_of_work():
+    """Start a fresh unit of work for a request."""
+    unit = UnitOfWork()
+    _current.set(unit)
+    return unit
+
+
+def finish_unit_of_work(commit):
+    """Flush (commit=True) or drop the current request's queued writes, and end its unit of work."""
+    current = _current.get()
+    _current.set(None)
+    if current is not None and commit:
+        current.flush()
+
+
+def get_unit_of_work():
+    """Get the current request's unit of work (starting one outside a request)."""
+    current = _current.get()
+    if current is None:
+        return start_unit_of_work()
+    return current
+
+
+def run_in_unit_of_work(func, *args):
+    """
+    Call func in a unit of work of its own, flushed when it returns (dropped
+    if it raises), then go back to the current one. For worker threads, which
+    must not share the request's unit.
+    """
+    unit = UnitOfWork()
+    token = _current.set(unit)
+    try:
+        result = func(*args)
+    except BaseException:
+        unit.discard()
+        raise
+    else:
+        unit.flush()
+    finally:
+        _current.reset(token)
+    return result
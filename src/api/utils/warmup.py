@@ -0,0 +1,86 @@
+"""
+Warm-up utilities for Lambda functions.
+A scheduled EventBridge rule invokes the API Lambdas with {"warmup": true}
+(see terraform/warmup.tf). error_handler recognises the event and, instead of
+running the handler, prepares the container for real requests:
+
+- builds the DynamoDB client and opens a pooled connection to it
+- runs warmers registered by the modules the handler imports (e.g. the
+  Stripe SDK in subscriptions.stripe_client and the price catalogue in
+  subscriptions.plans)
+
+Pings arrive every few minutes, so a warmer that calls an external API must
+be memoised: the price catalogue is fetched by the first ping in a container
+and later pings find it cached.
+
+Warm-up pings report whether they landed on a cold container (ColdStart
+metric, Trigger dimension "warmup"); real requests report it in their
+per-request telemetry record.
+"""
+from utils.telemetry import emit_metrics, get_function_name
+
+# Functions run on warm-up events, in registration order
+_warmers = []
+
+# True until the first invocation in this container
+_cold = True
+
+
+def register_warmer(func):
+    """Register a function to run on warm-up events (usable as a decorator)."""
+    if func not in _warmers:
+        _warmers.append(func)
+    return func
+
+
+def is_warmup_event(event):
+    """Check whether an event is a scheduled warm-up ping."""
+    return isinstance(event, dict) and event.get('warmup') is True
+
+
+def mark_invocation():
+    """Record an invocation. Returns True if the container was cold."""
+    global _cold
+    
+    cold_start = _cold
+    _cold = False
+    return cold_start
+
+
+def record_cold_start(context, cold_start, trigger):
+    """Emit the ColdStart metric for an invocation."""
+    emit_metrics(
+        {'ColdStart': 1 if cold_start else 0},
+        dimensions={'FunctionName': get_function_name(context), 'Trigger': trigger}
+    )
+
+
+def _prime_dynamodb():
+    # Import deferred so this module stays cheap to import
+    from utils.dynamodb import get_client
+    # Any request opens (and pools) the TLS connection; this one reads no table
+    get_client().describe_endpoints()
+
+
+def warm_up(context, cold_start):
+    """Prime clients and caches. Returns the response for the warm-up event."""
+    primed = []
+    failed = []
+    for warmer in [_prime_dynamodb] + _warmers:
+        name = warmer.__name__.lstrip('_')
+        try:
+            warmer()
+            primed.append(name)
+        except Exception as e:
+            # A failed warmer only means the first real request pays for it
+            print(f"[Warmup] {name} failed: {str(e)}")
+            failed.append(name)
+    
+    record_cold_start(context, cold_start, 'warmup')
+    
+    return {
+        'warmup': True,
+        'cold_start': cold_start,
+        'primed': primed,
+        'failed': failed
+    }
@@ -43,7 +43,9 @@ async function apiRequest(endpoint, options = {}) {
       method,
       headers: {
         'Content-Type': 'application/json'
-      }
+      },
+      // Always revalidate cached GETs (ETag / 304) so the page never shows stale data after a change
+      cache: 'no-cache'
     };
 
     // Add authorization header if authenticated
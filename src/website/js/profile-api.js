@@ -10,6 +10,9 @@
  * // Get current user's profile
  * const profile = await getProfile();
  * 
+ * // Get profile, organisation, members and subscription in one request
+ * const { profile, organisation, members, subscription } = await getMe();
+ * 
  * // Update profile
  * const updated = await updateProfile({ display_name: 'John Doe', phone: '+1234567890' });
  */
@@ -24,6 +27,16 @@ async function getProfile(userId = null) {
   return apiGet('/profile', queryParams);
 }
 
+/**
+ * Get everything the profile page needs in one request
+ * @param {Array<string>} [include] - Sections to include: 'profile', 'organisation', 'members', 'subscription' (default: all)
+ * @returns {Promise<Object>} Object keyed by section; sections that don't apply are null
+ */
+async function getMe(include = null) {
+  const queryParams = buildQueryParams({ include: include ? include.join(',') : null });
+  return apiGet('/me', queryParams);
+}
+
 /**
  * Create a new profile (typically called during onboarding)
  * @param {Object} profileData - Profile data
@@ -60,20 +60,39 @@ window.addEventListener('hashchange', function() {
 // ========================================
 
 async function loadAllData() {
+  let me = null;
+  
+  try {
+    // Single aggregate request for profile, organisation, members and subscription
+    me = await getMe();
+  } catch (error) {
+    console.error('Error loading profile data:', error);
+  }
+  
   try {
-    await Promise.all([
-      loadUserProfile(),
-      loadOrganisation(),
-      loadSubscriptionStatus()
-    ]);
+    if (me) {
+      await Promise.all([
+        loadUserProfile(me.profile),
+        loadOrganisation(me.organisation, me.members),
+        loadSubscriptionStatus(me.subscription || null)
+      ]);
+    } else {
+      // Fall back to individual requests
+      await Promise.all([
+        loadUserProfile(),
+        loadOrganisation(),
+        loadSubscriptionStatus()
+      ]);
+    }
   } catch (error) {
     console.error('Error loading profile data:', error);
   }
 }
 
-async function loadUserProfile() {
+// Loaders accept preloaded data from getMe(); with no arguments they fetch it themselves
+async function loadUserProfile(preloadedProfile) {
   try {
-    const profile = await getProfile();
+    const profile = preloadedProfile !== undefined ? preloadedProfile : await getProfile();
     
     if (!profile) {
       // No profile found, redirect to onboarding
@@ -253,15 +272,15 @@ async function handleProfileUpdate(e) {
 // Organisation Functions
 // ========================================
 
-async function loadOrganisation() {
+async function loadOrganisation(preloadedOrg, preloadedMembers) {
   try {
-    const org = await getOrganisation();
+    const org = preloadedOrg !== undefined ? preloadedOrg : await getOrganisation();
     
     currentOrganisation = org;
     
     if (org) {
       displayOrganisation(org);
-      await loadOrganisationMembers();
+      await loadOrganisationMembers(preloadedMembers);
     } else {
       showNoOrganisationState();
     }
@@ -329,11 +348,11 @@ function displayOrganisation(org) {
   if (leaveSection) leaveSection.style.display = isOwner ? 'none' : 'block';
 }
 
-async function loadOrganisationMembers() {
+async function loadOrganisationMembers(preloadedMembers) {
   const membersList = document.getElementById('members-list');
   
   try {
-    const members = await getOrganisationMembers();
+    const members = preloadedMembers != null ? preloadedMembers : await getOrganisationMembers();
     
     if (!members || members.length === 0) {
       membersList.innerHTML = '<div class="empty-state"><p>No members found</p></div>';
@@ -592,7 +611,8 @@ async function handleUpdateMemberRole(e) {
 // Subscription Functions
 // ========================================
 
-async function loadSubscriptionStatus() {
+// preloadedStatus is the GET /subscription payload ({subscription, has_access, ...})
+async function loadSubscriptionStatus(preloadedStatus) {
   const subscriptionContent = document.getElementById('subscription-content');
   const extensionSection = document.getElementById('extension-section');
   const noSubscriptionSection = document.getElementById('no-subscription-section');
@@ -600,12 +620,13 @@ async function loadSubscriptionStatus() {
   
   try {
     // TODO: Replace with real API call when backend is ready
-    const subscription = await fetchSubscription();
+    const status = preloadedStatus !== undefined ? preloadedStatus : await fetchSubscription();
+    const subscription = status ? status.subscription : null;
     
-    if (subscription && subscription.status === 'active') {
-      // User has active subscription
+    if (subscription && status.has_access) {
+      // User has an active or trialing subscription
       if (statusBadge) {
-        statusBadge.textContent = 'Active';
+        statusBadge.textContent = subscription.status === 'trialing' ? 'Trial' : 'Active';
         statusBadge.className = 'status-badge active';
       }
       displayActiveSubscription(subscription, subscriptionContent);
@@ -654,15 +675,19 @@ function displaySubscriptionError(container, message) {
 }
 
 function displayActiveSubscription(subscription, container) {
-  const planName = subscription.plan === 'monthly' ? 'Monthly' : 'Annual';
-  const amount = subscription.plan === 'monthly' ? 9.99 : 99;
-  const nextBilling = new Date(subscription.current_period_end).toLocaleDateString('en-US', {
+  const billingPeriod = subscription.billing_period === 'yearly' ? 'Yearly' : 'Monthly';
+  
+  // The API sends epoch seconds
+  const isTrial = subscription.status === 'trialing' && subscription.trial_end;
+  const periodEnd = isTrial ? subscription.trial_end : subscription.current_period_end;
+  const periodEndLabel = isTrial ? 'Trial Ends' : (subscription.cancel_at_period_end ? 'Ends' : 'Next Billing');
+  const periodEndDate = periodEnd ? new Date(periodEnd * 1000).toLocaleDateString('en-US', {
     year: 'numeric',
     month: 'long',
     day: 'numeric'
-  });
+  }) : '-';
   
-  const sharedInfo = subscription.shared ? `
+  const sharedInfo = subscription.is_organisation ? `
     <div class="detail-item">
       <div class="detail-label">Shared With</div>
       <div class="detail-value">${currentOrganisation?.name || 'Organisation'}</div>
@@ -673,15 +698,15 @@ function displayActiveSubscription(subscription, container) {
     <div class="detail-grid">
       <div class="detail-item">
         <div class="detail-label">Plan</div>
-        <div class="detail-value">${planName} Plan</div>
+        <div class="detail-value">${escapeHtml(subscription.plan_name || subscription.plan)}</div>
       </div>
       <div class="detail-item">
-        <div class="detail-label">Amount</div>
-        <div class="detail-value">$${amount.toFixed(2)} / ${subscription.plan === 'monthly' ? 'month' : 'year'}</div>
+        <div class="detail-label">Billing</div>
+        <div class="detail-value">${billingPeriod}</div>
       </div>
       <div class="detail-item">
-        <div class="detail-label">Next Billing</div>
-        <div class="detail-value">${nextBilling}</div>
+        <div class="detail-label">${periodEndLabel}</div>
+        <div class="detail-value">${periodEndDate}</div>
       </div>
       ${sharedInfo}
     </div>
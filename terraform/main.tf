@@ -39,6 +39,15 @@ data "archive_file" "api_lambda" {
   output_path = "${path.module}/lambda_api.zip"
 }
 
+# Per-function bundles built by tools/bundle.py. Functions without a bundle
+# in lambda_bundle_dir (or all of them, when it is unset) use the shared archive.
+locals {
+  lambda_bundles = var.lambda_bundle_dir == "" ? {} : {
+    for bundle in fileset(var.lambda_bundle_dir, "*.zip") :
+    trimsuffix(bundle, ".zip") => "${var.lambda_bundle_dir}/${bundle}"
+  }
+}
+
 #####################################################################
 # WEBSITE HOSTING
 #####################################################################
@@ -0,0 +1,128 @@
+#####################################################################
+# MAINTENANCE JOBS
+# Scheduled housekeeping that is not exposed via API Gateway:
+# - S3 bucket for archived (cold) records
+# - IAM policy for archival
+# - Lambda function and daily schedule for the archive job
+#####################################################################
+
+#####################################################################
+# ARCHIVE BUCKET
+#####################################################################
+
+resource "aws_s3_bucket" "archive" {
+  bucket = "printerapp-archive-${var.environment}"
+}
+
+resource "aws_s3_bucket_public_access_block" "archive" {
+  bucket = aws_s3_bucket.archive.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+# Archived partitions are rarely read - move them to cheaper storage
+resource "aws_s3_bucket_lifecycle_configuration" "archive" {
+  bucket = aws_s3_bucket.archive.id
+
+  rule {
+    id     = "archive-to-infrequent-access"
+    status = "Enabled"
+
+    filter {}
+
+    transition {
+      days          = 30
+      storage_class = "GLACIER_IR"
+    }
+  }
+}
+
+#####################################################################
+# IAM POLICY FOR ARCHIVAL
+#####################################################################
+
+resource "aws_iam_role_policy" "lambda_archive_policy" {
+  name = "lambda-archive-policy"
+  role = aws_iam_role.lambda_execution.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Scan",
+          "dynamodb:BatchWriteItem"
+        ]
+        Resource = [
+          aws_dynamodb_table.subscriptions.arn,
+          aws_dynamodb_table.organisation_data.arn
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+          "s3:GetObject"
+        ]
+        Resource = "${aws_s3_bucket.archive.arn}/*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:ListBucket"]
+        Resource = aws_s3_bucket.archive.arn
+      }
+    ]
+  })
+}
+
+#####################################################################
+# LAMBDA FUNCTIONS
+#####################################################################
+
+resource "aws_lambda_function" "archive_records" {
+  filename         = lookup(local.lambda_bundles, "archive_records", data.archive_file.api_lambda.output_path)
+  function_name    = "printerapp-archive-records-${var.environment}"
+  role             = aws_iam_role.lambda_execution.arn
+  handler          = "maintenance/archive_records.lambda_handler"
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["archive_records"]), data.archive_file.api_lambda.output_base64sha256)
+  runtime          = "python3.12"
+  timeout          = 300
+
+  environment {
+    variables = {
+      SUBSCRIPTIONS_TABLE_NAME     = aws_dynamodb_table.subscriptions.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
+      ARCHIVE_BUCKET               = aws_s3_bucket.archive.bucket
+    }
+  }
+}
+
+#####################################################################
+# SCHEDULES
+#####################################################################
+
+resource "aws_cloudwatch_event_rule" "archive_records" {
+  name                = "printerapp-archive-records-${var.environment}"
+  description         = "Archive canceled subscriptions and expired invitations"
+  schedule_expression = "cron(0 3 * * ? *)"
+}
+
+resource "aws_cloudwatch_event_target" "archive_records" {
+  rule = aws_cloudwatch_event_rule.archive_records.name
+  arn  = aws_lambda_function.archive_records.arn
+}
+
+resource "aws_lambda_permission" "archive_records" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.archive_records.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.archive_records.arn
+}
@@ -1,7 +1,8 @@
 #####################################################################
 # ORGANISATION API FEATURE
 # Complete organisation management system including:
-# - DynamoDB tables for organisations, members, and invitations
+# - DynamoDB table for organisations, members, and invitations
+#   (single-table layout, see src/api/organisations/model.py)
 # - IAM policies for Lambda execution
 # - Lambda functions for organisation operations
 # - API Gateway endpoints for /organisation resources
@@ -11,6 +12,73 @@
 # DYNAMODB TABLES FOR ORGANISATIONS
 #####################################################################
 
+# Organisations, members and invitations - one partition per organisation
+# (pk ORG#<id>; sk META, MEMBER#<user_id>, INVITE#<invitation_id>)
+resource "aws_dynamodb_table" "organisation_data" {
+  name         = "printerapp-organisation-data-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+  range_key    = "sk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "sk"
+    type = "S"
+  }
+
+  attribute {
+    name = "gsi1pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "gsi1sk"
+    type = "S"
+  }
+
+  attribute {
+    name = "gsi2pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "gsi2sk"
+    type = "S"
+  }
+
+  # Memberships by user (USER#<user_id> / ORG#<id>)
+  global_secondary_index {
+    name            = "gsi1"
+    hash_key        = "gsi1pk"
+    range_key       = "gsi1sk"
+    projection_type = "ALL"
+  }
+
+  # Invitations by email (EMAIL#<email> / ORG#<id>)
+  global_secondary_index {
+    name            = "gsi2"
+    hash_key        = "gsi2pk"
+    range_key       = "gsi2sk"
+    projection_type = "ALL"
+  }
+
+  # TTL for auto-expiring invitations
+  ttl {
+    attribute_name = "expires_at_ttl"
+    enabled        = true
+  }
+}
+
+# Legacy tables - read through by the functions while
+# organisation_legacy_tables_enabled is on (src/api/organisations/legacy.py)
+# and copied by tools/migrate_organisations.py. Turn the variable off once the
+# migration's counts match, and remove the tables after every environment has
+# been migrated to organisation_data
+
 # Main organisations table
 resource "aws_dynamodb_table" "organisations" {
   name         = "printerapp-organisations-${var.environment}"
@@ -82,6 +150,13 @@ resource "aws_dynamodb_table" "org_invitations" {
   }
 }
 
+# The legacy table names the functions are given ("" once they stop reading them)
+locals {
+  legacy_organisations_table   = var.organisation_legacy_tables_enabled ? aws_dynamodb_table.organisations.name : ""
+  legacy_org_members_table     = var.organisation_legacy_tables_enabled ? aws_dynamodb_table.org_members.name : ""
+  legacy_org_invitations_table = var.organisation_legacy_tables_enabled ? aws_dynamodb_table.org_invitations.name : ""
+}
+
 #####################################################################
 # IAM POLICY FOR ORGANISATION TABLES
 #####################################################################
@@ -101,15 +176,21 @@ resource "aws_iam_role_policy" "lambda_organisation_dynamodb_policy" {
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
-          "dynamodb:Scan"
-        ]
-        Resource = [
-          aws_dynamodb_table.organisations.arn,
-          aws_dynamodb_table.org_members.arn,
-          "${aws_dynamodb_table.org_members.arn}/index/*",
-          aws_dynamodb_table.org_invitations.arn,
-          "${aws_dynamodb_table.org_invitations.arn}/index/*"
+          "dynamodb:Scan",
+          "dynamodb:BatchWriteItem"
         ]
+        Resource = concat(
+          [
+            aws_dynamodb_table.organisation_data.arn,
+            "${aws_dynamodb_table.organisation_data.arn}/index/*"
+          ],
+          var.organisation_legacy_tables_enabled ? [
+            aws_dynamodb_table.organisations.arn,
+            aws_dynamodb_table.org_members.arn,
+            "${aws_dynamodb_table.org_members.arn}/index/*",
+            aws_dynamodb_table.org_invitations.arn
+          ] : []
+        )
       }
     ]
   })
@@ -121,164 +202,183 @@ resource "aws_iam_role_policy" "lambda_organisation_dynamodb_policy" {
 
 # GET /organisation
 resource "aws_lambda_function" "get_organisation" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "get_organisation", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-get-organisation-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "organisations/get_organisation.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["get_organisation"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
 
   environment {
     variables = {
-      ORGANISATIONS_TABLE_NAME    = aws_dynamodb_table.organisations.name
-      ORG_MEMBERS_TABLE_NAME      = aws_dynamodb_table.org_members.name
-      ORG_INVITATIONS_TABLE_NAME  = aws_dynamodb_table.org_invitations.name
-      TABLE_NAME                  = aws_dynamodb_table.user_profiles.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
+      TABLE_NAME                   = aws_dynamodb_table.user_profiles.name
     }
   }
 }
 
 # POST /organisation
 resource "aws_lambda_function" "create_organisation" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "create_organisation", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-create-organisation-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "organisations/create_organisation.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["create_organisation"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
 
   environment {
     variables = {
-      ORGANISATIONS_TABLE_NAME    = aws_dynamodb_table.organisations.name
-      ORG_MEMBERS_TABLE_NAME      = aws_dynamodb_table.org_members.name
-      ORG_INVITATIONS_TABLE_NAME  = aws_dynamodb_table.org_invitations.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
     }
   }
 }
 
 # PUT /organisation
 resource "aws_lambda_function" "update_organisation" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "update_organisation", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-update-organisation-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "organisations/update_organisation.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["update_organisation"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
 
   environment {
     variables = {
-      ORGANISATIONS_TABLE_NAME    = aws_dynamodb_table.organisations.name
-      ORG_MEMBERS_TABLE_NAME      = aws_dynamodb_table.org_members.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
     }
   }
 }
 
 # DELETE /organisation
 resource "aws_lambda_function" "delete_organisation" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "delete_organisation", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-delete-organisation-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "organisations/delete_organisation.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["delete_organisation"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
 
   environment {
     variables = {
-      ORGANISATIONS_TABLE_NAME    = aws_dynamodb_table.organisations.name
-      ORG_MEMBERS_TABLE_NAME      = aws_dynamodb_table.org_members.name
-      ORG_INVITATIONS_TABLE_NAME  = aws_dynamodb_table.org_invitations.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
     }
   }
 }
 
 # GET /organisation/members
 resource "aws_lambda_function" "get_members" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "get_members", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-get-members-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "organisations/get_members.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["get_members"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
 
   environment {
     variables = {
-      ORG_MEMBERS_TABLE_NAME = aws_dynamodb_table.org_members.name
-      TABLE_NAME             = aws_dynamodb_table.user_profiles.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
+      TABLE_NAME                   = aws_dynamodb_table.user_profiles.name
     }
   }
 }
 
 # POST /organisation/members/invite
 resource "aws_lambda_function" "invite_member" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "invite_member", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-invite-member-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "organisations/invite_member.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["invite_member"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
 
   environment {
     variables = {
-      ORGANISATIONS_TABLE_NAME    = aws_dynamodb_table.organisations.name
-      ORG_MEMBERS_TABLE_NAME      = aws_dynamodb_table.org_members.name
-      ORG_INVITATIONS_TABLE_NAME  = aws_dynamodb_table.org_invitations.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
+      RATE_LIMITS_TABLE_NAME       = aws_dynamodb_table.rate_limits.name
     }
   }
 }
 
 # PUT /organisation/members/{member_id}
 resource "aws_lambda_function" "update_member" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "update_member", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-update-member-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "organisations/update_member.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["update_member"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
 
   environment {
     variables = {
-      ORG_MEMBERS_TABLE_NAME = aws_dynamodb_table.org_members.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
     }
   }
 }
 
 # DELETE /organisation/members/{member_id}
 resource "aws_lambda_function" "remove_member" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "remove_member", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-remove-member-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "organisations/remove_member.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["remove_member"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
 
   environment {
     variables = {
-      ORG_MEMBERS_TABLE_NAME = aws_dynamodb_table.org_members.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
     }
   }
 }
 
 # POST /organisation/leave
 resource "aws_lambda_function" "leave_organisation" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "leave_organisation", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-leave-organisation-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "organisations/leave_organisation.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["leave_organisation"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
 
   environment {
     variables = {
-      ORG_MEMBERS_TABLE_NAME = aws_dynamodb_table.org_members.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
     }
   }
 }
@@ -341,7 +441,7 @@ resource "aws_api_gateway_integration" "get_organisation" {
   http_method             = aws_api_gateway_method.get_organisation.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.get_organisation.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.get_organisation.invoke_arn)
 }
 
 # POST /organisation
@@ -359,7 +459,7 @@ resource "aws_api_gateway_integration" "create_organisation" {
   http_method             = aws_api_gateway_method.create_organisation.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.create_organisation.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.create_organisation.invoke_arn)
 }
 
 # PUT /organisation
@@ -377,7 +477,7 @@ resource "aws_api_gateway_integration" "update_organisation" {
   http_method             = aws_api_gateway_method.update_organisation.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.update_organisation.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.update_organisation.invoke_arn)
 }
 
 # DELETE /organisation
@@ -395,7 +495,7 @@ resource "aws_api_gateway_integration" "delete_organisation" {
   http_method             = aws_api_gateway_method.delete_organisation.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.delete_organisation.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.delete_organisation.invoke_arn)
 }
 
 # OPTIONS /organisation (CORS)
@@ -412,6 +512,8 @@ resource "aws_api_gateway_integration" "organisation_options" {
   http_method = aws_api_gateway_method.organisation_options.http_method
   type        = "MOCK"
 
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -441,7 +543,7 @@ resource "aws_api_gateway_integration_response" "organisation_options" {
   status_code = aws_api_gateway_method_response.organisation_options.status_code
 
   response_parameters = {
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match'"
     "method.response.header.Access-Control-Allow-Methods" = "'GET,POST,PUT,DELETE,OPTIONS'"
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
@@ -468,7 +570,7 @@ resource "aws_api_gateway_integration" "get_members" {
   http_method             = aws_api_gateway_method.get_members.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.get_members.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.get_members.invoke_arn)
 }
 
 # OPTIONS /organisation/members (CORS)
@@ -485,6 +587,8 @@ resource "aws_api_gateway_integration" "organisation_members_options" {
   http_method = aws_api_gateway_method.organisation_members_options.http_method
   type        = "MOCK"
 
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -541,7 +645,7 @@ resource "aws_api_gateway_integration" "invite_member" {
   http_method             = aws_api_gateway_method.invite_member.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.invite_member.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.invite_member.invoke_arn)
 }
 
 # OPTIONS /organisation/members/invite (CORS)
@@ -558,6 +662,8 @@ resource "aws_api_gateway_integration" "organisation_members_invite_options" {
   http_method = aws_api_gateway_method.organisation_members_invite_options.http_method
   type        = "MOCK"
 
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -614,7 +720,7 @@ resource "aws_api_gateway_integration" "update_member" {
   http_method             = aws_api_gateway_method.update_member.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.update_member.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.update_member.invoke_arn)
 }
 
 # DELETE /organisation/members/{member_id}
@@ -632,7 +738,7 @@ resource "aws_api_gateway_integration" "remove_member" {
   http_method             = aws_api_gateway_method.remove_member.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.remove_member.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.remove_member.invoke_arn)
 }
 
 # OPTIONS /organisation/members/{member_id} (CORS)
@@ -649,6 +755,8 @@ resource "aws_api_gateway_integration" "organisation_member_options" {
   http_method = aws_api_gateway_method.organisation_member_options.http_method
   type        = "MOCK"
 
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -705,7 +813,7 @@ resource "aws_api_gateway_integration" "leave_organisation" {
   http_method             = aws_api_gateway_method.leave_organisation.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.leave_organisation.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.leave_organisation.invoke_arn)
 }
 
 # OPTIONS /organisation/leave (CORS)
@@ -722,6 +830,8 @@ resource "aws_api_gateway_integration" "organisation_leave_options" {
   http_method = aws_api_gateway_method.organisation_leave_options.http_method
   type        = "MOCK"
 
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -56,18 +56,23 @@ output "extension_redirect_uri" {
 # ORGANISATION TABLES
 #####################################################################
 
+output "organisation_data_table_name" {
+  description = "DynamoDB table name for organisations, members and invitations (single-table)"
+  value       = aws_dynamodb_table.organisation_data.name
+}
+
 output "organisations_table_name" {
-  description = "DynamoDB table name for organisations"
+  description = "Legacy DynamoDB table name for organisations (migration source)"
   value       = aws_dynamodb_table.organisations.name
 }
 
 output "org_members_table_name" {
-  description = "DynamoDB table name for organisation members"
+  description = "Legacy DynamoDB table name for organisation members (migration source)"
   value       = aws_dynamodb_table.org_members.name
 }
 
 output "org_invitations_table_name" {
-  description = "DynamoDB table name for organisation invitations"
+  description = "Legacy DynamoDB table name for organisation invitations (migration source)"
   value       = aws_dynamodb_table.org_invitations.name
 }
 
@@ -58,7 +58,8 @@ resource "aws_iam_role_policy" "lambda_dynamodb_policy" {
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
-          "dynamodb:Scan"
+          "dynamodb:Scan",
+          "dynamodb:BatchGetItem"
         ]
         Resource = aws_dynamodb_table.user_profiles.arn
       }
@@ -76,11 +77,11 @@ resource "aws_iam_role_policy_attachment" "lambda_logs" {
 #####################################################################
 
 resource "aws_lambda_function" "get_profile" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "get_profile", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-get-profile-${var.environment}"
   role            = aws_iam_role.lambda_execution.arn
   handler         = "profiles/get_profile.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["get_profile"]), data.archive_file.api_lambda.output_base64sha256)
   runtime         = "python3.12"
   timeout         = 10
 
@@ -92,11 +93,11 @@ resource "aws_lambda_function" "get_profile" {
 }
 
 resource "aws_lambda_function" "create_profile" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "create_profile", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-create-profile-${var.environment}"
   role            = aws_iam_role.lambda_execution.arn
   handler         = "profiles/create_profile.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["create_profile"]), data.archive_file.api_lambda.output_base64sha256)
   runtime         = "python3.12"
   timeout         = 10
 
@@ -108,11 +109,11 @@ resource "aws_lambda_function" "create_profile" {
 }
 
 resource "aws_lambda_function" "update_profile" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "update_profile", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-update-profile-${var.environment}"
   role            = aws_iam_role.lambda_execution.arn
   handler         = "profiles/update_profile.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["update_profile"]), data.archive_file.api_lambda.output_base64sha256)
   runtime         = "python3.12"
   timeout         = 10
 
@@ -123,6 +124,30 @@ resource "aws_lambda_function" "update_profile" {
   }
 }
 
+# GET /me (profile page aggregate)
+resource "aws_lambda_function" "get_me" {
+  filename         = lookup(local.lambda_bundles, "get_me", data.archive_file.api_lambda.output_path)
+  function_name    = "printerapp-get-me-${var.environment}"
+  role             = aws_iam_role.lambda_execution.arn
+  handler          = "profiles/get_me.lambda_handler"
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["get_me"]), data.archive_file.api_lambda.output_base64sha256)
+  runtime          = "python3.12"
+  timeout          = 10
+  layers           = [aws_lambda_layer_version.stripe.arn]
+
+  environment {
+    variables = {
+      TABLE_NAME                   = aws_dynamodb_table.user_profiles.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
+      SUBSCRIPTIONS_TABLE_NAME     = aws_dynamodb_table.subscriptions.name
+      STRIPE_SECRET_KEY            = var.stripe_secret_key
+    }
+  }
+}
+
 #####################################################################
 # API GATEWAY
 #####################################################################
@@ -130,6 +155,12 @@ resource "aws_lambda_function" "update_profile" {
 resource "aws_api_gateway_rest_api" "main" {
   name        = "printerapp-api-${var.environment}"
   description = "Printerapp API for user profiles"
+
+  # Lets Lambdas return gzip/brotli bodies (base64 + isBase64Encoded).
+  # Request bodies then arrive base64-encoded too - see get_raw_body. The
+  # OPTIONS MOCK integrations convert the preflight back to text
+  # (content_handling), or their request templates would fail with a 500.
+  binary_media_types = ["*/*"]
 }
 
 resource "aws_api_gateway_authorizer" "cognito" {
@@ -161,7 +192,7 @@ resource "aws_api_gateway_integration" "get_profile" {
   http_method             = aws_api_gateway_method.get_profile.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.get_profile.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.get_profile.invoke_arn)
 }
 
 # POST /profile method
@@ -179,7 +210,7 @@ resource "aws_api_gateway_integration" "create_profile" {
   http_method             = aws_api_gateway_method.create_profile.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.create_profile.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.create_profile.invoke_arn)
 }
 
 # PUT /profile method
@@ -197,7 +228,7 @@ resource "aws_api_gateway_integration" "update_profile" {
   http_method             = aws_api_gateway_method.update_profile.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.update_profile.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.update_profile.invoke_arn)
 }
 
 # CORS OPTIONS method for /profile
@@ -214,6 +245,8 @@ resource "aws_api_gateway_integration" "profile_options" {
   http_method = aws_api_gateway_method.profile_options.http_method
   type        = "MOCK"
 
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -243,7 +276,7 @@ resource "aws_api_gateway_integration_response" "profile_options" {
   status_code = aws_api_gateway_method_response.profile_options.status_code
 
   response_parameters = {
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match'"
     "method.response.header.Access-Control-Allow-Methods" = "'GET,POST,PUT,OPTIONS'"
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
@@ -251,6 +284,84 @@ resource "aws_api_gateway_integration_response" "profile_options" {
   depends_on = [aws_api_gateway_integration.profile_options]
 }
 
+# /me resource
+resource "aws_api_gateway_resource" "me" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  parent_id   = aws_api_gateway_rest_api.main.root_resource_id
+  path_part   = "me"
+}
+
+# GET /me method
+resource "aws_api_gateway_method" "get_me" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.me.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito.id
+}
+
+resource "aws_api_gateway_integration" "get_me" {
+  rest_api_id             = aws_api_gateway_rest_api.main.id
+  resource_id             = aws_api_gateway_resource.me.id
+  http_method             = aws_api_gateway_method.get_me.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.get_me.invoke_arn)
+}
+
+# CORS OPTIONS method for /me
+resource "aws_api_gateway_method" "me_options" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.me.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "me_options" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.me.id
+  http_method = aws_api_gateway_method.me_options.http_method
+  type        = "MOCK"
+
+  content_handling = "CONVERT_TO_TEXT"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "me_options" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.me.id
+  http_method = aws_api_gateway_method.me_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+
+  response_models = {
+    "application/json" = "Empty"
+  }
+}
+
+resource "aws_api_gateway_integration_response" "me_options" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.me.id
+  http_method = aws_api_gateway_method.me_options.http_method
+  status_code = aws_api_gateway_method_response.me_options.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.me_options]
+}
+
 #####################################################################
 # GATEWAY RESPONSES (CORS headers for error responses)
 #####################################################################
@@ -301,6 +412,8 @@ resource "aws_api_gateway_deployment" "main" {
 
   triggers = {
     redeployment = sha1(jsonencode([
+      # Integration targets switch between router and per-function Lambdas
+      var.api_router_enabled,
       # Profile API
       aws_api_gateway_resource.profile.id,
       aws_api_gateway_method.get_profile.id,
@@ -312,6 +425,12 @@ resource "aws_api_gateway_deployment" "main" {
       aws_api_gateway_integration.update_profile.id,
       aws_api_gateway_integration.profile_options.id,
       aws_api_gateway_integration_response.profile_options.id,
+      aws_api_gateway_resource.me.id,
+      aws_api_gateway_method.get_me.id,
+      aws_api_gateway_method.me_options.id,
+      aws_api_gateway_integration.get_me.id,
+      aws_api_gateway_integration.me_options.id,
+      aws_api_gateway_integration_response.me_options.id,
       # Gateway responses
       aws_api_gateway_gateway_response.unauthorized.id,
       aws_api_gateway_gateway_response.access_denied.id,
@@ -374,6 +493,8 @@ resource "aws_api_gateway_deployment" "main" {
     aws_api_gateway_integration.create_profile,
     aws_api_gateway_integration.update_profile,
     aws_api_gateway_integration.profile_options,
+    aws_api_gateway_integration.get_me,
+    aws_api_gateway_integration.me_options,
     # Organisation API
     aws_api_gateway_integration.get_organisation,
     aws_api_gateway_integration.create_organisation,
@@ -425,3 +546,11 @@ resource "aws_lambda_permission" "update_profile" {
   source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
 }
 
+resource "aws_lambda_permission" "get_me" {
+  statement_id  = "AllowAPIGatewayInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get_me.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
+}
+
@@ -0,0 +1,50 @@
+#####################################################################
+# RATE LIMITS
+# Token buckets shared by every Lambda container (utils/rate_limit.py):
+# - DynamoDB table of per-user and per-organisation buckets
+# - IAM policy for the rate-limited functions
+#####################################################################
+
+#####################################################################
+# DYNAMODB TABLE FOR RATE LIMITS
+#####################################################################
+
+# One item per bucket ("<route>#user#<id>" / "<route>#org#<id>")
+resource "aws_dynamodb_table" "rate_limits" {
+  name         = "printerapp-rate-limits-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "bucket_key"
+
+  attribute {
+    name = "bucket_key"
+    type = "S"
+  }
+
+  # Buckets expire once they have refilled
+  ttl {
+    attribute_name = "expires_at_ttl"
+    enabled        = true
+  }
+}
+
+#####################################################################
+# IAM POLICY FOR RATE LIMITS
+#####################################################################
+
+resource "aws_iam_role_policy" "lambda_rate_limits_policy" {
+  name = "lambda-rate-limits-policy"
+  role = aws_iam_role.lambda_execution.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:UpdateItem"
+        ]
+        Resource = aws_dynamodb_table.rate_limits.arn
+      }
+    ]
+  })
+}
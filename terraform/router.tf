@@ -0,0 +1,50 @@
+#####################################################################
+# API ROUTER (optional)
+# One Lambda behind every API route (src/api/router.py) so all routes
+# share warm containers. Enable with api_router_enabled = true; the
+# per-function Lambdas stay deployed and take over again when disabled.
+#####################################################################
+
+locals {
+  # Integrations use the router when enabled, their own function otherwise
+  api_router_invoke_arn = var.api_router_enabled ? aws_lambda_function.api_router[0].invoke_arn : null
+}
+
+resource "aws_lambda_function" "api_router" {
+  count = var.api_router_enabled ? 1 : 0
+
+  filename         = lookup(local.lambda_bundles, "api_router", data.archive_file.api_lambda.output_path)
+  function_name    = "printerapp-api-router-${var.environment}"
+  role             = aws_iam_role.lambda_execution.arn
+  handler          = "router.lambda_handler"
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["api_router"]), data.archive_file.api_lambda.output_base64sha256)
+  runtime          = "python3.12"
+  timeout          = 30
+  layers           = [aws_lambda_layer_version.stripe.arn]
+
+  environment {
+    variables = {
+      TABLE_NAME                   = aws_dynamodb_table.user_profiles.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
+      SUBSCRIPTIONS_TABLE_NAME     = aws_dynamodb_table.subscriptions.name
+      BILLING_METRICS_TABLE_NAME   = aws_dynamodb_table.billing_metrics.name
+      STRIPE_SECRET_KEY            = var.stripe_secret_key
+      STRIPE_WEBHOOK_SECRET        = var.stripe_webhook_secret
+      WEBSITE_URL                  = var.environment == "prod" ? "https://${var.domain_name}" : "https://${var.environment}.${var.domain_name}"
+      RATE_LIMITS_TABLE_NAME       = aws_dynamodb_table.rate_limits.name
+    }
+  }
+}
+
+resource "aws_lambda_permission" "api_router" {
+  count = var.api_router_enabled ? 1 : 0
+
+  statement_id  = "AllowAPIGatewayInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.api_router[0].function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
+}
@@ -36,6 +36,16 @@ resource "aws_dynamodb_table" "subscriptions" {
     type = "S"
   }
 
+  attribute {
+    name = "expiry_bucket"
+    type = "S"
+  }
+
+  attribute {
+    name = "expires_at"
+    type = "N"
+  }
+
   # GSI to look up subscription by owner (user_id or organisation_id)
   global_secondary_index {
     name            = "owner_id-index"
@@ -49,6 +59,34 @@ resource "aws_dynamodb_table" "subscriptions" {
     hash_key        = "stripe_subscription_id"
     projection_type = "ALL"
   }
+
+  # Sparse GSI of trialing/active/past_due subscriptions by next expiry
+  # (only rows with expiry_bucket set appear - used by the expiry sweeper)
+  global_secondary_index {
+    name               = "expiry_bucket-index"
+    hash_key           = "expiry_bucket"
+    range_key          = "expires_at"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["stripe_subscription_id"]
+  }
+}
+
+# Billing metrics aggregates (maintained by the Stripe webhook)
+resource "aws_dynamodb_table" "billing_metrics" {
+  name         = "printerapp-billing-metrics-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "metric_key"
+  range_key    = "dimension"
+
+  attribute {
+    name = "metric_key"
+    type = "S"
+  }
+
+  attribute {
+    name = "dimension"
+    type = "S"
+  }
 }
 
 #####################################################################
@@ -74,7 +112,8 @@ resource "aws_iam_role_policy" "lambda_subscription_dynamodb_policy" {
         ]
         Resource = [
           aws_dynamodb_table.subscriptions.arn,
-          "${aws_dynamodb_table.subscriptions.arn}/index/*"
+          "${aws_dynamodb_table.subscriptions.arn}/index/*",
+          aws_dynamodb_table.billing_metrics.arn
         ]
       }
     ]
@@ -105,86 +144,133 @@ resource "aws_lambda_layer_version" "stripe" {
 
 # GET /subscription
 resource "aws_lambda_function" "get_subscription" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "get_subscription", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-get-subscription-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "subscriptions/get_subscription.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["get_subscription"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
+  layers           = [aws_lambda_layer_version.stripe.arn]
 
   environment {
     variables = {
-      SUBSCRIPTIONS_TABLE_NAME   = aws_dynamodb_table.subscriptions.name
-      ORG_MEMBERS_TABLE_NAME     = aws_dynamodb_table.org_members.name
-      ORGANISATIONS_TABLE_NAME   = aws_dynamodb_table.organisations.name
+      SUBSCRIPTIONS_TABLE_NAME     = aws_dynamodb_table.subscriptions.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
+      RATE_LIMITS_TABLE_NAME       = aws_dynamodb_table.rate_limits.name
     }
   }
 }
 
 # POST /subscription (create checkout session)
 resource "aws_lambda_function" "create_checkout" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "create_checkout", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-create-checkout-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "subscriptions/create_checkout.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["create_checkout"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
   layers           = [aws_lambda_layer_version.stripe.arn]
 
   environment {
     variables = {
-      SUBSCRIPTIONS_TABLE_NAME   = aws_dynamodb_table.subscriptions.name
-      ORG_MEMBERS_TABLE_NAME     = aws_dynamodb_table.org_members.name
-      STRIPE_SECRET_KEY          = var.stripe_secret_key
-      STRIPE_WEBHOOK_SECRET      = var.stripe_webhook_secret
-      WEBSITE_URL                = var.environment == "prod" ? "https://${var.domain_name}" : "https://${var.environment}.${var.domain_name}"
+      SUBSCRIPTIONS_TABLE_NAME     = aws_dynamodb_table.subscriptions.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
+      STRIPE_SECRET_KEY            = var.stripe_secret_key
+      STRIPE_WEBHOOK_SECRET        = var.stripe_webhook_secret
+      WEBSITE_URL                  = var.environment == "prod" ? "https://${var.domain_name}" : "https://${var.environment}.${var.domain_name}"
+      RATE_LIMITS_TABLE_NAME       = aws_dynamodb_table.rate_limits.name
     }
   }
 }
 
 # POST /subscription/webhook (Stripe webhook handler)
 resource "aws_lambda_function" "stripe_webhook" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "stripe_webhook", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-stripe-webhook-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "subscriptions/stripe_webhook.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["stripe_webhook"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 30
   layers           = [aws_lambda_layer_version.stripe.arn]
 
   environment {
     variables = {
-      SUBSCRIPTIONS_TABLE_NAME = aws_dynamodb_table.subscriptions.name
-      STRIPE_SECRET_KEY        = var.stripe_secret_key
-      STRIPE_WEBHOOK_SECRET    = var.stripe_webhook_secret
+      SUBSCRIPTIONS_TABLE_NAME   = aws_dynamodb_table.subscriptions.name
+      BILLING_METRICS_TABLE_NAME = aws_dynamodb_table.billing_metrics.name
+      STRIPE_SECRET_KEY          = var.stripe_secret_key
+      STRIPE_WEBHOOK_SECRET      = var.stripe_webhook_secret
     }
   }
 }
 
 # POST /subscription/portal (create customer portal session)
 resource "aws_lambda_function" "create_portal" {
-  filename         = data.archive_file.api_lambda.output_path
+  filename         = lookup(local.lambda_bundles, "create_portal", data.archive_file.api_lambda.output_path)
   function_name    = "printerapp-create-portal-${var.environment}"
   role             = aws_iam_role.lambda_execution.arn
   handler          = "subscriptions/create_portal.lambda_handler"
-  source_code_hash = data.archive_file.api_lambda.output_base64sha256
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["create_portal"]), data.archive_file.api_lambda.output_base64sha256)
   runtime          = "python3.12"
   timeout          = 10
   layers           = [aws_lambda_layer_version.stripe.arn]
 
+  environment {
+    variables = {
+      SUBSCRIPTIONS_TABLE_NAME     = aws_dynamodb_table.subscriptions.name
+      ORGANISATION_DATA_TABLE_NAME = aws_dynamodb_table.organisation_data.name
+      ORGANISATIONS_TABLE_NAME     = local.legacy_organisations_table
+      ORG_MEMBERS_TABLE_NAME       = local.legacy_org_members_table
+      ORG_INVITATIONS_TABLE_NAME   = local.legacy_org_invitations_table
+      STRIPE_SECRET_KEY            = var.stripe_secret_key
+      WEBSITE_URL                  = var.environment == "prod" ? "https://${var.domain_name}" : "https://${var.environment}.${var.domain_name}"
+    }
+  }
+}
+
+# Scheduled expiry sweeper (not exposed via API Gateway)
+resource "aws_lambda_function" "expiry_sweeper" {
+  filename         = lookup(local.lambda_bundles, "expiry_sweeper", data.archive_file.api_lambda.output_path)
+  function_name    = "printerapp-expiry-sweeper-${var.environment}"
+  role             = aws_iam_role.lambda_execution.arn
+  handler          = "subscriptions/expiry_sweeper.lambda_handler"
+  source_code_hash = try(filebase64sha256(local.lambda_bundles["expiry_sweeper"]), data.archive_file.api_lambda.output_base64sha256)
+  runtime          = "python3.12"
+  timeout          = 60
+  layers           = [aws_lambda_layer_version.stripe.arn]
+
   environment {
     variables = {
       SUBSCRIPTIONS_TABLE_NAME   = aws_dynamodb_table.subscriptions.name
-      ORG_MEMBERS_TABLE_NAME     = aws_dynamodb_table.org_members.name
+      BILLING_METRICS_TABLE_NAME = aws_dynamodb_table.billing_metrics.name
       STRIPE_SECRET_KEY          = var.stripe_secret_key
-      WEBSITE_URL                = var.environment == "prod" ? "https://${var.domain_name}" : "https://${var.environment}.${var.domain_name}"
     }
   }
 }
 
+#####################################################################
+# SCHEDULED JOBS
+#####################################################################
+
+resource "aws_cloudwatch_event_rule" "expiry_sweeper" {
+  name                = "printerapp-expiry-sweeper-${var.environment}"
+  description         = "Re-verify subscriptions whose trial or billing period has lapsed"
+  schedule_expression = "rate(1 hour)"
+}
+
+resource "aws_cloudwatch_event_target" "expiry_sweeper" {
+  rule = aws_cloudwatch_event_rule.expiry_sweeper.name
+  arn  = aws_lambda_function.expiry_sweeper.arn
+}
+
 #####################################################################
 # API GATEWAY RESOURCES
 #####################################################################
@@ -229,7 +315,7 @@ resource "aws_api_gateway_integration" "get_subscription" {
   http_method             = aws_api_gateway_method.get_subscription.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.get_subscription.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.get_subscription.invoke_arn)
 }
 
 # POST /subscription (authenticated - create checkout)
@@ -247,7 +333,7 @@ resource "aws_api_gateway_integration" "create_checkout" {
   http_method             = aws_api_gateway_method.create_checkout.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.create_checkout.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.create_checkout.invoke_arn)
 }
 
 # POST /subscription/webhook (public - Stripe webhook)
@@ -264,7 +350,7 @@ resource "aws_api_gateway_integration" "stripe_webhook" {
   http_method             = aws_api_gateway_method.stripe_webhook.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.stripe_webhook.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.stripe_webhook.invoke_arn)
 }
 
 # POST /subscription/portal (authenticated - create portal session)
@@ -282,7 +368,7 @@ resource "aws_api_gateway_integration" "create_portal" {
   http_method             = aws_api_gateway_method.create_portal.http_method
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.create_portal.invoke_arn
+  uri                     = coalesce(local.api_router_invoke_arn, aws_lambda_function.create_portal.invoke_arn)
 }
 
 #####################################################################
@@ -302,6 +388,8 @@ resource "aws_api_gateway_integration" "subscription_options" {
   http_method = aws_api_gateway_method.subscription_options.http_method
   type        = "MOCK"
 
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -327,7 +415,7 @@ resource "aws_api_gateway_integration_response" "subscription_options" {
   status_code = aws_api_gateway_method_response.subscription_options.status_code
 
   response_parameters = {
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match'"
     "method.response.header.Access-Control-Allow-Methods" = "'GET,POST,OPTIONS'"
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
@@ -347,6 +435,8 @@ resource "aws_api_gateway_integration" "subscription_webhook_options" {
   http_method = aws_api_gateway_method.subscription_webhook_options.http_method
   type        = "MOCK"
 
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -392,6 +482,8 @@ resource "aws_api_gateway_integration" "subscription_portal_options" {
   http_method = aws_api_gateway_method.subscription_portal_options.http_method
   type        = "MOCK"
 
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -458,3 +550,11 @@ resource "aws_lambda_permission" "create_portal" {
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
 }
+
+resource "aws_lambda_permission" "expiry_sweeper" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.expiry_sweeper.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.expiry_sweeper.arn
+}
@@ -75,3 +75,33 @@ variable "additional_cloudfront_distribution_arns" {
   type        = list(string)
   default     = []
 }
+
+variable "lambda_bundle_dir" {
+  description = "Directory of per-function Lambda zips from tools/bundle.py (e.g. ../build/lambda). Empty deploys the shared src/api archive to every function."
+  type        = string
+  default     = ""
+}
+
+variable "api_router_enabled" {
+  description = "Route every API method through the single api_router Lambda (src/api/router.py) instead of the per-function Lambdas"
+  type        = bool
+  default     = false
+}
+
+variable "organisation_legacy_tables_enabled" {
+  description = "Let the functions read through to the legacy organisation tables (copying an organisation on first use) until tools/migrate_organisations.py has copied them all"
+  type        = bool
+  default     = true
+}
+
+variable "lambda_warmup_enabled" {
+  description = "Ping the API Lambdas with warm-up events on a schedule"
+  type        = bool
+  default     = false
+}
+
+variable "lambda_warmup_interval_minutes" {
+  description = "Minutes between warm-up pings"
+  type        = number
+  default     = 5
+}
@@ -0,0 +1,74 @@
+#####################################################################
+# LAMBDA WARM-UP (optional)
+# Pings the API Lambdas with {"warmup": true} on a schedule so clients,
+# connections and caches are ready before real requests arrive (see
+# src/api/utils/warmup.py). Only the router is pinged when it is enabled.
+#####################################################################
+
+locals {
+  warmup_functions = var.lambda_warmup_enabled ? (
+    var.api_router_enabled ? {
+      api_router = aws_lambda_function.api_router[0]
+    } : {
+      get_profile         = aws_lambda_function.get_profile
+      create_profile      = aws_lambda_function.create_profile
+      update_profile      = aws_lambda_function.update_profile
+      get_me              = aws_lambda_function.get_me
+      get_organisation    = aws_lambda_function.get_organisation
+      create_organisation = aws_lambda_function.create_organisation
+      update_organisation = aws_lambda_function.update_organisation
+      delete_organisation = aws_lambda_function.delete_organisation
+      get_members         = aws_lambda_function.get_members
+      invite_member       = aws_lambda_function.invite_member
+      update_member       = aws_lambda_function.update_member
+      remove_member       = aws_lambda_function.remove_member
+      leave_organisation  = aws_lambda_function.leave_organisation
+      get_subscription    = aws_lambda_function.get_subscription
+      create_checkout     = aws_lambda_function.create_checkout
+      create_portal       = aws_lambda_function.create_portal
+    }
+  ) : {}
+}
+
+resource "aws_cloudwatch_event_rule" "lambda_warmup" {
+  count = var.lambda_warmup_enabled ? 1 : 0
+
+  name                = "printerapp-lambda-warmup-${var.environment}"
+  description         = "Keep API Lambda containers warm"
+  schedule_expression = "rate(${var.lambda_warmup_interval_minutes} minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "lambda_warmup" {
+  for_each = local.warmup_functions
+
+  rule  = aws_cloudwatch_event_rule.lambda_warmup[0].name
+  arn   = each.value.arn
+  input = jsonencode({ warmup = true })
+}
+
+resource "aws_lambda_permission" "lambda_warmup" {
+  for_each = local.warmup_functions
+
+  statement_id  = "AllowEventBridgeWarmup"
+  action        = "lambda:InvokeFunction"
+  function_name = each.value.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lambda_warmup[0].arn
+}
+
+# Warm-up opens the DynamoDB connection with DescribeEndpoints (reads no table)
+resource "aws_iam_role_policy" "lambda_warmup_policy" {
+  name = "lambda-warmup-policy"
+  role = aws_iam_role.lambda_execution.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["dynamodb:DescribeEndpoints"]
+        Resource = "*"
+      }
+    ]
+  })
+}
@@ -0,0 +1,442 @@
+"""
+Backfill and migration runner
+Rewrites the items of a DynamoDB table through a migration's transform
+(tools/migrations.py) - for schema changes that need existing items updated:
+new or derived attributes, index keys, denormalised copies, a new layout.
+Tables and their keys come from terraform (every aws_dynamodb_table), so it
+runs against any environment and against the local stand-in.
+
+HOW IT RUNS:
+- Parallel segmented Scan: the table is split into --segments segments
+  (Scan Segment/TotalSegments), worked by --workers threads
+- Every page's items go through the transform; changed items are written
+  with BatchWriteItem, 25 at a time (unprocessed items resent), with a
+  conditional PutItem each for migrations with a version_attribute, or by
+  the migration's own write function
+- The capacity every Scan and write consumed (ReturnConsumedCapacity) is
+  charged to a shared limiter, holding the run to --max-rcu and --max-wcu
+  units per second on average so a backfill doesn't starve the handlers.
+  Throttled calls are retried with backoff
+
+CHECKPOINTS:
+Once a page's writes are done, its segment's LastEvaluatedKey is saved to
+the checkpoint file (build/backfill/<migration>-<environment>.json). Running
+the same migration again continues every segment from its last saved page;
+--restart starts over. A crash repeats at most a page per segment, which the
+idempotent transforms make harmless.
+
+DRY RUN:
+--dry-run scans and transforms without writing or checkpointing, counts the
+items it would change, prints a few of the changes (--show) and checks the
+transform is idempotent - transforming its own output must change nothing.
+
+USAGE:
+    python tools/backfill.py --list
+    python tools/backfill.py subscription-expiry-index --environment dev --dry-run
+    python tools/backfill.py subscription-expiry-index --environment dev --segments 8 --workers 8 --max-wcu 25
+    python tools/backfill.py subscription-expiry-index --local       # seeded local stand-in
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..', 'src', 'api'))
+
+from botocore.exceptions import ClientError  # noqa: E402
+from terraform_config import find_dynamodb_tables  # noqa: E402
+from utils.dynamodb import (  # noqa: E402
+    BATCH_WRITE_SIZE, ClientTable, ThrottledError, backoff_delay, is_throttle, marshal_item, send_batch
+)
+from utils.unit_of_work import is_condition_failure  # noqa: E402
+from migrations import MIGRATIONS, get_migration  # noqa: E402
+
+CHECKPOINT_DIR = os.path.join(TOOLS_DIR, '..', 'build', 'backfill')
+
+# Throttled calls are retried this many times (with backoff) before the run stops
+MAX_THROTTLE_RETRIES = 8
+
+# Conditional writes re-read and retransform an item this many times
+MAX_VERSION_CONFLICTS = 3
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 5
+
+
+class CapacityLimiter:
+    """
+    Holds its callers to an average of rate capacity units per second
+    (thread-safe; rate 0 is unlimited). Units are charged after the call that
+    consumed them, and the caller sleeps while the limiter is in debt.
+    """
+    
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        # Up to one second's worth may be spent at once
+        self.available = float(rate)
+        self.refilled = time.monotonic()
+        self.spent = 0.0
+    
+    def spend(self, units):
+        with self.lock:
+            self.spent += units
+            if not self.rate:
+                return
+            now = time.monotonic()
+            self.available = min(self.rate, self.available + (now - self.refilled) * self.rate) - units
+            self.refilled = now
+            wait_seconds = -self.available / self.rate if self.available < 0 else 0
+        if wait_seconds:
+            time.sleep(wait_seconds)
+
+
+def consumed_units(response):
+    """Total capacity units in a response's ConsumedCapacity (table and indexes)."""
+    consumed = response.get('ConsumedCapacity') or []
+    return sum(entry.get('CapacityUnits', 0) for entry in (consumed if isinstance(consumed, list) else [consumed]))
+
+
+def with_retries(call, *args, **kwargs):
+    """Make a call, retrying it with backoff while DynamoDB throttles it."""
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        try:
+            return call(*args, **kwargs)
+        except (ClientError, ThrottledError) as e:
+            if not is_throttle(e) or attempt == MAX_THROTTLE_RETRIES:
+                raise
+            time.sleep(backoff_delay(attempt + 2))
+
+
+class Checkpoint:
+    """Progress of every segment, saved to a JSON file after each page (thread-safe)."""
+    
+    def __init__(self, path, migration, table, total_segments, restart=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = None
+        if path and os.path.exists(path) and not restart:
+            with open(path) as f:
+                self.state = json.load(f)
+            saved = (self.state['migration'], self.state['table'], self.state['total_segments'])
+            if saved != (migration, table, total_segments):
+                raise SystemExit(
+                    f"{path} holds {saved[0]} on {saved[1]} in {saved[2]} segments - "
+                    f"run with --segments {saved[2]} to resume it, or --restart"
+                )
+        if self.state is None:
+            self.state = {
+                'migration': migration,
+                'table': table,
+                'total_segments': total_segments,
+                'segments': {
+                    str(segment): {'last_key': None, 'done': False, 'scanned': 0, 'changed': 0, 'written': 0}
+                    for segment in range(total_segments)
+                },
+            }
+    
+    def segment(self, segment):
+        return self.state['segments'][str(segment)]
+    
+    def advance(self, segment, last_key, scanned, changed, written):
+        """Record a finished page (last_key None: the segment is done)."""
+        with self.lock:
+            progress = self.segment(segment)
+            progress['last_key'] = last_key
+            progress['done'] = last_key is None
+            progress['scanned'] += scanned
+            progress['changed'] += changed
+            progress['written'] += written
+            self._save()
+    
+    def totals(self):
+        with self.lock:
+            segments = self.state['segments'].values()
+            totals = {name: sum(progress[name] for progress in segments) for name in ('scanned', 'changed', 'written')}
+            totals['done'] = sum(progress['done'] for progress in segments)
+            return totals
+    
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Written aside and renamed, so a crash never leaves half a file
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(self.state, f, indent=2, default=str)
+        os.replace(temporary, self.path)
+
+
+class Run:
+    """One migration over one table: the workers' shared state."""
+    
+    def __init__(self, migration, tables, args):
+        source = tables[migration.table]
+        target = tables[migration.target or migration.table]
+        self.migration = migration
+        self.tables = tables
+        self.args = args
+        self.source = ClientTable(source['name'])
+        self.target = ClientTable(target['name'])
+        self.in_place = self.target.name == self.source.name
+        self.key_names = [name for name in (target['hash_key'], target['range_key']) if name]
+        self.reads = CapacityLimiter(args.max_rcu)
+        self.writes = CapacityLimiter(args.max_wcu)
+        self.lock = threading.Lock()
+        self.conflicts = 0
+        self.not_idempotent = 0
+        self.examples = []
+        
+        path = None
+        if not args.dry_run and not args.no_checkpoint:
+            path = args.checkpoint or os.path.join(CHECKPOINT_DIR, f"{migration.name}-{args.environment}.json")
+        self.checkpoint = Checkpoint(path, migration.name, self.source.name, args.segments, args.restart)
+        
+        if migration.version_attribute and not self.in_place:
+            raise ValueError(f"{migration.name}: version_attribute only applies to in-place migrations")
+    
+    def key_of(self, item):
+        return {name: item[name] for name in self.key_names}
+    
+    def changes(self, items):
+        """(old, new) for every item the transform changes."""
+        changes = []
+        for item in items:
+            new = self.migration.transform(item)
+            if new is None or (self.in_place and new == item):
+                continue
+            changes.append((item, new))
+        return changes
+    
+    def check(self, changes):
+        """Dry run: check the transform is idempotent and keep a few examples."""
+        for old, new in changes:
+            again = self.migration.transform(new)
+            with self.lock:
+                if again is not None and again != new:
+                    self.not_idempotent += 1
+                if len(self.examples) < self.args.show:
+                    self.examples.append((old, new))
+    
+    def write_batch(self, changes):
+        """Write changed items with BatchWriteItem. Returns the number written."""
+        requests = []
+        for old, new in changes:
+            requests.append({'PutRequest': {'Item': marshal_item(new)}})
+            if self.in_place and self.key_of(old) != self.key_of(new):
+                # Rewritten under a new key - the old one goes
+                requests.append({'DeleteRequest': {'Key': marshal_item(self.key_of(old))}})
+        
+        def send(request_items):
+            # Unprocessed items are resent; a batch that stays throttled is resent whole (puts and deletes repeat safely)
+            return list(send_batch(self.target.client.batch_write_item, request_items, 'UnprocessedItems'))
+        
+        for start in range(0, len(requests), BATCH_WRITE_SIZE):
+            for response in with_retries(send, {self.target.name: requests[start:start + BATCH_WRITE_SIZE]}):
+                self.writes.spend(consumed_units(response))
+        return len(changes)
+    
+    def write_versioned(self, old, new):
+        """
+        Write one item with a PutItem conditional on its version attribute.
+        An item changed since it was read is re-read and transformed again.
+        Returns True if it was written.
+        """
+        version = self.migration.version_attribute
+        key = self.key_of(old)
+        if key != self.key_of(new):
+            raise ValueError(f"{self.migration.name}: versioned migrations can't change an item's key")
+        
+        for _ in range(MAX_VERSION_CONFLICTS):
+            if old.get(version) is None:
+                condition = {
+                    'ConditionExpression': 'attribute_exists(#key) AND attribute_not_exists(#version)',
+                    'ExpressionAttributeNames': {'#key': self.key_names[0], '#version': version},
+                }
+            else:
+                condition = {
+                    'ConditionExpression': '#version = :version',
+                    'ExpressionAttributeNames': {'#version': version},
+                    'ExpressionAttributeValues': {':version': old[version]},
+                }
+            try:
+                response = with_retries(self.target.put_item, Item=new, **condition)
+                self.writes.spend(consumed_units(response))
+                return True
+            except ClientError as e:
+                if not is_condition_failure(e):
+                    raise
+            
+            with self.lock:
+                self.conflicts += 1
+            response = with_retries(self.target.get_item, Key=key, ConsistentRead=True)
+            self.reads.spend(consumed_units(response))
+            old = response.get('Item')
+            # Deleted or already migrated in the meantime
+            new = self.migration.transform(old) if old is not None else None
+            if new is None or new == old:
+                return False
+        raise RuntimeError(f"{self.migration.name}: item {key} kept changing, giving up after {MAX_VERSION_CONFLICTS} tries")
+    
+    def write_each(self, changes):
+        """Write changed items one at a time with the migration's own write. Returns the number written."""
+        written = 0
+        for old, new in changes:
+            response = with_retries(self.migration.write, self.tables, old, new)
+            if response is not None:
+                self.writes.spend(consumed_units(response))
+                written += 1
+        return written
+    
+    def write(self, changes):
+        if self.migration.write:
+            return self.write_each(changes)
+        if self.migration.version_attribute:
+            return sum(self.write_versioned(old, new) for old, new in changes)
+        return self.write_batch(changes)
+    
+    def run_segment(self, segment):
+        progress = self.checkpoint.segment(segment)
+        if progress['done']:
+            return
+        
+        scan_kwargs = dict(self.migration.scan, Segment=segment, TotalSegments=self.args.segments)
+        if self.args.page_size:
+            scan_kwargs['Limit'] = self.args.page_size
+        if progress['last_key']:
+            scan_kwargs['ExclusiveStartKey'] = progress['last_key']
+        
+        while True:
+            response = with_retries(self.source.scan, **scan_kwargs)
+            self.reads.spend(consumed_units(response))
+            items = response.get('Items', [])
+            changes = self.changes(items)
+            
+            if self.args.dry_run:
+                self.check(changes)
+                written = 0
+            else:
+                written = self.write(changes) if changes else 0
+            
+            last_key = response.get('LastEvaluatedKey')
+            self.checkpoint.advance(segment, last_key, len(items), len(changes), written)
+            if last_key is None:
+                return
+            scan_kwargs['ExclusiveStartKey'] = last_key
+
+
+def run_migration(migration, tables, args):
+    """Run a migration over its table. Returns the totals (scanned, changed, written, ...)."""
+    run = Run(migration, tables, args)
+    action = 'dry run' if args.dry_run else f"writing to {run.target.name}"
+    print(f"{migration.name}: scanning {run.source.name} in {args.segments} segment(s), {args.workers} worker(s), {action}")
+    resumed = run.checkpoint.totals()
+    if resumed['scanned'] or resumed['done']:
+        print(f"  resuming {run.checkpoint.path}: {resumed['done']}/{args.segments} segments done, {resumed['scanned']} scanned")
+    
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(run.run_segment, segment) for segment in range(args.segments)]
+        pending = futures
+        while pending:
+            _, pending = wait(pending, timeout=PROGRESS_INTERVAL)
+            if pending:
+                totals = run.checkpoint.totals()
+                print(
+                    f"  {totals['done']}/{args.segments} segments done, {totals['scanned']} scanned, "
+                    f"{totals['changed']} changed, {run.reads.spent:.0f} RCU, {run.writes.spent:.0f} WCU"
+                )
+        # Surface the first worker error
+        for future in futures:
+            future.result()
+    
+    totals = run.checkpoint.totals()
+    totals.update({
+        'conflicts': run.conflicts,
+        'not_idempotent': run.not_idempotent,
+        'rcu': round(run.reads.spent, 1),
+        'wcu': round(run.writes.spent, 1),
+        'seconds': round(time.monotonic() - started, 1),
+    })
+    
+    print(
+        f"  {totals['scanned']} scanned, {totals['changed']} {'to change' if args.dry_run else 'changed'}, "
+        f"{totals['written']} written, {totals['conflicts']} version conflicts, "
+        f"{totals['rcu']} RCU / {totals['wcu']} WCU in {totals['seconds']}s"
+    )
+    for old, new in run.examples:
+        changed = sorted(name for name in set(old) | set(new) if old.get(name) != new.get(name))
+        diff = ', '.join(f"{name}: {old.get(name)!r} -> {new.get(name)!r}" for name in changed)
+        print(f"    {run.key_of(old) if run.in_place else old}: {diff}")
+    if run.not_idempotent:
+        print(f"  NOT IDEMPOTENT: transforming {run.not_idempotent} migrated item(s) again changed them")
+    return totals
+
+
+def add_runner_arguments(parser):
+    """The runner's options, shared with the tools built on it."""
+    parser.add_argument('--environment', default='dev', help='Terraform environment the table names are built for')
+    parser.add_argument('--local', action='store_true', help='Run against the local DynamoDB stand-in, seeded with the scenario data')
+    parser.add_argument('--dry-run', action='store_true', help='Transform without writing, show examples and check idempotency')
+    parser.add_argument('--show', type=int, default=3, help='Changes to print on a dry run')
+    parser.add_argument('--segments', type=int, default=4, help='Scan segments (TotalSegments)')
+    parser.add_argument('--workers', type=int, default=4, help='Threads working the segments')
+    parser.add_argument('--page-size', type=int, default=500, help='Items per Scan page (Limit)')
+    parser.add_argument('--max-rcu', type=float, default=100, help='Read capacity units per second on average (0: unlimited)')
+    parser.add_argument('--max-wcu', type=float, default=50, help='Write capacity units per second on average (0: unlimited)')
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: build/backfill/<migration>-<environment>.json)')
+    parser.add_argument('--no-checkpoint', action='store_true', help="Don't save progress")
+    parser.add_argument('--restart', action='store_true', help='Ignore a saved checkpoint and start over')
+
+
+def resolve_tables(args):
+    """
+    Get the terraform tables for the run's environment. With --local, installs
+    the local stand-in first. Returns (tables, stand-in or None).
+    """
+    local = None
+    if args.local:
+        from local_dynamodb import LocalDynamoDB
+        local = LocalDynamoDB.from_terraform()
+        local.install()
+        # The stand-in is gone after the run - nothing to resume, unless a file was asked for
+        args.no_checkpoint = args.no_checkpoint or not args.checkpoint
+        args.environment = 'local'
+    return find_dynamodb_tables(environment=args.environment), local
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a data migration over a DynamoDB table (tools/migrations.py)')
+    parser.add_argument('migration', nargs='?', help='Migration to run')
+    parser.add_argument('--list', action='store_true', help='List the migrations')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 1000], help='Organisation sizes to seed with --local')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    
+    if args.list or not args.migration:
+        for migration in MIGRATIONS:
+            target = f" -> {migration.target}" if migration.target else ''
+            print(f"{migration.name:<34} {migration.table}{target}: {migration.description}")
+        return 0
+    
+    migration = get_migration(args.migration)
+    if migration is None:
+        print(f"Unknown migration {args.migration} (see --list)")
+        return 1
+    
+    tables, local = resolve_tables(args)
+    if local is not None:
+        from stub_stripe import StubStripe
+        from scenarios import seed
+        seed(local, StubStripe().install(), args.sizes)
+    
+    totals = run_migration(migration, tables, args)
+    return 1 if totals['not_idempotent'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+DynamoDB access benchmark - boto3 resource Table vs utils.dynamodb.ClientTable
+Runs each handler's DynamoDB call sequence against canned wire responses
+(no network: requests are answered from a before-send hook), so the numbers
+cover request serialisation, response parsing and (un)marshalling only.
+
+Also reports the cold cost of importing boto3 and building each layer, and
+the capacity each handler consumes per table and index (the canned responses
+carry the ConsumedCapacity a real table would return, see tools/capacity.py),
+as collected by utils.telemetry.
+
+USAGE:
+    AWS_DEFAULT_REGION=eu-west-2 python tools/bench_dynamodb.py --members 100
+    python tools/bench_dynamodb.py --members 1000 --capacity-only --json capacity.json
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'api'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+
+import boto3  # noqa: E402
+from botocore.awsrequest import AWSResponse  # noqa: E402
+from utils.dynamodb import ClientTable, instrument_client  # noqa: E402
+from utils.telemetry import capture, start_request, finish_request  # noqa: E402
+from capacity import read_units, consumed_capacity  # noqa: E402
+
+
+class _Raw:
+    def __init__(self, body):
+        self.body = body
+    
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def profile_item(user_id):
+    return {
+        'user_id': {'S': user_id},
+        'display_name': {'S': f'User {user_id[-4:]}'},
+        'email': {'S': f'{user_id[-4:]}@example.com'},
+        'company': {'S': 'Example Ltd'},
+        'country': {'S': 'GB'},
+        'created_at': {'S': '2026-03-14T09:26:53.589793'},
+        'updated_at': {'S': '2026-09-01T12:00:00.000000'},
+    }
+
+
+def member_item(index):
+    return {
+        'organisation_id': {'S': 'org-1'},
+        'user_id': {'S': f'user-{index:08d}'},
+        'role': {'S': 'owner' if index == 0 else 'member'},
+        'joined_at': {'S': '2026-03-14T09:26:53.589793'},
+    }
+
+
+def subscription_item():
+    return {
+        'subscription_id': {'S': 'sub-1'},
+        'organisation_id': {'S': 'org-1'},
+        'status': {'S': 'active'},
+        'plan': {'S': 'team'},
+        'billing_period': {'S': 'yearly'},
+        'user_limit': {'N': '25'},
+        'current_period_start': {'N': '1760000000'},
+        'current_period_end': {'N': '1791536000'},
+        'cancel_at_period_end': {'BOOL': False},
+        'mrr': {'N': '4158'},
+        'expiry_bucket': {'S': '2026-10-08'},
+        'expires_at': {'N': '1791536000'},
+    }
+
+
+def build_responses(member_count):
+    org = {
+        'organisation_id': {'S': 'org-1'},
+        'name': {'S': 'Example Ltd'},
+        'owner_id': {'S': 'user-00000000'},
+        'created_at': {'S': '2026-03-14T09:26:53.589793'},
+    }
+    responses = {
+        'GetItem:profile': {'Item': profile_item('user-00000000')},
+        'GetItem:org': {'Item': org},
+        'Query:membership': {'Items': [member_item(0)], 'Count': 1, 'ScannedCount': 1},
+        'Query:members': {
+            'Items': [member_item(i) for i in range(member_count)],
+            'Count': member_count,
+            'ScannedCount': member_count,
+        },
+        'Query:count': {'Count': member_count, 'ScannedCount': member_count},
+        'Query:subscription': {'Items': [subscription_item()], 'Count': 1, 'ScannedCount': 1},
+    }
+    
+    # What each response read: (table, index, items read, GetItem)
+    reads = {
+        'GetItem:profile': ('profiles', None, [responses['GetItem:profile']['Item']], True),
+        'GetItem:org': ('orgs', None, [org], True),
+        'Query:membership': ('members', 'user_id-index', responses['Query:membership']['Items'], False),
+        'Query:members': ('members', None, responses['Query:members']['Items'], False),
+        # COUNT queries still read (and pay for) every item
+        'Query:count': ('members', None, responses['Query:members']['Items'], False),
+        'Query:subscription': ('subscriptions', 'organisation_id-index', responses['Query:subscription']['Items'], False),
+    }
+    for key, (table, index, items, per_item) in reads.items():
+        responses[key]['ConsumedCapacity'] = consumed_capacity(table, read=read_units(items, per_item=per_item), index=index)
+    return responses
+
+
+# Each handler's DynamoDB calls: (operation, table, response key, kwargs)
+def handler_calls(member_count):
+    membership = ('query', 'members', 'Query:membership', {
+        'IndexName': 'user_id-index',
+        'KeyConditionExpression': 'user_id = :uid',
+        'ExpressionAttributeValues': {':uid': 'user-00000000'},
+    })
+    org = ('get_item', 'orgs', 'GetItem:org', {'Key': {'organisation_id': 'org-1'}})
+    count = ('query', 'members', 'Query:count', {
+        'KeyConditionExpression': 'organisation_id = :oid',
+        'ExpressionAttributeValues': {':oid': 'org-1'},
+        'Select': 'COUNT',
+    })
+    members = ('query', 'members', 'Query:members', {
+        'KeyConditionExpression': 'organisation_id = :oid',
+        'ExpressionAttributeValues': {':oid': 'org-1'},
+    })
+    profile = ('get_item', 'profiles', 'GetItem:profile', {'Key': {'user_id': 'user-00000000'}})
+    subscription = ('query', 'subscriptions', 'Query:subscription', {
+        'IndexName': 'organisation_id-index',
+        'KeyConditionExpression': 'organisation_id = :oid',
+        'ExpressionAttributeValues': {':oid': 'org-1'},
+    })
+    return {
+        'get_profile': [profile],
+        'get_organisation': [membership, org, count],
+        f'get_members ({member_count})': [membership, members] + [profile] * member_count,
+        'get_subscription': [membership, subscription, org, count],
+    }
+
+
+def make_client(responses, pending):
+    client = boto3.client('dynamodb')
+    
+    def answer(request, **kwargs):
+        body = json.dumps(responses[pending.pop(0)]).encode('utf-8')
+        return AWSResponse(request.url, 200, {'Content-Type': 'application/x-amz-json-1.0'}, _Raw(body))
+    
+    client.meta.events.register('before-send.dynamodb', answer)
+    return client
+
+
+def run_handler(tables, calls, pending):
+    for operation, table, response_key, kwargs in calls:
+        pending.append(response_key)
+        getattr(tables[table], operation)(**kwargs)
+
+
+def capacity_report(tables, member_count, pending):
+    """Run each handler once and collect its consumed capacity from telemetry."""
+    report = {}
+    with capture() as sink:
+        for handler, calls in handler_calls(member_count).items():
+            start_request(None, False, handler)
+            run_handler(tables, calls, pending)
+            finish_request(200)
+    for record in sink.requests():
+        report[record['route']] = {
+            'rcu': record['ConsumedRCU'],
+            'wcu': record['ConsumedWCU'],
+            'calls': record['DynamoDBCalls'],
+            'capacity': record['capacity'],
+        }
+    return report
+
+
+def print_capacity(report):
+    print(f"\n{'handler':<22} {'calls':>6} {'RCU':>8} {'WCU':>8}  per table/index")
+    for handler, usage in report.items():
+        breakdown = ', '.join(
+            f"{key} {units['rcu']:g}r/{units['wcu']:g}w" for key, units in sorted(usage['capacity'].items())
+        )
+        print(f"{handler:<22} {usage['calls']:>6} {usage['rcu']:>8g} {usage['wcu']:>8g}  {breakdown}")
+
+
+def cold_start(statement):
+    code = f"import time; t = time.perf_counter(); import boto3; {statement}; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, env=os.environ)
+    return float(output.stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DynamoDB resource vs client access')
+    parser.add_argument('--members', type=int, default=100, help='Organisation size for member queries')
+    parser.add_argument('--repeat', type=int, default=200, help='Iterations per measurement')
+    parser.add_argument('--capacity-only', action='store_true', help='Only report consumed capacity')
+    parser.add_argument('--json', help='Also write the capacity report to this file')
+    args = parser.parse_args()
+    
+    responses = build_responses(args.members)
+    pending = []
+    
+    # Instrumented as in production, so calls and capacity reach telemetry
+    instrumented = instrument_client(make_client(responses, pending))
+    report = capacity_report(
+        {name: ClientTable(name, instrumented) for name in ('profiles', 'orgs', 'members', 'subscriptions')},
+        args.members, pending
+    )
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'members': args.members, 'handlers': report}, f, indent=2)
+    if args.capacity_only:
+        print_capacity(report)
+        return
+    
+    resource_client = make_client(responses, pending)
+    resource = boto3.resource('dynamodb')
+    resource.meta.client = resource_client
+    resource_tables = {name: resource.Table(name) for name in ('profiles', 'orgs', 'members', 'subscriptions')}
+    for table in resource_tables.values():
+        table.meta.client = resource_client
+    
+    client = make_client(responses, pending)
+    client_tables = {name: ClientTable(name, client) for name in ('profiles', 'orgs', 'members', 'subscriptions')}
+    
+    print(f"{'handler':<22} {'resource':>12} {'client':>12} {'speedup':>8}")
+    for handler, calls in handler_calls(args.members).items():
+        repeat = max(1, args.repeat // max(1, len(calls) // 10))
+        timings = []
+        for tables in (resource_tables, client_tables):
+            seconds = min(timeit.repeat(lambda: run_handler(tables, calls, pending), number=repeat, repeat=3))
+            timings.append(seconds / repeat)
+        print(f"{handler:<22} {timings[0] * 1e6:10.0f}us {timings[1] * 1e6:10.0f}us {timings[0] / timings[1]:7.1f}x")
+    
+    resource_cold = cold_start("boto3.resource('dynamodb').Table('x')")
+    client_cold = cold_start("boto3.client('dynamodb')")
+    print(f"{'cold import + build':<22} {resource_cold * 1e3:10.0f}ms {client_cold * 1e3:10.0f}ms {resource_cold / client_cold:7.1f}x")
+    
+    print_capacity(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+End-to-end handler benchmark
+Runs every lambda_handler (tools/scenarios.py) against the in-memory DynamoDB
+stand-in (tools/local_dynamodb.py) and the Stripe stub (tools/stub_stripe.py),
+seeded with organisations of 1, 10 and 1000 members, through the same
+error_handler/telemetry path as in Lambda.
+
+PER SCENARIO AND ORG SIZE:
+- Latency p50/p95/p99 and mean (ms), plus the first call including import
+- DynamoDB and Stripe calls per request, consumed RCU/WCU (from telemetry)
+- Allocations per request (tracemalloc, separate untimed runs): peak KB and
+  blocks still allocated afterwards
+- Status codes returned (unexpected ones are flagged)
+
+Results are written as JSON; --compare prints the change against an earlier
+run.
+
+USAGE:
+    python tools/bench_handlers.py
+    python tools/bench_handlers.py --sizes 1000 --scenario members --iterations 200
+    python tools/bench_handlers.py --output build/after.json --compare build/before.json
+"""
+import io
+import os
+import sys
+import gc
+import json
+import math
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..', 'src', 'api'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+os.environ.setdefault('ARCHIVE_DIR', tempfile.mkdtemp(prefix='bench-archive-'))
+
+from local_dynamodb import LocalDynamoDB  # noqa: E402
+from stub_stripe import StubStripe  # noqa: E402
+from scenarios import ORG_SIZES, FakeContext, get_scenarios, seed, function_name, load_handler, status_of  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(TOOLS_DIR, '..', 'build', 'bench_handlers.json')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def invoke(handler, scenario, world, iteration, quiet=True):
+    """Run one invocation. Returns (response, elapsed ms, telemetry record)."""
+    from utils.telemetry import capture
+    
+    event = scenario.event(world, iteration)
+    context = FakeContext(function_name(scenario.module))
+    output = io.StringIO() if quiet else sys.stdout
+    with capture() as sink, redirect_stdout(output):
+        started = time.perf_counter()
+        response = handler(event, context)
+        elapsed = (time.perf_counter() - started) * 1000
+    records = sink.requests()
+    return response, elapsed, records[-1] if records else {}
+
+
+def run_scenario(scenario, world, args, local, stripe_stub):
+    """Benchmark one scenario against one world."""
+    def restore():
+        if scenario.restore:
+            scenario.restore(local, stripe_stub, world)
+    
+    # Cold: import plus first call
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        handler = load_handler(scenario.module)
+    import_ms = (time.perf_counter() - started) * 1000
+    _, first_ms, _ = invoke(handler, scenario, world, 0, args.quiet)
+    restore()
+    
+    for iteration in range(args.warmup):
+        invoke(handler, scenario, world, iteration, args.quiet)
+        restore()
+    
+    timings = []
+    dynamodb_calls = []
+    stripe_calls = []
+    rcu = []
+    wcu = []
+    statuses = {}
+    for iteration in range(args.iterations):
+        response, elapsed, record = invoke(handler, scenario, world, iteration, args.quiet)
+        timings.append(elapsed)
+        dynamodb_calls.append(record.get('DynamoDBCalls', 0))
+        stripe_calls.append(record.get('StripeCalls', 0))
+        rcu.append(record.get('ConsumedRCU', 0))
+        wcu.append(record.get('ConsumedWCU', 0))
+        status = str(status_of(response))
+        statuses[status] = statuses.get(status, 0) + 1
+        restore()
+    
+    # Allocations are measured separately - tracemalloc slows everything down
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for iteration in range(args.alloc_iterations):
+            gc.collect()
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            blocks = sys.getallocatedblocks()
+            invoke(handler, scenario, world, iteration, args.quiet)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - baseline) / 1024)
+            retained.append(sys.getallocatedblocks() - blocks)
+            restore()
+    finally:
+        tracemalloc.stop()
+    
+    expected = {str(code) for code in scenario.expected}
+    return {
+        'scenario': scenario.name,
+        'module': scenario.module,
+        'org_size': world['size'],
+        'iterations': args.iterations,
+        'import_ms': round(import_ms, 2),
+        'first_call_ms': round(first_ms, 2),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'dynamodb_calls': round(sum(dynamodb_calls) / len(dynamodb_calls), 2),
+        'max_dynamodb_calls': max(dynamodb_calls),
+        'stripe_calls': round(sum(stripe_calls) / len(stripe_calls), 2),
+        'rcu': round(sum(rcu) / len(rcu), 2),
+        'wcu': round(sum(wcu) / len(wcu), 2),
+        'alloc_peak_kb': round(percentile(peaks, 50), 1) if peaks else None,
+        'alloc_retained_blocks': int(percentile(retained, 50)) if retained else None,
+        'status_codes': statuses,
+        'unexpected_status': sorted(set(statuses) - expected),
+    }
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=TOOLS_DIR)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_header():
+    print(f"{'scenario':<42} {'org':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ddb':>6} {'stripe':>6} {'RCU':>7} {'peakKB':>8}  status")
+
+
+def print_result(result):
+    flag = ' UNEXPECTED' if result['unexpected_status'] else ''
+    statuses = ','.join(f"{code}x{count}" for code, count in sorted(result['status_codes'].items()))
+    print(
+        f"{result['scenario']:<42} {result['org_size']:>5} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+        f"{result['p99_ms']:>8.2f} {result['dynamodb_calls']:>6g} {result['stripe_calls']:>6g} {result['rcu']:>7g} "
+        f"{result['alloc_peak_kb'] or 0:>8.0f}  {statuses}{flag}"
+    )
+
+
+def print_comparison(results, baseline):
+    previous = {(result['scenario'], result['org_size']): result for result in baseline['results']}
+    print(f"\nChange against {baseline['meta'].get('revision') or 'baseline'} ({baseline['meta'].get('timestamp')}):")
+    print(f"{'scenario':<42} {'org':>5} {'p50':>9} {'p95':>9} {'ddb calls':>12} {'peakKB':>9}")
+    
+    def change(before, after):
+        if not before:
+            return '     n/a'
+        return f"{(after - before) / before * 100:+7.1f}%"
+    
+    for result in results:
+        before = previous.get((result['scenario'], result['org_size']))
+        if before is None:
+            continue
+        print(
+            f"{result['scenario']:<42} {result['org_size']:>5} {change(before['p50_ms'], result['p50_ms']):>9} "
+            f"{change(before['p95_ms'], result['p95_ms']):>9} "
+            f"{before['dynamodb_calls']:>5g} -> {result['dynamodb_calls']:<4g} "
+            f"{change(before['alloc_peak_kb'], result['alloc_peak_kb']):>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every handler against local DynamoDB and Stripe stand-ins')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(ORG_SIZES), help='Organisation sizes to seed and run')
+    parser.add_argument('--scenario', nargs='+', help='Only run scenarios whose name contains one of these')
+    parser.add_argument('--tag', nargs='+', help='Only run scenarios with one of these tags (read, write, stripe, scheduled)')
+    parser.add_argument('--iterations', type=int, default=50, help='Timed invocations per scenario and size')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed invocations before timing')
+    parser.add_argument('--alloc-iterations', type=int, default=5, help='Invocations under tracemalloc (0 to skip)')
+    parser.add_argument('--dynamodb-latency-ms', type=float, default=0, help='Simulated latency per DynamoDB call')
+    parser.add_argument('--stripe-latency-ms', type=float, default=0, help='Simulated latency per Stripe call')
+    parser.add_argument('--rate-limits', action='store_true', help='Keep rate limiting on (utils.rate_limit)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Where to write the JSON results')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    parser.add_argument('--verbose', dest='quiet', action='store_false', help="Show the handlers' own log output")
+    args = parser.parse_args()
+    
+    local = LocalDynamoDB.from_terraform(latency_ms=args.dynamodb_latency_ms)
+    local.install()
+    if not args.rate_limits:
+        # Every iteration is the same user, who would soon be rate limited
+        os.environ['RATE_LIMITS_TABLE_NAME'] = ''
+    stripe_stub = StubStripe(latency_ms=args.stripe_latency_ms).install()
+    worlds = seed(local, stripe_stub, args.sizes)
+    
+    results = []
+    print_header()
+    for scenario in get_scenarios(args.scenario, args.tag):
+        for size in args.sizes:
+            if size < scenario.min_size:
+                continue
+            results.append(run_scenario(scenario, worlds[size], args, local, stripe_stub))
+            print_result(results[-1])
+    
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': args.sizes,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'dynamodb_latency_ms': args.dynamodb_latency_ms,
+            'stripe_latency_ms': args.stripe_latency_ms,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+    
+    return 1 if any(result['unexpected_status'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
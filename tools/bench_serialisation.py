@@ -0,0 +1,123 @@
+"""
+Serialisation micro-benchmark
+Compares the response JSON paths over realistic member and subscription
+payloads (DynamoDB-style, numbers as Decimal).
+
+PATHS:
+- baseline: json.dumps(default=callback) converting each Decimal to float
+- stdlib: utils.serialisation with the standard library encoder
+- orjson: utils.serialisation with orjson (skipped if not installed)
+
+USAGE:
+    python tools/bench_serialisation.py --members 1000 --repeat 200
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'api'))
+
+from utils import serialisation  # noqa: E402
+
+
+def decimal_default(obj):
+    # Previous behaviour: one Python callback per Decimal
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+def build_members(count):
+    roles = ['owner'] + ['admin'] * min(3, count - 1) + ['member'] * max(0, count - 4)
+    return [
+        {
+            'user_id': f'5f1c2a9e-0000-4000-8000-{index:012d}',
+            'role': roles[index],
+            'joined_at': '2026-03-14T09:26:53.589793',
+            'display_name': f'Member {index}',
+            'email': f'member{index}@example.com',
+        }
+        for index in range(count)
+    ]
+
+
+def build_subscription():
+    return {
+        'has_subscription': True,
+        'subscription_type': 'organisation',
+        'status': 'active',
+        'plan': 'team',
+        'billing_period': 'yearly',
+        'user_limit': Decimal('25'),
+        'user_count': Decimal('11'),
+        'current_period_start': Decimal('1760000000'),
+        'current_period_end': Decimal('1791536000'),
+        'trial_end': None,
+        'cancel_at_period_end': False,
+        'mrr': Decimal('4158.33'),
+        'organisation': {'organisation_id': 'org-1', 'name': 'Example Ltd', 'user_role': 'owner'},
+    }
+
+
+def bench(label, func, repeat):
+    seconds = min(timeit.repeat(func, number=repeat, repeat=5)) / repeat
+    print(f"  {label:<10} {seconds * 1e6:10.1f} us")
+    return seconds
+
+
+def run_payload(name, payload, repeat):
+    print(f"{name}:")
+    results = {'baseline': bench('baseline', lambda: json.dumps(payload, default=decimal_default), repeat)}
+    
+    orjson = serialisation.orjson
+    serialisation.orjson = None
+    try:
+        results['stdlib'] = bench('stdlib', lambda: serialisation.dumps(payload), repeat)
+    finally:
+        serialisation.orjson = orjson
+    
+    if orjson is not None:
+        results['orjson'] = bench('orjson', lambda: serialisation.dumps(payload), repeat)
+    else:
+        print("  orjson     not installed")
+    
+    fastest = min(results, key=results.get)
+    print(f"  -> {fastest} is {results['baseline'] / results[fastest]:.1f}x baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark response serialisation')
+    parser.add_argument('--members', type=int, default=100, help='Members in the member list payload')
+    parser.add_argument('--repeat', type=int, default=500, help='Iterations per measurement')
+    args = parser.parse_args()
+    
+    subscription = build_subscription()
+    run_payload('subscription status', subscription, args.repeat * 10)
+    run_payload(f'member list ({args.members})', build_members(args.members), args.repeat)
+    run_payload('me aggregate', {
+        'subscription': subscription,
+        'members': build_members(args.members),
+        'member_count': Decimal(args.members),
+    }, args.repeat)
+    
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
+        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+    }
+    print("headers:")
+    bench('literal', lambda: {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
+        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+    }, args.repeat * 100)
+    bench('template', lambda: dict(headers), args.repeat * 100)
+
+
+if __name__ == '__main__':
+    main()
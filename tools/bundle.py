@@ -0,0 +1,385 @@
+"""
+Per-function Lambda bundler
+Builds a minimal zip per Lambda function from the handler's static import
+graph, instead of shipping the whole of src/api to every function.
+
+LOGIC:
+1. Read the functions (handler, runtime, layers) from terraform/*.tf
+2. Walk each handler's imports with ast - including imports inside
+   functions, since lazily imported modules are still needed at runtime
+3. Bundle the local modules reached (plus their package __init__ files),
+   each with a precompiled __pycache__ .pyc
+4. Third-party imports are resolved as provided by the runtime (boto3),
+   by an attached layer, or vendored from --vendor (copied without tests,
+   docs or metadata; vendored packages nothing imports are left out).
+   Vendored compiled extensions must match the function's runtime and
+   architecture - a .cpython-311 or macOS build fails the build (exit 1)
+5. Report bundle size and estimated import time (measured by importing the
+   handler from the extracted bundle with -X importtime)
+
+Set lambda_bundle_dir in terraform to deploy the bundles instead of the
+shared archive.
+
+USAGE:
+    python tools/bundle.py                         # all functions -> build/lambda
+    python tools/bundle.py --function get_profile --json report.json
+    pip install --target vendor --platform manylinux2014_x86_64 --python-version 3.12 \
+        --only-binary=:all: brotli && python tools/bundle.py --vendor vendor
+"""
+import os
+import re
+import ast
+import sys
+import json
+import shutil
+import zipfile
+import argparse
+import tempfile
+import py_compile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from import_report import API_DIR, measure, get_total_ms  # noqa: E402
+from terraform_config import TERRAFORM_DIR, find_lambda_functions  # noqa: E402
+
+REPO_DIR = os.path.normpath(os.path.join(API_DIR, '..', '..'))
+DEFAULT_OUTPUT_DIR = os.path.join(REPO_DIR, 'build', 'lambda')
+
+# Packages the Lambda Python runtime already provides
+RUNTIME_PACKAGES = ['boto3', 'botocore', 's3transfer', 'jmespath', 'dateutil', 'urllib3']
+
+# Never copied out of vendored packages
+EXCLUDED_DIRS = {'tests', 'test', 'testing', 'docs', 'doc', 'examples', '__pycache__'}
+EXCLUDED_SUFFIXES = ('.md', '.rst', '.pyi', '.pyc', '.c', '.h')
+
+# Compiled extension ABI tag, e.g. _brotli.cpython-311-x86_64-linux-gnu.so
+_EXTENSION_TAG = re.compile(r'\.cpython-(\d+)-[^.]*\.so$')
+
+# ELF e_machine of each Lambda architecture
+ELF_MACHINES = {'x86_64': 0x3e, 'arm64': 0xb7}
+
+_DOTTED = re.compile(r'^[a-z_][a-z0-9_]*(\.[a-z_][a-z0-9_]*)+$')
+
+# Fixed timestamp so identical inputs give identical zips (stable source_code_hash)
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+def module_path(module, api_dir=API_DIR):
+    """Get the file for a local module name, or None if it isn't local."""
+    base = os.path.join(api_dir, *module.split('.'))
+    if os.path.isfile(base + '.py'):
+        return base + '.py'
+    if os.path.isfile(os.path.join(base, '__init__.py')):
+        return os.path.join(base, '__init__.py')
+    return None
+
+
+def _is_import_error_guard(handler):
+    names = []
+    if isinstance(handler.type, ast.Name):
+        names = [handler.type.id]
+    elif isinstance(handler.type, ast.Tuple):
+        names = [elt.id for elt in handler.type.elts if isinstance(elt, ast.Name)]
+    return 'ImportError' in names or 'ModuleNotFoundError' in names
+
+
+def find_imports(path):
+    """
+    Get the modules a file imports, anywhere in the file.
+    Returns ({module: optional}, dynamic) - optional when guarded by except
+    ImportError; dynamic holds dotted string constants of files that call
+    importlib.import_module (e.g. the router's route table), which may name
+    modules imported by name at runtime.
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    
+    optional_nodes = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Try) and any(_is_import_error_guard(h) for h in node.handlers):
+            for child in node.body:
+                optional_nodes.update(id(n) for n in ast.walk(child))
+    
+    imports = {}
+    for node in ast.walk(tree):
+        names = []
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # "from utils import serialisation" may name a submodule
+            names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        for name in names:
+            optional = id(node) in optional_nodes
+            imports[name] = imports.get(name, True) and optional
+    
+    dynamic = set()
+    calls_import_module = any(
+        isinstance(node, ast.Attribute) and node.attr == 'import_module'
+        for node in ast.walk(tree)
+    )
+    if calls_import_module:
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and _DOTTED.match(node.value):
+                dynamic.add(node.value)
+    return imports, dynamic
+
+
+def resolve_graph(module, api_dir=API_DIR):
+    """
+    Walk a handler's import graph.
+    Returns (local files, {third-party top-level package: optional}).
+    """
+    files = set()
+    external = {}
+    pending = [module]
+    seen = set()
+    
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        
+        path = module_path(name, api_dir)
+        if path is None:
+            top = name.split('.')[0]
+            if module_path(top, api_dir) is None and top not in sys.stdlib_module_names:
+                external.setdefault(top, True)
+            continue
+        
+        files.add(path)
+        # Importing a.b.c runs a/__init__ and a/b/__init__ first
+        parts = name.split('.')
+        for depth in range(1, len(parts)):
+            parent = '.'.join(parts[:depth])
+            if module_path(parent, api_dir):
+                pending.append(parent)
+        
+        imports, dynamic = find_imports(path)
+        # Names used with import_module only count when they are local modules
+        pending.extend(name for name in dynamic if module_path(name, api_dir))
+        
+        for imported, optional in imports.items():
+            top = imported.split('.')[0]
+            if module_path(top, api_dir) is None:
+                if top not in sys.stdlib_module_names:
+                    external[top] = external.get(top, True) and optional
+            elif module_path(imported, api_dir):
+                pending.append(imported)
+    
+    return files, external
+
+
+def layer_packages(tf_dir=TERRAFORM_DIR):
+    """Get the top-level packages each layer provides ({layer: [packages]})."""
+    layers = {}
+    for entry in sorted(os.listdir(tf_dir)):
+        requirements = os.path.join(tf_dir, entry, 'requirements.txt')
+        if entry.endswith('_layer') and os.path.isfile(requirements):
+            with open(requirements) as f:
+                layers[entry[:-len('_layer')]] = [
+                    re.split(r'[=<>!~\[ ]', line.strip())[0].lower().replace('-', '_')
+                    for line in f if line.strip() and not line.startswith('#')
+                ]
+    return layers
+
+
+def vendored_files(package, vendor_dir):
+    """Get (path, archive name) pairs for a vendored package, minus tests/docs."""
+    root = os.path.join(vendor_dir, package)
+    if os.path.isfile(root + '.py'):
+        return [(root + '.py', package + '.py')]
+    
+    pairs = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS)
+        for filename in sorted(filenames):
+            if filename.endswith(EXCLUDED_SUFFIXES):
+                continue
+            path = os.path.join(dirpath, filename)
+            pairs.append((path, os.path.relpath(path, vendor_dir).replace(os.sep, '/')))
+    return pairs
+
+
+def runtime_cache_tag(runtime):
+    """"python3.12" -> "cpython-312"."""
+    match = re.match(r'python(\d+)\.(\d+)', runtime or '')
+    return f"cpython-{match.group(1)}{match.group(2)}" if match else None
+
+
+def check_extension(path, archive_name, runtime, architecture):
+    """Get why a vendored file can't be loaded by the Lambda runtime, or None."""
+    if archive_name.endswith(('.pyd', '.dylib')):
+        return 'not built for Linux'
+    if not archive_name.endswith('.so'):
+        return None
+    
+    match = _EXTENSION_TAG.search(archive_name)
+    cache_tag = runtime_cache_tag(runtime)
+    if match and cache_tag and f"cpython-{match.group(1)}" != cache_tag:
+        return f"built for cpython-{match.group(1)}, runtime is {runtime}"
+    
+    # abi3 and untagged libraries name no platform - check the binary itself
+    with open(path, 'rb') as f:
+        header = f.read(20)
+    if header[:4] != b'\x7fELF':
+        return 'not built for Linux'
+    machine = int.from_bytes(header[18:20], 'little' if header[5] == 1 else 'big')
+    if machine != ELF_MACHINES.get(architecture):
+        return f"not built for {architecture}"
+    return None
+
+
+def _write(archive, name, data):
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+    info.external_attr = 0o644 << 16
+    info.compress_type = zipfile.ZIP_DEFLATED
+    archive.writestr(info, data)
+
+
+def _compile(path):
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, 'module.pyc')
+        # Unchecked hash pycs stay valid regardless of zip timestamps
+        py_compile.compile(
+            path, cfile=target, doraise=True,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH
+        )
+        with open(target, 'rb') as f:
+            return f.read()
+
+
+def build_bundle(name, function, output_dir, vendor_dir=None, layers=None, compile_pyc=True):
+    """Build one function's zip. Returns the report entry for it."""
+    files, external = resolve_graph(function['module'])
+    layers = layers or {}
+    
+    attached = {package for layer in function['layers'] for package in layers.get(layer, [])}
+    used_layers = set()
+    vendored = []
+    missing = []
+    for package, optional in sorted(external.items()):
+        if package in RUNTIME_PACKAGES:
+            continue
+        providing = [layer for layer in function['layers'] if package in layers.get(layer, [])]
+        if providing:
+            used_layers.update(providing)
+        elif vendor_dir and os.path.exists(os.path.join(vendor_dir, package)) or \
+                vendor_dir and os.path.isfile(os.path.join(vendor_dir, package + '.py')):
+            vendored.append(package)
+        elif not optional and package not in attached:
+            missing.append(package)
+    
+    cache_tag = runtime_cache_tag(function['runtime'])
+    compile_pyc = compile_pyc and cache_tag == sys.implementation.cache_tag
+    
+    entries = [(path, os.path.relpath(path, API_DIR).replace(os.sep, '/')) for path in sorted(files)]
+    incompatible = []
+    for package in vendored:
+        for path, archive_name in vendored_files(package, vendor_dir):
+            entries.append((path, archive_name))
+            reason = check_extension(path, archive_name, function['runtime'], function['architecture'])
+            if reason:
+                incompatible.append(f"{archive_name} ({reason})")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    zip_path = os.path.join(output_dir, f"{name}.zip")
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        for path, archive_name in entries:
+            with open(path, 'rb') as f:
+                _write(archive, archive_name, f.read())
+            if compile_pyc and archive_name.endswith('.py'):
+                directory, filename = os.path.split(archive_name)
+                pyc_name = f"{filename[:-3]}.{cache_tag}.pyc"
+                _write(archive, '/'.join(filter(None, [directory, '__pycache__', pyc_name])), _compile(path))
+    
+    return {
+        'function': name,
+        'handler': function['handler'],
+        'zip': os.path.relpath(zip_path, REPO_DIR),
+        'files': len(entries),
+        'modules': sorted(os.path.relpath(path, API_DIR).replace(os.sep, '/') for path in files),
+        'size_bytes': os.path.getsize(zip_path),
+        'pyc': compile_pyc,
+        'vendored': vendored,
+        'layers_used': sorted(used_layers),
+        'layers_unused': sorted(set(function['layers']) - used_layers),
+        'missing': missing,
+        'incompatible': incompatible,
+    }
+
+
+def estimate_import_ms(zip_path, module):
+    """Import the handler from the extracted bundle and return its import time."""
+    with tempfile.TemporaryDirectory() as tmp:
+        with zipfile.ZipFile(zip_path) as archive:
+            archive.extractall(tmp)
+        return get_total_ms(module, measure(module, tmp))
+
+
+def shared_archive_size():
+    """Size of the shared src/api archive every function ships today (for comparison)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        base = shutil.make_archive(os.path.join(tmp, 'api'), 'zip', API_DIR)
+        return os.path.getsize(base)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build minimal per-function Lambda bundles')
+    parser.add_argument('--function', action='append', help='Terraform function name (default: all)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help='Directory for the zips')
+    parser.add_argument('--vendor', help='Directory of installed third-party packages to vendor from')
+    parser.add_argument('--no-pyc', action='store_true', help='Ship sources only')
+    parser.add_argument('--no-timing', action='store_true', help='Skip the import time estimate')
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+    
+    functions = find_lambda_functions()
+    names = args.function or sorted(functions)
+    unknown = [name for name in names if name not in functions]
+    if unknown:
+        parser.error(f"Unknown function(s): {', '.join(unknown)}")
+    
+    layers = layer_packages()
+    runtimes = {functions[name]['runtime'] for name in names}
+    if not args.no_pyc and any(runtime_cache_tag(r) != sys.implementation.cache_tag for r in runtimes):
+        print(f"NOTE: running {sys.implementation.cache_tag}, runtime is {', '.join(sorted(runtimes))} "
+              f"- .pyc files are skipped (run with the runtime's Python to include them)\n")
+    
+    results = []
+    for name in names:
+        result = build_bundle(name, functions[name], args.output, args.vendor, layers, not args.no_pyc)
+        if not args.no_timing:
+            result['import_ms'] = round(estimate_import_ms(os.path.join(REPO_DIR, result['zip']), functions[name]['module']), 1)
+        results.append(result)
+    
+    shared_size = shared_archive_size()
+    print(f"{'function':<22} {'files':>5} {'size':>9} {'import':>9}  notes")
+    for result in results:
+        notes = []
+        if result['layers_unused']:
+            notes.append(f"unused layer: {', '.join(result['layers_unused'])}")
+        if result['missing']:
+            notes.append(f"MISSING: {', '.join(result['missing'])}")
+        if result['vendored']:
+            notes.append(f"vendored: {', '.join(result['vendored'])}")
+        if result['incompatible']:
+            notes.append(f"INCOMPATIBLE: {', '.join(result['incompatible'])}")
+        import_ms = f"{result['import_ms']:.1f}ms" if 'import_ms' in result else '-'
+        print(f"{result['function']:<22} {result['files']:>5} {result['size_bytes'] / 1024:>7.1f}KB {import_ms:>9}  {'; '.join(notes)}")
+    print(f"\nshared src/api archive: {shared_size / 1024:.1f}KB per function")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'shared_archive_bytes': shared_size, 'functions': results}, f, indent=2)
+    
+    if any(result['incompatible'] for result in results):
+        print("\nVendored extensions must be built for the function's runtime - install them with "
+              "pip install --target <dir> --platform manylinux2014_<arch> --python-version <version> --only-binary=:all:")
+    
+    if any(result['missing'] or result['incompatible'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+DynamoDB capacity estimates for local tools
+Applies DynamoDB's item-size and capacity-unit rules to items in wire format
+({'S': 'x'}), so benchmarks and local stand-ins can return the
+ConsumedCapacity blocks a real table would (ReturnConsumedCapacity=INDEXES).
+
+RULES:
+- Item size: UTF-8 attribute names plus values (strings by UTF-8 length,
+  numbers by significant digits, maps/lists with 3 bytes of overhead plus
+  1 byte per element)
+- Reads: 4KB per RCU, eventually consistent reads cost half; Query and Scan
+  round the total of all items read (not each item), before any filter
+- Writes: 1KB per WCU, rounded up per item, at least 1 WCU
+"""
+import math
+
+READ_UNIT_BYTES = 4096
+WRITE_UNIT_BYTES = 1024
+
+
+def _number_size(text):
+    digits = text.lstrip('-').replace('.', '').split('e')[0].split('E')[0].strip('0')
+    return math.ceil(max(1, len(digits)) / 2) + 1
+
+
+def value_size(attribute):
+    """Size in bytes of a wire-format attribute value."""
+    for type_key, value in attribute.items():
+        if type_key == 'S':
+            return len(value.encode('utf-8'))
+        if type_key == 'N':
+            return _number_size(value)
+        if type_key == 'B':
+            return len(value)
+        if type_key in ('BOOL', 'NULL'):
+            return 1
+        if type_key == 'SS':
+            return sum(len(item.encode('utf-8')) for item in value)
+        if type_key == 'NS':
+            return sum(_number_size(item) for item in value)
+        if type_key == 'BS':
+            return sum(len(item) for item in value)
+        if type_key == 'M':
+            return 3 + sum(len(name.encode('utf-8')) + value_size(item) + 1 for name, item in value.items())
+        if type_key == 'L':
+            return 3 + sum(value_size(item) + 1 for item in value)
+    return 0
+
+
+def item_size(item):
+    """Size in bytes of a wire-format item."""
+    return sum(len(name.encode('utf-8')) + value_size(value) for name, value in item.items())
+
+
+def read_units(items, consistent=False, per_item=False):
+    """RCU for reading items - GetItem/BatchGetItem round per item, Query/Scan the total."""
+    sizes = [item_size(item) for item in items]
+    if per_item:
+        units = sum(max(1, math.ceil(size / READ_UNIT_BYTES)) for size in sizes)
+        return units if consistent else units / 2
+    return read_units_for_bytes(sum(sizes), consistent)
+
+
+def read_units_for_bytes(total_bytes, consistent=False):
+    """RCU for a Query/Scan page that read total_bytes."""
+    units = max(1, math.ceil(total_bytes / READ_UNIT_BYTES))
+    return units if consistent else units / 2
+
+
+def write_units(items):
+    """WCU for writing (or deleting) items."""
+    return sum(max(1, math.ceil(item_size(item) / WRITE_UNIT_BYTES)) for item in items)
+
+
+def consumed_capacity(table, read=0.0, write=0.0, index=None, local_index=False):
+    """A ConsumedCapacity block as returned with ReturnConsumedCapacity=INDEXES."""
+    units = {'CapacityUnits': read + write, 'ReadCapacityUnits': read, 'WriteCapacityUnits': write}
+    capacity = {'TableName': table, **units}
+    if index is None:
+        capacity['Table'] = dict(units)
+    else:
+        # Index reads are charged to the index, not the base table
+        capacity['Table'] = {'CapacityUnits': 0.0, 'ReadCapacityUnits': 0.0, 'WriteCapacityUnits': 0.0}
+        capacity['LocalSecondaryIndexes' if local_index else 'GlobalSecondaryIndexes'] = {index: units}
+    return capacity
+
+
+def write_capacity(table, write, index_writes=None):
+    """A ConsumedCapacity block for a write, including the GSIs it updated."""
+    def units(value):
+        return {'CapacityUnits': value, 'ReadCapacityUnits': 0.0, 'WriteCapacityUnits': value}
+    
+    index_writes = index_writes or {}
+    total = write + sum(index_writes.values())
+    capacity = {'TableName': table, **units(total), 'Table': units(write)}
+    if index_writes:
+        capacity['GlobalSecondaryIndexes'] = {index: units(value) for index, value in index_writes.items()}
+    return capacity
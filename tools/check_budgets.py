@@ -0,0 +1,211 @@
+"""
+Round-trip budgets per endpoint
+Runs every handler scenario (tools/scenarios.py) against the local DynamoDB
+and Stripe stand-ins at each organisation size, records every DynamoDB and
+Stripe request it makes, and checks the counts against the endpoint's budget.
+
+BUDGETS:
+Each scenario declares the most DynamoDB and Stripe round trips one warm
+invocation may make. Calls must not grow with the size of the organisation,
+except for batched operations listed in Budget.batched - those may make one
+call per batch of members (BatchGetItem reads 100 keys, BatchWriteItem
+writes 25 items), so e.g. a per-member get_item fails the check even if a
+small org stays under budget. Budgets of rate-limited endpoints include a
+bucket write per scope (utils.rate_limit), made when the container has no
+leased tokens left.
+
+FAILS WHEN:
+- A scenario has no budget (new endpoints must declare one)
+- An invocation makes more calls than its budget at any size
+- Any operation is called more often at a larger size, beyond its batches
+- The handler returns an unexpected status
+
+USAGE:
+    python tools/check_budgets.py
+    python tools/check_budgets.py --scenario members --verbose
+"""
+import io
+import os
+import sys
+import math
+import argparse
+import tempfile
+from collections import Counter
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..', 'src', 'api'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+os.environ.setdefault('ARCHIVE_DIR', tempfile.mkdtemp(prefix='budget-archive-'))
+
+from local_dynamodb import LocalDynamoDB  # noqa: E402
+from stub_stripe import StubStripe  # noqa: E402
+from scenarios import ORG_SIZES, FakeContext, get_scenarios, seed, function_name, load_handler, status_of  # noqa: E402
+
+# Keys per call for the batched operations
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+
+
+@dataclass
+class Budget:
+    """Most round trips one warm invocation may make (counted at a one-member org)."""
+    dynamodb: int
+    stripe: int = 0
+    # Operations that may make one more call per batch of members: {operation: batch size}
+    batched: dict = field(default_factory=dict)
+    
+    def extra_calls(self, operation, size):
+        """Calls an operation may add over a one-member org."""
+        batch_size = self.batched.get(operation)
+        # The other members can start a new batch each batch_size, wherever
+        # the batches start (they may share one with the organisation's other items)
+        return math.ceil((size - 1) / batch_size) if batch_size else 0
+    
+    def allowed(self, size):
+        return self.dynamodb + sum(self.extra_calls(operation, size) for operation in self.batched)
+
+
+BUDGETS = {
+    # Profile API
+    'GET /profile': Budget(1),
+    'POST /profile': Budget(1),
+    'PUT /profile': Budget(1),
+    'GET /me': Budget(5, batched={'BatchGetItem': BATCH_GET_SIZE}),
+    # Organisation API
+    'GET /organisation': Budget(2),
+    'POST /organisation': Budget(2),
+    'PUT /organisation': Budget(2),
+    'DELETE /organisation': Budget(3, batched={'BatchWriteItem': BATCH_WRITE_SIZE}),
+    'GET /organisation/members': Budget(3, batched={'BatchGetItem': BATCH_GET_SIZE}),
+    'GET /organisation/members?fields=user_id,role': Budget(2),
+    'POST /organisation/members/invite': Budget(6),
+    'PUT /organisation/members/{member_id}': Budget(3),
+    'DELETE /organisation/members/{member_id}': Budget(3),
+    'POST /organisation/leave': Budget(2),
+    # Subscription API
+    'GET /subscription': Budget(6),
+    'POST /subscription': Budget(3, stripe=1),
+    'POST /subscription/portal': Budget(2, stripe=1),
+    'POST /subscription/webhook': Budget(2),
+    # Scheduled jobs (the sweeps page through tables, but the seeded data fits one page)
+    'expiry sweeper': Budget(8),
+    'archive records': Budget(2),
+}
+
+
+def record_calls(handler, scenario, world, iteration, local, stripe_stub):
+    """Run one invocation. Returns (response, DynamoDB requests, Stripe requests)."""
+    dynamodb_start = len(local.requests)
+    stripe_start = len(stripe_stub.requests)
+    with redirect_stdout(io.StringIO()):
+        response = handler(scenario.event(world, iteration), FakeContext(function_name(scenario.module)))
+    return response, local.requests[dynamodb_start:], stripe_stub.requests[stripe_start:]
+
+
+def check_scenario(scenario, budget, worlds, local, stripe_stub):
+    """Record one warm invocation per org size. Returns (runs, failures)."""
+    with redirect_stdout(io.StringIO()):
+        handler = load_handler(scenario.module)
+    
+    runs = []
+    failures = []
+    for size, world in sorted(worlds.items()):
+        if size < scenario.min_size:
+            continue
+        # The first call fills per-container caches (e.g. Stripe prices)
+        for iteration in range(2):
+            response, dynamodb_calls, stripe_calls = record_calls(handler, scenario, world, iteration, local, stripe_stub)
+            if scenario.restore:
+                scenario.restore(local, stripe_stub, world)
+        runs.append({
+            'size': size,
+            'status': status_of(response),
+            'dynamodb': dynamodb_calls,
+            'stripe': stripe_calls,
+            'operations': Counter(operation for operation, _ in dynamodb_calls),
+        })
+    
+    for run in runs:
+        size = run['size']
+        if run['status'] not in scenario.expected:
+            failures.append(f"org of {size}: unexpected status {run['status']}")
+        if len(run['dynamodb']) > budget.allowed(size):
+            failures.append(f"org of {size}: {len(run['dynamodb'])} DynamoDB calls, budget {budget.allowed(size)}")
+        if len(run['stripe']) > budget.stripe:
+            failures.append(f"org of {size}: {len(run['stripe'])} Stripe calls, budget {budget.stripe}")
+    
+    # Calls that grow with the org, compared with the smallest org run
+    if len(runs) > 1:
+        smallest = runs[0]
+        for run in runs[1:]:
+            for operation, count in sorted(run['operations'].items()):
+                before = smallest['operations'].get(operation, 0)
+                allowed = before + budget.extra_calls(operation, run['size']) - budget.extra_calls(operation, smallest['size'])
+                if count > allowed:
+                    failures.append(
+                        f"{operation} scales with org size: {before} call(s) at {smallest['size']} members, "
+                        f"{count} at {run['size']}"
+                    )
+            if len(run['stripe']) > len(smallest['stripe']):
+                failures.append(
+                    f"Stripe calls scale with org size: {len(smallest['stripe'])} at {smallest['size']} members, "
+                    f"{len(run['stripe'])} at {run['size']}"
+                )
+    return runs, failures
+
+
+def describe_calls(run):
+    """Summarise the recorded calls, e.g. 'Query x2 (profiles), BatchGetItem x10 (profiles)'."""
+    counts = Counter((operation, ', '.join(tables)) for operation, tables in run['dynamodb'])
+    counts.update((f'{method} {path}', 'stripe') for method, path in run['stripe'])
+    return ', '.join(f"{operation} x{count} ({tables})" for (operation, tables), count in counts.items()) or 'none'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the DynamoDB and Stripe round trips each endpoint makes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(ORG_SIZES), help='Organisation sizes to seed and run')
+    parser.add_argument('--scenario', nargs='+', help='Only check scenarios whose name contains one of these')
+    parser.add_argument('--verbose', action='store_true', help='List the calls made for every scenario')
+    args = parser.parse_args()
+    
+    local = LocalDynamoDB.from_terraform()
+    local.install()
+    stripe_stub = StubStripe().install()
+    worlds = seed(local, stripe_stub, args.sizes)
+    
+    failed = 0
+    print(f"{'scenario':<48} {'budget':>8} " + ' '.join(f"{'org ' + str(size):>9}" for size in args.sizes) + '  result')
+    for scenario in get_scenarios(args.scenario):
+        budget = BUDGETS.get(scenario.name)
+        if budget is None:
+            failed += 1
+            print(f"{scenario.name:<48} {'-':>8}  FAIL: no budget declared in tools/check_budgets.py")
+            continue
+        
+        runs, failures = check_scenario(scenario, budget, worlds, local, stripe_stub)
+        counts = {run['size']: f"{len(run['dynamodb'])}/{len(run['stripe'])}" for run in runs}
+        budget_text = f"{budget.dynamodb}{'+' if budget.batched else ''}/{budget.stripe}"
+        print(
+            f"{scenario.name:<48} {budget_text:>8} "
+            + ' '.join(f"{counts.get(size, '-'):>9}" for size in args.sizes)
+            + ('  FAIL' if failures else '  ok')
+        )
+        for failure in failures:
+            print(f"    {failure}")
+        if failures or args.verbose:
+            for run in runs:
+                print(f"    org of {run['size']}: {describe_calls(run)}")
+        failed += bool(failures)
+    
+    print('\nCounts are DynamoDB/Stripe calls per warm invocation; "+" budgets grow by one call per batch of members.')
+    if failed:
+        print(f"{failed} scenario(s) over budget")
+        return 1
+    print('All scenarios within budget')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
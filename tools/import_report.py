@@ -0,0 +1,130 @@
+"""
+Handler import-time report
+Imports every Lambda handler module in a fresh interpreter with
+-X importtime and prints a per-module breakdown of where cold-start import
+time goes.
+
+CHECKS (exit status 1 on failure, so it can gate CI):
+- No handler imports a deferred module (stripe, boto3) at import time
+- With --budget-ms, no handler's total import time exceeds the budget
+
+USAGE:
+    python tools/import_report.py
+    python tools/import_report.py --top 15 --budget-ms 150
+    python tools/import_report.py --module subscriptions.get_subscription
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'api')
+
+# Modules that must only be imported on the code paths that use them
+DEFERRED_MODULES = ['stripe', 'boto3']
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def find_handlers():
+    """Find handler modules (files defining lambda_handler) under src/api."""
+    handlers = []
+    for filename in sorted(os.listdir(API_DIR)):
+        if filename.endswith('.py'):
+            with open(os.path.join(API_DIR, filename)) as f:
+                if 'def lambda_handler(' in f.read():
+                    handlers.append(filename[:-3])
+    for package in sorted(os.listdir(API_DIR)):
+        package_dir = os.path.join(API_DIR, package)
+        if not os.path.isfile(os.path.join(package_dir, '__init__.py')):
+            continue
+        for filename in sorted(os.listdir(package_dir)):
+            if not filename.endswith('.py') or filename == '__init__.py':
+                continue
+            with open(os.path.join(package_dir, filename)) as f:
+                if 'def lambda_handler(' in f.read():
+                    handlers.append(f"{package}.{filename[:-3]}")
+    return handlers
+
+
+def table_env(api_dir=API_DIR):
+    """Dummy values for every *_TABLE_NAME variable the handlers read."""
+    names = set()
+    for dirpath, _, filenames in os.walk(api_dir):
+        for filename in filenames:
+            if filename.endswith('.py'):
+                with open(os.path.join(dirpath, filename)) as f:
+                    names.update(re.findall(r"get_table\('(\w+)'\)", f.read()))
+    return {name: f'import-report-{name.lower()}' for name in names}
+
+
+def measure(module, api_dir=API_DIR):
+    """Import a module with -X importtime. Returns [(module, self_us, cumulative_us, depth)]."""
+    env = dict(os.environ)
+    env.update(table_env(API_DIR))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [api_dir, env.get('PYTHONPATH')]))
+    env.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+    
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return rows
+
+
+def get_total_ms(module, rows):
+    """Get a module's cumulative import time from measure() rows."""
+    # The module itself is the last entry with its name
+    return next(cumulative for name, _, cumulative, _ in reversed(rows) if name == module) / 1000
+
+
+def report(module, rows, top):
+    """Print the breakdown for one handler. Returns (total_ms, deferred modules imported)."""
+    total_ms = get_total_ms(module, rows)
+    imported = {name for name, _, _, _ in rows}
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+    
+    print(f"{module}: {total_ms:.1f} ms")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda row: -row[1])[:top]:
+        print(f"    {self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+    if eager:
+        print(f"    !! imports deferred modules at import time: {', '.join(eager)}")
+    
+    return total_ms, eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report handler import times')
+    parser.add_argument('--module', action='append', help='Handler module to report (default: all handlers)')
+    parser.add_argument('--top', type=int, default=8, help='Slowest modules to list per handler')
+    parser.add_argument('--budget-ms', type=float, help='Fail if a handler takes longer than this to import')
+    args = parser.parse_args()
+    
+    failures = []
+    for module in args.module or find_handlers():
+        total_ms, eager = report(module, measure(module), args.top)
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)} at import time")
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            failures.append(f"{module} takes {total_ms:.1f} ms to import (budget {args.budget_ms} ms)")
+    
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
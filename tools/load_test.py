@@ -0,0 +1,357 @@
+"""
+Load generator for the local API Gateway emulator
+Drives tools/local_gateway.py over HTTP with virtual users following a ramp
+profile, each repeatedly sending a request drawn from a weighted read/write
+mix as a member of one of the seeded organisations.
+
+PROFILES:
+A profile is a list of stages (seconds, users): over each stage the number
+of active users moves linearly from the previous stage's target to this
+one's (starting from 0), like k6 stages. --stages "30:10,60:50" gives a
+custom profile; --scale shortens or stretches every stage.
+
+REPORT:
+- Per stage and per second: active users, throughput (req/s), p50/p95/p99
+  latency, errors and time spent waiting for a gateway worker
+- Per request type: count, latency percentiles, status codes
+- Latency histogram (log buckets) for the whole run
+Results can also be written as JSON (--output).
+
+USAGE:
+    python tools/local_gateway.py --workers 20 --dynamodb-latency-ms 5 &
+    python tools/load_test.py --profile ramp --mix mixed --org-size 1000
+    python tools/load_test.py --stages 10:5,30:40 --mix read --scale 0.5
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+# scenarios builds its seed items with organisations.model
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..', 'src', 'api'))
+
+from scenarios import member_id  # noqa: E402
+
+# Ramp profiles: (seconds, target users) per stage
+PROFILES = {
+    'smoke': [(1, 1), (10, 1)],
+    'ramp': [(60, 50), (30, 50), (10, 0)],
+    'step': [(1, 5), (20, 5), (1, 10), (20, 10), (1, 20), (20, 20), (1, 40), (20, 40)],
+    'spike': [(5, 5), (20, 5), (2, 50), (15, 50), (2, 5), (20, 5)],
+    'soak': [(10, 20), (300, 20), (10, 0)],
+}
+
+
+def _profile_body(user, org, rng):
+    return {'display_name': f'Load {rng.randrange(1000)}', 'company': 'Example Ltd'}
+
+
+def _organisation_body(user, org, rng):
+    return {'name': f'Organisation {rng.randrange(1000)}'}
+
+
+def _role_body(user, org, rng):
+    return {'role': rng.choice(['admin', 'member'])}
+
+
+def _invite_body(user, org, rng):
+    return {'email': f'load-{uuid.uuid4().hex[:12]}@example.com'}
+
+
+# Request types: (name, method, path, who, body) - who is 'member' (any
+# member of the org), 'owner' or 'new' (a user without a profile or org)
+REQUESTS = {
+    'get_profile': ('GET /profile', 'GET', '/profile', 'member', None),
+    'get_me': ('GET /me', 'GET', '/me', 'member', None),
+    'get_organisation': ('GET /organisation', 'GET', '/organisation', 'member', None),
+    'get_members': ('GET /organisation/members', 'GET', '/organisation/members', 'member', None),
+    'get_subscription': ('GET /subscription', 'GET', '/subscription', 'member', None),
+    'update_profile': ('PUT /profile', 'PUT', '/profile', 'member', _profile_body),
+    'create_profile': ('POST /profile', 'POST', '/profile', 'new', _profile_body),
+    'update_organisation': ('PUT /organisation', 'PUT', '/organisation', 'owner', _organisation_body),
+    'update_member': ('PUT /organisation/members/{member_id}', 'PUT', '/organisation/members/{member_id}', 'owner', _role_body),
+    'invite_member': ('POST /organisation/members/invite', 'POST', '/organisation/members/invite', 'owner', _invite_body),
+}
+
+# Weighted request mixes
+MIXES = {
+    'read': {'get_me': 30, 'get_members': 20, 'get_profile': 20, 'get_organisation': 15, 'get_subscription': 15},
+    'mixed': {
+        'get_me': 25, 'get_members': 15, 'get_profile': 15, 'get_organisation': 15, 'get_subscription': 10,
+        'update_profile': 8, 'update_organisation': 4, 'update_member': 4, 'invite_member': 4,
+    },
+    'write': {'update_profile': 40, 'update_organisation': 20, 'update_member': 20, 'invite_member': 10, 'create_profile': 10},
+}
+
+# Latency histogram bucket upper bounds (ms)
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+
+def parse_stages(text):
+    """Parse "30:10,60:50" into [(30, 10), (60, 50)]."""
+    stages = []
+    for stage in text.split(','):
+        seconds, users = stage.split(':')
+        stages.append((float(seconds), int(users)))
+    return stages
+
+
+def target_users(stages, elapsed):
+    """Active users the profile asks for at a point in the run."""
+    previous = 0
+    for seconds, users in stages:
+        if elapsed < seconds:
+            return round(previous + (users - previous) * elapsed / seconds)
+        elapsed -= seconds
+        previous = users
+    return previous
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)] if ordered else 0
+
+
+class VirtualUser(threading.Thread):
+    """Sends requests over one keep-alive connection while it is active."""
+    
+    def __init__(self, index, test):
+        super().__init__(daemon=True)
+        self.index = index
+        self.test = test
+        self.rng = random.Random(test.seed + index)
+        self.connection = None
+    
+    def request(self, method, path, user_id, body):
+        headers = {'Authorization': f'Bearer local.{user_id}', 'Accept': 'application/json', 'Accept-Encoding': 'gzip'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            try:
+                if self.connection is None:
+                    self.connection = http.client.HTTPConnection(self.test.host, self.test.port, timeout=60)
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                return response.status, float(response.getheader('X-Local-Queue-Ms') or 0)
+            except (ConnectionError, http.client.HTTPException, OSError):
+                # Reconnect once (keep-alive connection closed by the server)
+                if self.connection is not None:
+                    self.connection.close()
+                    self.connection = None
+                if attempt:
+                    return 599, 0.0
+    
+    def run(self):
+        test = self.test
+        while not test.done.is_set():
+            if self.index >= test.active_users:
+                time.sleep(0.05)
+                continue
+            key = self.rng.choices(test.request_keys, weights=test.request_weights)[0]
+            name, method, path, who, body_builder = REQUESTS[key]
+            size = test.org_size
+            if who == 'owner':
+                user_id = member_id(size, 0)
+            elif who == 'new':
+                user_id = f'load-{uuid.uuid4().hex[:12]}'
+            else:
+                user_id = member_id(size, self.rng.randrange(size))
+            if '{member_id}' in path:
+                # A plain member (not the owner or admin) of the org
+                path = path.replace('{member_id}', member_id(size, self.rng.randrange(2, size)))
+            body = body_builder(user_id, size, self.rng) if body_builder else None
+            
+            started = time.perf_counter()
+            status, queue_ms = self.request(method, path, user_id, body)
+            finished = time.perf_counter()
+            test.record(name, started - test.started, (finished - started) * 1000, status, queue_ms)
+
+
+class LoadTest:
+    def __init__(self, base_url, stages, mix, org_size, seed=1):
+        split = urlsplit(base_url)
+        self.host = split.hostname
+        self.port = split.port or 80
+        self.stages = stages
+        self.request_keys = list(mix)
+        self.request_weights = [mix[key] for key in self.request_keys]
+        self.org_size = org_size
+        self.seed = seed
+        self.active_users = 0
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        # (name, start offset s, latency ms, status, queue ms)
+        self.samples = []
+        # Active users per whole second of the run
+        self.users_by_second = {}
+        self.started = None
+    
+    def record(self, name, offset, latency_ms, status, queue_ms):
+        with self.lock:
+            self.samples.append((name, offset, latency_ms, status, queue_ms))
+    
+    def run(self):
+        duration = sum(seconds for seconds, _ in self.stages)
+        users = [VirtualUser(index, self) for index in range(max(users for _, users in self.stages))]
+        self.started = time.perf_counter()
+        for user in users:
+            user.start()
+        while True:
+            elapsed = time.perf_counter() - self.started
+            if elapsed >= duration:
+                break
+            self.active_users = target_users(self.stages, elapsed)
+            self.users_by_second[int(elapsed)] = max(self.users_by_second.get(int(elapsed), 0), self.active_users)
+            time.sleep(0.1)
+        self.done.set()
+        for user in users:
+            user.join(timeout=60)
+        return self.samples
+
+
+def summarise(samples):
+    latencies = [sample[2] for sample in samples]
+    errors = sum(1 for sample in samples if sample[3] >= 500 or sample[3] == 429)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'client_errors': sum(1 for sample in samples if 400 <= sample[3] < 500 and sample[3] != 429),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2) if latencies else 0,
+        'queue_p95_ms': round(percentile([sample[4] for sample in samples], 95), 2),
+    }
+
+
+def build_report(test, samples):
+    report = {'overall': None, 'stages': [], 'seconds': [], 'requests': {}, 'histogram': []}
+    duration = sum(seconds for seconds, _ in test.stages)
+    report['overall'] = dict(summarise(samples), throughput=round(len(samples) / duration, 1))
+    
+    start = 0
+    previous = 0
+    for index, (seconds, users) in enumerate(test.stages):
+        stage_samples = [sample for sample in samples if start <= sample[1] < start + seconds]
+        report['stages'].append(dict(
+            summarise(stage_samples), stage=index + 1, users=f'{previous}->{users}' if previous != users else str(users),
+            seconds=seconds, throughput=round(len(stage_samples) / seconds, 1)
+        ))
+        start += seconds
+        previous = users
+    
+    for second in range(math.ceil(duration)):
+        second_samples = [sample for sample in samples if second <= sample[1] < second + 1]
+        report['seconds'].append(dict(
+            summarise(second_samples), second=second, users=test.users_by_second.get(second, 0), throughput=len(second_samples)
+        ))
+    
+    for name in sorted({sample[0] for sample in samples}):
+        request_samples = [sample for sample in samples if sample[0] == name]
+        statuses = {}
+        for sample in request_samples:
+            statuses[str(sample[3])] = statuses.get(str(sample[3]), 0) + 1
+        report['requests'][name] = dict(summarise(request_samples), statuses=statuses)
+    
+    lower = 0
+    for upper in HISTOGRAM_BUCKETS:
+        count = sum(1 for sample in samples if lower <= sample[2] < upper)
+        report['histogram'].append({'from_ms': lower, 'to_ms': None if upper == float('inf') else upper, 'count': count})
+        lower = upper
+    return report
+
+
+def bar(value, largest, width=40):
+    return '#' * (round(value / largest * width) if largest else 0)
+
+
+def print_report(report):
+    overall = report['overall']
+    print(
+        f"\n{overall['requests']} requests, {overall['throughput']} req/s, p50 {overall['p50_ms']}ms, "
+        f"p95 {overall['p95_ms']}ms, p99 {overall['p99_ms']}ms, {overall['errors']} errors, "
+        f"{overall['client_errors']} 4xx"
+    )
+    
+    print(f"\n{'stage':>5} {'users':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queue p95':>10} {'errors':>7}")
+    for stage in report['stages']:
+        print(
+            f"{stage['stage']:>5} {stage['users']:>9} {stage['throughput']:>8} {stage['p50_ms']:>8} "
+            f"{stage['p95_ms']:>8} {stage['p99_ms']:>8} {stage['queue_p95_ms']:>10} {stage['errors']:>7}"
+        )
+    
+    print('\nThroughput per second:')
+    largest = max((second['throughput'] for second in report['seconds']), default=0)
+    for second in report['seconds']:
+        print(
+            f"{second['second']:>5}s {second['users']:>4} users {second['throughput']:>6} req/s "
+            f"p95 {second['p95_ms']:>8}ms  {bar(second['throughput'], largest)}"
+        )
+    
+    print(f"\n{'request':<42} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  status")
+    for name, stats in report['requests'].items():
+        statuses = ','.join(f'{code}x{count}' for code, count in sorted(stats['statuses'].items()))
+        print(f"{name:<42} {stats['requests']:>7} {stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}  {statuses}")
+    
+    print('\nLatency histogram:')
+    largest = max((bucket['count'] for bucket in report['histogram']), default=0)
+    for bucket in report['histogram']:
+        label = f"{bucket['from_ms']:g}-{bucket['to_ms']:g}ms" if bucket['to_ms'] else f">{bucket['from_ms']:g}ms"
+        print(f"{label:>14} {bucket['count']:>7}  {bar(bucket['count'], largest)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the local API Gateway emulator')
+    parser.add_argument('--base-url', default='http://127.0.0.1:3001', help='Where tools/local_gateway.py is listening')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='ramp', help='Ramp profile')
+    parser.add_argument('--stages', help='Custom profile as seconds:users,... (overrides --profile)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every stage duration')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='mixed', help='Request mix')
+    parser.add_argument('--org-size', type=int, default=10, help='Seeded organisation to act in (one of the gateway --sizes, at least 3)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for request choice')
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+    
+    if args.org_size < 3:
+        parser.error('--org-size must be at least 3 (an owner, an admin and a plain member)')
+    stages = parse_stages(args.stages) if args.stages else PROFILES[args.profile]
+    stages = [(seconds * args.scale, users) for seconds, users in stages]
+    
+    test = LoadTest(args.base_url, stages, MIXES[args.mix], args.org_size, args.seed)
+    try:
+        connection = http.client.HTTPConnection(test.host, test.port, timeout=5)
+        connection.request('OPTIONS', '/profile')
+        connection.getresponse().read()
+        connection.close()
+    except OSError:
+        print(f"Nothing listening on {args.base_url} - start tools/local_gateway.py first", file=sys.stderr)
+        return 1
+    
+    duration = sum(seconds for seconds, _ in stages)
+    print(f"Running {args.mix} mix for {duration:g}s: " + ', '.join(f'{users} users over {seconds:g}s' for seconds, users in stages))
+    report = build_report(test, test.run())
+    report['meta'] = {'profile': args.stages or args.profile, 'scale': args.scale, 'mix': args.mix, 'org_size': args.org_size}
+    print_report(report)
+    
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
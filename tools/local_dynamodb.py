@@ -0,0 +1,1158 @@
+"""
+Local DynamoDB stand-in
+An in-memory DynamoDB for benchmarks and local runs. It answers a real boto3
+client's requests from a before-send hook, so every call still goes through
+botocore's serialisation and parsing and the client hooks in utils.dynamodb
+(telemetry, consumed capacity) - only the network and the service are
+replaced.
+
+Tables, keys and GSIs are read from terraform (tools/terraform_config.py),
+and responses carry the ConsumedCapacity a real table would charge
+(tools/capacity.py).
+
+SUPPORTED:
+- GetItem, PutItem, UpdateItem, DeleteItem, Query, Scan (with parallel
+  segments), BatchGetItem, BatchWriteItem, TransactGetItems,
+  TransactWriteItems, DescribeEndpoints
+- Key condition, filter, condition and projection expressions (comparisons,
+  BETWEEN, IN, AND/OR/NOT, attribute_exists, attribute_not_exists,
+  attribute_type, begins_with, contains, size)
+- Update expressions (SET with +/-, if_not_exists and list_append, REMOVE,
+  ADD, DELETE), ReturnValues and ReturnValuesOnConditionCheckFailure
+- Limit, ExclusiveStartKey/LastEvaluatedKey, the 1MB page size,
+  Select=COUNT, ScanIndexForward, ConsistentRead, GSI projections
+
+USAGE:
+    local = LocalDynamoDB.from_terraform()
+    local.install()      # table env vars + utils.dynamodb's shared client
+    local.put_items('TABLE_NAME', [{'user_id': 'u1', 'display_name': 'Ann'}])
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import zlib
+import base64
+import bisect
+import random
+import threading
+from decimal import Decimal
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(TOOLS_DIR, '..', 'src', 'api')
+sys.path.insert(0, API_DIR)
+
+from botocore.awsrequest import AWSResponse  # noqa: E402
+from utils.dynamodb import marshal_item, unmarshal_item  # noqa: E402
+from capacity import item_size, read_units, read_units_for_bytes, write_units, consumed_capacity, write_capacity  # noqa: E402
+from terraform_config import TERRAFORM_DIR, find_dynamodb_tables, table_environment  # noqa: E402
+
+# Query/Scan pages stop after reading this much data
+PAGE_BYTES = 1024 * 1024
+# DynamoDB's item size limit
+MAX_ITEM_BYTES = 400 * 1024
+# Per-call request limits
+MAX_BATCH_GET = 100
+MAX_BATCH_WRITE = 25
+MAX_TRANSACT_ITEMS = 100
+
+ERROR_PREFIX = 'com.amazonaws.dynamodb.v20120810#'
+
+
+class DynamoDBError(Exception):
+    """An error returned to the client as a DynamoDB error response."""
+    
+    def __init__(self, code, message, status=400, **fields):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.fields = fields
+    
+    def payload(self):
+        return {'__type': ERROR_PREFIX + self.code, 'message': str(self), **self.fields}
+
+
+def _validation(message):
+    return DynamoDBError('ValidationException', message)
+
+
+# ----------------------------------------------------------------------------
+# Values
+# ----------------------------------------------------------------------------
+
+def _decode_binary(value):
+    return base64.b64decode(value) if isinstance(value, str) else bytes(value)
+
+
+def _scalar(attribute):
+    """Comparable (type, value) for a scalar attribute, or None."""
+    for type_key, value in attribute.items():
+        if type_key == 'S':
+            return ('S', value)
+        if type_key == 'N':
+            return ('N', Decimal(value))
+        if type_key == 'B':
+            return ('B', _decode_binary(value))
+    return None
+
+
+def _canonical(attribute):
+    """Hashable form of any attribute, for equality checks."""
+    type_key, value = next(iter(attribute.items()))
+    if type_key in ('S', 'N', 'B'):
+        return _scalar(attribute)
+    if type_key == 'SS':
+        return ('SS', frozenset(value))
+    if type_key == 'NS':
+        return ('NS', frozenset(Decimal(item) for item in value))
+    if type_key == 'BS':
+        return ('BS', frozenset(_decode_binary(item) for item in value))
+    if type_key == 'L':
+        return ('L', tuple(_canonical(item) for item in value))
+    if type_key == 'M':
+        return ('M', tuple(sorted((name, _canonical(item)) for name, item in value.items())))
+    return (type_key, value)
+
+
+def _format_number(number):
+    text = format(number.normalize(), 'f')
+    return text if text != '-0' else '0'
+
+
+def _size_of(attribute):
+    type_key, value = next(iter(attribute.items()))
+    if type_key == 'S':
+        return len(value)
+    if type_key == 'B':
+        return len(_decode_binary(value))
+    if type_key in ('SS', 'NS', 'BS', 'L', 'M'):
+        return len(value)
+    raise _validation(f"size() is not supported for type {type_key}")
+
+
+def _get_path(item, path):
+    """Get the attribute at a path (list of names / list indexes), or None."""
+    attribute = item.get(path[0])
+    for segment in path[1:]:
+        if attribute is None:
+            return None
+        if isinstance(segment, int):
+            values = attribute.get('L')
+            attribute = values[segment] if values is not None and segment < len(values) else None
+        else:
+            attribute = attribute.get('M', {}).get(segment) if 'M' in attribute else None
+    return attribute
+
+
+def _set_path(item, path, attribute):
+    if len(path) == 1:
+        item[path[0]] = attribute
+        return
+    parent = _get_path(item, path[:-1])
+    segment = path[-1]
+    if parent is None:
+        raise _validation("The document path provided in the update expression is invalid for update")
+    if isinstance(segment, int):
+        values = parent.get('L')
+        if values is None:
+            raise _validation("The document path provided in the update expression is invalid for update")
+        if segment < len(values):
+            values[segment] = attribute
+        else:
+            values.append(attribute)
+    else:
+        if 'M' not in parent:
+            raise _validation("The document path provided in the update expression is invalid for update")
+        parent['M'][segment] = attribute
+
+
+def _remove_path(item, path):
+    if len(path) == 1:
+        item.pop(path[0], None)
+        return
+    parent = _get_path(item, path[:-1])
+    segment = path[-1]
+    if parent is None:
+        return
+    if isinstance(segment, int):
+        values = parent.get('L')
+        if values is not None and segment < len(values):
+            del values[segment]
+    elif 'M' in parent:
+        parent['M'].pop(segment, None)
+
+
+def _copy(attribute):
+    return json.loads(json.dumps(attribute))
+
+
+# ----------------------------------------------------------------------------
+# Expressions
+# ----------------------------------------------------------------------------
+
+_TOKEN = re.compile(r'\s*(?:(<>|<=|>=|=|<|>|\+|-)|([(),\[\].])|(:\w+)|(#\w+)|(\d+)|([A-Za-z_]\w*))')
+_COMPARATORS = ('=', '<>', '<', '<=', '>', '>=')
+_CONDITION_FUNCTIONS = ('attribute_exists', 'attribute_not_exists', 'attribute_type', 'begins_with', 'contains')
+_UPDATE_FUNCTIONS = ('if_not_exists', 'list_append')
+
+
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise _validation(f"Invalid expression: syntax error near: {expression[position:position + 20]!r}")
+        kind = ('op', 'punct', 'value', 'name', 'number', 'word')[match.lastindex - 1]
+        tokens.append((kind, match.group(match.lastindex)))
+        position = match.end()
+    return tokens
+
+
+class ExpressionParser:
+    """Parses DynamoDB expressions into nested tuples, resolving #names and :values."""
+    
+    def __init__(self, expression, names=None, values=None):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+    
+    def _peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+    
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            raise _validation("Invalid expression: unexpected end of expression")
+        self.position += 1
+        return token
+    
+    def _expect(self, text):
+        kind, value = self._next()
+        if value != text:
+            raise _validation(f"Invalid expression: expected {text!r}, found {value!r}")
+    
+    def _at_word(self, *words):
+        kind, value = self._peek()
+        return kind == 'word' and value.upper() in words
+    
+    def _at_call(self, functions):
+        kind, value = self._peek()
+        return kind == 'word' and value.lower() in functions and self._peek(1)[1] == '('
+    
+    def _done(self, result):
+        if self._peek()[0] is not None:
+            raise _validation(f"Invalid expression: unexpected token {self._peek()[1]!r}")
+        return result
+    
+    # Conditions
+    
+    def parse_condition(self):
+        return self._done(self._or())
+    
+    def _or(self):
+        node = self._and()
+        while self._at_word('OR'):
+            self._next()
+            node = ('or', node, self._and())
+        return node
+    
+    def _and(self):
+        node = self._not()
+        while self._at_word('AND'):
+            self._next()
+            node = ('and', node, self._not())
+        return node
+    
+    def _not(self):
+        if self._at_word('NOT'):
+            self._next()
+            return ('not', self._not())
+        return self._primary()
+    
+    def _primary(self):
+        if self._peek()[1] == '(':
+            self._next()
+            node = self._or()
+            self._expect(')')
+            return node
+        if self._at_call(_CONDITION_FUNCTIONS):
+            name = self._next()[1].lower()
+            return ('call', name, self._arguments())
+        
+        left = self._operand()
+        if self._at_word('BETWEEN'):
+            self._next()
+            low = self._operand()
+            if not self._at_word('AND'):
+                raise _validation("Invalid expression: BETWEEN requires AND")
+            self._next()
+            return ('between', left, low, self._operand())
+        if self._at_word('IN'):
+            self._next()
+            return ('in', left, self._arguments())
+        
+        kind, comparator = self._next()
+        if comparator not in _COMPARATORS:
+            raise _validation(f"Invalid expression: expected a comparator, found {comparator!r}")
+        return ('compare', comparator, left, self._operand())
+    
+    def _arguments(self, operand=None):
+        operand = operand or self._operand
+        self._expect('(')
+        arguments = [operand()]
+        while self._peek()[1] == ',':
+            self._next()
+            arguments.append(operand())
+        self._expect(')')
+        return arguments
+    
+    def _operand(self):
+        kind, value = self._peek()
+        if kind == 'value':
+            self._next()
+            if value not in self.values:
+                raise _validation(f"An expression attribute value used in expression is not defined; attribute value: {value}")
+            return ('value', self.values[value])
+        if self._at_call(('size',)):
+            self._next()
+            return ('size', self._arguments(self._path)[0])
+        return ('path', self._path())
+    
+    def _path(self):
+        path = [self._name()]
+        while self._peek()[1] in ('.', '['):
+            if self._next()[1] == '.':
+                path.append(self._name())
+            else:
+                kind, number = self._next()
+                if kind != 'number':
+                    raise _validation("Invalid expression: list index must be a number")
+                self._expect(']')
+                path.append(int(number))
+        return path
+    
+    def _name(self):
+        kind, value = self._next()
+        if kind == 'name':
+            if value not in self.names:
+                raise _validation(f"An expression attribute name used in the document path is not defined; attribute name: {value}")
+            return self.names[value]
+        if kind == 'word':
+            return value
+        raise _validation(f"Invalid expression: expected an attribute name, found {value!r}")
+    
+    # Projections
+    
+    def parse_projection(self):
+        paths = [self._path()]
+        while self._peek()[1] == ',':
+            self._next()
+            paths.append(self._path())
+        return self._done(paths)
+    
+    # Updates
+    
+    def parse_update(self):
+        actions = {'SET': [], 'REMOVE': [], 'ADD': [], 'DELETE': []}
+        while self._peek()[0] is not None:
+            kind, clause = self._next()
+            clause = clause.upper()
+            if kind != 'word' or clause not in actions:
+                raise _validation(f"Invalid UpdateExpression: unexpected token {clause!r}")
+            while True:
+                path = self._path()
+                if clause == 'SET':
+                    self._expect('=')
+                    actions[clause].append((path, self._set_value()))
+                elif clause == 'REMOVE':
+                    actions[clause].append(path)
+                else:
+                    actions[clause].append((path, self._operand()))
+                if self._peek()[1] != ',':
+                    break
+                self._next()
+        return actions
+    
+    def _set_value(self):
+        node = self._set_operand()
+        if self._peek()[1] in ('+', '-'):
+            operator = self._next()[1]
+            node = ('arithmetic', operator, node, self._set_operand())
+        return node
+    
+    def _set_operand(self):
+        if self._at_call(_UPDATE_FUNCTIONS):
+            name = self._next()[1].lower()
+            return ('call', name, self._arguments(self._set_value))
+        return self._operand()
+
+
+def _evaluate(node, item):
+    """Evaluate an operand to an attribute value (None if it doesn't exist)."""
+    kind = node[0]
+    if kind == 'value':
+        return node[1]
+    if kind == 'path':
+        return _get_path(item, node[1])
+    if kind == 'size':
+        attribute = _get_path(item, node[1])
+        return None if attribute is None else {'N': str(_size_of(attribute))}
+    if kind == 'arithmetic':
+        left, right = _evaluate(node[2], item), _evaluate(node[3], item)
+        if not left or not right or 'N' not in left or 'N' not in right:
+            raise _validation("An operand in the update expression has an incorrect data type")
+        result = Decimal(left['N']) + Decimal(right['N']) if node[1] == '+' else Decimal(left['N']) - Decimal(right['N'])
+        return {'N': _format_number(result)}
+    if kind == 'call' and node[1] == 'if_not_exists':
+        existing = _evaluate(node[2][0], item)
+        return existing if existing is not None else _evaluate(node[2][1], item)
+    if kind == 'call' and node[1] == 'list_append':
+        left, right = _evaluate(node[2][0], item), _evaluate(node[2][1], item)
+        if not left or not right or 'L' not in left or 'L' not in right:
+            raise _validation("An operand in the update expression has an incorrect data type")
+        return {'L': left['L'] + right['L']}
+    raise _validation(f"Invalid operand: {kind}")
+
+
+def _compare(comparator, left, right):
+    if left is None or right is None:
+        return False
+    if comparator in ('=', '<>'):
+        equal = _canonical(left) == _canonical(right)
+        return equal if comparator == '=' else not equal
+    left, right = _scalar(left), _scalar(right)
+    if left is None or right is None or left[0] != right[0]:
+        return False
+    if comparator == '<':
+        return left[1] < right[1]
+    if comparator == '<=':
+        return left[1] <= right[1]
+    if comparator == '>':
+        return left[1] > right[1]
+    return left[1] >= right[1]
+
+
+def _matches(node, item):
+    """Evaluate a condition against a (wire format) item."""
+    kind = node[0]
+    if kind == 'and':
+        return _matches(node[1], item) and _matches(node[2], item)
+    if kind == 'or':
+        return _matches(node[1], item) or _matches(node[2], item)
+    if kind == 'not':
+        return not _matches(node[1], item)
+    if kind == 'compare':
+        return _compare(node[1], _evaluate(node[2], item), _evaluate(node[3], item))
+    if kind == 'between':
+        value = _evaluate(node[1], item)
+        return _compare('>=', value, _evaluate(node[2], item)) and _compare('<=', value, _evaluate(node[3], item))
+    if kind == 'in':
+        value = _evaluate(node[1], item)
+        return any(_compare('=', value, _evaluate(option, item)) for option in node[2])
+    
+    name, arguments = node[1], node[2]
+    value = _evaluate(arguments[0], item)
+    if name == 'attribute_exists':
+        return value is not None
+    if name == 'attribute_not_exists':
+        return value is None
+    if value is None:
+        return False
+    operand = _evaluate(arguments[1], item)
+    if operand is None:
+        return False
+    if name == 'attribute_type':
+        return operand.get('S') in value
+    if name == 'begins_with':
+        value, operand = _scalar(value), _scalar(operand)
+        return bool(value and operand) and value[0] == operand[0] != 'N' and value[1].startswith(operand[1])
+    # contains
+    if 'S' in value:
+        return 'S' in operand and operand['S'] in value['S']
+    if 'L' in value:
+        return any(_canonical(element) == _canonical(operand) for element in value['L'])
+    canonical = _canonical(value)
+    if canonical[0] in ('SS', 'NS', 'BS'):
+        scalar = _scalar(operand)
+        return scalar is not None and scalar[1] in canonical[1]
+    return False
+
+
+def _top_level(path):
+    return path[0]
+
+
+def apply_update(item, actions):
+    """Apply parsed update actions to a copy of an item. Returns (new item, updated names)."""
+    updated = _copy(item)
+    names = set()
+    
+    # Right-hand sides see the item as it was before the update
+    for path, value in actions['SET']:
+        attribute = _evaluate(value, item)
+        if attribute is None:
+            raise _validation("The provided expression refers to an attribute that does not exist in the item")
+        _set_path(updated, path, _copy(attribute))
+        names.add(_top_level(path))
+    for path in actions['REMOVE']:
+        _remove_path(updated, path)
+        names.add(_top_level(path))
+    for path, value in actions['ADD']:
+        operand = _evaluate(value, item)
+        existing = _get_path(updated, path)
+        if existing is None:
+            _set_path(updated, path, _copy(operand))
+        elif 'N' in existing and 'N' in operand:
+            _set_path(updated, path, {'N': _format_number(Decimal(existing['N']) + Decimal(operand['N']))})
+        else:
+            type_key = next(iter(operand))
+            if type_key not in existing or type_key not in ('SS', 'NS', 'BS'):
+                raise _validation("An operand in the update expression has an incorrect data type")
+            merged = list(existing[type_key]) + [value for value in operand[type_key] if value not in existing[type_key]]
+            _set_path(updated, path, {type_key: merged})
+        names.add(_top_level(path))
+    for path, value in actions['DELETE']:
+        operand = _evaluate(value, item)
+        existing = _get_path(updated, path)
+        if existing is not None:
+            type_key = next(iter(operand))
+            remaining = [value for value in existing.get(type_key, []) if value not in operand[type_key]]
+            if remaining:
+                _set_path(updated, path, {type_key: remaining})
+            else:
+                _remove_path(updated, path)
+        names.add(_top_level(path))
+    
+    return updated, names
+
+
+def project(item, paths):
+    """Keep only the attributes at the given paths."""
+    projected = {}
+    for path in paths:
+        attribute = _get_path(item, path)
+        if attribute is None:
+            continue
+        if len(path) == 1 or any(isinstance(segment, int) for segment in path):
+            projected[path[0]] = _copy(item[path[0]])
+            continue
+        target = projected.setdefault(path[0], {'M': {}})
+        for segment in path[1:-1]:
+            target = target['M'].setdefault(segment, {'M': {}})
+        target['M'][path[-1]] = _copy(attribute)
+    return projected
+
+
+# ----------------------------------------------------------------------------
+# Tables
+# ----------------------------------------------------------------------------
+
+class KeySchema:
+    """Items grouped by partition key and ordered by sort key (a table or index)."""
+    
+    def __init__(self, name, hash_key, range_key=None, projection_type='ALL', non_key_attributes=()):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.projection_type = projection_type
+        self.non_key_attributes = set(non_key_attributes)
+        self.partitions = {}
+    
+    def contains(self, item):
+        # GSIs are sparse - items without the index keys aren't in them
+        return self.hash_key in item and (self.range_key is None or self.range_key in item)
+    
+    def order_key(self, item, primary_key):
+        range_value = _scalar(item[self.range_key]) if self.range_key else ()
+        return (range_value, primary_key)
+    
+    def add(self, primary_key, item):
+        if self.contains(item):
+            self.partitions.setdefault(_scalar(item[self.hash_key]), {})[primary_key] = item
+    
+    def remove(self, primary_key, item):
+        if item is not None and self.contains(item):
+            partition = self.partitions.get(_scalar(item[self.hash_key]), {})
+            partition.pop(primary_key, None)
+    
+    def entries(self, hash_value):
+        """[(order key, item)] for one partition, in sort key order."""
+        partition = self.partitions.get(hash_value, {})
+        return sorted(((self.order_key(item, key), item) for key, item in partition.items()), key=lambda entry: entry[0])
+
+
+class LocalTable:
+    """One in-memory table and its GSIs."""
+    
+    def __init__(self, name, hash_key, range_key=None, indexes=None):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.items = {}
+        self.base = KeySchema(None, hash_key, range_key)
+        self.indexes = {
+            index_name: KeySchema(
+                index_name, index['hash_key'], index.get('range_key'),
+                index.get('projection_type', 'ALL'), index.get('non_key_attributes', ())
+            )
+            for index_name, index in (indexes or {}).items()
+        }
+    
+    @property
+    def key_names(self):
+        return [self.hash_key] + ([self.range_key] if self.range_key else [])
+    
+    def key_of(self, item, exact=False):
+        """The primary key of an item (or of a Key parameter when exact)."""
+        if exact and set(item) != set(self.key_names):
+            raise _validation("The provided key element does not match the schema")
+        key = []
+        for name in self.key_names:
+            attribute = item.get(name)
+            scalar = _scalar(attribute) if attribute else None
+            if scalar is None:
+                raise _validation(f"One or more parameter values were invalid: Missing the key {name} in the item")
+            key.append(scalar)
+        return tuple(key)
+    
+    def key_attributes(self, item, index=None):
+        names = self.key_names + ([index.hash_key] + ([index.range_key] if index.range_key else []) if index else [])
+        return {name: item[name] for name in names if name in item}
+    
+    def get_index(self, name):
+        if name is None:
+            return self.base
+        if name not in self.indexes:
+            raise _validation(f"The table does not have the specified index: {name}")
+        return self.indexes[name]
+    
+    def project_for(self, index, item):
+        """The copy of an item an index holds (per its projection)."""
+        if index.projection_type == 'ALL' or index is self.base:
+            return item
+        keep = set(self.key_attributes(item, index))
+        if index.projection_type == 'INCLUDE':
+            keep |= index.non_key_attributes
+        return {name: value for name, value in item.items() if name in keep}
+    
+    def get(self, key):
+        return self.items.get(key)
+    
+    def put(self, item):
+        key = self.key_of(item)
+        old = self.items.get(key)
+        for schema in [self.base, *self.indexes.values()]:
+            schema.remove(key, old)
+            schema.add(key, item)
+        self.items[key] = item
+        return old
+    
+    def delete(self, key):
+        old = self.items.pop(key, None)
+        for schema in [self.base, *self.indexes.values()]:
+            schema.remove(key, old)
+        return old
+    
+    def index_writes(self, old, new):
+        """WCU charged to each GSI for replacing old with new."""
+        writes = {}
+        for name, index in self.indexes.items():
+            before = old is not None and index.contains(old)
+            after = new is not None and index.contains(new)
+            if not before and not after:
+                continue
+            units = 0
+            if before:
+                units += write_units([self.project_for(index, old)])
+            if after and (not before or self.key_attributes(old, index) != self.key_attributes(new, index)):
+                units += write_units([self.project_for(index, new)])
+            elif after:
+                units = write_units([self.project_for(index, new)])
+            writes[name] = units
+        return writes
+
+
+class _Raw:
+    def __init__(self, body):
+        self.body = body
+    
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class LocalDynamoDB:
+    """In-memory DynamoDB answering a boto3 client's requests."""
+    
+    def __init__(self, tables=None, latency_ms=0, environment=None, throttle_rate=0.0):
+        self.tables = {}
+        self.environment = environment or {}
+        self.latency_ms = latency_ms
+        # Share of requests answered with ProvisionedThroughputExceededException
+        self.throttle_rate = throttle_rate
+        self.lock = threading.RLock()
+        self.calls = 0
+        # (operation, table names) of every request, in order
+        self.requests = []
+        for table in tables or []:
+            self.tables[table.name] = table
+    
+    @classmethod
+    def from_terraform(cls, tf_dir=TERRAFORM_DIR, environment='local', latency_ms=0):
+        """Create every table defined in terraform (names use the given environment)."""
+        tables = [
+            LocalTable(config['name'], config['hash_key'], config['range_key'], config['indexes'])
+            for config in find_dynamodb_tables(tf_dir, environment).values()
+        ]
+        return cls(tables, latency_ms, table_environment(tf_dir, environment))
+    
+    # Client integration
+    
+    def attach(self, client):
+        """Answer a boto3 DynamoDB client's requests from this stand-in."""
+        client.meta.events.register('before-send.dynamodb', self._answer)
+        return client
+    
+    def install(self):
+        """
+        Point the handlers at this stand-in: set the *_TABLE_NAME variables and
+        replace utils.dynamodb's shared client. Call before importing handlers.
+        """
+        import boto3
+        from utils import dynamodb
+        
+        os.environ.update(self.environment)
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+        dynamodb._client = dynamodb.instrument_client(self.attach(boto3.client('dynamodb', config=dynamodb.client_config())))
+        return dynamodb._client
+    
+    def _answer(self, request, **kwargs):
+        target = request.headers['X-Amz-Target']
+        operation = (target.decode('utf-8') if isinstance(target, bytes) else target).split('.')[-1]
+        body = json.loads(request.body or b'{}')
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        
+        try:
+            if self.throttle_rate and random.random() < self.throttle_rate and operation != 'DescribeEndpoints':
+                raise DynamoDBError('ProvisionedThroughputExceededException', 'The level of configured provisioned throughput for the table was exceeded')
+            status, payload = 200, self.handle(operation, body)
+        except DynamoDBError as e:
+            status, payload = e.status, e.payload()
+        
+        headers = {'Content-Type': 'application/x-amz-json-1.0', 'x-amzn-RequestId': uuid.uuid4().hex}
+        return AWSResponse(request.url, status, headers, _Raw(json.dumps(payload).encode('utf-8')))
+    
+    def handle(self, operation, request):
+        """Run one operation on a wire-format request. Returns the wire-format response."""
+        handler = getattr(self, f'_op_{operation}', None)
+        if handler is None:
+            raise DynamoDBError('UnknownOperationException', f"Operation {operation} is not supported locally")
+        with self.lock:
+            self.calls += 1
+            self.requests.append((operation, self._table_names(request)))
+            return handler(request)
+    
+    @staticmethod
+    def _table_names(request):
+        if 'TableName' in request:
+            return (request['TableName'],)
+        if 'RequestItems' in request:
+            return tuple(sorted(request['RequestItems']))
+        names = set()
+        for action in request.get('TransactItems', []):
+            for params in action.values():
+                names.add(params['TableName'])
+        return tuple(sorted(names))
+    
+    # Seeding and inspection (plain Python values)
+    
+    def table(self, name):
+        """Get a table by name or by its *_TABLE_NAME variable."""
+        name = self.environment.get(name, name)
+        if name not in self.tables:
+            raise DynamoDBError('ResourceNotFoundException', f"Requested resource not found: Table: {name} not found")
+        return self.tables[name]
+    
+    def put_items(self, table_name, items):
+        table = self.table(table_name)
+        with self.lock:
+            for item in items:
+                table.put(json.loads(json.dumps(marshal_item(item), default=str)))
+    
+    def get_items(self, table_name):
+        table = self.table(table_name)
+        with self.lock:
+            return [unmarshal_item(item) for item in table.items.values()]
+    
+    def clear(self):
+        with self.lock:
+            for table in self.tables.values():
+                table.items.clear()
+                for schema in [table.base, *table.indexes.values()]:
+                    schema.partitions.clear()
+    
+    # Helpers
+    
+    @staticmethod
+    def _capacity(request, capacity):
+        mode = request.get('ReturnConsumedCapacity', 'NONE')
+        if mode == 'INDEXES':
+            return capacity
+        if mode == 'TOTAL':
+            return {name: capacity[name] for name in ('TableName', 'CapacityUnits', 'ReadCapacityUnits', 'WriteCapacityUnits')}
+        return None
+    
+    @staticmethod
+    def _merge_capacity(blocks):
+        """Add up ConsumedCapacity blocks for the same table."""
+        merged = {}
+        for block in blocks:
+            name = block['TableName']
+            if name not in merged:
+                merged[name] = json.loads(json.dumps(block))
+                continue
+            target = merged[name]
+            for field in ('CapacityUnits', 'ReadCapacityUnits', 'WriteCapacityUnits'):
+                target[field] += block[field]
+                target['Table'][field] += block['Table'][field]
+            for index_type in ('GlobalSecondaryIndexes', 'LocalSecondaryIndexes'):
+                for index, units in block.get(index_type, {}).items():
+                    existing = target.setdefault(index_type, {}).setdefault(index, dict.fromkeys(units, 0.0))
+                    for field, value in units.items():
+                        existing[field] += value
+        return list(merged.values())
+    
+    @staticmethod
+    def _parser(request, expression_field):
+        return ExpressionParser(
+            request[expression_field],
+            request.get('ExpressionAttributeNames'),
+            request.get('ExpressionAttributeValues')
+        )
+    
+    def _condition(self, request, field='ConditionExpression'):
+        return self._parser(request, field).parse_condition() if request.get(field) else None
+    
+    def _projection(self, request):
+        return self._parser(request, 'ProjectionExpression').parse_projection() if request.get('ProjectionExpression') else None
+    
+    @staticmethod
+    def _check(condition, item, request=None):
+        if condition is not None and not _matches(condition, item or {}):
+            fields = {}
+            if item and (request or {}).get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD':
+                fields['Item'] = item
+            raise DynamoDBError('ConditionalCheckFailedException', 'The conditional request failed', **fields)
+    
+    @staticmethod
+    def _return_values(request, old, new, updated_names=None):
+        mode = request.get('ReturnValues', 'NONE')
+        if mode == 'ALL_OLD' and old:
+            return {'Attributes': old}
+        if mode == 'ALL_NEW' and new:
+            return {'Attributes': new}
+        if mode == 'UPDATED_OLD' and old:
+            return {'Attributes': {name: old[name] for name in updated_names or () if name in old}}
+        if mode == 'UPDATED_NEW' and new:
+            return {'Attributes': {name: new[name] for name in updated_names or () if name in new}}
+        return {}
+    
+    def _write(self, table, key, old, new):
+        """Store (or delete) an item. Returns its capacity block."""
+        if new is not None:
+            if item_size(new) > MAX_ITEM_BYTES:
+                raise _validation("Item size has exceeded the maximum allowed size")
+            table.put(new)
+        elif old is not None:
+            table.delete(key)
+        # Writes are charged on the larger of the old and new item
+        units = write_units([max(old or {}, new or {}, key=item_size)])
+        return write_capacity(table.name, units, table.index_writes(old, new))
+    
+    def _respond(self, request, response, capacity):
+        capacity = self._capacity(request, capacity)
+        if capacity is not None:
+            response['ConsumedCapacity'] = capacity
+        return response
+    
+    # Single-item operations
+    
+    def _op_GetItem(self, request):
+        table = self.table(request['TableName'])
+        item = table.get(table.key_of(request['Key'], exact=True))
+        consistent = request.get('ConsistentRead', False)
+        capacity = consumed_capacity(table.name, read=read_units([item or {}], consistent, per_item=True))
+        response = {}
+        if item is not None:
+            projection = self._projection(request)
+            response['Item'] = project(item, projection) if projection else item
+        return self._respond(request, response, capacity)
+    
+    def _op_PutItem(self, request):
+        table = self.table(request['TableName'])
+        item = request['Item']
+        key = table.key_of(item)
+        old = table.get(key)
+        self._check(self._condition(request), old, request)
+        capacity = self._write(table, key, old, item)
+        return self._respond(request, self._return_values(request, old, None), capacity)
+    
+    def _op_UpdateItem(self, request):
+        table = self.table(request['TableName'])
+        key = table.key_of(request['Key'], exact=True)
+        old = table.get(key)
+        self._check(self._condition(request), old, request)
+        
+        new, names = old or dict(request['Key']), set()
+        if request.get('UpdateExpression'):
+            actions = self._parser(request, 'UpdateExpression').parse_update()
+            touched = {_top_level(path) for path, _ in actions['SET'] + actions['ADD'] + actions['DELETE']}
+            touched |= {_top_level(path) for path in actions['REMOVE']}
+            if touched & set(table.key_names):
+                raise _validation("One or more parameter values were invalid: Cannot update attribute. This attribute is part of the key")
+            new, names = apply_update(old or dict(request['Key']), actions)
+        
+        capacity = self._write(table, key, old, new)
+        return self._respond(request, self._return_values(request, old, new, names), capacity)
+    
+    def _op_DeleteItem(self, request):
+        table = self.table(request['TableName'])
+        key = table.key_of(request['Key'], exact=True)
+        old = table.get(key)
+        self._check(self._condition(request), old, request)
+        capacity = self._write(table, key, old, None)
+        return self._respond(request, self._return_values(request, old, None), capacity)
+    
+    # Query and Scan
+    
+    def _read_page(self, request, table, index, entries, key_condition):
+        """Read one page of (order key, item) entries, applying Limit and the 1MB page size."""
+        filter_condition = self._condition(request, 'FilterExpression')
+        projection = self._projection(request)
+        limit = request.get('Limit')
+        
+        items = []
+        scanned = 0
+        size = 0
+        last = None
+        remaining = iter(())
+        for position, (_, item) in enumerate(entries):
+            stored = table.project_for(index, item)
+            if key_condition is not None and not _matches(key_condition, stored):
+                continue
+            scanned += 1
+            size += item_size(stored)
+            last = stored
+            if filter_condition is None or _matches(filter_condition, stored):
+                items.append(project(stored, projection) if projection else stored)
+            if (limit and scanned >= limit) or size >= PAGE_BYTES:
+                remaining = entries[position + 1:]
+                break
+        
+        response = {'Count': len(items), 'ScannedCount': scanned}
+        if request.get('Select') != 'COUNT':
+            response['Items'] = items
+        more = any(key_condition is None or _matches(key_condition, table.project_for(index, item)) for _, item in remaining)
+        if more and last is not None:
+            response['LastEvaluatedKey'] = table.key_attributes(last, None if index is table.base else index)
+        
+        read = read_units_for_bytes(size, request.get('ConsistentRead', False))
+        capacity = consumed_capacity(table.name, read=read, index=None if index is table.base else index.name)
+        return self._respond(request, response, capacity)
+    
+    @staticmethod
+    def _hash_value(condition, hash_key):
+        """Find the partition key's equality condition in a key condition."""
+        if condition[0] == 'and':
+            return LocalDynamoDB._hash_value(condition[1], hash_key) or LocalDynamoDB._hash_value(condition[2], hash_key)
+        if condition[0] == 'compare' and condition[1] == '=':
+            left, right = condition[2], condition[3]
+            if left[0] == 'path' and left[1] == [hash_key] and right[0] == 'value':
+                return _scalar(right[1])
+            if right[0] == 'path' and right[1] == [hash_key] and left[0] == 'value':
+                return _scalar(left[1])
+        return None
+    
+    def _op_Query(self, request):
+        table = self.table(request['TableName'])
+        index = table.get_index(request.get('IndexName'))
+        if not request.get('KeyConditionExpression'):
+            raise _validation("Either the KeyConditions or KeyConditionExpression parameter must be specified in the request")
+        key_condition = self._condition(request, 'KeyConditionExpression')
+        hash_value = self._hash_value(key_condition, index.hash_key)
+        if hash_value is None:
+            raise _validation("Query condition missed key schema element")
+        
+        entries = index.entries(hash_value)
+        forward = request.get('ScanIndexForward', True)
+        if 'ExclusiveStartKey' in request:
+            start = request['ExclusiveStartKey']
+            start_key = index.order_key(start, table.key_of(start))
+            order_keys = [order_key for order_key, _ in entries]
+            if forward:
+                entries = entries[bisect.bisect_right(order_keys, start_key):]
+            else:
+                entries = entries[:bisect.bisect_left(order_keys, start_key)]
+        if not forward:
+            entries = entries[::-1]
+        
+        return self._read_page(request, table, index, entries, key_condition)
+    
+    def _op_Scan(self, request):
+        table = self.table(request['TableName'])
+        index = table.get_index(request.get('IndexName'))
+        segment = request.get('Segment')
+        total_segments = request.get('TotalSegments')
+        if (segment is None) != (total_segments is None):
+            raise _validation("Segment and TotalSegments must be specified together")
+        
+        entries = []
+        for hash_value, partition in index.partitions.items():
+            # Partitions are spread over segments by a hash of their key
+            if total_segments and zlib.crc32(repr(hash_value).encode('utf-8')) % total_segments != segment:
+                continue
+            for key, item in partition.items():
+                entries.append(((repr(hash_value), index.order_key(item, key)), item))
+        entries.sort(key=lambda entry: entry[0])
+        
+        if 'ExclusiveStartKey' in request:
+            start = request['ExclusiveStartKey']
+            start_key = (repr(_scalar(start[index.hash_key])), index.order_key(start, table.key_of(start)))
+            entries = entries[bisect.bisect_right([order_key for order_key, _ in entries], start_key):]
+        
+        return self._read_page(request, table, index, entries, None)
+    
+    # Batch operations
+    
+    def _op_BatchGetItem(self, request):
+        requested = request['RequestItems']
+        if sum(len(keys['Keys']) for keys in requested.values()) > MAX_BATCH_GET:
+            raise _validation(f"Too many items requested for the BatchGetItem call (max {MAX_BATCH_GET})")
+        
+        responses = {}
+        capacity = []
+        for table_name, keys in requested.items():
+            table = self.table(table_name)
+            projection = self._projection(keys)
+            found = []
+            read = 0
+            for key in keys['Keys']:
+                item = table.get(table.key_of(key, exact=True))
+                read += read_units([item or {}], keys.get('ConsistentRead', False), per_item=True)
+                if item is not None:
+                    found.append(project(item, projection) if projection else item)
+            responses[table_name] = found
+            capacity.append(self._capacity(request, consumed_capacity(table.name, read=read)))
+        
+        response = {'Responses': responses, 'UnprocessedKeys': {}}
+        if capacity[0] is not None:
+            response['ConsumedCapacity'] = capacity
+        return response
+    
+    def _op_BatchWriteItem(self, request):
+        requested = request['RequestItems']
+        if sum(len(writes) for writes in requested.values()) > MAX_BATCH_WRITE:
+            raise _validation(f"Too many items requested for the BatchWriteItem call (max {MAX_BATCH_WRITE})")
+        
+        capacity = []
+        for table_name, writes in requested.items():
+            table = self.table(table_name)
+            keys = [table.key_of(write['PutRequest']['Item'] if 'PutRequest' in write else write['DeleteRequest']['Key']) for write in writes]
+            if len(set(keys)) != len(keys):
+                raise _validation("Provided list of item keys contains duplicates")
+            for key, write in zip(keys, writes):
+                new = write['PutRequest']['Item'] if 'PutRequest' in write else None
+                capacity.append(self._write(table, key, table.get(key), new))
+        
+        response = {'UnprocessedItems': {}}
+        if capacity and self._capacity(request, capacity[0]) is not None:
+            response['ConsumedCapacity'] = [self._capacity(request, block) for block in self._merge_capacity(capacity)]
+        return response
+    
+    # Transactions
+    
+    def _op_TransactGetItems(self, request):
+        if len(request['TransactItems']) > MAX_TRANSACT_ITEMS:
+            raise _validation(f"Member must have length less than or equal to {MAX_TRANSACT_ITEMS}")
+        
+        responses = []
+        capacity = []
+        for entry in request['TransactItems']:
+            get = entry['Get']
+            table = self.table(get['TableName'])
+            item = table.get(table.key_of(get['Key'], exact=True))
+            # Transactional reads cost twice a consistent read
+            capacity.append(consumed_capacity(table.name, read=2 * read_units([item or {}], True, per_item=True)))
+            projection = self._projection(get)
+            responses.append({'Item': project(item, projection) if projection else item} if item is not None else {})
+        
+        response = {'Responses': responses}
+        if self._capacity(request, capacity[0]) is not None:
+            response['ConsumedCapacity'] = [self._capacity(request, block) for block in self._merge_capacity(capacity)]
+        return response
+    
+    def _op_TransactWriteItems(self, request):
+        entries = request['TransactItems']
+        if len(entries) > MAX_TRANSACT_ITEMS:
+            raise _validation(f"Member must have length less than or equal to {MAX_TRANSACT_ITEMS}")
+        
+        # Work out every write (and check every condition) before applying any
+        planned = []
+        reasons = []
+        seen = set()
+        for entry in entries:
+            action, params = next(iter(entry.items()))
+            table = self.table(params['TableName'])
+            key = table.key_of(params['Item'] if action == 'Put' else params['Key'], exact=action != 'Put')
+            if (table.name, key) in seen:
+                raise _validation("Transaction request cannot include multiple operations on one item")
+            seen.add((table.name, key))
+            
+            old = table.get(key)
+            condition = self._condition(params)
+            if condition is not None and not _matches(condition, old or {}):
+                reasons.append({'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'})
+                continue
+            reasons.append({'Code': 'None'})
+            
+            if action == 'Put':
+                planned.append((table, key, old, params['Item']))
+            elif action == 'Delete':
+                planned.append((table, key, old, None))
+            elif action == 'Update':
+                actions = self._parser(params, 'UpdateExpression').parse_update()
+                new, _ = apply_update(old or dict(params['Key']), actions)
+                planned.append((table, key, old, new))
+        
+        if any(reason['Code'] != 'None' for reason in reasons):
+            codes = ', '.join(reason['Code'] for reason in reasons)
+            raise DynamoDBError(
+                'TransactionCanceledException',
+                f"Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]",
+                CancellationReasons=reasons
+            )
+        
+        capacity = []
+        for table, key, old, new in planned:
+            block = self._write(table, key, old, new)
+            # Transactional writes cost twice a standard write
+            for units in [block, block['Table'], *block.get('GlobalSecondaryIndexes', {}).values()]:
+                for field in ('CapacityUnits', 'WriteCapacityUnits'):
+                    units[field] *= 2
+            capacity.append(block)
+        
+        response = {}
+        if capacity and self._capacity(request, capacity[0]) is not None:
+            response['ConsumedCapacity'] = [self._capacity(request, block) for block in self._merge_capacity(capacity)]
+        return response
+    
+    def _op_DescribeEndpoints(self, request):
+        return {'Endpoints': [{'Address': 'localhost', 'CachePeriodInMinutes': 1440}]}
@@ -0,0 +1,329 @@
+"""
+Local API Gateway emulator
+Serves the API over HTTP on localhost the way the deployed REST API does:
+routes, authorisation and CORS responses are read from the terraform
+*_api.tf files (tools/terraform_config.py), and each request is turned into
+an AWS_PROXY event and run through the route's lambda_handler in a worker
+pool, against the local DynamoDB (tools/local_dynamodb.py) and Stripe
+(tools/stub_stripe.py) stand-ins seeded with the benchmark organisations.
+
+LOGIC:
+1. Match (method, path) to a terraform resource - literal path parts win
+   over {params}; no match answers 403 "Missing Authentication Token"
+2. MOCK integrations (OPTIONS) answer with their integration response headers
+3. COGNITO_USER_POOLS methods need an Authorization header; the token is
+   not verified - "Bearer local.<user_id>" or any JWT whose payload has a
+   sub becomes the authorizer claims, anything else answers 401
+4. The event (base64 body, as binary_media_types is */*) is queued for the
+   worker pool; a worker runs the handler with a Lambda context carrying the
+   function's terraform timeout
+5. Handler errors answer 502, requests waiting longer than API Gateway's
+   29s integration timeout answer 504
+
+Every response carries X-Local-Queue-Ms (time waiting for a worker) and
+X-Local-Handler-Ms. Workers are threads in one process. Unlike a Lambda
+container, which runs one request at a time, they run requests
+concurrently: the caches a container keeps between requests (clients,
+Stripe prices, rate limit leases) are shared by all of them, while each
+invocation runs in a fresh contextvars.Context, so per-request state (the
+unit of work, deadline, rate limit decisions and telemetry are context
+variables) stays with its request. Handler timings include contention for
+the GIL (use tools/bench_handlers.py for per-request figures).
+
+USAGE:
+    python tools/local_gateway.py --workers 20 --dynamodb-latency-ms 5
+    python tools/local_gateway.py --dynamodb-throttle-rate 0.2    # retries, 429s
+    curl -H 'Authorization: Bearer local.user-10-0000' http://127.0.0.1:3001/organisation/members
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+import argparse
+import tempfile
+import contextvars
+import threading
+import traceback
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..', 'src', 'api'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+os.environ.setdefault('ARCHIVE_DIR', tempfile.mkdtemp(prefix='gateway-archive-'))
+
+from local_dynamodb import LocalDynamoDB  # noqa: E402
+from stub_stripe import StubStripe  # noqa: E402
+from terraform_config import find_api_routes  # noqa: E402
+from scenarios import ORG_SIZES, FakeContext, seed, load_handler  # noqa: E402
+
+# API Gateway's maximum integration timeout
+INTEGRATION_TIMEOUT_MS = 29000
+
+
+def claims_from_token(authorization):
+    """Cognito claims for an Authorization header value, or None if unusable."""
+    token = (authorization or '').strip()
+    if token.lower().startswith('bearer '):
+        token = token[7:].strip()
+    if token.startswith('local.') and len(token) > 6:
+        user_id, email = token[6:], None
+    elif token.count('.') == 2:
+        try:
+            payload = token.split('.')[1]
+            payload = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        except ValueError:
+            return None
+        user_id, email = payload.get('sub'), payload.get('email')
+    else:
+        return None
+    if not user_id:
+        return None
+    return {
+        'sub': user_id,
+        'email': email or f'{user_id}@example.com',
+        'email_verified': 'true',
+        'cognito:username': user_id,
+        'token_use': 'id',
+    }
+
+
+class LocalGateway:
+    """Routes HTTP requests to lambda_handlers like the REST API's proxy integrations."""
+    
+    def __init__(self, routes, workers=10, use_router=False):
+        self.routes = routes
+        self.use_router = use_router
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lambda')
+        self.lock = threading.Lock()
+        self.handlers = {}
+        # (method, resource) -> {'count', 'statuses', 'queue_ms', 'handler_ms'}
+        self.stats = {}
+        # Resource paths split into parts, most literal parts first
+        self.resources = sorted(
+            {path for _, path in routes},
+            key=lambda path: -sum(not part.startswith('{') for part in path.strip('/').split('/'))
+        )
+    
+    def match(self, path):
+        """Find the resource for a request path. Returns (resource, path parameters) or (None, None)."""
+        parts = path.strip('/').split('/')
+        for resource in self.resources:
+            resource_parts = resource.strip('/').split('/')
+            if len(resource_parts) != len(parts):
+                continue
+            params = {}
+            for resource_part, part in zip(resource_parts, parts):
+                if resource_part.startswith('{'):
+                    if not part:
+                        break
+                    params[resource_part[1:-1]] = part
+                elif resource_part != part:
+                    break
+            else:
+                return resource, params
+        return None, None
+    
+    def get_handler(self, route):
+        module = 'router' if self.use_router else route['module']
+        with self.lock:
+            if module not in self.handlers:
+                self.handlers[module] = load_handler(module)
+            return self.handlers[module]
+    
+    def build_event(self, method, resource, path, path_params, query, headers, body, claims):
+        """Build the AWS_PROXY event API Gateway would send."""
+        multi_query = parse_qs(query, keep_blank_values=True) if query else {}
+        request_context = {
+            'resourcePath': resource,
+            'httpMethod': method,
+            'path': f'/local{path}',
+            'stage': 'local',
+            'requestId': str(uuid.uuid4()),
+            'requestTimeEpoch': int(time.time() * 1000),
+            'identity': {'sourceIp': '127.0.0.1', 'userAgent': headers.get('User-Agent')},
+        }
+        if claims:
+            request_context['authorizer'] = {'claims': claims}
+        return {
+            'resource': resource,
+            'path': path,
+            'httpMethod': method,
+            'headers': headers or None,
+            'multiValueHeaders': {name: [value] for name, value in headers.items()} or None,
+            'queryStringParameters': {name: values[-1] for name, values in multi_query.items()} or None,
+            'multiValueQueryStringParameters': multi_query or None,
+            'pathParameters': path_params or None,
+            'stageVariables': None,
+            'requestContext': request_context,
+            # binary_media_types = ["*/*"] - every body arrives base64-encoded
+            'body': base64.b64encode(body).decode('ascii') if body else None,
+            'isBase64Encoded': bool(body),
+        }
+    
+    def _run(self, handler, event, context, queued):
+        started = time.perf_counter()
+        try:
+            # A fresh context per invocation - pool threads would otherwise carry one request's state into the next
+            response = contextvars.Context().run(handler, event, context)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            response = None
+        finished = time.perf_counter()
+        return response, (started - queued) * 1000, (finished - started) * 1000
+    
+    def handle(self, method, raw_path, headers, body):
+        """Handle one HTTP request. Returns (status, headers, body bytes)."""
+        split = urlsplit(raw_path)
+        resource, path_params = self.match(split.path)
+        route = self.routes.get((method, resource)) if resource else None
+        if route is None:
+            return self._gateway_response(403, 'Missing Authentication Token')
+        
+        if route['type'] == 'MOCK':
+            return 200, dict(route['response_headers'], **{'Content-Type': 'application/json'}), b''
+        
+        claims = None
+        if route['authorization'] == 'COGNITO_USER_POOLS':
+            authorization = next((value for name, value in headers.items() if name.lower() == 'authorization'), None)
+            claims = claims_from_token(authorization)
+            if claims is None:
+                return self._gateway_response(401, 'Unauthorized')
+        
+        event = self.build_event(method, resource, split.path, path_params, split.query, headers, body, claims)
+        timeout_ms = (route['timeout'] or 3) * 1000
+        context = FakeContext('api_router' if self.use_router else route['function'], timeout_ms=timeout_ms)
+        
+        handler = self.get_handler(route)
+        queued = time.perf_counter()
+        future = self.pool.submit(self._run, handler, event, context, queued)
+        try:
+            response, queue_ms, handler_ms = future.result(timeout=INTEGRATION_TIMEOUT_MS / 1000)
+        except FutureTimeoutError:
+            self._record(method, resource, 504, (time.perf_counter() - queued) * 1000, 0)
+            return self._gateway_response(504, 'Endpoint request timed out')
+        
+        if handler_ms > timeout_ms:
+            print(f"[Gateway] {route['function']} timed out after {handler_ms:.0f}ms (timeout {timeout_ms}ms)", file=sys.stderr)
+            response = None
+        if not isinstance(response, dict) or 'statusCode' not in response:
+            status, response_headers, response_body = self._gateway_response(502, 'Internal server error')
+        else:
+            status = int(response['statusCode'])
+            response_headers = dict(response.get('headers') or {})
+            for name, values in (response.get('multiValueHeaders') or {}).items():
+                response_headers[name] = ', '.join(str(value) for value in values)
+            response_body = response.get('body') or ''
+            if response.get('isBase64Encoded'):
+                response_body = base64.b64decode(response_body)
+            else:
+                response_body = response_body.encode('utf-8')
+        
+        response_headers['X-Local-Queue-Ms'] = f'{queue_ms:.2f}'
+        response_headers['X-Local-Handler-Ms'] = f'{handler_ms:.2f}'
+        self._record(method, resource, status, queue_ms, handler_ms)
+        return status, response_headers, response_body
+    
+    @staticmethod
+    def _gateway_response(status, message):
+        return status, {'Content-Type': 'application/json', 'x-amzn-ErrorType': message}, json.dumps({'message': message}).encode('utf-8')
+    
+    def _record(self, method, resource, status, queue_ms, handler_ms):
+        with self.lock:
+            stats = self.stats.setdefault((method, resource), {'count': 0, 'statuses': {}, 'queue_ms': [], 'handler_ms': []})
+            stats['count'] += 1
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+            stats['queue_ms'].append(queue_ms)
+            stats['handler_ms'].append(handler_ms)
+    
+    def print_stats(self, out=sys.stderr):
+        def pct(values, p):
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else 0
+        
+        print(f"\n{'route':<46} {'count':>7} {'handler p50':>12} {'p95':>8} {'queue p95':>10}  status", file=out)
+        for (method, resource), stats in sorted(self.stats.items(), key=lambda item: (item[0][1], item[0][0])):
+            statuses = ','.join(f'{code}x{count}' for code, count in sorted(stats['statuses'].items()))
+            print(
+                f"{method + ' ' + resource:<46} {stats['count']:>7} {pct(stats['handler_ms'], 50):>12.2f} "
+                f"{pct(stats['handler_ms'], 95):>8.2f} {pct(stats['queue_ms'], 95):>10.2f}  {statuses}",
+                file=out
+            )
+
+
+class GatewayRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def _dispatch(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, headers, response_body = self.server.gateway.handle(self.command, self.path, dict(self.headers.items()), body)
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() not in ('content-length', 'connection'):
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(response_body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(response_body)
+    
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_OPTIONS = do_HEAD = _dispatch
+    
+    def log_message(self, format, *args):
+        if self.server.access_log:
+            sys.stderr.write(f"[Gateway] {self.address_string()} {format % args}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the API locally, routed from terraform, against local stand-ins')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3001)
+    parser.add_argument('--workers', type=int, default=10, help='Concurrent handler invocations (like reserved concurrency)')
+    parser.add_argument('--router', action='store_true', help='Send every route through router.lambda_handler (api_router_enabled)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(ORG_SIZES), help='Organisation sizes to seed')
+    parser.add_argument('--dynamodb-latency-ms', type=float, default=0, help='Simulated latency per DynamoDB call')
+    parser.add_argument('--stripe-latency-ms', type=float, default=0, help='Simulated latency per Stripe call')
+    parser.add_argument('--no-rate-limits', action='store_true', help='Turn rate limiting (utils.rate_limit) off')
+    parser.add_argument('--dynamodb-throttle-rate', type=float, default=0, help='Share of DynamoDB calls answered with a throttling error')
+    parser.add_argument('--access-log', action='store_true', help='Log every request')
+    parser.add_argument('--verbose', action='store_true', help="Show the handlers' own log output")
+    args = parser.parse_args()
+    
+    local = LocalDynamoDB.from_terraform(latency_ms=args.dynamodb_latency_ms)
+    local.install()
+    stripe_stub = StubStripe(latency_ms=args.stripe_latency_ms).install()
+    worlds = seed(local, stripe_stub, args.sizes)
+    local.throttle_rate = args.dynamodb_throttle_rate
+    if args.no_rate_limits:
+        os.environ['RATE_LIMITS_TABLE_NAME'] = ''
+    
+    routes = find_api_routes()
+    gateway = LocalGateway(routes, workers=args.workers, use_router=args.router)
+    server = ThreadingHTTPServer((args.host, args.port), GatewayRequestHandler)
+    server.daemon_threads = True
+    server.request_queue_size = 256
+    server.gateway = gateway
+    server.access_log = args.access_log
+    
+    print(f"[Gateway] {len(routes)} routes from terraform, {args.workers} workers, http://{args.host}:{args.port}", file=sys.stderr)
+    for size, world in sorted(worlds.items()):
+        print(f"[Gateway] org of {size}: owner Authorization: Bearer local.{world['owner']}", file=sys.stderr)
+    
+    # Handlers log to stdout; the gateway logs to stderr
+    if not args.verbose:
+        sys.stdout = open(os.devnull, 'w')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        gateway.pool.shutdown(wait=False)
+        gateway.print_stats()
+
+
+if __name__ == '__main__':
+    main()
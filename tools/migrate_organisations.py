@@ -0,0 +1,157 @@
+"""
+Organisation table migration
+Copies the legacy organisations, org-members and org-invitations tables into
+the single-table layout (organisation_data, see src/api/organisations/model.py).
+
+STEPS:
+1. Run the organisation-data-* migrations (tools/migrations.py) with the
+   backfill runner (tools/backfill.py): a parallel segmented Scan of each
+   legacy table, items built with the model's builders (organisation_item,
+   member_item, invitation_item), held to --max-rcu/--max-wcu and
+   checkpointed per segment
+2. Count each entity in both layouts and report any difference
+
+Items are copied one at a time with organisations.legacy.copy_item, the
+copy the functions make on first use: a PutItem conditional on the item
+not being in organisation_data yet (or the legacy row having a newer
+updated_at), so nothing changed through the handlers is overwritten. The
+functions delete legacy rows together with their organisation_data items,
+and a copy whose legacy row went while it was written is removed again, so
+deleted members, invitations and organisations don't come back. Running it
+again (--restart) only copies what is missing or newer. --dry-run builds
+and counts the items without writing.
+
+DEPLOY ORDER:
+1. terraform apply - the functions switch to organisation_data, and with
+   organisation_legacy_tables_enabled (the default) read through to the
+   legacy tables, copying an organisation the first time one of its
+   members is seen
+2. python tools/migrate_organisations.py --environment <env> once the apply
+   has finished (copies every organisation nobody has used yet)
+3. terraform apply -var organisation_legacy_tables_enabled=false once the
+   counts match; remove the legacy tables when every environment is done
+
+USAGE:
+    python tools/migrate_organisations.py --environment dev --dry-run
+    python tools/migrate_organisations.py --environment dev --segments 8 --workers 8 --max-wcu 100
+    python tools/migrate_organisations.py --local      # seeded local stand-in
+"""
+import os
+import sys
+import time
+import argparse
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..', 'src', 'api'))
+
+from utils.dynamodb import ClientTable  # noqa: E402
+from backfill import add_runner_arguments, resolve_tables, run_migration  # noqa: E402
+from migrations import get_migration  # noqa: E402
+
+# Migration (legacy table -> organisation_data) -> entity it copies
+MIGRATIONS = {
+    'organisation-data-organisations': 'organisation',
+    'organisation-data-members': 'member',
+    'organisation-data-invitations': 'invitation',
+}
+
+TARGET = 'organisation_data'
+
+
+def count_items(table, **scan_kwargs):
+    """Count a table's items (matching a filter) with COUNT scans."""
+    total = 0
+    while True:
+        response = table.scan(Select='COUNT', **scan_kwargs)
+        total += response.get('Count', 0)
+        if 'LastEvaluatedKey' not in response:
+            return total
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def verify(tables):
+    """Compare each entity's count in the legacy and new layouts. Returns {entity: (legacy, migrated)}."""
+    target = ClientTable(tables[TARGET]['name'])
+    counts = {}
+    for name, entity in MIGRATIONS.items():
+        counts[entity] = (
+            count_items(ClientTable(tables[get_migration(name).table]['name'])),
+            count_items(target, FilterExpression='#entity = :entity',
+                        ExpressionAttributeNames={'#entity': 'entity'}, ExpressionAttributeValues={':entity': entity}),
+        )
+    return counts
+
+
+def migrate(tables, args):
+    """Copy every legacy table. Returns True if the counts match."""
+    for name in MIGRATIONS:
+        run_migration(get_migration(name), tables, args)
+        print()
+    
+    if args.dry_run:
+        return True
+    
+    matched = True
+    print(f"{'entity':<14} {'legacy':>8} {'migrated':>9}")
+    for entity, (legacy, migrated) in verify(tables).items():
+        # The target can hold more - items created after a previous run's switch
+        status = 'ok' if migrated >= legacy else 'MISSING'
+        matched = matched and migrated >= legacy
+        print(f"{entity:<14} {legacy:>8} {migrated:>9}  {status}")
+    return matched
+
+
+def seed_legacy(local, sizes):
+    """Seed the local legacy tables with one organisation per size."""
+    from scenarios import member_id
+    
+    timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime())
+    for size in sizes:
+        org_id = f'org-{size}'
+        local.put_items('printerapp-organisations-local', [{
+            'organisation_id': org_id,
+            'name': f'Organisation of {size}',
+            'owner_id': member_id(size, 0),
+            'created_at': timestamp,
+            'updated_at': timestamp,
+        }])
+        local.put_items('printerapp-org-members-local', [
+            {
+                'organisation_id': org_id,
+                'user_id': member_id(size, index),
+                'role': 'owner' if index == 0 else 'member',
+                'joined_at': timestamp,
+            }
+            for index in range(size)
+        ])
+        local.put_items('printerapp-org-invitations-local', [
+            {
+                'organisation_id': org_id,
+                'invitation_id': f'invite-{size}-{index}',
+                'email': f'invitee-{size}-{index}@example.com',
+                'role': 'member',
+                'invited_by': member_id(size, 0),
+                'created_at': timestamp,
+                'expires_at': timestamp,
+                'status': 'pending',
+            }
+            for index in range(3)
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy the legacy organisation tables into the single-table layout')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 1000], help='Organisation sizes to seed with --local')
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    
+    tables, local = resolve_tables(args)
+    if local is not None:
+        seed_legacy(local, args.sizes)
+    
+    print(f"Migrating organisation tables ({args.environment}){' - dry run' if args.dry_run else ''}\n")
+    return 0 if migrate(tables, args) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Data migrations for tools/backfill.py
+Each Migration names the terraform table it scans and a transform applied to
+every item: transform(item) returns the item as it should be stored, or None
+to leave the item alone.
+
+TRANSFORMS MUST BE IDEMPOTENT:
+A transform given an item it has already migrated returns None (or the item
+unchanged). The runner repeats at most a page after a crash, an in-place
+migration run again writes nothing (a copy rewrites the same items), and
+--dry-run checks that transforming a transform's own output changes nothing.
+
+WRITES:
+- target: another terraform table to write to (copies into a new layout);
+  by default items are written back to the table they came from
+- version_attribute: an attribute every handler write changes (updated_at).
+  Items are then written one at a time with a conditional PutItem on it, and
+  an item changed since the scan is re-read and transformed again instead of
+  overwritten. Without it, items are written with BatchWriteItem - for tables
+  no handler writes to during the run (or a new table)
+- An item written back under a different key has its old key deleted
+- write: a function that writes one changed item itself -
+  write(tables, old, new) returns the write's response, or None when the
+  item turned out not to need it. For items that must be written together
+  with others (a transaction)
+
+Add a migration by appending to MIGRATIONS; tools/backfill.py --list shows
+them.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from botocore.exceptions import ClientError
+from organisations.legacy import copy_item
+from organisations.model import INVITE_PREFIX, get_invitation_expiry, organisation_item, member_item, invitation_item
+from subscriptions.billing_metrics import (
+    MRR_STATUSES, build_metric_update, build_metrics_state, get_seed_deltas, get_subscription_mrr
+)
+from subscriptions.expiry import get_expiry_attributes
+from subscriptions.stripe_client import get_stripe
+from utils.dynamodb import ClientTable, get_client, marshal_request
+from utils.unit_of_work import is_condition_failure
+
+
+@dataclass
+class Migration:
+    """One rewrite of a table's items."""
+    name: str
+    description: str
+    # Terraform resource scanned, e.g. "subscriptions"
+    table: str
+    transform: Callable
+    # Terraform resource written to (default: table)
+    target: Optional[str] = None
+    # Extra Scan parameters, e.g. a FilterExpression to skip items early
+    scan: dict = field(default_factory=dict)
+    version_attribute: Optional[str] = None
+    write: Optional[Callable] = None
+
+
+def index_subscription_expiry(subscription):
+    """Set (or clear) the expiry_bucket-index attributes from the subscription's status and period."""
+    expected = get_expiry_attributes(
+        subscription.get('status'),
+        subscription.get('current_period_end'),
+        subscription.get('trial_end')
+    )
+    current = {name: subscription[name] for name in ('expiry_bucket', 'expires_at') if name in subscription}
+    if current == expected:
+        return None
+    
+    migrated = {name: value for name, value in subscription.items() if name not in ('expiry_bucket', 'expires_at')}
+    migrated.update(expected)
+    return migrated
+
+
+def set_subscription_mrr(subscription):
+    """Give a subscription written before the billing metrics its mrr (None once it has one)."""
+    if 'mrr' in subscription:
+        return None
+    
+    mrr = 0
+    # Only active subscriptions count towards MRR - the others need no Stripe call
+    if subscription.get('status') in MRR_STATUSES and subscription.get('stripe_subscription_id'):
+        mrr = get_subscription_mrr(get_stripe().Subscription.retrieve(subscription['stripe_subscription_id']))
+    return dict(subscription, mrr=mrr)
+
+
+def count_subscription_metrics(tables, old, new):
+    """
+    Set a subscription's mrr and add it to the CURRENT gauges in one
+    transaction. None if a webhook counted it first.
+    """
+    subscriptions = tables['subscriptions']
+    transact_items = [{'Update': marshal_request({
+        'TableName': subscriptions['name'],
+        'Key': {subscriptions['hash_key']: old[subscriptions['hash_key']]},
+        'UpdateExpression': 'SET mrr = :mrr',
+        'ConditionExpression': 'attribute_exists(#key) AND attribute_not_exists(mrr)',
+        'ExpressionAttributeNames': {'#key': subscriptions['hash_key']},
+        'ExpressionAttributeValues': {':mrr': new['mrr']},
+    })}]
+    
+    state = build_metrics_state(new.get('status'), new.get('plan'), new.get('billing_period'), new['mrr'])
+    for (metric_key, dimension), deltas in get_seed_deltas(state).items():
+        update = build_metric_update(metric_key, dimension, deltas)
+        update['TableName'] = tables['billing_metrics']['name']
+        transact_items.append({'Update': marshal_request(update)})
+    
+    try:
+        return get_client().transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        if is_condition_failure(e):
+            return None
+        raise
+
+
+def set_invitation_expiry(invitation):
+    """Give an invitation written with expires_at = created_at its real expiry (None once it has one)."""
+    if not invitation.get('created_at') or invitation.get('expires_at') != invitation['created_at']:
+        return None
+    return dict(invitation, expires_at=get_invitation_expiry(invitation['created_at']))
+
+
+def write_invitation_expiry(tables, old, new):
+    """Set expires_at unless the invitation changed (or went) since the scan. None if it did."""
+    table = ClientTable(tables['organisation_data']['name'])
+    try:
+        return table.update_item(
+            Key={'pk': old['pk'], 'sk': old['sk']},
+            UpdateExpression='SET expires_at = :expires_at',
+            ConditionExpression='expires_at = created_at',
+            ExpressionAttributeValues={':expires_at': new['expires_at']}
+        )
+    except ClientError as e:
+        if is_condition_failure(e):
+            return None
+        raise
+
+
+# Legacy organisation tables by the entity they hold
+LEGACY_TABLES = {'organisation': 'organisations', 'member': 'org_members', 'invitation': 'org_invitations'}
+
+
+def copy_legacy_item(tables, old, new):
+    """
+    Copy a legacy organisation row unless organisation_data has it at the
+    same or a newer updated_at, or it was deleted meanwhile (organisations.legacy).
+    None if nothing was copied.
+    """
+    source = tables[LEGACY_TABLES[new['entity']]]
+    key = {name: old[name] for name in (source['hash_key'], source['range_key']) if name}
+    return copy_item(ClientTable(tables['organisation_data']['name']), ClientTable(source['name']), new, key)
+
+
+MIGRATIONS = [
+    Migration(
+        name='subscription-expiry-index',
+        description='Add expiry_bucket/expires_at to subscriptions written before the expiry sweeper',
+        table='subscriptions',
+        transform=index_subscription_expiry,
+        version_attribute='updated_at',
+    ),
+    Migration(
+        name='billing-metrics-seed',
+        description='Set mrr on subscriptions written before the billing metrics and count them in the CURRENT gauges',
+        table='subscriptions',
+        transform=set_subscription_mrr,
+        scan={'FilterExpression': 'attribute_not_exists(mrr)'},
+        write=count_subscription_metrics,
+    ),
+    Migration(
+        name='invitation-expiry',
+        description='Give invitations created without one a real expires_at (before archive_records relies on it)',
+        table='organisation_data',
+        transform=set_invitation_expiry,
+        scan={
+            'FilterExpression': 'begins_with(sk, :invite) AND expires_at = created_at',
+            'ExpressionAttributeValues': {':invite': INVITE_PREFIX},
+        },
+        write=write_invitation_expiry,
+    ),
+    # Copies of the legacy organisation tables (tools/migrate_organisations.py)
+    Migration(
+        name='organisation-data-organisations',
+        description='Copy the legacy organisations table into organisation_data',
+        table='organisations',
+        target='organisation_data',
+        transform=organisation_item,
+        write=copy_legacy_item,
+    ),
+    Migration(
+        name='organisation-data-members',
+        description='Copy the legacy org-members table into organisation_data',
+        table='org_members',
+        target='organisation_data',
+        transform=member_item,
+        write=copy_legacy_item,
+    ),
+    Migration(
+        name='organisation-data-invitations',
+        description='Copy the legacy org-invitations table into organisation_data',
+        table='org_invitations',
+        target='organisation_data',
+        transform=invitation_item,
+        write=copy_legacy_item,
+    ),
+]
+
+
+def get_migration(name):
+    """Get a migration by name (None if there is no such migration)."""
+    return next((migration for migration in MIGRATIONS if migration.name == name), None)
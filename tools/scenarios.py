@@ -0,0 +1,361 @@
+"""
+Handler scenarios for local runs
+Builds API Gateway events (with Cognito claims) and Lambda contexts, seeds
+the local DynamoDB stand-in with synthetic organisations, and defines one
+scenario per lambda_handler - shared by the benchmark and other local tools.
+
+WORLD:
+Each organisation size gets its own org ("org-<size>") with an owner, an
+admin and plain members, a profile per member, three pending invitations
+and an active business subscription known to the Stripe stub. Scenarios act
+as the owner of the org of the size being run.
+
+SCENARIOS:
+Scenario.event(world, iteration) builds the event; scenarios that change
+the data they depend on have a restore step, run outside any timing.
+"""
+import os
+import time
+import uuid
+import json
+import importlib
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from terraform_config import find_lambda_functions
+from stub_stripe import sign_payload
+from organisations.model import get_invitation_expiry, org_pk, organisation_item, member_item, invitation_item
+
+# Organisation sizes seeded by default
+ORG_SIZES = (1, 10, 1000)
+
+# Pending invitations seeded per organisation
+INVITATIONS_PER_ORG = 3
+
+
+class FakeContext:
+    """The parts of the Lambda context object the handlers and utils read."""
+    
+    def __init__(self, function_name='local', timeout_ms=10000, memory_limit_in_mb=128):
+        self.function_name = function_name
+        self.function_version = '$LATEST'
+        self.memory_limit_in_mb = memory_limit_in_mb
+        self.aws_request_id = str(uuid.uuid4())
+        self.invoked_function_arn = f'arn:aws:lambda:eu-west-2:000000000000:function:{function_name}'
+        self._deadline = time.monotonic() + timeout_ms / 1000
+    
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+def build_event(method, resource, user_id=None, body=None, path_params=None, query=None, headers=None, email=None):
+    """Build an API Gateway (REST, proxy integration) event with Cognito claims."""
+    path = resource
+    for name, value in (path_params or {}).items():
+        path = path.replace(f'{{{name}}}', value)
+    
+    headers = dict({'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate, br'}, **(headers or {}))
+    if user_id:
+        headers.setdefault('Authorization', f'Bearer local.{user_id}')
+    
+    request_context = {
+        'resourcePath': resource,
+        'httpMethod': method,
+        'path': f'/local{path}',
+        'stage': 'local',
+        'requestId': str(uuid.uuid4()),
+        'requestTimeEpoch': int(time.time() * 1000),
+        'identity': {'sourceIp': '127.0.0.1', 'userAgent': 'local'},
+    }
+    if user_id:
+        request_context['authorizer'] = {'claims': {
+            'sub': user_id,
+            'email': email or f'{user_id}@example.com',
+            'email_verified': 'true',
+            'cognito:username': user_id,
+            'token_use': 'id',
+        }}
+    
+    return {
+        'resource': resource,
+        'path': path,
+        'httpMethod': method,
+        'headers': headers,
+        'multiValueHeaders': {name: [value] for name, value in headers.items()},
+        'queryStringParameters': query or None,
+        'multiValueQueryStringParameters': {name: [value] for name, value in query.items()} if query else None,
+        'pathParameters': path_params or None,
+        'stageVariables': None,
+        'requestContext': request_context,
+        'body': body if body is None or isinstance(body, str) else json.dumps(body),
+        'isBase64Encoded': False,
+    }
+
+
+def scheduled_event(rule='local'):
+    """Build an EventBridge scheduled event."""
+    return {
+        'version': '0',
+        'id': str(uuid.uuid4()),
+        'detail-type': 'Scheduled Event',
+        'source': 'aws.events',
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'resources': [f'arn:aws:events:eu-west-2:000000000000:rule/{rule}'],
+        'detail': {},
+    }
+
+
+# ----------------------------------------------------------------------------
+# Seeding
+# ----------------------------------------------------------------------------
+
+def member_id(size, index):
+    return f'user-{size}-{index:04d}'
+
+
+def seed_organisation(local, stripe_stub, size):
+    """Seed one organisation of the given size. Returns its world dict."""
+    org_id = f'org-{size}'
+    stripe_sub_id = f'sub_Local{size:08d}'
+    now = int(time.time())
+    timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(now))
+    
+    members = []
+    profiles = []
+    for index in range(size):
+        user_id = member_id(size, index)
+        role = 'owner' if index == 0 else 'admin' if index == 1 else 'member'
+        members.append({'organisation_id': org_id, 'user_id': user_id, 'role': role, 'joined_at': timestamp})
+        profiles.append({
+            'user_id': user_id,
+            'display_name': f'Member {index} of {size}',
+            'email': f'{user_id}@example.com',
+            'company': 'Example Ltd',
+            'country': 'GB',
+            'created_at': timestamp,
+            'updated_at': timestamp,
+        })
+    
+    local.put_items('ORGANISATION_DATA_TABLE_NAME', [organisation_item({
+        'organisation_id': org_id,
+        'name': f'Organisation of {size}',
+        'owner_id': member_id(size, 0),
+        'created_at': timestamp,
+        'updated_at': timestamp,
+    })])
+    local.put_items('ORGANISATION_DATA_TABLE_NAME', [member_item(member) for member in members])
+    local.put_items('TABLE_NAME', profiles)
+    local.put_items('ORGANISATION_DATA_TABLE_NAME', [
+        invitation_item({
+            'organisation_id': org_id,
+            'invitation_id': f'invite-{size}-{index}',
+            'email': f'invitee-{size}-{index}@example.com',
+            'role': 'member',
+            'token': str(uuid.uuid4()),
+            'invited_by': member_id(size, 0),
+            'created_at': timestamp,
+            'expires_at': get_invitation_expiry(timestamp),
+            'status': 'pending',
+        })
+        for index in range(INVITATIONS_PER_ORG)
+    ])
+    
+    stripe_sub = stripe_stub.add_subscription(stripe_sub_id, plan='business', interval='month')
+    local.put_items('SUBSCRIPTIONS_TABLE_NAME', [{
+        'subscription_id': f'subscription-{size}',
+        'stripe_subscription_id': stripe_sub_id,
+        'stripe_customer_id': stripe_sub['customer'],
+        'owner_id': org_id,
+        'owner_type': 'organisation',
+        'created_by_user_id': member_id(size, 0),
+        'plan': 'business',
+        'billing_period': 'monthly',
+        'status': 'active',
+        'current_period_start': stripe_sub['current_period_start'],
+        'current_period_end': stripe_sub['current_period_end'],
+        'cancel_at_period_end': False,
+        'user_limit': 10,
+        'mrr': 3999,
+        'created_at': timestamp,
+        'updated_at': timestamp,
+    }])
+    
+    return {
+        'size': size,
+        'org_id': org_id,
+        'owner': member_id(size, 0),
+        'admin': member_id(size, 1) if size > 1 else None,
+        'member': member_id(size, size - 1) if size > 2 else None,
+        'members': members,
+        'stripe_subscription_id': stripe_sub_id,
+        'stripe_customer_id': stripe_sub['customer'],
+    }
+
+
+def seed(local, stripe_stub, sizes=ORG_SIZES):
+    """Seed one organisation per size. Returns {size: world}."""
+    return {size: seed_organisation(local, stripe_stub, size) for size in sizes}
+
+
+def remove_organisation(local, world):
+    """Delete everything seed_organisation wrote for an org (for reseeding)."""
+    pk = org_pk(world['org_id'])
+    table = local.table('ORGANISATION_DATA_TABLE_NAME')
+    for item in local.get_items('ORGANISATION_DATA_TABLE_NAME'):
+        if item['pk'] == pk:
+            table.delete(table.key_of({'pk': {'S': item['pk']}, 'sk': {'S': item['sk']}}))
+
+
+# ----------------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------------
+
+@dataclass
+class Scenario:
+    """One handler invocation, repeatable against a seeded world."""
+    name: str
+    module: str
+    event: Callable
+    # Smallest org the scenario makes sense for (e.g. needs a plain member)
+    min_size: int = 1
+    # Undo the scenario's writes after each run: restore(local, stripe_stub, world)
+    restore: Optional[Callable] = None
+    # Status codes that count as success
+    expected: tuple = (200, 201, 304)
+    tags: tuple = field(default_factory=tuple)
+
+
+def _owner_event(method, resource, **kwargs):
+    return lambda world, iteration: build_event(method, resource, world['owner'], **kwargs)
+
+
+def _restore_organisation(local, stripe_stub, world):
+    remove_organisation(local, world)
+    world.update(seed_organisation(local, stripe_stub, world['size']))
+
+
+def _restore_member(local, stripe_stub, world):
+    local.put_items('ORGANISATION_DATA_TABLE_NAME', [member_item(world['members'][-1])])
+
+
+def _webhook_event(world, iteration):
+    secret = os.environ['STRIPE_WEBHOOK_SECRET']
+    payload = json.dumps({
+        'id': f'evt_local{iteration:010d}',
+        'object': 'event',
+        'type': 'customer.subscription.updated',
+        'data': {'object': {
+            'id': world['stripe_subscription_id'],
+            'object': 'subscription',
+            'status': 'active',
+            'current_period_start': int(time.time()),
+            'current_period_end': int(time.time()) + 30 * 86400,
+            'cancel_at_period_end': iteration % 2 == 1,
+            'trial_end': None,
+            'items': {'data': [{'quantity': 1, 'price': {
+                'id': 'price_business_month', 'unit_amount': 3999, 'recurring': {'interval': 'month'},
+            }}]},
+        }},
+    })
+    return build_event(
+        'POST', '/subscription/webhook', body=payload,
+        headers={'Stripe-Signature': sign_payload(payload, secret), 'Content-Type': 'application/json'}
+    )
+
+
+SCENARIOS = [
+    # Profile API
+    Scenario('GET /profile', 'profiles.get_profile', _owner_event('GET', '/profile'), tags=('read',)),
+    Scenario(
+        'POST /profile', 'profiles.create_profile',
+        lambda world, iteration: build_event('POST', '/profile', f'new-user-{uuid.uuid4().hex[:12]}', body={'display_name': 'New User'}),
+        tags=('write',)
+    ),
+    Scenario('PUT /profile', 'profiles.update_profile', _owner_event('PUT', '/profile', body={'display_name': 'Owner', 'company': 'Example Ltd'}), tags=('write',)),
+    Scenario('GET /me', 'profiles.get_me', _owner_event('GET', '/me'), tags=('read',)),
+    # Organisation API
+    Scenario('GET /organisation', 'organisations.get_organisation', _owner_event('GET', '/organisation'), tags=('read',)),
+    Scenario(
+        'POST /organisation', 'organisations.create_organisation',
+        lambda world, iteration: build_event('POST', '/organisation', f'new-user-{uuid.uuid4().hex[:12]}', body={'name': 'New Organisation'}),
+        tags=('write',)
+    ),
+    Scenario('PUT /organisation', 'organisations.update_organisation', _owner_event('PUT', '/organisation', body={'name': 'Renamed Organisation'}), tags=('write',)),
+    Scenario('DELETE /organisation', 'organisations.delete_organisation', _owner_event('DELETE', '/organisation'), restore=_restore_organisation, tags=('write',)),
+    Scenario('GET /organisation/members', 'organisations.get_members', _owner_event('GET', '/organisation/members'), tags=('read',)),
+    Scenario(
+        'GET /organisation/members?fields=user_id,role', 'organisations.get_members',
+        _owner_event('GET', '/organisation/members', query={'fields': 'user_id,role'}), tags=('read',)
+    ),
+    Scenario(
+        'POST /organisation/members/invite', 'organisations.invite_member',
+        lambda world, iteration: build_event('POST', '/organisation/members/invite', world['owner'], body={'email': f'{uuid.uuid4().hex[:12]}@example.com'}),
+        expected=(201,), tags=('write',)
+    ),
+    Scenario(
+        'PUT /organisation/members/{member_id}', 'organisations.update_member',
+        lambda world, iteration: build_event(
+            'PUT', '/organisation/members/{member_id}', world['owner'],
+            path_params={'member_id': world['member']}, body={'role': 'admin' if iteration % 2 else 'member'}
+        ),
+        min_size=3, tags=('write',)
+    ),
+    Scenario(
+        'DELETE /organisation/members/{member_id}', 'organisations.remove_member',
+        lambda world, iteration: build_event('DELETE', '/organisation/members/{member_id}', world['owner'], path_params={'member_id': world['member']}),
+        min_size=3, restore=_restore_member, tags=('write',)
+    ),
+    Scenario(
+        'POST /organisation/leave', 'organisations.leave_organisation',
+        lambda world, iteration: build_event('POST', '/organisation/leave', world['member']),
+        min_size=3, restore=_restore_member, tags=('write',)
+    ),
+    # Subscription API
+    Scenario('GET /subscription', 'subscriptions.get_subscription', _owner_event('GET', '/subscription'), tags=('read',)),
+    Scenario(
+        'POST /subscription', 'subscriptions.create_checkout',
+        _owner_event('POST', '/subscription', body={'plan': 'business', 'billing_period': 'monthly', 'owner_type': 'organisation'}),
+        tags=('write', 'stripe')
+    ),
+    Scenario('POST /subscription/portal', 'subscriptions.create_portal', _owner_event('POST', '/subscription/portal'), tags=('write', 'stripe')),
+    Scenario('POST /subscription/webhook', 'subscriptions.stripe_webhook', _webhook_event, tags=('write', 'stripe')),
+    # Scheduled jobs
+    Scenario('expiry sweeper', 'subscriptions.expiry_sweeper', lambda world, iteration: scheduled_event('expiry-sweeper'), expected=(None,), tags=('scheduled', 'stripe')),
+    Scenario('archive records', 'maintenance.archive_records', lambda world, iteration: scheduled_event('archive-records'), expected=(None,), tags=('scheduled',)),
+]
+
+
+def get_scenarios(names=None, tags=None):
+    """Get scenarios by (substring of) name and/or tag."""
+    scenarios = SCENARIOS
+    if names:
+        scenarios = [scenario for scenario in scenarios if any(name in scenario.name for name in names)]
+    if tags:
+        scenarios = [scenario for scenario in scenarios if set(tags) & set(scenario.tags)]
+    return scenarios
+
+
+# Lambda function names by handler module (from terraform)
+_function_names = None
+
+
+def function_name(module):
+    """The terraform Lambda resource that runs a handler module."""
+    global _function_names
+    
+    if _function_names is None:
+        _function_names = {
+            function['module']: name
+            for name, function in find_lambda_functions().items()
+            if function['module'] and name != 'api_router'
+        }
+    return _function_names.get(module, module.rsplit('.', 1)[-1])
+
+
+def load_handler(module):
+    return importlib.import_module(module).lambda_handler
+
+
+def status_of(response):
+    """The HTTP status of a handler response (None for non-API handlers)."""
+    return response.get('statusCode') if isinstance(response, dict) else None
@@ -0,0 +1,223 @@
+"""
+Lambda memory sizing from the benchmark scenarios
+Profiles each Lambda function's memory with utils.memory_profile
+(MEMORY_PROFILE=1) and recommends a memory_size for it.
+
+PER FUNCTION (one fresh Python process each, so imports are measured cold):
+1. Import the handler module and build the clients its first request would
+   (the DynamoDB client, and the Stripe SDK if the handler uses it) - the
+   init memory, broken down by import
+2. Install the local DynamoDB and Stripe stand-ins, seed the organisations
+   and run the function's scenarios (tools/scenarios.py), recording each
+   invocation's peak and retained memory
+3. One more invocation of each scenario at the largest size with the heap
+   snapshots on, for its top allocation sites (diffing the heap takes a
+   few seconds, so a full run takes a few minutes)
+
+RECOMMENDATION:
+    estimate    = interpreter RSS + (init + largest invocation peak) * 1.3
+    recommended = smallest Lambda size >= estimate * headroom (1.5)
+The 1.3 covers allocator overhead on top of what tracemalloc sees. The
+interpreter RSS is measured locally; Lambda's runtime adds a little on top,
+so compare with "Max Memory Used" in the function's REPORT log lines.
+Memory also sets a function's CPU share - the recommendation is a floor for
+memory, not a latency tuning.
+
+USAGE:
+    python tools/size_functions.py
+    python tools/size_functions.py --function get_members delete_organisation --sizes 1000 --verbose
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(TOOLS_DIR, '..', 'src', 'api')
+sys.path.insert(0, API_DIR)
+
+from terraform_config import find_lambda_functions, table_environment  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(TOOLS_DIR, '..', 'build', 'memory_profile.json')
+
+# Memory sizes to recommend from (MB)
+MEMORY_STEPS = [128, 192, 256, 384, 512, 768, 1024, 1536, 2048, 3008]
+
+# Allocator and fragmentation overhead on top of traced Python allocations
+ALLOCATOR_OVERHEAD = 1.3
+
+
+def profile_function(function_name, args):
+    """Child process: profile one function and write the results as JSON."""
+    os.environ['MEMORY_PROFILE'] = '1'
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+    os.environ.setdefault('STRIPE_SECRET_KEY', 'sk_test_stub')
+    os.environ.setdefault('STRIPE_WEBHOOK_SECRET', 'whsec_stub')
+    os.environ.setdefault('ARCHIVE_DIR', tempfile.mkdtemp(prefix='sizing-archive-'))
+    # Handlers read their table names at import
+    os.environ.update(table_environment())
+    
+    import importlib
+    import tracemalloc
+    from utils import memory_profile
+    
+    function = find_lambda_functions()[function_name]
+    interpreter_rss = memory_profile.max_rss_mb()
+    
+    # 1. Init: the handler's imports and the clients its first request builds
+    handler = importlib.import_module(function['module']).lambda_handler
+    from utils.dynamodb import get_client
+    get_client()
+    if 'subscriptions.stripe_client' in sys.modules:
+        from subscriptions.stripe_client import get_stripe
+        get_stripe()
+    init = {
+        'traced_kb': round(tracemalloc.get_traced_memory()[0] / 1024, 1),
+        'rss_mb': memory_profile.max_rss_mb(),
+        'imports': memory_profile.import_memory(),
+    }
+    
+    # 2. Invocations against the stand-ins
+    from local_dynamodb import LocalDynamoDB
+    from stub_stripe import StubStripe
+    from scenarios import SCENARIOS, seed
+    from bench_handlers import invoke
+    
+    local = LocalDynamoDB.from_terraform()
+    local.install()
+    # Every iteration is the same user, who would soon be rate limited
+    os.environ['RATE_LIMITS_TABLE_NAME'] = ''
+    stripe_stub = StubStripe().install()
+    worlds = seed(local, stripe_stub, args.sizes)
+    
+    def run(scenario, world, iteration):
+        _, _, record = invoke(handler, scenario, world, iteration)
+        if scenario.restore:
+            scenario.restore(local, stripe_stub, world)
+        return record
+    
+    top_sites = memory_profile.TOP_SITES or 10
+    invocations = []
+    for scenario in [scenario for scenario in SCENARIOS if scenario.module == function['module']]:
+        for size in args.sizes:
+            if size < scenario.min_size:
+                continue
+            world = worlds[size]
+            records = []
+            memory_profile.TOP_SITES = 0
+            for iteration in range(args.iterations + 1):
+                record = run(scenario, world, iteration)
+                # The first run fills per-container caches
+                if iteration:
+                    records.append(record)
+            sites = []
+            if size == max(args.sizes):
+                memory_profile.TOP_SITES = top_sites
+                sites = run(scenario, world, args.iterations + 1).get('memory', {}).get('sites', [])
+            largest = max(records, key=lambda record: record.get('MemoryPeakKB', 0))
+            retained = sorted(record.get('MemoryRetainedKB', 0) for record in records)
+            invocations.append({
+                'scenario': scenario.name,
+                'org_size': size,
+                'peak_kb': largest.get('MemoryPeakKB', 0),
+                'retained_kb': retained[len(retained) // 2],
+                'sites': sites,
+            })
+    
+    with open(args.result, 'w') as f:
+        json.dump({
+            'function': function_name,
+            'module': function['module'],
+            'memory_size': function['memory_size'],
+            'interpreter_rss_mb': interpreter_rss,
+            'init': init,
+            'invocations': invocations,
+        }, f)
+
+
+def recommend(result, headroom):
+    """Add the estimate and recommended memory_size to a function's result."""
+    peak = max(result['invocations'], key=lambda invocation: invocation['peak_kb'], default=None)
+    peak_kb = peak['peak_kb'] if peak else 0
+    estimate = result['interpreter_rss_mb'] + (result['init']['traced_kb'] + peak_kb) / 1024 * ALLOCATOR_OVERHEAD
+    needed = estimate * headroom
+    recommended = next((size for size in MEMORY_STEPS if size >= needed), MEMORY_STEPS[-1])
+    result.update({
+        'peak_invocation': f"{peak['scenario']} ({peak['org_size']})" if peak else None,
+        'estimate_mb': round(estimate, 1),
+        'recommended_mb': recommended,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recommend Lambda memory sizes from profiled benchmark scenarios')
+    parser.add_argument('--function', nargs='+', help='Terraform function resources to profile (default: all with scenarios)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000], help='Organisation sizes to run')
+    parser.add_argument('--iterations', type=int, default=3, help='Profiled invocations per scenario and size')
+    parser.add_argument('--headroom', type=float, default=1.5, help='Multiplier on the estimate before rounding up')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Where to write the JSON results')
+    parser.add_argument('--verbose', action='store_true', help='List the top imports and allocation sites per function')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        profile_function(args.child, args)
+        return 0
+    
+    from scenarios import SCENARIOS
+    modules = {scenario.module for scenario in SCENARIOS}
+    functions = {
+        name: function for name, function in find_lambda_functions().items()
+        if function['module'] in modules and (not args.function or name in args.function)
+    }
+    
+    results = []
+    print(f"{'function':<22} {'now MB':>7} {'init MB':>8} {'peak MB':>8} {'estimate':>9} {'recommend':>10}  largest invocation")
+    for name in sorted(functions):
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            result_path = f.name
+        command = [
+            sys.executable, os.path.abspath(__file__), '--child', name, '--result', result_path,
+            '--iterations', str(args.iterations), '--sizes', *map(str, args.sizes),
+        ]
+        process = subprocess.run(command, capture_output=True, text=True)
+        if process.returncode != 0:
+            print(f"{name:<22} failed:\n{process.stderr}")
+            continue
+        with open(result_path) as f:
+            result = recommend(json.load(f), args.headroom)
+        os.unlink(result_path)
+        results.append(result)
+        
+        peak_kb = max((invocation['peak_kb'] for invocation in result['invocations']), default=0)
+        change = '' if result['recommended_mb'] == result['memory_size'] else f" (from {result['memory_size']})"
+        print(
+            f"{name:<22} {result['memory_size']:>7} {result['init']['traced_kb'] / 1024:>8.1f} {peak_kb / 1024:>8.1f} "
+            f"{result['estimate_mb']:>9.1f} {result['recommended_mb']:>10}  {result['peak_invocation']}{change}"
+        )
+        if args.verbose:
+            imports = sorted(result['init']['imports'].items(), key=lambda item: item[1], reverse=True)[:5]
+            print('    imports: ' + ', '.join(f"{module} {kb / 1024:.1f}MB" for module, kb in imports))
+            largest = max(result['invocations'], key=lambda invocation: invocation['peak_kb'], default=None)
+            for site in (largest['sites'][:5] if largest else []):
+                print(f"    {site['kb']:>9.1f}KB  {site['site']}")
+    
+    print('\nRecommended memory_size values for terraform (aws_lambda_function):')
+    for result in results:
+        print(f"  {result['function']:<22} memory_size = {result['recommended_mb']}")
+    
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'headroom': args.headroom, 'sizes': args.sizes, 'functions': results}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Stripe stand-in
+A stub HTTP client for the Stripe SDK. The SDK still builds requests and
+parses responses, and subscriptions.stripe_client still wraps the client for
+telemetry, but requests are answered in memory instead of going to the API.
+
+SERVED:
+- GET  /v1/prices                  (one product and monthly/yearly price per plan)
+- POST /v1/checkout/sessions
+- POST /v1/billing_portal/sessions
+- GET  /v1/subscriptions/{id}      (created on first retrieve, or seeded)
+Anything else answers 404 like the API does for unknown objects.
+
+USAGE:
+    stripe_stub = StubStripe()
+    stripe_stub.install()       # before the first get_stripe()
+    header = sign_payload(payload, os.environ['STRIPE_WEBHOOK_SECRET'])
+"""
+import os
+import hmac
+import json
+import time
+import uuid
+import hashlib
+import threading
+from urllib.parse import urlsplit
+
+# Monthly prices per plan (cents); yearly prices are ten months
+PLAN_PRICES = {
+    'single': 499,
+    'team': 1299,
+    'business': 3999,
+}
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Build a Stripe-Signature header for a webhook payload."""
+    timestamp = timestamp or int(time.time())
+    signed = f"{timestamp}.{payload}".encode('utf-8')
+    signature = hmac.new(secret.encode('utf-8'), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def _price(plan, interval, amount):
+    return {
+        'id': f'price_{plan}_{interval}',
+        'object': 'price',
+        'active': True,
+        'currency': 'gbp',
+        'unit_amount': amount,
+        'recurring': {'interval': interval, 'interval_count': 1},
+        'product': {
+            'id': f'prod_{plan}',
+            'object': 'product',
+            'name': plan.title(),
+            'metadata': {'plan_key': plan},
+        },
+    }
+
+
+class StubStripe:
+    """In-memory answers for the Stripe API calls the handlers make."""
+    
+    name = 'stub'
+    
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+        self.subscriptions = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.prices = [
+            _price(plan, interval, amount * (10 if interval == 'year' else 1))
+            for plan, amount in PLAN_PRICES.items()
+            for interval in ('month', 'year')
+        ]
+    
+    def install(self):
+        """Make subscriptions.stripe_client configure the SDK with this client."""
+        import stripe
+        from subscriptions import stripe_client
+        
+        os.environ.setdefault('STRIPE_SECRET_KEY', 'sk_test_stub')
+        os.environ.setdefault('STRIPE_WEBHOOK_SECRET', 'whsec_stub')
+        stripe.new_default_http_client = lambda *args, **kwargs: self
+        # Reconfigure on the next get_stripe()
+        stripe_client._stripe = None
+        return self
+    
+    def add_subscription(self, subscription_id, plan='team', interval='month', status='active', **fields):
+        """Seed a subscription for Subscription.retrieve."""
+        price = next(price for price in self.prices if price['id'] == f'price_{plan}_{interval}')
+        now = int(time.time())
+        subscription = {
+            'id': subscription_id,
+            'object': 'subscription',
+            'status': status,
+            'customer': f'cus_{uuid.uuid4().hex[:14]}',
+            'current_period_start': now,
+            'current_period_end': now + (365 if interval == 'year' else 30) * 86400,
+            'cancel_at_period_end': False,
+            'trial_end': None,
+            'items': {
+                'object': 'list',
+                'data': [{
+                    'id': f'si_{uuid.uuid4().hex[:14]}',
+                    'object': 'subscription_item',
+                    'quantity': 1,
+                    'price': {key: value for key, value in price.items() if key != 'product'},
+                }],
+            },
+        }
+        subscription.update(fields)
+        with self.lock:
+            self.subscriptions[subscription_id] = subscription
+        return subscription
+    
+    def _route(self, method, path):
+        if method == 'get' and path == '/v1/prices':
+            return 200, {'object': 'list', 'url': path, 'has_more': False, 'data': self.prices}
+        if method == 'post' and path == '/v1/checkout/sessions':
+            session_id = f'cs_test_{uuid.uuid4().hex}'
+            return 200, {'id': session_id, 'object': 'checkout.session', 'url': f'https://checkout.stripe.com/c/pay/{session_id}'}
+        if method == 'post' and path == '/v1/billing_portal/sessions':
+            session_id = f'bps_{uuid.uuid4().hex[:24]}'
+            return 200, {'id': session_id, 'object': 'billing_portal.session', 'url': f'https://billing.stripe.com/p/session/{session_id}'}
+        if method == 'get' and path.startswith('/v1/subscriptions/'):
+            subscription_id = path.rsplit('/', 1)[1]
+            subscription = self.subscriptions.get(subscription_id) or self.add_subscription(subscription_id)
+            return 200, subscription
+        return 404, {'error': {'type': 'invalid_request_error', 'message': f'Unrecognized request URL ({method.upper()}: {path})'}}
+    
+    # Stripe HTTPClient interface
+    
+    def request_with_retries(self, method, url, headers, post_data=None, max_network_retries=None, *, _usage=None):
+        return self.request(method, url, headers, post_data)
+    
+    def request(self, method, url, headers, post_data=None, *, _usage=None):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        path = urlsplit(url).path
+        with self.lock:
+            self.requests.append((method.upper(), path))
+        status, body = self._route(method.lower(), path)
+        return json.dumps(body), status, {'request-id': f'req_{uuid.uuid4().hex[:14]}'}
+    
+    def close(self):
+        pass
@@ -0,0 +1,233 @@
+"""
+Terraform config reader
+Minimal reader for the parts of terraform/*.tf the dev tools need. It is
+not an HCL parser - it relies on the layout the .tf files in this repo use
+(one attribute per line, resource blocks closed by a "}" in column 0).
+"""
+import os
+import re
+
+TERRAFORM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'terraform')
+
+_RESOURCE = re.compile(r'^resource "(\w+)" "(\w+)" \{\s*$')
+_ATTRIBUTE = re.compile(r'^\s+(\w+)\s*=\s*(.+?)\s*$')
+
+
+def iter_resources(resource_type, tf_dir=TERRAFORM_DIR):
+    """Yield (file, name, body lines) for each resource of a type."""
+    for filename in sorted(os.listdir(tf_dir)):
+        if not filename.endswith('.tf'):
+            continue
+        with open(os.path.join(tf_dir, filename)) as f:
+            lines = f.read().splitlines()
+        
+        index = 0
+        while index < len(lines):
+            match = _RESOURCE.match(lines[index])
+            index += 1
+            if not match or match.group(1) != resource_type:
+                continue
+            body = []
+            while index < len(lines) and lines[index] != '}':
+                body.append(lines[index])
+                index += 1
+            yield filename, match.group(2), body
+
+
+def get_attribute(body, name):
+    """Get a top-level attribute's raw value (quotes stripped) from a resource body."""
+    for line in body:
+        # Top-level attributes are indented by exactly two spaces
+        if not line.startswith('  ') or line.startswith('   '):
+            continue
+        match = _ATTRIBUTE.match(line)
+        if match and match.group(1) == name:
+            return match.group(2).strip('"')
+    return None
+
+
+def find_lambda_functions(tf_dir=TERRAFORM_DIR):
+    """
+    Get the Lambda functions defined in terraform.
+    Returns {resource_name: {file, handler, module, runtime, architecture, timeout, memory_size, layers, environment}}.
+    """
+    functions = {}
+    for filename, name, body in iter_resources('aws_lambda_function', tf_dir):
+        handler = get_attribute(body, 'handler')
+        layers = get_attribute(body, 'layers') or ''
+        
+        environment = {}
+        in_variables = False
+        for line in body:
+            if line.strip().startswith('variables = {'):
+                in_variables = True
+                continue
+            if in_variables:
+                if line.strip() == '}':
+                    break
+                match = _ATTRIBUTE.match(line)
+                if match:
+                    environment[match.group(1)] = match.group(2).strip('"')
+        
+        functions[name] = {
+            'file': filename,
+            'handler': handler,
+            # "profiles/get_profile.lambda_handler" -> "profiles.get_profile"
+            'module': handler.rsplit('.', 1)[0].replace('/', '.') if handler else None,
+            'runtime': get_attribute(body, 'runtime'),
+            # Lambda's default when architectures is not set
+            'architecture': 'arm64' if 'arm64' in (get_attribute(body, 'architectures') or '') else 'x86_64',
+            'timeout': int(get_attribute(body, 'timeout') or 3),
+            # Lambda's default when memory_size is not set
+            'memory_size': int(get_attribute(body, 'memory_size') or 128),
+            'layers': re.findall(r'aws_lambda_layer_version\.(\w+)', layers),
+            'environment': environment,
+        }
+    return functions
+
+
+def _iter_blocks(body, block_type):
+    """Yield the lines of each nested block of a type (e.g. global_secondary_index)."""
+    index = 0
+    while index < len(body):
+        line = body[index]
+        index += 1
+        if line.strip() != f'{block_type} {{':
+            continue
+        block = []
+        while index < len(body) and body[index].strip() != '}':
+            block.append(body[index])
+            index += 1
+        yield block
+
+
+def _block_attribute(block, name):
+    for line in block:
+        match = _ATTRIBUTE.match(line)
+        if match and match.group(1) == name:
+            return match.group(2).strip('"')
+    return None
+
+
+def find_dynamodb_tables(tf_dir=TERRAFORM_DIR, environment='local'):
+    """
+    Get the DynamoDB tables defined in terraform.
+    Returns {resource_name: {file, name, hash_key, range_key, attributes, indexes}}
+    where indexes is {index_name: {hash_key, range_key, projection_type, non_key_attributes}}.
+    """
+    tables = {}
+    for filename, name, body in iter_resources('aws_dynamodb_table', tf_dir):
+        attributes = {}
+        for block in _iter_blocks(body, 'attribute'):
+            attributes[_block_attribute(block, 'name')] = _block_attribute(block, 'type')
+        
+        indexes = {}
+        for block in _iter_blocks(body, 'global_secondary_index'):
+            non_key = _block_attribute(block, 'non_key_attributes')
+            indexes[_block_attribute(block, 'name')] = {
+                'hash_key': _block_attribute(block, 'hash_key'),
+                'range_key': _block_attribute(block, 'range_key'),
+                'projection_type': _block_attribute(block, 'projection_type') or 'ALL',
+                'non_key_attributes': re.findall(r'"([^"]+)"', non_key or ''),
+            }
+        
+        tables[name] = {
+            'file': filename,
+            'name': get_attribute(body, 'name').replace('${var.environment}', environment),
+            'hash_key': get_attribute(body, 'hash_key'),
+            'range_key': get_attribute(body, 'range_key'),
+            'attributes': attributes,
+            'indexes': indexes,
+        }
+    return tables
+
+
+def table_environment(tf_dir=TERRAFORM_DIR, environment='local'):
+    """
+    Get the *_TABLE_NAME variables the Lambda functions are given, resolved to
+    table names ({'TABLE_NAME': 'printerapp-user-profiles-local', ...}).
+    """
+    tables = find_dynamodb_tables(tf_dir, environment)
+    variables = {}
+    for function in find_lambda_functions(tf_dir).values():
+        for variable, value in function['environment'].items():
+            match = re.match(r'aws_dynamodb_table\.(\w+)\.name$', value)
+            if match and match.group(1) in tables:
+                variables.setdefault(variable, tables[match.group(1)]['name'])
+    return variables
+
+
+def _map_attribute(body, name):
+    """Get a map attribute ({"key" = value, ...}) as a dict of raw values."""
+    values = {}
+    in_map = False
+    for line in body:
+        if line.strip() == f'{name} = {{' or re.match(rf'^\s+{name}\s*=\s*\{{\s*$', line):
+            in_map = True
+            continue
+        if in_map:
+            if line.strip() == '}':
+                break
+            match = re.match(r'^\s+"([^"]+)"\s*=\s*(.+?)\s*$', line)
+            if match:
+                values[match.group(1)] = match.group(2).strip('"')
+    return values
+
+
+def find_api_routes(tf_dir=TERRAFORM_DIR):
+    """
+    Get the API Gateway routes defined in terraform.
+    Returns {(http_method, resource_path): {authorization, type, function, module, response_headers}}
+    where function is the Lambda resource behind an AWS_PROXY integration and
+    response_headers are the static headers a MOCK integration (CORS) answers with.
+    """
+    parents = {}
+    for _, name, body in iter_resources('aws_api_gateway_resource', tf_dir):
+        parent = re.match(r'aws_api_gateway_resource\.(\w+)\.id', get_attribute(body, 'parent_id') or '')
+        parents[name] = (parent.group(1) if parent else None, get_attribute(body, 'path_part'))
+    
+    def resource_path(name):
+        parent, path_part = parents[name]
+        return (resource_path(parent) if parent else '') + '/' + path_part
+    
+    def resource_of(body):
+        match = re.match(r'aws_api_gateway_resource\.(\w+)\.id', get_attribute(body, 'resource_id') or '')
+        return match.group(1) if match else None
+    
+    methods = {}
+    for _, name, body in iter_resources('aws_api_gateway_method', tf_dir):
+        resource = resource_of(body)
+        if resource in parents:
+            methods[name] = (get_attribute(body, 'http_method'), resource_path(resource), get_attribute(body, 'authorization'))
+    
+    def method_of(body):
+        match = re.match(r'aws_api_gateway_method\.(\w+)\.http_method', get_attribute(body, 'http_method') or '')
+        return methods.get(match.group(1)) if match else None
+    
+    functions = find_lambda_functions(tf_dir)
+    routes = {}
+    for _, name, body in iter_resources('aws_api_gateway_integration', tf_dir):
+        method = method_of(body)
+        if method is None:
+            continue
+        http_method, path, authorization = method
+        function = re.search(r'aws_lambda_function\.(\w+)\.invoke_arn', get_attribute(body, 'uri') or '')
+        function = function.group(1) if function else None
+        routes[(http_method, path)] = {
+            'authorization': authorization,
+            'type': get_attribute(body, 'type'),
+            'function': function,
+            'module': functions[function]['module'] if function in functions else None,
+            'timeout': functions[function]['timeout'] if function in functions else None,
+            'response_headers': {},
+        }
+    
+    for _, name, body in iter_resources('aws_api_gateway_integration_response', tf_dir):
+        method = method_of(body)
+        if method is None or (method[0], method[1]) not in routes:
+            continue
+        routes[(method[0], method[1])]['response_headers'] = {
+            key.replace('method.response.header.', ''): value.strip("'")
+            for key, value in _map_attribute(body, 'response_parameters').items()
+        }
+    return routes